@@ -0,0 +1 @@
+# 性能基准脚本，不属于单元测试，需手动运行
@@ -0,0 +1,122 @@
+"""
+比较约会在内存中以普通字典保存与以 models.Appointment 保存时的内存占用，
+以及到期提醒检查的 CPU 开销。
+
+在项目根目录运行：
+    python -m calendar_reminder_service.benchmarks.bench_records
+    python -m calendar_reminder_service.benchmarks.bench_records --size 100000
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+from calendar_reminder_service.src.calendar_utils import datetime_to_seconds
+from calendar_reminder_service.src.models import Appointment
+from calendar_reminder_service.src.scheduler import ReminderScheduler
+
+
+def _seed_json(count: int) -> str:
+    """生成 count 条约会的 JSON 文本，其中一半设置了提醒。"""
+    records = []
+    for i in range(count):
+        date = f"2024-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}"
+        time_str = f"{i % 24:02d}:{i % 60:02d}"
+        records.append({
+            "id": f"seed-{i}",
+            "title": f"Seed {i}",
+            "date": date,
+            "time": time_str,
+            "description": "",
+            "reminder_set": i % 2 == 0,
+            "reminder_time": f"{date} 00:00" if i % 2 == 0 else "",
+            "location": "",
+        })
+    return json.dumps(records)
+
+
+def _measure_memory(build) -> int:
+    """返回 build() 构造的对象在构造后仍占用的字节数。"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def _best_of(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def legacy_scan(records: list, now: datetime) -> list:
+    """原先 check_reminders 的实现：每次检查都对每条约会调用两次 strptime。"""
+    due = []
+    for appt in records:
+        if appt.get("reminder_set") and appt.get("reminder_time"):
+            try:
+                reminder = datetime.strptime(appt["reminder_time"], "%Y-%m-%d %H:%M")
+                start = datetime.strptime(f"{appt.get('date')} {appt.get('time')}", "%Y-%m-%d %H:%M")
+            except ValueError:
+                continue
+            if reminder <= now <= start:
+                due.append(appt)
+    return due
+
+
+def minute_scan(records: list, now_minute: float) -> list:
+    """基于预解析纪元分钟的全量扫描。"""
+    return [
+        appt for appt in records
+        if appt.remind_minute is not None and appt.start_minute is not None
+        and appt.remind_minute <= now_minute <= appt.start_minute
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    text = _seed_json(args.size)
+    dict_bytes = _measure_memory(lambda: json.loads(text))
+    record_bytes = _measure_memory(lambda: [Appointment.from_dict(appt) for appt in json.loads(text)])
+    print(f"records: {args.size}")
+    print(f"memory / appointment   dict: {dict_bytes / args.size:8.1f} B"
+          f"   Appointment: {record_bytes / args.size:8.1f} B"
+          f"   ({1 - record_bytes / dict_bytes:.0%} less)")
+
+    dicts = json.loads(text)
+    now = datetime(2024, 6, 15, 0, 30)
+    now_seconds = datetime_to_seconds(now)
+
+    load_time = _best_of(lambda: [Appointment.from_dict(appt) for appt in dicts], args.repeat)
+    records = [Appointment.from_dict(appt) for appt in dicts]
+    legacy_time = _best_of(lambda: legacy_scan(dicts, now), args.repeat)
+    minute_time = _best_of(lambda: minute_scan(records, now_seconds / 60), args.repeat)
+    assert len(legacy_scan(dicts, now)) == len(minute_scan(records, now_seconds / 60))
+
+    def scheduler_due():
+        scheduler = ReminderScheduler()
+        scheduler.rebuild(records)
+        return scheduler.due(now_seconds)
+
+    rebuild_time = _best_of(scheduler_due, args.repeat)
+    print(f"from_dict (parse once)          : {load_time * 1000:8.1f} ms")
+    print(f"check_reminders  strptime scan  : {legacy_time * 1000:8.1f} ms")
+    print(f"check_reminders  epoch-min scan : {minute_time * 1000:8.1f} ms"
+          f"   ({legacy_time / minute_time:.0f}x faster)")
+    print(f"scheduler rebuild + due         : {rebuild_time * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+比较多线程版 SimpleAPIHandler 与 asyncio 版服务器在大量 keep-alive 连接下的表现。
+
+每个客户端连接在同一连接上依次发送若干个 GET 请求，请求之间保持空闲（模拟面板轮询）。
+服务器运行在独立进程中，客户端使用 asyncio 在本进程内模拟。
+
+在项目根目录运行：
+    python -m calendar_reminder_service.benchmarks.bench_servers
+    python -m calendar_reminder_service.benchmarks.bench_servers --connections 100 1000 --requests 5
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _serve(kind: str, port: int, data_file: str, workers: int):
+    from calendar_reminder_service.src import appointments
+    appointments.DATA_FILE = data_file
+    if kind == "threaded":
+        from calendar_reminder_service.src.api_server import SimpleAPIHandler, create_server
+
+        class QuietHandler(SimpleAPIHandler):
+            # 关闭逐请求的访问日志，避免 stderr 输出影响测量
+            def log_message(self, format, *args):
+                pass
+
+        server = create_server('127.0.0.1', port, workers, QuietHandler)
+        server.serve_forever()
+    else:
+        from calendar_reminder_service.src.async_server import AsyncAPIServer
+        asyncio.run(AsyncAPIServer('127.0.0.1', port).serve_forever())
+
+
+async def _client(port: int, requests: int, think: float, latencies: list, errors: list):
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    except OSError as exc:
+        errors.append(exc)
+        return
+    try:
+        for _ in range(requests):
+            started = time.perf_counter()
+            writer.write(b"GET /api/appointments?date=2024-06-01 HTTP/1.1\r\nHost: bench\r\n\r\n")
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            if not status_line.startswith(b"HTTP/1.1 200"):
+                errors.append(status_line)
+            await asyncio.sleep(think)
+    except (OSError, asyncio.IncompleteReadError) as exc:
+        errors.append(exc)
+    finally:
+        writer.close()
+
+
+async def _drive(port: int, connections: int, requests: int, think: float):
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(port, requests, think, latencies, errors) for _ in range(connections)))
+    return time.perf_counter() - started, latencies, errors
+
+
+def _wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def bench(kind: str, connections: int, requests: int, think: float, workers: int, data_file: str) -> dict:
+    port = _free_port()
+    proc = multiprocessing.Process(target=_serve, args=(kind, port, data_file, workers), daemon=True)
+    proc.start()
+    try:
+        _wait_for_port(port)
+        elapsed, latencies, errors = asyncio.run(_drive(port, connections, requests, think))
+    finally:
+        proc.terminate()
+        proc.join()
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else float("nan")
+    return {
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": pick(0.50),
+        "p99_ms": pick(0.99),
+        "errors": len(errors),
+        "elapsed": elapsed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--requests", type=int, default=5, help="每个连接发送的请求数")
+    parser.add_argument("--think", type=float, default=0.2, help="同一连接上两次请求之间的空闲时间（秒）")
+    parser.add_argument("--workers", type=int, default=8, help="多线程服务器同时处理的请求数上限")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, "appointments.json")
+        from calendar_reminder_service.src import appointments
+        original = appointments.DATA_FILE
+        appointments.DATA_FILE = data_file
+        try:
+            for i in range(50):
+                appointments.add_appointment(f"Bench {i}", "2024-06-01", f"{i % 24:02d}:00")
+        finally:
+            appointments.DATA_FILE = original
+
+        print(f"{'server':>9} {'conns':>6} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'secs':>7}")
+        for connections in args.connections:
+            for kind in ("threaded", "async"):
+                r = bench(kind, connections, args.requests, args.think, args.workers, data_file)
+                print(f"{kind:>9} {connections:>6} {r['rps']:>10.1f} {r['p50_ms']:>9.2f} "
+                      f"{r['p99_ms']:>9.2f} {r['errors']:>7} {r['elapsed']:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+比较 JSON 数据文件与二进制快照（见 src/snapshot.py）的冷启动：从进程启动后的第一个请求到拿到结果的耗时
+（time-to-first-response），以及此时的 RSS（及其中的匿名内存）与读取全部约会之后的峰值 RSS。
+
+每个规模先以 JSON 模式写入数据文件（与 save_appointments 的带缩进格式相同），再转换为快照；
+每种模式在独立的子进程中测量，第一个请求为按日期查询，随后是按 ID 查询与 load_appointments。
+
+在项目根目录运行：
+    python -m calendar_reminder_service.benchmarks.bench_snapshot
+    python -m calendar_reminder_service.benchmarks.bench_snapshot --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from calendar_reminder_service.benchmarks.bench_suite import peak_rss_kb
+from calendar_reminder_service.benchmarks.synthetic import generate_calendar
+
+MODES = ("json", "snapshot")
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def memory_kb() -> dict:
+    """
+    返回 {"rss": 当前 RSS, "anon": 其中的匿名（进程私有）内存, "peak": 峰值 RSS}，单位 KB。
+
+    Linux 上读取 /proc/self/status 的 VmRSS / RssAnon / VmHWM：getrusage 的 ru_maxrss 在 exec 之后仍保留
+    父进程的峰值，子进程里读到的是生成测试数据的父进程的内存。快照模式下 RSS 还包括已访问的映射文件页，
+    这部分与页缓存共享、可随时回收，RssAnon 才是解码出的约会等私有内存。其他平台三项都退回到 ru_maxrss。
+    """
+    values = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "RssAnon", "VmHWM"):
+                    values[key] = int(value.split()[0])
+    except OSError:
+        pass
+    if len(values) == 3:
+        return {"rss": values["VmRSS"], "anon": values["RssAnon"], "peak": values["VmHWM"]}
+    peak = peak_rss_kb()
+    return {"rss": peak, "anon": peak, "peak": peak}
+
+
+def run_child(data_file: str, mode: str, probe_id: str, probe_date: str) -> dict:
+    """在当前（新启动的）进程中依次执行第一个请求、按 ID 查询与全量读取并计时。"""
+    from calendar_reminder_service.src import appointments
+    appointments.DATA_FILE = data_file
+    appointments.STORAGE_MODE = mode
+    baseline = memory_kb()
+
+    started = time.perf_counter()
+    rows = appointments.get_appointments_on_date(probe_date)
+    first_seconds = time.perf_counter() - started
+    first = memory_kb()
+
+    started = time.perf_counter()
+    appointments.get_appointment(probe_id)
+    get_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    records = appointments.load_appointments()
+    load_seconds = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "first_response_ms": _ms(first_seconds),
+        "first_response_rows": len(rows),
+        "get_appointment_ms": _ms(get_seconds),
+        "load_appointments_ms": _ms(load_seconds),
+        "records": len(records),
+        "baseline_rss_kb": baseline["rss"],
+        "first_response_rss_kb": first["rss"],
+        "first_response_anon_kb": first["anon"],
+        "peak_rss_kb": memory_kb()["peak"],
+    }
+
+
+def bench_size(size: int, seed: int = 0) -> list:
+    """生成 size 条约会，分别在子进程中测量 JSON 与快照两种模式，返回各模式的结果。"""
+    from calendar_reminder_service.src import appointments
+    from calendar_reminder_service.src.repository import snapshot_path_for
+    from calendar_reminder_service.src.snapshot import migrate_to_snapshot
+
+    records = generate_calendar(size, seed=seed)
+    probe = records[len(records) // 2]
+    original = (appointments.DATA_FILE, appointments.STORAGE_MODE)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, "appointments.json")
+        appointments.DATA_FILE, appointments.STORAGE_MODE = data_file, "json"
+        try:
+            appointments.save_appointments(records)
+            appointments.current_store().close()
+        finally:
+            appointments.DATA_FILE, appointments.STORAGE_MODE = original
+        del records
+        migrate_to_snapshot(data_file)
+        sizes = {"json": os.path.getsize(data_file), "snapshot": os.path.getsize(snapshot_path_for(data_file))}
+        for mode in MODES:
+            command = [
+                sys.executable, "-m", "calendar_reminder_service.benchmarks.bench_snapshot", "--child",
+                "--data", data_file, "--mode", mode, "--probe-id", probe["id"], "--probe-date", probe["date"],
+            ]
+            result = json.loads(subprocess.run(command, capture_output=True, text=True, check=True).stdout)
+            result.update(size=size, file_bytes=sizes[mode])
+            results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="结果 JSON 文件")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--data", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--probe-id", help=argparse.SUPPRESS)
+    parser.add_argument("--probe-date", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(args.data, args.mode, args.probe_id, args.probe_date)))
+        return 0
+
+    report = []
+    print(f"{'size':>8} {'mode':>9} {'file MB':>8} {'first ms':>9} {'get ms':>7} {'load ms':>8} "
+          f"{'RSS first MB':>13} {'anon first MB':>14} {'RSS peak MB':>12}")
+    for size in args.sizes:
+        for result in bench_size(size, args.seed):
+            report.append(result)
+            print(f"{size:>8} {result['mode']:>9} {result['file_bytes'] / 2 ** 20:>8.1f} "
+                  f"{result['first_response_ms']:>9} {result['get_appointment_ms']:>7} "
+                  f"{result['load_appointments_ms']:>8} {(result['first_response_rss_kb'] or 0) / 1024:>13.1f} "
+                  f"{(result['first_response_anon_kb'] or 0) / 1024:>14.1f} {(result['peak_rss_kb'] or 0) / 1024:>12.1f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+比较 json 与 journal 两种存储模式下 add_appointment 的写入吞吐。
+
+在项目根目录运行：
+    python -m calendar_reminder_service.benchmarks.bench_storage
+    python -m calendar_reminder_service.benchmarks.bench_storage --sizes 1000 10000 --writes 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from calendar_reminder_service.src import appointments
+
+
+def _seed_records(count: int) -> list:
+    return [
+        {
+            "id": f"seed-{i}",
+            "title": f"Seed {i}",
+            "date": f"2024-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}",
+            "time": f"{i % 24:02d}:{i % 60:02d}",
+            "description": "",
+            "reminder_set": False,
+            "reminder_time": "",
+            "location": "",
+        }
+        for i in range(count)
+    ]
+
+
+def bench_writes(mode: str, size: int, writes: int) -> float:
+    """在已有 size 条约会的数据文件上执行 writes 次 add_appointment，返回每秒写入数。"""
+    with tempfile.TemporaryDirectory() as tmp:
+        appointments.DATA_FILE = os.path.join(tmp, "appointments.json")
+        appointments.STORAGE_MODE = mode
+        appointments.save_appointments(_seed_records(size))
+        started = time.perf_counter()
+        for i in range(writes):
+            appointments.add_appointment(f"Bench {i}", "2024-06-01", "09:00")
+        elapsed = time.perf_counter() - started
+    return writes / elapsed if elapsed > 0 else float("inf")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--writes", type=int, default=20, help="每种配置执行的写入次数")
+    args = parser.parse_args(argv)
+
+    original = (appointments.DATA_FILE, appointments.STORAGE_MODE)
+    try:
+        print(f"{'size':>8} {'json w/s':>12} {'journal w/s':>12} {'speedup':>8}")
+        for size in args.sizes:
+            json_rate = bench_writes("json", size, args.writes)
+            journal_rate = bench_writes("journal", size, args.writes)
+            print(f"{size:>8} {json_rate:>12.1f} {journal_rate:>12.1f} {journal_rate / json_rate:>7.1f}x")
+    finally:
+        appointments.DATA_FILE, appointments.STORAGE_MODE = original
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""
+约会与提醒热点路径的基准测试套件。
+
+对每个规模生成合成日历（见 synthetic.py）写入临时数据文件，分别计时
+load_appointments、get_appointments_on_date、search_appointments、add_appointment、set_reminder 与 check_reminders，
+以 JSON 输出每项操作的 ops/sec、p50/p99 延迟以及进程峰值 RSS。
+每个规模在独立的子进程中运行，峰值 RSS 互不影响。
+
+在项目根目录运行：
+    python -m calendar_reminder_service.benchmarks.bench_suite --sizes 1000 10000 100000 -o results.json
+    python -m calendar_reminder_service.benchmarks.bench_suite --sizes 1000000 --write-ops 5
+    # 与之前提交的结果比较，p50 变慢超过阈值时以非零状态退出
+    python -m calendar_reminder_service.benchmarks.bench_suite -o new.json --compare old.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，不报告峰值 RSS
+    resource = None
+
+from calendar_reminder_service.src import appointments, reminders
+from calendar_reminder_service.benchmarks.synthetic import default_start_date, generate_calendar
+
+OPERATIONS = (
+    "load_appointments", "load_appointments_cold", "get_appointments_on_date",
+    "search_appointments", "add_appointment", "set_reminder", "check_reminders",
+)
+# 全文检索基准的查询：单个词、前缀、多词 AND（synthetic 的标题为 "<名称> #<序号>"）
+SEARCH_QUERIES = ("dentist", "design rev", "team sync 12", "interview 7", "room a standup", "work")
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """最近秩法求百分位数，sorted_values 需已排序且非空。"""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: list) -> dict:
+    """把单次调用耗时（秒）汇总为 ops/sec 与毫秒级延迟分位数。"""
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    return {
+        "ops": len(ordered),
+        "ops_per_sec": round(len(ordered) / total, 1) if total > 0 else None,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p90_ms": round(percentile(ordered, 0.90) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "mean_ms": round(total / len(ordered) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+
+
+def time_calls(func, args_iter) -> dict:
+    latencies = []
+    for args in args_iter:
+        started = time.perf_counter()
+        func(*args)
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def peak_rss_kb():
+    """进程峰值常驻内存（KB），平台不支持时返回 None。"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _touch(path: str):
+    """修改数据文件的 mtime，迫使存储在下一次访问时重新加载（模拟冷启动）。"""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+
+
+def run_size(size: int, mode: str = "json", reminder_density: float = 0.5, days: int = 365,
+             read_ops: int = 200, write_ops: int = 20, seed: int = 0) -> dict:
+    """
+    在当前进程中对一个规模执行全部操作的计时。
+
+    返回值:
+        dict: 该规模的结果，operations 为操作名到统计信息的映射。
+    """
+    rng = random.Random(seed + 1)
+    original = (appointments.DATA_FILE, appointments.STORAGE_MODE)
+    with tempfile.TemporaryDirectory() as tmp:
+        appointments.DATA_FILE = os.path.join(tmp, "appointments.json")
+        appointments.STORAGE_MODE = mode
+        try:
+            started = time.perf_counter()
+            records = generate_calendar(size, reminder_density, days, seed=seed)
+            appointments.save_appointments(records)
+            setup_seconds = time.perf_counter() - started
+
+            ids = [appt["id"] for appt in records]
+            dates = sorted({appt["date"] for appt in records})
+            start_date = default_start_date(days)
+            del records
+
+            results = {}
+            load_ops = max(1, min(read_ops, 20))
+            results["load_appointments"] = time_calls(appointments.load_appointments, [()] * load_ops)
+            if mode in ("json", "journal"):
+                def cold_load():
+                    _touch(appointments.DATA_FILE)
+                    return appointments.load_appointments()
+                results["load_appointments_cold"] = time_calls(cold_load, [()] * max(1, min(write_ops, 5)))
+            results["get_appointments_on_date"] = time_calls(
+                appointments.get_appointments_on_date, [(rng.choice(dates),) for _ in range(read_ops)])
+            results["search_appointments"] = time_calls(
+                appointments.search_appointments, [(rng.choice(SEARCH_QUERIES),) for _ in range(read_ops)])
+            results["add_appointment"] = time_calls(appointments.add_appointment, [
+                (f"Bench {i}", start_date.strftime("%Y-%m-%d"), "12:00") for i in range(write_ops)])
+            results["set_reminder"] = time_calls(reminders.set_reminder, [
+                (rng.choice(ids), start_date.strftime("%Y-%m-%d") + " 11:00") for _ in range(write_ops)])
+            results["check_reminders"] = time_calls(reminders.check_reminders, [()] * read_ops)
+            appointments.current_store().close()
+        finally:
+            appointments.DATA_FILE, appointments.STORAGE_MODE = original
+    return {
+        "size": size,
+        "mode": mode,
+        "reminder_density": reminder_density,
+        "days": days,
+        "setup_seconds": round(setup_seconds, 3),
+        "peak_rss_kb": peak_rss_kb(),
+        "operations": results,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_isolated(size: int, args) -> dict:
+    """在子进程中运行单个规模，使峰值 RSS 只反映该规模。"""
+    command = [
+        sys.executable, "-m", "calendar_reminder_service.benchmarks.bench_suite", "--child",
+        "--sizes", str(size), "--mode", args.mode, "--reminder-density", str(args.reminder_density),
+        "--days", str(args.days), "--read-ops", str(args.read_ops), "--write-ops", str(args.write_ops),
+        "--seed", str(args.seed),
+    ]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    比较两次运行的结果，返回 p50 延迟变慢超过 threshold（比例）的条目。
+
+    返回值:
+        list: 每项为 (规模, 模式, 操作名, 基线 p50, 当前 p50)。
+    """
+    base = {(r["size"], r["mode"], name): stats["p50_ms"]
+            for r in baseline.get("results", []) for name, stats in r["operations"].items()}
+    regressions = []
+    for r in current["results"]:
+        for name, stats in r["operations"].items():
+            old = base.get((r["size"], r["mode"], name))
+            if old and stats["p50_ms"] > old * (1 + threshold):
+                regressions.append((r["size"], r["mode"], name, old, stats["p50_ms"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--mode", default="json", choices=("json", "journal", "sqlite", "sharded", "snapshot"))
+    parser.add_argument("--reminder-density", type=float, default=0.5, help="设置了提醒的约会比例")
+    parser.add_argument("--days", type=int, default=365, help="约会分布的天数")
+    parser.add_argument("--read-ops", type=int, default=200, help="每项读操作的调用次数")
+    parser.add_argument("--write-ops", type=int, default=20, help="每项写操作的调用次数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="结果 JSON 文件，缺省输出到标准输出")
+    parser.add_argument("--compare", help="作为基线的结果 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定为退化的 p50 变慢比例")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_size(args.sizes[0], args.mode, args.reminder_density, args.days,
+                                  args.read_ops, args.write_ops, args.seed)))
+        return 0
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": [],
+    }
+    for size in args.sizes:
+        result = run_isolated(size, args)
+        report["results"].append(result)
+        print(f"size={size:<8} setup={result['setup_seconds']}s peak_rss={result['peak_rss_kb']}KB",
+              file=sys.stderr)
+        for name, stats in result["operations"].items():
+            print(f"  {name:<26} {stats['ops_per_sec']:>12} ops/s  p50={stats['p50_ms']}ms  p99={stats['p99_ms']}ms",
+                  file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for size, mode, name, old, new in regressions:
+            print(f"REGRESSION size={size} mode={mode} {name}: p50 {old}ms -> {new}ms", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
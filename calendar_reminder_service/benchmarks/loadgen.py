@@ -0,0 +1,357 @@
+"""
+api_server 的 HTTP 压测工具（仅依赖标准库）。
+
+在子进程中以临时端口启动 API 服务器（线程池版或 asyncio 版），数据文件预先填充合成日历
+（见 synthetic.py），然后按可配置的请求比例发送以下请求：
+
+    get_date         GET  /api/appointments?date=<随机日期>
+    get_all          GET  /api/appointments
+    post_appointment POST /api/appointments
+    post_reminder    POST /api/reminders
+    get_due          GET  /api/reminders/due
+
+两种负载模型：
+    --concurrency N   闭环：N 个 keep-alive 连接，每个连接收到响应后立即发送下一个请求；
+    --rate R          开环：每秒按固定间隔发出 R 个请求，与响应快慢无关。
+                      延迟从计划发送时间算起，服务器跟不上时排队时间也计入延迟。
+
+按路由报告吞吐、延迟分位数与错误数（非 2xx 状态码与连接错误）。
+
+在项目根目录运行：
+    python -m calendar_reminder_service.benchmarks.loadgen --size 10000 --concurrency 32 --duration 10
+    python -m calendar_reminder_service.benchmarks.loadgen --server async --rate 500 --duration 20 -o report.json
+    python -m calendar_reminder_service.benchmarks.loadgen --mix get_date=80,post_reminder=20
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from calendar_reminder_service.benchmarks.bench_suite import summarize
+from calendar_reminder_service.benchmarks.synthetic import write_calendar
+
+ROUTES = ("get_date", "get_all", "post_appointment", "post_reminder", "get_due")
+DEFAULT_MIX = "get_date=50,get_all=2,post_appointment=15,post_reminder=13,get_due=20"
+
+
+def parse_mix(text: str) -> dict:
+    """
+    解析 "route=权重,..." 形式的请求比例。
+
+    异常:
+        ValueError: 路由名未知、权重不是非负数或权重全为 0。
+    """
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        route, sep, weight = part.partition("=")
+        if not sep or route not in ROUTES:
+            raise ValueError(f"Unknown route in mix: {part!r} (expected one of {', '.join(ROUTES)})")
+        mix[route] = float(weight)
+        if mix[route] < 0:
+            raise ValueError(f"Negative weight for {route}")
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Request mix must contain at least one positive weight")
+    return mix
+
+
+class Workload:
+    """按请求比例随机生成请求，目标日期与约会 ID 取自预填充的数据。"""
+
+    def __init__(self, records: list, mix: dict, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.routes = list(mix)
+        self.weights = [mix[route] for route in self.routes]
+        self.dates = sorted({appt["date"] for appt in records})
+        self.ids = [appt["id"] for appt in records]
+        self.counter = 0
+
+    def next_request(self):
+        """返回 (路由名, 方法, 路径, 请求体 bytes)。"""
+        route = self.rng.choices(self.routes, self.weights)[0]
+        self.counter += 1
+        if route == "get_date":
+            return route, "GET", f"/api/appointments?date={self.rng.choice(self.dates)}", b""
+        if route == "get_all":
+            return route, "GET", "/api/appointments", b""
+        if route == "get_due":
+            return route, "GET", "/api/reminders/due", b""
+        date = self.rng.choice(self.dates)
+        if route == "post_appointment":
+            body = {"title": f"Load {self.counter}", "date": date, "time": f"{self.rng.randrange(8, 20):02d}:00"}
+            return route, "POST", "/api/appointments", json.dumps(body).encode("utf-8")
+        body = {"appointment_id": self.rng.choice(self.ids), "reminder_time": f"{date} 07:30"}
+        return route, "POST", "/api/reminders", json.dumps(body).encode("utf-8")
+
+
+class Connection:
+    """一个 HTTP/1.1 keep-alive 连接，只实现压测所需的最小子集。"""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> int:
+        """发送一个请求并读完响应体，返回状态码；服务器关闭连接时下次请求自动重连。"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        head = f"{method} {path} HTTP/1.1\r\nHost: loadgen\r\nContent-Length: {len(body)}\r\n"
+        if body:
+            head += "Content-Type: application/json\r\n"
+        self.writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            self.close()
+            raise ConnectionError("connection closed by server")
+        status = int(status_line.split()[1])
+        length, chunked, close = 0, False, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding":
+                chunked = "chunked" in value
+            elif name == "connection":
+                close = value == "close"
+        if chunked:
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif length:
+            await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class Recorder:
+    """按路由记录延迟与错误。"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    async def send(self, conn: Connection, request, started: float):
+        route, method, path, body = request
+        try:
+            status = await conn.request(method, path, body)
+        except (OSError, ValueError, asyncio.IncompleteReadError) as exc:
+            conn.close()
+            self.errors[route][type(exc).__name__] += 1
+            return
+        self.latencies[route].append(time.perf_counter() - started)
+        if status >= 400:
+            self.errors[route][str(status)] += 1
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route in sorted(set(self.latencies) | set(self.errors)):
+            latencies = self.latencies.get(route, [])
+            errors = self.errors.get(route, {})
+            stats = summarize(latencies) if latencies else {"ops": 0}
+            stats["throughput_rps"] = round(len(latencies) / elapsed, 1) if elapsed else None
+            stats["errors"] = sum(errors.values())
+            stats["error_kinds"] = dict(errors)
+            routes[route] = stats
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        total = summarize(all_latencies) if all_latencies else {"ops": 0}
+        total["throughput_rps"] = round(len(all_latencies) / elapsed, 1) if elapsed else None
+        total["errors"] = sum(stats["errors"] for stats in routes.values())
+        return {"elapsed_seconds": round(elapsed, 3), "total": total, "routes": routes}
+
+
+async def closed_loop(port: int, workload: Workload, concurrency: int, duration: float, max_requests: int):
+    """固定并发：每个连接收到响应后立即发送下一个请求。"""
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+    sent = 0
+
+    async def client():
+        nonlocal sent
+        conn = Connection(port)
+        try:
+            while time.perf_counter() < deadline and (not max_requests or sent < max_requests):
+                sent += 1
+                await recorder.send(conn, workload.next_request(), time.perf_counter())
+        finally:
+            conn.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return recorder, time.perf_counter() - started
+
+
+async def open_loop(port: int, workload: Workload, rate: float, duration: float, max_requests: int,
+                    max_connections: int):
+    """固定到达率：按计划时间发出请求，空闲连接不足时新建连接（不超过 max_connections）。"""
+    recorder = Recorder()
+    idle = asyncio.Queue()
+    connections = []
+    total = int(rate * duration)
+    if max_requests:
+        total = min(total, max_requests)
+
+    async def one(request, scheduled):
+        if idle.empty() and len(connections) < max_connections:
+            conn = Connection(port)
+            connections.append(conn)
+        else:
+            conn = await idle.get()
+        try:
+            await recorder.send(conn, request, scheduled)
+        finally:
+            idle.put_nowait(conn)
+
+    started = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        scheduled = started + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(workload.next_request(), scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    for conn in connections:
+        conn.close()
+    return recorder, elapsed
+
+
+def _serve(kind: str, data_file: str, mode: str, workers: int, port_pipe):
+    """子进程入口：在临时端口上启动服务器，并通过管道告知端口号。"""
+    from calendar_reminder_service.src import appointments
+    appointments.DATA_FILE = data_file
+    appointments.STORAGE_MODE = mode
+    if mode == "sqlite":
+        from calendar_reminder_service.src.repository import sqlite_path_for
+        from calendar_reminder_service.src.sqlite_store import migrate_json_to_sqlite
+        migrate_json_to_sqlite(data_file, sqlite_path_for(data_file))
+    elif mode == "sharded":
+        from calendar_reminder_service.src.shards import migrate_to_shards
+        migrate_to_shards(data_file)
+    elif mode == "snapshot":
+        from calendar_reminder_service.src.snapshot import migrate_to_snapshot
+        migrate_to_snapshot(data_file)
+    if kind == "threaded":
+        from calendar_reminder_service.src.api_server import SimpleAPIHandler, create_server
+
+        class QuietHandler(SimpleAPIHandler):
+            # 关闭逐请求的访问日志，避免 stderr 输出影响测量
+            def log_message(self, format, *args):
+                pass
+
+        server = create_server("127.0.0.1", 0, workers, QuietHandler)
+        port_pipe.send(server.server_address[1])
+        server.serve_forever()
+    else:
+        from calendar_reminder_service.src.async_server import AsyncAPIServer
+
+        async def serve():
+            server = AsyncAPIServer("127.0.0.1", 0)
+            await server.start()
+            port_pipe.send(server.port)
+            await server.serve_forever()
+
+        asyncio.run(serve())
+
+
+def run_load(args) -> dict:
+    mix = parse_mix(args.mix)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, "appointments.json")
+        records = write_calendar(data_file, args.size, reminder_density=args.reminder_density, seed=args.seed)
+        workload = Workload(records, mix, args.seed)
+        del records
+
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        proc = multiprocessing.Process(target=_serve, args=(args.server, data_file, args.mode, args.workers, sender),
+                                       daemon=True)
+        proc.start()
+        try:
+            if not receiver.poll(60):
+                raise RuntimeError("server did not start")
+            port = receiver.recv()
+            if args.rate:
+                recorder, elapsed = asyncio.run(open_loop(port, workload, args.rate, args.duration, args.requests,
+                                                          args.max_connections))
+            else:
+                recorder, elapsed = asyncio.run(closed_loop(port, workload, args.concurrency, args.duration,
+                                                            args.requests))
+        finally:
+            proc.terminate()
+            proc.join()
+
+    report = recorder.report(elapsed)
+    report["config"] = {
+        "server": args.server, "mode": args.mode, "workers": args.workers, "size": args.size,
+        "mix": mix, "concurrency": None if args.rate else args.concurrency, "rate": args.rate,
+        "duration": args.duration,
+    }
+    return report
+
+
+def print_report(report: dict, stream=sys.stderr):
+    print(f"{'route':<18} {'ok':>8} {'err':>6} {'req/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}",
+          file=stream)
+    rows = list(report["routes"].items()) + [("TOTAL", report["total"])]
+    for route, stats in rows:
+        if not stats["ops"]:
+            print(f"{route:<18} {0:>8} {stats['errors']:>6}", file=stream)
+            continue
+        print(f"{route:<18} {stats['ops']:>8} {stats['errors']:>6} {stats['throughput_rps']:>9} "
+              f"{stats['p50_ms']:>9.2f} {stats['p90_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f}",
+              file=stream)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=("threaded", "async"), default="threaded")
+    parser.add_argument("--workers", type=int, default=8, help="线程池服务器的工作线程数")
+    parser.add_argument("--mode", choices=("json", "journal", "sqlite", "sharded", "snapshot"), default="json", help="存储模式")
+    parser.add_argument("--size", type=int, default=10000, help="预填充的约会条数")
+    parser.add_argument("--reminder-density", type=float, default=0.5)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"请求比例，默认 {DEFAULT_MIX}")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=16, help="闭环模式的并发连接数")
+    load.add_argument("--rate", type=float, help="开环模式每秒发出的请求数")
+    parser.add_argument("--max-connections", type=int, default=256, help="开环模式最多使用的连接数")
+    parser.add_argument("--duration", type=float, default=10.0, help="压测时长（秒）")
+    parser.add_argument("--requests", type=int, default=0, help="最多发送的请求数，0 表示只按时长")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="将 JSON 报告写入文件")
+    args = parser.parse_args(argv)
+    try:
+        parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    report = run_load(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    return 1 if report["total"]["errors"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+生成用于基准测试的合成日历数据。
+
+约会集中在工作时间（08:00–19:45，按 15 分钟对齐），按可配置的天数分布在起始日期之后，
+其中一部分设置了提醒（提前 10 分钟到 1 天）。相同的参数与随机种子总是生成相同的数据。
+"""
+import json
+import os
+import random
+from datetime import date, datetime, timedelta
+
+from calendar_reminder_service.src.calendar_utils import DATE_FORMAT, DATETIME_FORMAT
+
+_TITLES = (
+    "Standup", "1:1", "Design review", "Dentist", "Lunch", "Gym", "Sprint planning",
+    "Customer call", "Interview", "Retro", "Doctor", "School pickup", "Team sync", "Workshop",
+)
+_LOCATIONS = ("", "", "Room A", "Room B", "Online", "Office", "Clinic")
+# 提醒提前量（分钟）
+_REMINDER_LEADS = (10, 15, 30, 60, 120, 1440)
+
+
+def default_start_date(days: int) -> date:
+    """默认让日历覆盖今天前后各一半的天数，使到期提醒检查有真实的命中。"""
+    return date.today() - timedelta(days=days // 2)
+
+
+def generate_calendar(count: int, reminder_density: float = 0.5, days: int = 365,
+                      start_date: date = None, seed: int = 0) -> list:
+    """
+    生成合成约会列表，字段与 appointments.add_appointment 创建的约会一致。
+
+    参数:
+        count (int): 约会条数。
+        reminder_density (float): 设置了提醒的约会比例（0–1）。
+        days (int): 约会分布的天数。
+        start_date (date, optional): 第一天，默认见 default_start_date。
+        seed (int): 随机种子。
+
+    返回值:
+        list: 约会字典列表。
+    """
+    rng = random.Random(seed)
+    start_date = start_date or default_start_date(days)
+    dates = [(start_date + timedelta(days=offset)).strftime(DATE_FORMAT) for offset in range(max(days, 1))]
+    records = []
+    for i in range(count):
+        day = rng.choice(dates)
+        slot = rng.randrange(48)
+        time_str = f"{8 + slot // 4:02d}:{(slot % 4) * 15:02d}"
+        reminder_set = rng.random() < reminder_density
+        reminder_time = ""
+        if reminder_set:
+            start = datetime.strptime(f"{day} {time_str}", DATETIME_FORMAT)
+            reminder_time = (start - timedelta(minutes=rng.choice(_REMINDER_LEADS))).strftime(DATETIME_FORMAT)
+        records.append({
+            "id": f"synthetic-{seed}-{i}",
+            "title": f"{rng.choice(_TITLES)} #{i}",
+            "date": day,
+            "time": time_str,
+            "description": "",
+            "reminder_set": reminder_set,
+            "reminder_time": reminder_time,
+            "location": rng.choice(_LOCATIONS),
+        })
+    return records
+
+
+def write_calendar(path: str, count: int, **options) -> list:
+    """
+    生成合成日历并以 JSON 模式的数据文件格式写入 path。
+
+    参数:
+        path (str): 数据文件路径。
+        count (int): 约会条数。
+        **options: 传给 generate_calendar 的其他参数。
+
+    返回值:
+        list: 写入的约会列表。
+    """
+    records = generate_calendar(count, **options)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(records, f)
+    return records
@@ -1,82 +1,773 @@
 # 基于 http.server 的简易 API 服务
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from contextlib import contextmanager
+import argparse
+import base64
+import binascii
 import json
-from urllib.parse import urlparse, parse_qs
-from .appointments import add_appointment, get_appointments_on_date, load_appointments
-from .reminders import set_reminder, check_reminders
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs, unquote
+from .appointments import (
+    add_appointment, add_appointments, current_store, delete_appointment, get_appointment,
+    get_appointments_on_date, get_appointments_between, get_appointments_page, get_changes_since, iter_appointments,
+    load_appointments, search_appointments, update_appointment, validate_appointment_fields,
+)
+from . import interprocess, prefork
+from .changes import ResyncRequired
+from .dispatcher import BROKER, dispatcher_stats, event_stream, start_dispatcher, stop_dispatcher
+from .metrics import METRICS
+from .profiling import PROFILER
+from .response_cache import ResponseCache, etag_matches, make_etag
+from .reminders import (
+    acknowledge_reminders, set_reminder, set_reminders, check_reminders, current_marks, pending_reminders,
+)
+
+
+# 多线程模式下同时处理的请求数上限
+DEFAULT_WORKERS = int(os.environ.get("CALENDAR_API_WORKERS", "8"))
+# 多线程模式下同时保持的连接数上限，超出的连接立即以 503 关闭
+DEFAULT_MAX_CONNECTIONS = int(os.environ.get("CALENDAR_API_MAX_CONNECTIONS", "256"))
+# 多线程模式下同时保持的 SSE 订阅连接数上限，超出时返回 503
+DEFAULT_MAX_STREAMS = int(os.environ.get("CALENDAR_API_MAX_STREAMS", "64"))
+# pre-fork 模式的工作进程数，1 表示单进程
+DEFAULT_PROCESSES = int(os.environ.get("CALENDAR_API_PROCESSES", "1"))
+# pre-fork 模式下提醒分发线程的最长休眠秒数：其他工作进程写入的提醒不会唤醒本进程，
+# 靠定期检查共享版本计数器发现（计数器不变时检查只是一次内存读取）
+PREFORK_DISPATCHER_SLEEP = 1.0
+
+
+# 分页参数 limit 的上限
+MAX_PAGE_SIZE = 1000
+# 全文检索默认返回的条数
+SEARCH_LIMIT = 50
+# 流式输出时每批序列化的约会条数
+STREAM_BATCH_SIZE = 500
+# 已编码 GET 响应的缓存，键包含数据版本，数据变化后旧条目自然失效
+RESPONSE_CACHE = ResponseCache(max_entries=int(os.environ.get("CALENDAR_RESPONSE_CACHE_SIZE", "256")))
+# 可缓存的 GET 路由
+CACHEABLE_ROUTES = ('/api/appointments', '/api/appointments/search', '/api/reminders/due')
+# 指标中按路径区分的路由，其他路径统一记为 "other"，避免任意路径撑大标签集合
+ROUTES = (
+    '/api/appointments', '/api/appointments/batch', '/api/appointments/search', '/api/reminders', '/api/reminders/batch',
+    '/api/reminders/due', '/api/reminders/ack', '/api/reminders/stream', '/api/reminders/dispatcher', '/api/metrics',
+)
+# 单条约会路由 /api/appointments/<id> 的前缀，以及它在指标中的路由标签
+APPOINTMENT_PREFIX = '/api/appointments/'
+APPOINTMENT_ROUTE = '/api/appointments/{id}'
+# 不做 cProfile 剖析的长连接路由（剖析器会一直被占用）
+UNPROFILED_ROUTES = ('/api/reminders/stream',)
+# 长期保持的订阅路由：占用订阅名额而不是请求名额（见 ThreadedHTTPServer）
+SUBSCRIPTION_ROUTES = ('/api/reminders/stream',)
+# Prometheus 文本格式的 Content-Type
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class StreamingResponse:
+    """
+    分块输出的响应体：chunks 为逐块产出 bytes 的迭代器。
+
+    SimpleAPIHandler 以 chunked 传输编码发送，内存占用只与单块大小有关。
+    """
+
+    def __init__(self, chunks, content_type='application/x-ndjson', headers=None):
+        self.chunks = chunks
+        self.content_type = content_type
+        self.headers = headers or {}
+
+
+class EventStream(StreamingResponse):
+    """
+    GET /api/reminders/stream 的 Server-Sent Events 响应：持续推送后台分发线程触发的提醒。
+
+    多线程服务器中每个订阅连接占用自己的连接线程与一个订阅名额，不占用请求名额；
+    async_server 直接订阅 broker，不占用线程。
+    """
+
+    def __init__(self, broker=None):
+        self.broker = broker if broker is not None else BROKER
+        super().__init__(event_stream(self.broker), 'text/event-stream', {'Cache-Control': 'no-cache'})
+
+
+def appointment_id_from_path(path: str):
+    """路径为 /api/appointments/<id> 时返回（URL 解码后的）约会 ID，否则返回 None。"""
+    if not path.startswith(APPOINTMENT_PREFIX) or path in ROUTES:
+        return None
+    appointment_id = path[len(APPOINTMENT_PREFIX):]
+    if not appointment_id or '/' in appointment_id:
+        return None
+    return unquote(appointment_id)
+
+
+def route_label(path: str) -> str:
+    """返回请求路径在指标中使用的路由标签。"""
+    if path in ROUTES:
+        return path
+    return APPOINTMENT_ROUTE if appointment_id_from_path(path) is not None else 'other'
+
+
+def record_request(route: str, method: str, status: int, elapsed: float):
+    """
+    记录一次请求的计数与耗时，供 SimpleAPIHandler 与 async_server 共用。
+
+    参数:
+        route (str): route_label 返回的路由标签。
+        method (str): HTTP 方法。
+        status (int): 响应状态码。
+        elapsed (float): 处理耗时（秒）。
+    """
+    METRICS.inc('calendar_http_requests_total', {'route': route, 'method': method, 'status': str(status)})
+    METRICS.observe('calendar_http_request_duration_seconds', elapsed, {'route': route, 'method': method})
+
+
+def encode_json(data, route: str) -> bytes:
+    """把响应数据编码为 JSON，并按路由记录编码耗时。"""
+    with METRICS.timed('calendar_json_encode_duration_seconds', {'route': route}):
+        return json.dumps(data).encode('utf-8')
+
+
+def _collect_service_metrics():
+    """render 时读取响应缓存、存储、提醒分发与剖析器的统计。"""
+    cache = RESPONSE_CACHE.stats()
+    store = current_store()
+    store_stats = store.stats()
+    dispatch = dispatcher_stats()
+    metrics = [
+        ('calendar_response_cache_hits_total', 'counter', 'Response cache hits.', [({}, cache['hits'])]),
+        ('calendar_response_cache_misses_total', 'counter', 'Response cache misses.', [({}, cache['misses'])]),
+        ('calendar_response_cache_entries', 'gauge', 'Encoded responses held in the cache.',
+         [({}, cache['entries'])]),
+        ('calendar_response_cache_bytes', 'gauge', 'Bytes held in the response cache.', [({}, cache['bytes'])]),
+        ('calendar_reminders_published_total', 'counter', 'Reminder events published to subscribers.',
+         [({}, dispatch['published'])]),
+        ('calendar_reminder_subscribers', 'gauge', 'Connected reminder stream subscribers.',
+         [({}, dispatch['subscribers'])]),
+        ('calendar_profiles_sampled_total', 'counter', 'Requests profiled with cProfile.',
+         [({}, PROFILER.sampled)]),
+        ('calendar_profiles_saved_total', 'counter', 'Slow-request profiles written to disk.',
+         [({}, PROFILER.saved)]),
+    ]
+    if 'reloads' in store_stats:
+        metrics.append(('calendar_store_reloads_total', 'counter', 'Reloads of the data file after external changes.',
+                        [({}, store_stats['reloads'])]))
+    version = store.version()
+    if version is not None:
+        metrics.append(('calendar_data_version', 'gauge', 'Current data version.', [({}, version)]))
+    return metrics
+
+
+METRICS.register_collector(_collect_service_metrics)
+
+
+def encode_cursor(key: tuple) -> str:
+    """将分页游标键编码为不透明的 URL 安全字符串。"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    解析 encode_cursor 生成的游标。
+
+    异常:
+        ValueError: 游标格式不正确。
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError) as exc:
+        raise ValueError('Invalid cursor') from exc
+    if not isinstance(key, list) or len(key) != 3 or not all(isinstance(part, str) for part in key):
+        raise ValueError('Invalid cursor')
+    return tuple(key)
+
+
+def ndjson_chunks(batch_size=STREAM_BATCH_SIZE):
+    """按 (date, time, id) 顺序逐批序列化全部约会为 NDJSON。"""
+    batch = []
+    for appt in iter_appointments(batch_size):
+        batch.append(json.dumps(appt))
+        if len(batch) >= batch_size:
+            yield ("\n".join(batch) + "\n").encode('utf-8')
+            batch = []
+    if batch:
+        yield ("\n".join(batch) + "\n").encode('utf-8')
+
+
+def _page_limit(query, default: int) -> int:
+    """
+    解析查询参数 limit。
+
+    异常:
+        ValueError: 不是 1..MAX_PAGE_SIZE 之间的整数。
+    """
+    limit = query.get('limit', [None])[0]
+    limit = int(limit) if limit is not None else default
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError
+    return limit
+
+
+def _list_appointments(query):
+    """处理不带日期条件的 GET /api/appointments：全量、分页或流式。"""
+    stream = query.get('stream', [''])[0].lower() in ('1', 'true', 'ndjson')
+    if stream:
+        return 200, StreamingResponse(ndjson_chunks())
+    cursor = query.get('cursor', [None])[0]
+    if 'limit' not in query and cursor is None:
+        return 200, load_appointments()
+    try:
+        limit = _page_limit(query, 100)
+    except ValueError:
+        return 400, {'error': f'limit must be an integer between 1 and {MAX_PAGE_SIZE}'}
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return 400, {'error': 'Invalid cursor'}
+    items, next_key = get_appointments_page(limit, after)
+    return 200, {'items': items, 'next_cursor': encode_cursor(next_key) if next_key else None}
+
+
+def _changes_since(query):
+    """
+    处理 GET /api/appointments?since=<seq>：返回该序号之后的变更；
+    变更日志已不包含这些变更时返回 410，客户端需全量下载后从响应中的 seq 继续。
+    """
+    try:
+        since = int(query['since'][0])
+        if since < 0:
+            raise ValueError
+    except ValueError:
+        return 400, {'error': 'since must be a non-negative integer'}
+    try:
+        limit = _page_limit(query, MAX_PAGE_SIZE)
+    except ValueError:
+        return 400, {'error': f'limit must be an integer between 1 and {MAX_PAGE_SIZE}'}
+    try:
+        return 200, get_changes_since(since, limit)
+    except ResyncRequired as exc:
+        return 410, {'error': 'Changes since this sequence are no longer available, full resync required',
+                     'resync': True, 'seq': exc.seq}
+
+
+def _search(query):
+    """处理 GET /api/appointments/search?q=...：全文检索，可用 from / to 限定日期范围。"""
+    q = query.get('q', [''])[0]
+    if not q.strip():
+        return 400, {'error': 'q is required'}
+    start = query.get('from', [None])[0]
+    end = query.get('to', [None])[0]
+    try:
+        for value in (start, end):
+            if value:
+                datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return 400, {'error': 'Invalid date'}
+    try:
+        limit = _page_limit(query, SEARCH_LIMIT)
+    except ValueError:
+        return 400, {'error': f'limit must be an integer between 1 and {MAX_PAGE_SIZE}'}
+    return 200, search_appointments(q, start or None, end or None, limit)
+
+
+def handle_get(parsed):
+    """
+    处理 GET 请求的路由，与具体的 HTTP 服务器实现无关。
+
+    参数:
+        parsed: urlparse 的结果。
+
+    返回值:
+        tuple: (状态码, 可 JSON 序列化的响应数据或 StreamingResponse)。
+    """
+    if parsed.path == '/api/appointments':
+        query = parse_qs(parsed.query)
+        date = query.get('date', [None])[0]
+        start = query.get('from', [None])[0]
+        end = query.get('to', [None])[0]
+        if 'since' in query:
+            return _changes_since(query)
+        # 日期与范围查询默认只查热存储，include_archived=1 时同时读取对应年份的归档文件
+        include_archived = query.get('include_archived', [''])[0].lower() in ('1', 'true')
+        if date:
+            return 200, get_appointments_on_date(date, include_archived)
+        if start or end:
+            try:
+                for value in (start, end):
+                    if value:
+                        datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                return 400, {'error': 'Invalid date'}
+            return 200, get_appointments_between(start, end, include_archived)
+        return _list_appointments(query)
+    if parsed.path == '/api/appointments/search':
+        return _search(parse_qs(parsed.query))
+    appointment_id = appointment_id_from_path(parsed.path)
+    if appointment_id is not None:
+        appt = get_appointment(appointment_id)
+        if appt is None:
+            return 404, {'error': 'Appointment not found'}
+        return 200, appt
+    if parsed.path == '/api/reminders/due':
+        if 'pending' in parse_qs(parsed.query):
+            return 200, pending_reminders()
+        return 200, check_reminders()
+    if parsed.path == '/api/reminders/stream':
+        return 200, EventStream()
+    if parsed.path == '/api/reminders/dispatcher':
+        return 200, dispatcher_stats()
+    if parsed.path == '/api/metrics':
+        return 200, StreamingResponse(iter([METRICS.render().encode('utf-8')]), METRICS_CONTENT_TYPE)
+    return 404, {'error': 'Not Found'}
+
+
+def handle_post(parsed, data):
+    """
+    处理 POST 请求的路由。
+
+    参数:
+        parsed: urlparse 的结果。
+        data: 已解析的 JSON 请求体。
+
+    返回值:
+        tuple: (状态码, 可 JSON 序列化的响应数据或 StreamingResponse)。
+    """
+    if parsed.path == '/api/appointments':
+        # 与批量新增相同的校验与错误信息
+        error = validate_appointment_fields(data)
+        if error:
+            return 400, {'error': error}
+        try:
+            new_appt = add_appointment(
+                data['title'],
+                data['date'],
+                data['time'],
+                data.get('description', ''),
+                data.get('location', ''),
+                data.get('recurrence')
+            )
+        except ValueError as exc:
+            return 400, {'error': str(exc)}
+        return 201, new_appt
+    if parsed.path == '/api/reminders':
+        if 'appointment_id' not in data or 'reminder_time' not in data:
+            return 400, {'error': 'Missing fields'}
+        success = set_reminder(data['appointment_id'], data['reminder_time'])
+        if success:
+            return 200, {'status': 'ok'}
+        return 400, {'error': 'Failed to set reminder'}
+    if parsed.path in ('/api/appointments/batch', '/api/reminders/batch'):
+        if not isinstance(data, list):
+            return 400, {'error': 'Expected a JSON array'}
+        if parsed.path == '/api/appointments/batch':
+            results = add_appointments(data)
+        else:
+            results = set_reminders(data)
+        failed = sum(1 for result in results if result['status'] == 'error')
+        return 200, {'succeeded': len(results) - failed, 'failed': failed, 'results': results}
+    if parsed.path == '/api/reminders/ack':
+        ids = data.get('ids') if isinstance(data, dict) else data
+        if not isinstance(ids, list):
+            return 400, {'error': 'Expected a JSON array of ids or {"ids": [...]}'}
+        results = acknowledge_reminders(ids)
+        failed = sum(1 for result in results if result['status'] == 'error')
+        return 200, {'succeeded': len(results) - failed, 'failed': failed, 'results': results}
+    return 404, {'error': 'Not Found'}
+
+
+def handle_patch(parsed, data):
+    """
+    处理 PATCH /api/appointments/<id>：修改单条约会的部分字段。
+
+    参数:
+        parsed: urlparse 的结果。
+        data: 已解析的 JSON 请求体，见 appointments.EDITABLE_FIELDS。
+
+    返回值:
+        tuple: (状态码, 修改后的约会或错误信息)。
+    """
+    appointment_id = appointment_id_from_path(parsed.path)
+    if appointment_id is None:
+        return 404, {'error': 'Not Found'}
+    try:
+        appt = update_appointment(appointment_id, data)
+    except ValueError as exc:
+        return 400, {'error': str(exc)}
+    if appt is None:
+        return 404, {'error': 'Appointment not found'}
+    return 200, appt
+
+
+def handle_delete(parsed):
+    """
+    处理 DELETE /api/appointments/<id>。
+
+    参数:
+        parsed: urlparse 的结果。
+
+    返回值:
+        tuple: (状态码, 响应数据)。
+    """
+    appointment_id = appointment_id_from_path(parsed.path)
+    if appointment_id is None:
+        return 404, {'error': 'Not Found'}
+    if not delete_appointment(appointment_id):
+        return 404, {'error': 'Appointment not found'}
+    return 200, {'status': 'ok'}
+
+
+def _cache_key(parsed):
+    """返回 GET 响应的缓存键；不可缓存（流式输出或存储不支持版本号）时返回 None。"""
+    if parsed.path not in CACHEABLE_ROUTES:
+        return None
+    query = parse_qs(parsed.query)
+    if 'stream' in query:
+        return None
+    if parsed.path == '/api/reminders/due' and 'pending' not in query:
+        # 每次检查都会推进水位线，不能复用之前的响应
+        return None
+    store = current_store()
+    version = store.version()
+    if version is None:
+        return None
+    # id(store) 区分不同的数据文件 / 存储模式（存储实例在进程内按路径缓存，不会被回收）
+    key = (id(store), version, parsed.path, tuple(sorted((k, tuple(v)) for k, v in query.items())))
+    if parsed.path == '/api/reminders/due':
+        # 到期提醒还取决于当前时间（按分钟区分）与提醒标记文件中的确认标记
+        key += (datetime.now().strftime("%Y-%m-%d %H:%M"), current_marks().version())
+    return key
+
+
+def conditional_get(path, if_none_match=None):
+    """
+    处理 GET 请求：命中缓存时直接复用已编码的响应，并支持 If-None-Match 条件请求。
+
+    参数:
+        path (str): 请求路径（含查询字符串）。
+        if_none_match (str, optional): If-None-Match 请求头。
+
+    返回值:
+        tuple: (状态码, 响应体, ETag)。响应体为 bytes 或 StreamingResponse；
+               ETag 匹配时状态码为 304，响应体为空。
+    """
+    parsed = urlparse(path)
+    key = _cache_key(parsed)
+    entry = RESPONSE_CACHE.get(key) if key is not None else None
+    if entry is None:
+        status, data = handle_get(parsed)
+        if isinstance(data, StreamingResponse):
+            return status, data, None
+        body = encode_json(data, route_label(parsed.path))
+        etag = make_etag(body) if status == 200 else None
+        if key is not None and status == 200:
+            RESPONSE_CACHE.put(key, status, body, etag)
+    else:
+        status, body, etag = entry
+    if etag is not None and etag_matches(if_none_match, etag):
+        return 304, b'', etag
+    return status, body, etag
+
+
+def handle_request(method, path, body=b''):
+    """
+    按方法分发请求，供 SimpleAPIHandler 与 async_server 共用。
+
+    参数:
+        method (str): HTTP 方法。
+        path (str): 请求路径（含查询字符串）。
+        body (bytes): 请求体。
+
+    返回值:
+        tuple: (状态码, 可 JSON 序列化的响应数据)。
+    """
+    parsed = urlparse(path)
+    if method == 'GET':
+        return handle_get(parsed)
+    if method == 'DELETE':
+        return handle_delete(parsed)
+    if method in ('POST', 'PATCH'):
+        try:
+            data = json.loads(body) if body else {}
+        except json.JSONDecodeError:
+            return 400, {'error': 'Invalid JSON'}
+        return handle_post(parsed, data) if method == 'POST' else handle_patch(parsed, data)
+    return 405, {'error': 'Method Not Allowed'}
 
 
 class SimpleAPIHandler(BaseHTTPRequestHandler):
+    # 使用 HTTP/1.1 以支持持久连接（keep-alive），所有响应都带 Content-Length
+    protocol_version = 'HTTP/1.1'
+    # 空闲连接的超时时间（秒），避免空闲的 keep-alive 连接长期占用工作线程
+    timeout = 15
+
     def _send_json(self, data, status=200):
-        response = json.dumps(data).encode('utf-8')
+        self._send_body(encode_json(data, route_label(urlparse(self.path).path)), status)
+
+    def send_response(self, code, message=None):
+        # 记录状态码，供 _instrumented 计数
+        self._status = code
+        super().send_response(code, message)
+
+    @contextmanager
+    def _slot(self, route):
+        """
+        处理请求期间占用服务器的一个名额（见 ThreadedHTTPServer），产出是否取得了名额；单线程服务器不限制。
+
+        订阅路由占用订阅名额且不等待，名额已满时产出 False；其他请求等待请求名额。
+        """
+        if route in SUBSCRIPTION_ROUTES:
+            slots, blocking = getattr(self.server, 'stream_slots', None), False
+        else:
+            slots, blocking = getattr(self.server, 'request_slots', None), True
+        if slots is None:
+            yield True
+            return
+        if not slots.acquire(blocking=blocking):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            slots.release()
+
+    def _instrumented(self, method, handler):
+        """执行 handler 并记录请求计数、耗时；按采样率对请求做 cProfile 剖析。"""
+        route = route_label(urlparse(self.path).path)
+        profile = PROFILER.start() if route not in UNPROFILED_ROUTES else None
+        self._status = None
+        started = time.perf_counter()
+        try:
+            with self._slot(route) as acquired:
+                if acquired:
+                    handler()
+                else:
+                    self._send_json({'error': 'Too many stream subscribers'}, 503)
+        finally:
+            elapsed = time.perf_counter() - started
+            PROFILER.finish(profile, elapsed, f"{method} {route}")
+            record_request(route, method, self._status or 500, elapsed)
+
+    def _send_body(self, body: bytes, status=200, etag=None):
         self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        if status == 304:
+            self.end_headers()
+            return
         self.send_header('Content-Type', 'application/json')
-        self.send_header('Content-Length', str(len(response)))
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(response)
+        self.wfile.write(body)
 
-    def do_GET(self):
-        parsed = urlparse(self.path)
-        if parsed.path == '/api/appointments':
-            query = parse_qs(parsed.query)
-            date = query.get('date', [None])[0]
-            if date:
-                data = get_appointments_on_date(date)
-            else:
-                data = load_appointments()
-            self._send_json(data)
-        elif parsed.path == '/api/reminders/due':
-            data = check_reminders()
-            self._send_json(data)
+    def _send_stream(self, response: StreamingResponse, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', response.content_type)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        chunked = self.request_version == 'HTTP/1.1'
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
         else:
-            self._send_json({'error': 'Not Found'}, 404)
+            # HTTP/1.0 不支持分块编码，以关闭连接标识响应结束
+            self.close_connection = True
+        self.end_headers()
+        try:
+            for chunk in response.chunks:
+                if not chunk:
+                    continue
+                if chunked:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                else:
+                    self.wfile.write(chunk)
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except ConnectionError:
+            # 长连接的 SSE 客户端断开属于正常情况
+            self.close_connection = True
+        finally:
+            # 客户端中途断开时立即结束生成器（SSE 流借此取消订阅）
+            close = getattr(response.chunks, 'close', None)
+            if close is not None:
+                close()
+
+    def do_GET(self):
+        self._instrumented('GET', self._handle_get)
 
     def do_POST(self):
-        parsed = urlparse(self.path)
+        self._instrumented('POST', lambda: self._handle_body('POST'))
+
+    def do_PATCH(self):
+        self._instrumented('PATCH', lambda: self._handle_body('PATCH'))
+
+    def do_DELETE(self):
+        self._instrumented('DELETE', lambda: self._handle_body('DELETE'))
+
+    def _handle_get(self):
+        status, body, etag = conditional_get(self.path, self.headers.get('If-None-Match'))
+        if isinstance(body, StreamingResponse):
+            self._send_stream(body, status)
+        else:
+            self._send_body(body, status, etag)
+
+    def _handle_body(self, method):
         length = int(self.headers.get('Content-Length', 0))
         body = self.rfile.read(length)
-        try:
-            data = json.loads(body) if body else {}
-        except json.JSONDecodeError:
-            self._send_json({'error': 'Invalid JSON'}, 400)
+        status, data = handle_request(method, self.path, body)
+        self._send_json(data, status)
+
+
+class ThreadedHTTPServer(ThreadingHTTPServer):
+    """
+    每个连接一个线程、同时处理的请求数受限的 HTTPServer。
+
+    请求名额 request_slots 只在处理请求期间占用：连接线程等待下一个 keep-alive 请求时不占名额，
+    空闲连接不会让其他客户端排队等到空闲超时。同时执行的请求数不超过 workers，
+    同时保持的连接数不超过 max_connections，超出的连接立即收到 503 并被关闭。
+    SSE 订阅在自己的连接线程上推送，只占用订阅名额 stream_slots（至多 max_streams 个，
+    且为其他请求留出至少 workers 个连接），名额已满时返回 503。
+    """
+
+    daemon_threads = True
+    block_on_close = False
+
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, max_streams=DEFAULT_MAX_STREAMS):
+        self.workers = workers
+        self.max_connections = max(max_connections, workers)
+        self.max_streams = max(0, min(max_streams, self.max_connections - workers))
+        # socketserver 默认的监听队列只有 5：同时建立的连接一多就会因 SYN 重传多等 1 秒以上
+        self.request_queue_size = self.max_connections
+        super().__init__(server_address, handler_class)
+        self.request_slots = threading.BoundedSemaphore(workers)
+        self.stream_slots = threading.BoundedSemaphore(self.max_streams)
+        self._connection_slots = threading.BoundedSemaphore(self.max_connections)
+
+    def process_request(self, request, client_address):
+        if not self._connection_slots.acquire(blocking=False):
+            self._reject(request)
             return
+        try:
+            super().process_request(request, client_address)
+        except BaseException:
+            self._connection_slots.release()
+            raise
 
-        if parsed.path == '/api/appointments':
-            required = {'title', 'date', 'time'}
-            if not required.issubset(data):
-                self._send_json({'error': 'Missing fields'}, 400)
-                return
-            new_appt = add_appointment(
-                data['title'],
-                data['date'],
-                data['time'],
-                data.get('description', ''),
-                data.get('location', '')
-            )
-            self._send_json(new_appt, 201)
-        elif parsed.path == '/api/reminders':
-            if 'appointment_id' not in data or 'reminder_time' not in data:
-                self._send_json({'error': 'Missing fields'}, 400)
-                return
-            success = set_reminder(data['appointment_id'], data['reminder_time'])
-            if success:
-                self._send_json({'status': 'ok'})
-            else:
-                self._send_json({'error': 'Failed to set reminder'}, 400)
-        else:
-            self._send_json({'error': 'Not Found'}, 404)
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._connection_slots.release()
+
+    def _reject(self, request):
+        try:
+            request.sendall(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n"
+                            b"Retry-After: 1\r\nConnection: close\r\n\r\n")
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+
+def create_server(host='0.0.0.0', port=8000, workers=DEFAULT_WORKERS, handler_class=SimpleAPIHandler):
+    """
+    创建 API 服务器实例。
+
+    参数:
+        host (str): 监听地址。
+        port (int): 监听端口，0 表示由系统分配。
+        workers (int): 同时处理的请求数上限；小于等于 1 时使用单线程的 HTTPServer。
+        handler_class: 请求处理类。
+
+    返回值:
+        HTTPServer: 尚未开始 serve_forever 的服务器实例。
+    """
+    if workers <= 1:
+        return HTTPServer((host, port), handler_class)
+    return ThreadedHTTPServer((host, port), handler_class, workers)
+
+
+def serve_worker(server, dispatcher=True):
+    """
+    pre-fork 工作进程的主函数：在继承的监听套接字上处理请求，收到 SIGTERM 后停止接受连接并退出。
+
+    每个工作进程运行自己的提醒分发线程，只向连接到本进程的 SSE 订阅者推送，推送记录保存在进程内存中。
+
+    参数:
+        server: 主进程创建、已绑定端口的服务器实例。
+        dispatcher (bool): 是否启动提醒分发线程。
+    """
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    if dispatcher:
+        start_dispatcher(max_sleep=PREFORK_DISPATCHER_SLEEP, persist_delivered=False)
+    try:
+        server.serve_forever()
+    finally:
+        stop_dispatcher()
+        server.server_close()
+
+
+def run_prefork(processes, handler_class=SimpleAPIHandler, host='0.0.0.0', port=8000, workers=DEFAULT_WORKERS,
+                dispatcher=True):
+    """
+    以 pre-fork 模式运行：主进程绑定端口后 fork 出 processes 个工作进程，共享同一个监听套接字。
+
+    开启跨进程同步（interprocess.enable）：写入由数据文件旁的 .lock 文件加锁串行化并原子替换，
+    各工作进程通过共享版本计数器发现其他进程的写入。
+
+    参数:
+        processes (int): 工作进程数。
+        workers (int): 每个工作进程同时处理的请求数上限。
+    """
+    interprocess.enable()
+    server = create_server(host, port, workers, handler_class)
+    print(f"API server listening on {host}:{port} with {processes} worker processes")
+    try:
+        prefork.supervise(lambda index: serve_worker(server, dispatcher), processes)
+    finally:
+        server.server_close()
 
 
-def run(server_class=HTTPServer, handler_class=SimpleAPIHandler, host='0.0.0.0', port=8000):
-    server = server_class((host, port), handler_class)
+def run(server_class=None, handler_class=SimpleAPIHandler, host='0.0.0.0', port=8000, workers=DEFAULT_WORKERS,
+        dispatcher=True, processes=1):
+    if PROFILER.enabled:
+        print(f"Profiling {PROFILER.sample_rate:.0%} of requests; saving those slower than "
+              f"{PROFILER.slow_seconds * 1000:g} ms to {PROFILER.directory}")
+    if processes > 1:
+        run_prefork(processes, handler_class, host, port, workers, dispatcher)
+        return
+    if dispatcher:
+        start_dispatcher()
+    if server_class is None:
+        server = create_server(host, port, workers, handler_class)
+    else:
+        server = server_class((host, port), handler_class)
     print(f"API server listening on {host}:{port}")
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         pass
     finally:
+        stop_dispatcher()
         server.server_close()
 
 
 if __name__ == '__main__':
-    run()
+    parser = argparse.ArgumentParser(description="Calendar reminder API server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="同时处理的请求数上限，1 表示单线程模式")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES,
+                        help="pre-fork 工作进程数，大于 1 时多个进程共享监听套接字（仅 POSIX）")
+    parser.add_argument("--no-dispatcher", action="store_true",
+                        help="不启动后台提醒分发线程（/api/reminders/stream 将没有事件）")
+    parser.add_argument("--profile-dir", help="保存慢请求 cProfile 结果的目录（默认取 CALENDAR_PROFILE_DIR）")
+    parser.add_argument("--profile-sample-rate", type=float,
+                        help="被剖析请求的比例 0–1（默认取 CALENDAR_PROFILE_SAMPLE_RATE，为 0 即关闭）")
+    parser.add_argument("--profile-slow-ms", type=float,
+                        help="保存剖析结果的耗时阈值，毫秒（默认取 CALENDAR_PROFILE_SLOW_MS 或 200）")
+    args = parser.parse_args()
+    PROFILER.configure(args.profile_dir, args.profile_sample_rate, args.profile_slow_ms)
+    run(host=args.host, port=args.port, workers=args.workers, dispatcher=not args.no_dispatcher,
+        processes=args.processes)
@@ -1,6 +1,11 @@
-from .appointments import add_appointment, get_appointments_on_date, load_appointments # 用于设置提醒时加载数据
+from .appointments import add_appointment, get_appointment, get_appointments_between, get_appointments_on_date
 from .reminders import set_reminder, check_reminders
-from datetime import datetime # 输入校验与格式化
+from datetime import date, datetime # 输入校验与格式化
+from .calendar_utils import parse_datetime_minutes
+from . import appointments, archive, bulk
+import argparse
+import json
+import sys
 
 def print_appointment(appt: dict):
     """辅助函数：统一格式打印约会详情"""
@@ -67,36 +72,38 @@ def handle_view_appointments():
 def handle_set_reminder():
     """为约会设置提醒"""
     print("\n--- Set Reminder for an Appointment ---")
-    # 展示现有约会供用户选择 ID
-    all_appointments = load_appointments()
-    if not all_appointments:
-        print("No appointments available to set reminders for.")
+    # 只展示今天及以后的约会供用户选择 ID：走日期索引，不加载全部（包括过去的）约会
+    upcoming = []
+    listed = set()
+    for appt in get_appointments_between(date.today().isoformat(), None):
+        # 重复约会展开为多次发生，只列出最近的一次
+        if appt['id'] not in listed:
+            listed.add(appt['id'])
+            upcoming.append(appt)
+    if not upcoming:
+        print("No upcoming appointments available to set reminders for.")
         return
-        
-    print("Available appointments:")
-    for appt in all_appointments:
+
+    print("Upcoming appointments:")
+    for appt in upcoming:
         print(f"  ID: {appt['id']}, Title: {appt['title']}, Date: {appt['date']}, Time: {appt['time']}")
     
     appointment_id = input("Enter appointment ID to set reminder for: ")
-    if not any(appt['id'] == appointment_id for appt in all_appointments):
+    # 通过 ID 索引直接取得所选约会，不再扫描列表
+    selected_appt = get_appointment(appointment_id)
+    if selected_appt is None:
         print("Invalid appointment ID.")
         return
 
     reminder_datetime_str = input("Enter reminder date and time (YYYY-MM-DD HH:MM): ")
     try:
         # 校验提醒时间格式
-        reminder_dt_obj = datetime.strptime(reminder_datetime_str, "%Y-%m-%d %H:%M")
-        
+        reminder_minute = parse_datetime_minutes(reminder_datetime_str)
+
         # 可选：检查提醒时间是否早于约会时间
-        selected_appt = next((appt for appt in all_appointments if appt['id'] == appointment_id), None)
-        if selected_appt:
-            appointment_dt_str = f"{selected_appt['date']} {selected_appt['time']}"
-            appointment_dt_obj = datetime.strptime(appointment_dt_str, "%Y-%m-%d %H:%M")
-            if reminder_dt_obj >= appointment_dt_obj:
-                print("Reminder time must be before the appointment time. Please try again.")
-                return
-        else: # 理论上不会发生，作为安全检查
-            print("Could not retrieve appointment details for validation.")
+        appointment_dt_str = f"{selected_appt['date']} {selected_appt['time']}"
+        if reminder_minute >= parse_datetime_minutes(appointment_dt_str):
+            print("Reminder time must be before the appointment time. Please try again.")
             return
 
     except ValueError:
@@ -105,13 +112,9 @@ def handle_set_reminder():
 
     if set_reminder(appointment_id, reminder_datetime_str):
         print("Reminder set successfully!")
-        # 显示更新后的约会信息
-        updated_appointments = load_appointments()
-        for appt in updated_appointments:
-            if appt['id'] == appointment_id:
-                print("\nUpdated appointment details:")
-                print_appointment(appt)
-                break
+        # 显示更新后的约会信息（同样按 ID 读取，不重新加载全部数据）
+        print("\nUpdated appointment details:")
+        print_appointment(get_appointment(appointment_id))
     else:
         print("Failed to set reminder. Ensure the appointment ID is correct and datetime format is valid.")
 
@@ -125,7 +128,7 @@ def handle_check_reminders():
             print(f"\nREMINDER: Appointment '{appt.get('title')}' at {appt.get('date')} {appt.get('time')}")
             print_appointment(appt)
     else:
-        print("No reminders are currently due.")
+        print("No new reminders are due since the last check.")
 
 def main_cli():
     """主命令行循环"""
@@ -154,5 +157,124 @@ def main_cli():
         else:
             print("Invalid choice. Please enter a number between 1 and 5.")
 
+# 导入时每读取这么多行输出一次进度
+PROGRESS_EVERY = 100000
+
+def _open_data(path: str, mode: str, fmt: str):
+    """打开导入/导出文件，"-" 表示标准输入/输出。"""
+    if path == "-":
+        return None
+    return open(path, mode, encoding="utf-8", newline="" if fmt == "csv" else None)
+
+def command_import(args) -> int:
+    """import 子命令：流式导入 NDJSON / CSV，进度与结果输出到标准错误。"""
+    fmt = args.format or bulk.detect_format(args.file)
+    shown = [0]
+
+    def progress(report):
+        # 每 PROGRESS_EVERY 行输出一次进度
+        if report["read"] - shown[0] >= PROGRESS_EVERY:
+            shown[0] = report["read"]
+            print(f"  {report['read']} rows read, {report['imported']} imported, "
+                  f"{report['rows_per_second']:.0f} rows/s", file=sys.stderr)
+
+    fp = _open_data(args.file, "r", fmt)
+    try:
+        report = bulk.import_appointments(fp or sys.stdin, fmt, args.batch_size, progress)
+    finally:
+        if fp is not None:
+            fp.close()
+    for error in report["errors"]:
+        print(f"  line {error['line']}: {error['error']}", file=sys.stderr)
+    if report["failed"] > len(report["errors"]):
+        print(f"  ... {report['failed'] - len(report['errors'])} more errors", file=sys.stderr)
+    print(f"Imported {report['imported']} of {report['read']} rows ({report['failed']} failed) "
+          f"in {report['batches']} batches, {report['elapsed']:.2f}s, {report['rows_per_second']:.0f} rows/s",
+          file=sys.stderr)
+    return 1 if report["failed"] else 0
+
+def command_export(args) -> int:
+    """export 子命令：流式导出 NDJSON / CSV，结果摘要输出到标准错误，便于导出到标准输出。"""
+    fmt = args.format or bulk.detect_format(args.file)
+    fp = _open_data(args.file, "w", fmt)
+    try:
+        report = bulk.export_appointments(fp or sys.stdout, fmt, args.batch_size)
+    finally:
+        if fp is not None:
+            fp.close()
+    print(f"Exported {report['exported']} rows in {report['elapsed']:.2f}s, "
+          f"{report['rows_per_second']:.0f} rows/s", file=sys.stderr)
+    return 0
+
+def command_stats(args) -> int:
+    """stats 子命令：输出当前存储的统计信息（JSON）。"""
+    result = bulk.storage_stats(args.batch_size)
+    result["mode"] = appointments.STORAGE_MODE
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+def command_archive(args) -> int:
+    """archive 子命令：把早于保留期限的约会移入按年份划分的 gzip 归档文件，输出归档报告（JSON）。"""
+    try:
+        before = args.before or archive.archive_cutoff(args.days)
+        report = appointments.archive_appointments(before)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    report["files"] = archive.archive_stats(archive.archive_dir_for(appointments.DATA_FILE))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数：不带子命令时进入交互式菜单。"""
+    parser = argparse.ArgumentParser(description="Calendar Reminder Service")
+    commands = parser.add_subparsers(dest="command")
+
+    importer = commands.add_parser("import", help="Import appointments from NDJSON or CSV")
+    importer.add_argument("file", help="Input file, '-' for stdin")
+    importer.set_defaults(handler=command_import)
+
+    exporter = commands.add_parser("export", help="Export all appointments to NDJSON or CSV")
+    exporter.add_argument("file", help="Output file, '-' for stdout")
+    exporter.set_defaults(handler=command_export)
+
+    for command in (importer, exporter):
+        command.add_argument("--format", choices=bulk.FORMATS,
+                             help="File format (default: from extension, otherwise ndjson)")
+
+    stats = commands.add_parser("stats", help="Show storage statistics")
+    stats.set_defaults(handler=command_stats)
+
+    for command in (importer, exporter, stats):
+        command.add_argument("--batch-size", type=int, default=bulk.DEFAULT_BATCH_SIZE,
+                             help="Records per storage batch (default: %(default)s)")
+
+    archiver = commands.add_parser("archive", help="Move past appointments into per-year gzip archives")
+    horizon = archiver.add_mutually_exclusive_group()
+    horizon.add_argument("--days", type=int, default=None,
+                         help=f"Archive appointments older than this many days (default: {archive.ARCHIVE_HORIZON_DAYS})")
+    horizon.add_argument("--before", help="Archive appointments dated before YYYY-MM-DD")
+    archiver.set_defaults(handler=command_archive)
+    return parser
+
+def main(argv=None) -> int:
+    """
+    命令行入口。
+
+    参数:
+        argv (list, optional): 命令行参数，默认取 sys.argv。
+
+    返回值:
+        int: 退出码。
+    """
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        main_cli()
+        return 0
+    if getattr(args, "batch_size", 1) < 1:
+        print("--batch-size must be positive", file=sys.stderr)
+        return 2
+    return args.handler(args)
+
 if __name__ == "__main__":
-    main_cli()
+    sys.exit(main())
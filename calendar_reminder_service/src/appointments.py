@@ -1,55 +1,76 @@
-import json
 import uuid
 import os
+from datetime import datetime
+from functools import lru_cache
+from . import archive
+from .calendar_utils import DATE_FORMAT, TIME_FORMAT, parse_datetime_minutes
+from .recurrence import RECURRENCE_FIELD, normalize_recurrence, validate_recurrence
+from .repository import get_repository, order_key
 
 # 确定数据文件的绝对路径
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DATA_FILE = os.path.join(BASE_DIR, "calendar_reminder_service", "data", "appointments.json")
+# 存储模式："json"（每次写入整体重写文件）、"journal"（追加日志 + 定期压缩为快照）
+# "sqlite"（与 DATA_FILE 同名的 .db 数据库）、"sharded"（与 DATA_FILE 同名的目录下按月分片）
+# 或 "snapshot"（与 DATA_FILE 同名的 .snap 二进制快照，mmap 映射后按需解码）
+STORAGE_MODE = os.environ.get("CALENDAR_STORAGE_MODE", "json")
+# update_appointment 可以修改的字段（id 不可修改，reminder_set 随 reminder_time 自动设置）
+EDITABLE_FIELDS = ("title", "date", "time", "description", "location", "reminder_time", RECURRENCE_FIELD)
+
+def current_store():
+    """
+    返回当前 DATA_FILE / STORAGE_MODE 对应的存储实例（见 repository.AppointmentRepository）。
+
+    每次调用时读取模块全局变量，因此测试中对 DATA_FILE 的替换依然生效。
+    """
+    return get_repository(DATA_FILE, STORAGE_MODE)
 
 def load_appointments() -> list:
     """
-    从 JSON 文件加载约会信息。
+    从当前存储加载全部约会信息（JSON 模式下经由内存缓存，文件未变化时不会重新解析）。
 
     返回值:
         list: 约会字典的列表。如果文件不存在或者无数据或 JSON 格式错误，则返回空列表。
     """
-    try:
-        if os.path.exists(DATA_FILE) and os.path.getsize(DATA_FILE) > 0:
-            with open(DATA_FILE, 'r') as f:
-                return json.load(f)
-        else:
-            return []
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+    return current_store().all()
 
 def save_appointments(appointments: list):
     """
-    将约会列表保存到 JSON 文件。
+    将约会列表整体保存到当前存储，并同步更新内存缓存。
 
     参数:
         appointments (list): 将要保存的约会字典列表。
     """
-    # 确保目录存在
-    os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-    with open(DATA_FILE, 'w') as f:
-        json.dump(appointments, f, indent=4)
+    current_store().replace(appointments)
 
-def add_appointment(title: str, date: str, time: str, description: str = "", location: str = "") -> dict:
+def add_appointment(title: str, date: str, time: str, description: str = "", location: str = "",
+                    recurrence: dict = None) -> dict:
     """
     新增一条约会并保存。
 
     参数:
         title (str): 约会标题。
-        date (str): 约会日期（如 "YYYY-MM-DD"）。
+        date (str): 约会日期（如 "YYYY-MM-DD"），重复约会为第一次发生的日期。
         time (str): 约会时间（如 "HH:MM"）。
         description (str, optional): 约会描述，默认为空。
         location (str, optional): 约会地点，默认为空。
+        recurrence (dict, optional): 重复规则，如 {"freq": "weekly", "interval": 2, "count": 10}，
+            见 recurrence.validate_recurrence。重复约会只保存一条，查询时按日期展开。
 
     返回值:
         dict: 新建约会的字典。
+
+    异常:
+        ValueError: 字段或重复规则无效（错误信息与批量新增相同，见 validate_appointment_fields）。
     """
-    appointments = load_appointments()
-    new_appointment = {
+    error = validate_appointment_fields({"title": title, "date": date, "time": time, "description": description,
+                                         "location": location, RECURRENCE_FIELD: recurrence})
+    if error:
+        raise ValueError(error)
+    return current_store().add(_new_appointment(title, date, time, description, location, recurrence))
+
+def _new_appointment(title, date, time, description="", location="", recurrence=None) -> dict:
+    appt = {
         "id": str(uuid.uuid4()),
         "title": title,
         "date": date,
@@ -59,22 +80,292 @@ def add_appointment(title: str, date: str, time: str, description: str = "", loc
         "reminder_time": "",
         "location": location,
     }
-    appointments.append(new_appointment)
-    save_appointments(appointments)
-    return new_appointment
+    if recurrence:
+        appt[RECURRENCE_FIELD] = normalize_recurrence(recurrence)
+    return appt
+
+@lru_cache(maxsize=4096)
+def _matches_format(value: str, fmt: str) -> bool:
+    """
+    判断字符串是否符合 strptime 格式。批量导入时日期、时间高度重复，结果按值缓存，
+    每个不同的取值只解析一次。
+    """
+    try:
+        datetime.strptime(value, fmt)
+    except ValueError:
+        return False
+    return True
+
+def validate_appointment_fields(item) -> str:
+    """
+    校验一条待新增约会的字段。
 
-def get_appointments_on_date(date: str) -> list:
+    参数:
+        item: 请求中的单条约会数据，应为包含 title、date、time 的字典。
+
+    返回值:
+        str: 错误描述；校验通过时返回空字符串。
     """
-    获取指定日期的所有约会。
+    if not isinstance(item, dict):
+        return "Item must be an object"
+    missing = [key for key in ("title", "date", "time") if not item.get(key)]
+    if missing:
+        return f"Missing fields: {', '.join(missing)}"
+    for key in ("title", "date", "time", "description", "location"):
+        if key in item and not isinstance(item[key], str):
+            return f"Field '{key}' must be a string"
+    if not _matches_format(item["date"], DATE_FORMAT):
+        return "Invalid date format, expected YYYY-MM-DD"
+    if not _matches_format(item["time"], TIME_FORMAT):
+        return "Invalid time format, expected HH:MM"
+    if item.get(RECURRENCE_FIELD) is not None:
+        return validate_recurrence(item[RECURRENCE_FIELD])
+    return ""
+
+def add_appointments(items: list) -> list:
+    """
+    批量新增约会：先校验全部条目，再一次性写入存储（只加载、保存一次）。
+
+    参数:
+        items (list): 约会数据列表，每项包含 title、date、time，可选 description、location、recurrence。
+
+    返回值:
+        list: 与 items 一一对应的结果。成功为 {"index", "status": "created", "appointment"}，
+              失败为 {"index", "status": "error", "error"}，失败的条目不会写入。
+    """
+    results = []
+    pending = []
+    for index, item in enumerate(items):
+        error = validate_appointment_fields(item)
+        if error:
+            results.append({"index": index, "status": "error", "error": error})
+            continue
+        record = _new_appointment(item["title"], item["date"], item["time"],
+                                  item.get("description", ""), item.get("location", ""),
+                                  item.get(RECURRENCE_FIELD))
+        result = {"index": index, "status": "created", "appointment": record}
+        results.append(result)
+        pending.append(result)
+    if pending:
+        saved = current_store().add_many([result["appointment"] for result in pending])
+        for result, record in zip(pending, saved):
+            result["appointment"] = record
+    return results
+
+def get_appointment(appointment_id: str):
+    """
+    通过存储的 ID 索引获取单条约会，不扫描、不重新加载全部数据。
+
+    参数:
+        appointment_id (str): 约会 ID。
+
+    返回值:
+        dict | None: 约会字典（重复约会返回系列本身）；未找到时返回 None。
+    """
+    return current_store().get(appointment_id)
+
+def validate_appointment_changes(changes) -> str:
+    """
+    校验一次约会修改请求的字段。
+
+    参数:
+        changes: 请求中的修改内容，应为只包含 EDITABLE_FIELDS 中字段的非空字典。
+
+    返回值:
+        str: 错误描述；校验通过时返回空字符串。
+    """
+    if not isinstance(changes, dict):
+        return "Changes must be an object"
+    if not changes:
+        return "No fields to update"
+    unknown = set(changes) - set(EDITABLE_FIELDS)
+    if unknown:
+        return f"Unknown or read-only fields: {', '.join(sorted(unknown))}"
+    for key in ("title", "date", "time", "description", "location", "reminder_time"):
+        if key in changes and not isinstance(changes[key], str):
+            return f"Field '{key}' must be a string"
+    empty = [key for key in ("title", "date", "time") if key in changes and not changes[key]]
+    if empty:
+        return f"Fields cannot be empty: {', '.join(empty)}"
+    if "date" in changes and not _matches_format(changes["date"], DATE_FORMAT):
+        return "Invalid date format, expected YYYY-MM-DD"
+    if "time" in changes and not _matches_format(changes["time"], TIME_FORMAT):
+        return "Invalid time format, expected HH:MM"
+    if changes.get("reminder_time"):
+        try:
+            parse_datetime_minutes(changes["reminder_time"])
+        except ValueError:
+            return "Invalid reminder_time format, expected YYYY-MM-DD HH:MM"
+    if changes.get(RECURRENCE_FIELD) is not None:
+        return validate_recurrence(changes[RECURRENCE_FIELD])
+    return ""
+
+def update_appointment(appointment_id: str, changes: dict):
+    """
+    修改指定约会的字段并保存，只通过 ID 索引定位这一条约会。
+
+    参数:
+        appointment_id (str): 约会 ID。
+        changes (dict): 要修改的字段，见 EDITABLE_FIELDS。reminder_time 为空字符串表示取消提醒；
+            recurrence 为 None 表示改为单次约会。
+
+    返回值:
+        dict | None: 修改后的约会字典；未找到时返回 None。
+
+    异常:
+        ValueError: 修改内容无效（见 validate_appointment_changes）。
+    """
+    error = validate_appointment_changes(changes)
+    if error:
+        raise ValueError(error)
+    changes = dict(changes)
+    if "reminder_time" in changes:
+        changes["reminder_set"] = bool(changes["reminder_time"])
+    if changes.get(RECURRENCE_FIELD) is not None:
+        changes[RECURRENCE_FIELD] = normalize_recurrence(changes[RECURRENCE_FIELD])
+    return current_store().update(appointment_id, changes)
+
+def delete_appointment(appointment_id: str) -> bool:
+    """
+    删除指定约会（重复约会删除整个系列）。
+
+    参数:
+        appointment_id (str): 约会 ID。
+
+    返回值:
+        bool: 删除成功返回 True；未找到时返回 False。
+    """
+    return current_store().delete(appointment_id)
+
+def get_appointments_on_date(date: str, include_archived: bool = False) -> list:
+    """
+    获取指定日期的所有约会，包括当天发生的重复约会。
 
     参数:
         date (str): 用于过滤约会的日期（如 "YYYY-MM-DD"）。
+        include_archived (bool): 同时查询已归档的约会（见 archive_appointments），只读取该年的归档文件。
 
     返回值:
         list: 对应日期的约会列表。
     """
-    appointments = load_appointments()
-    return [appt for appt in appointments if appt.get("date") == date]
+    result = current_store().on_date(date)
+    if include_archived:
+        result = archive.merge_archived(result, archive.archived_between(archive.archive_dir_for(DATA_FILE), date, date))
+    return result
+
+def get_appointments_between(start: str, end: str, include_archived: bool = False) -> list:
+    """
+    获取日期在 [start, end] 闭区间内的所有约会，适用于周视图、月视图等范围查询。
+
+    重复约会展开为区间内的各次发生（共用系列的 id，date 为该次的日期）；
+    不限上界时最多展开到起点之后 recurrence.EXPANSION_HORIZON_DAYS 天。
+
+    参数:
+        start (str): 起始日期（如 "YYYY-MM-DD"），为 None 表示不限下界。
+        end (str): 结束日期（如 "YYYY-MM-DD"），为 None 表示不限上界。
+        include_archived (bool): 同时查询已归档的约会，只读取覆盖该区间的年份文件。
+
+    返回值:
+        list: 按日期排序的约会列表，同一日期内保持添加顺序（归档约会在前）。
+    """
+    result = current_store().between(start, end)
+    if include_archived:
+        result = archive.merge_archived(result, archive.archived_between(archive.archive_dir_for(DATA_FILE), start, end))
+    return result
+
+def archive_appointments(before: str = None) -> dict:
+    """
+    把日期早于 before 的单次约会移入按年份划分的 gzip 归档文件，并从当前存储中删除。
+
+    归档后 load_appointments、到期提醒检查等只处理当前与未来的约会；
+    已归档的约会可通过 get_appointments_on_date / get_appointments_between 的 include_archived 查询。
+
+    参数:
+        before (str, optional): 截止日期（YYYY-MM-DD），默认为今天减去 archive.ARCHIVE_HORIZON_DAYS 天。
+
+    返回值:
+        dict: 归档报告，见 archive.archive_appointments。
+
+    异常:
+        ValueError: before 不是有效的日期。
+    """
+    if before is None:
+        before = archive.archive_cutoff()
+    elif not _matches_format(before, DATE_FORMAT):
+        raise ValueError("Invalid date format, expected YYYY-MM-DD")
+    return archive.archive_appointments(current_store(), archive.archive_dir_for(DATA_FILE), before)
+
+def search_appointments(query: str, start: str = None, end: str = None, limit: int = 50) -> list:
+    """
+    全文检索标题、描述与地点：查询按空白与标点切分为词，每个词按前缀匹配（不区分大小写），
+    多个词必须同时出现（AND）。
+
+    参数:
+        query (str): 查询字符串，如 "team meet"。
+        start (str, optional): 起始日期（如 "YYYY-MM-DD"），为 None 表示不限下界。
+        end (str, optional): 结束日期（如 "YYYY-MM-DD"），为 None 表示不限上界。
+        limit (int): 返回条数上限。
+
+    返回值:
+        list: 按 (date, time, id) 排序的约会列表。未指定日期范围时重复约会按系列返回，
+              指定范围时展开为范围内的各次发生。
+    """
+    return current_store().search(query, start, end, limit)
+
+def data_version():
+    """
+    返回当前存储的数据版本号（每次保存后递增），存储不支持时返回 None。
+    """
+    return current_store().version()
+
+def get_changes_since(seq: int, limit: int = 1000) -> dict:
+    """
+    增量同步：返回序号 seq 之后的新增、修改、删除。
+
+    参数:
+        seq (int): 客户端已经同步到的序号。
+        limit (int): 返回条数上限。
+
+    返回值:
+        dict: {"seq": 同步到的序号, "changes": [{"seq", "op", "id"[, "appointment"]}, ...], "more": bool}。
+              more 为 True 时以返回的 seq 继续拉取。
+
+    异常:
+        changes.ResyncRequired: 变更日志已不包含 seq 之后的全部变更，需要全量下载后从异常的 seq 继续。
+    """
+    return current_store().changes_since(seq, limit)
+
+def get_appointments_page(limit: int, after=None) -> tuple:
+    """
+    按 (date, time, id) 的稳定顺序分页获取约会。
+
+    参数:
+        limit (int): 每页条数。
+        after (tuple, optional): 上一页返回的游标键，None 表示第一页。
+
+    返回值:
+        tuple: (约会列表, 下一页游标键)；没有更多数据时游标键为 None。
+    """
+    items = current_store().page(after, limit + 1)
+    if len(items) > limit:
+        items = items[:limit]
+        return items, order_key(items[-1])
+    return items, None
+
+def iter_appointments(batch_size: int = 500):
+    """
+    按 (date, time, id) 顺序逐条产出全部约会，每次只从存储取出 batch_size 条，内存占用与数据总量无关。
+
+    参数:
+        batch_size (int): 每批从存储读取的条数。
+    """
+    after = None
+    while True:
+        batch = current_store().page(after, batch_size)
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        after = order_key(batch[-1])
 
 if __name__ == '__main__':
     # 简单的测试用例
@@ -0,0 +1,233 @@
+# 冷数据归档：把早于保留期限的约会按年份移入 gzip 压缩的 NDJSON 文件，热存储及其扫描只覆盖当前与未来的约会
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, timedelta
+from .interprocess import fcntl
+from .models import json_default
+from .recurrence import is_recurring
+from .store import file_signature
+
+# 默认保留期限（天）：日期早于“今天减去保留期限”的单次约会会被归档
+ARCHIVE_HORIZON_DAYS = int(os.environ.get("CALENDAR_ARCHIVE_DAYS", "30"))
+# 按需查询时缓存的已解压年份文件数（按文件签名失效）
+ARCHIVE_CACHE_FILES = 4
+# 年份文件的扩展名，如 2023.ndjson.gz
+ARCHIVE_SUFFIX = ".ndjson.gz"
+# 写入年份文件时每段编码的条数
+_WRITE_CHUNK = 1000
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_archive_lock = threading.Lock()
+
+
+def archive_dir_for(path: str) -> str:
+    """数据文件对应的归档目录：与数据文件同级，目录名为去掉扩展名的文件名加 _archive（如 data/appointments_archive/）。"""
+    return os.path.splitext(os.path.abspath(path))[0] + "_archive"
+
+
+def archive_path(directory: str, year: str) -> str:
+    """某一年的归档文件路径。"""
+    return os.path.join(directory, f"{year}{ARCHIVE_SUFFIX}")
+
+
+def archived_years(directory: str) -> list:
+    """返回归档目录中已有的年份（字符串，升序）。"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-len(ARCHIVE_SUFFIX)] for name in names
+                  if name.endswith(ARCHIVE_SUFFIX) and name[:-len(ARCHIVE_SUFFIX)].isdigit())
+
+
+def archive_cutoff(days: int = None, today: date = None) -> str:
+    """
+    返回归档的截止日期：日期早于它的约会会被归档。
+
+    参数:
+        days (int, optional): 保留期限（天），默认 ARCHIVE_HORIZON_DAYS。
+        today (datetime.date, optional): 当前日期，默认今天。
+
+    返回值:
+        str: YYYY-MM-DD。
+
+    异常:
+        ValueError: days 为负数。
+    """
+    days = ARCHIVE_HORIZON_DAYS if days is None else days
+    if days < 0:
+        raise ValueError("Archive horizon must not be negative")
+    return ((today or date.today()) - timedelta(days=days)).isoformat()
+
+
+def read_archive_file(path: str) -> list:
+    """
+    读取一个年份文件，返回约会字典列表（按归档顺序）；文件不存在时返回空列表。
+
+    最近读取的 ARCHIVE_CACHE_FILES 个文件按文件签名缓存，返回的列表与其中的字典由缓存共享，调用方不得修改。
+    无法解析的行会被跳过。
+    """
+    signature = file_signature(path)
+    if signature is None:
+        return []
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == signature:
+            _cache.move_to_end(path)
+            return cached[1]
+    records = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                appt = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(appt, dict):
+                records.append(appt)
+    with _cache_lock:
+        _cache[path] = (signature, records)
+        _cache.move_to_end(path)
+        while len(_cache) > ARCHIVE_CACHE_FILES:
+            _cache.popitem(last=False)
+    return records
+
+
+def write_archive_file(path: str, records: list):
+    """
+    原子地写入一个年份文件（临时文件 + fsync + os.replace）。
+
+    归档任务在文件落盘之后才从热存储中删除对应约会，因此这里需要 fsync。
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            for start in range(0, len(records), _WRITE_CHUNK):
+                chunk = records[start:start + _WRITE_CHUNK]
+                f.write("".join(json.dumps(appt, ensure_ascii=False, default=json_default) + "\n"
+                                for appt in chunk).encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _locked(directory: str):
+    """串行化同一归档目录上的归档任务（进程内线程锁 + 目录下 .lock 文件上的 flock）。"""
+    with _archive_lock:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, ".lock"), "a") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def archive_appointments(repository, directory: str, cutoff: str) -> dict:
+    """
+    把日期早于 cutoff 的单次约会移入按年份划分的归档文件，并从热存储中删除。
+
+    先把约会合并写入归档文件（按 ID 去重，重复运行结果不变），落盘后再批量删除，
+    任务在两步之间中断时约会同时存在于两处，查询时以热存储为准，不会丢失数据。
+    删除时存储在写锁内逐条比较，只删除内容与读取时相同的约会：归档期间被修改（如改期、设置提醒）
+    或删除的约会保留在热存储中，本次写入的归档副本随之撤回，下次归档时按最新内容重新处理。
+    重复约会只保存一条，不归档。
+
+    参数:
+        repository (repository.AppointmentRepository): 热存储。
+        directory (str): 归档目录，见 archive_dir_for。
+        cutoff (str): 截止日期（YYYY-MM-DD），见 archive_cutoff。
+
+    返回值:
+        dict: {"cutoff", "archived": 归档条数, "years": {年份: 该年本次归档的条数}}。
+    """
+    last_day = (date.fromisoformat(cutoff) - timedelta(days=1)).isoformat()
+    with _locked(directory):
+        by_year = {}
+        for appt in repository.between(None, last_day):
+            if not is_recurring(appt):
+                by_year.setdefault(appt["date"][:4], []).append(appt)
+        # 本次覆盖的归档条目原先的内容（没有时为 None），撤回时恢复
+        previous = {}
+        for year, records in sorted(by_year.items()):
+            path = archive_path(directory, year)
+            merged = {appt.get("id"): appt for appt in read_archive_file(path)}
+            previous.update((appt["id"], merged.get(appt["id"])) for appt in records)
+            merged.update((appt.get("id"), appt) for appt in records)
+            write_archive_file(path, list(merged.values()))
+        snapshot = [appt for records in by_year.values() for appt in records]
+        changed = set()
+        if snapshot:
+            deleted = repository.delete_many([appt["id"] for appt in snapshot], expected=snapshot)
+            changed = {appt["id"] for appt, done in zip(snapshot, deleted) if not done}
+        for year, records in sorted(by_year.items()):
+            if any(appt["id"] in changed for appt in records):
+                _revert_archive(archive_path(directory, year), changed, previous)
+                by_year[year] = [appt for appt in records if appt["id"] not in changed]
+    return {
+        "cutoff": cutoff,
+        "archived": len(snapshot) - len(changed),
+        "years": {year: len(records) for year, records in sorted(by_year.items()) if records},
+    }
+
+
+def _revert_archive(path: str, ids: set, previous: dict):
+    """撤回年份文件中本次写入的 ids：恢复为原先的归档内容，原先没有的直接去掉。"""
+    records = []
+    for appt in read_archive_file(path):
+        if appt.get("id") in ids:
+            appt = previous.get(appt.get("id"))
+            if appt is None:
+                continue
+        records.append(appt)
+    write_archive_file(path, records)
+
+
+def archived_between(directory: str, start=None, end=None) -> list:
+    """
+    按需读取日期在 [start, end] 闭区间内的归档约会，只解压覆盖该区间的年份文件。
+
+    参数:
+        directory (str): 归档目录。
+        start (str, optional): 起始日期，None 表示不限。
+        end (str, optional): 结束日期，None 表示不限。
+
+    返回值:
+        list: 约会字典副本列表，按日期排序，同一日期内保持归档顺序。
+    """
+    result = []
+    for year in archived_years(directory):
+        if (start is not None and year < start[:4]) or (end is not None and year > end[:4]):
+            continue
+        for appt in read_archive_file(archive_path(directory, year)):
+            day = appt.get("date")
+            if isinstance(day, str) and (start is None or day >= start) and (end is None or day <= end):
+                result.append(dict(appt))
+    result.sort(key=lambda appt: appt["date"])
+    return result
+
+
+def merge_archived(hot: list, archived: list) -> list:
+    """
+    合并热存储与归档的查询结果：同一 ID 以热存储为准；按日期排序，同一日期内归档约会在前。
+    """
+    if not archived:
+        return hot
+    hot_ids = {appt.get("id") for appt in hot}
+    merged = [appt for appt in archived if appt.get("id") not in hot_ids]
+    merged.extend(hot)
+    merged.sort(key=lambda appt: str(appt.get("date") or ""))
+    return merged
+
+
+def archive_stats(directory: str) -> dict:
+    """返回各年份归档文件的大小（字节）。"""
+    return {year: os.path.getsize(archive_path(directory, year)) for year in archived_years(directory)}
@@ -0,0 +1,279 @@
+# 基于 asyncio 的 API 服务，路由与 api_server 相同，适合大量空闲的 keep-alive 连接
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import responses
+from urllib.parse import urlsplit
+from . import dispatcher
+from .api_server import (
+    EventStream, StreamingResponse, conditional_get, encode_json, handle_request, record_request, route_label,
+)
+
+# 空闲 keep-alive 连接的超时时间（秒）
+IDLE_TIMEOUT = 60
+# 请求头总大小上限（字节）
+MAX_HEADER_BYTES = 64 * 1024
+# 执行阻塞存储操作的线程数
+DEFAULT_EXECUTOR_WORKERS = int(os.environ.get("CALENDAR_ASYNC_EXECUTOR_WORKERS", "4"))
+
+
+class BadRequest(Exception):
+    """请求格式不正确。"""
+
+
+async def read_request(reader: asyncio.StreamReader):
+    """
+    从连接中读取并解析一个 HTTP/1.x 请求。
+
+    参数:
+        reader (asyncio.StreamReader): 连接的读取端。
+
+    返回值:
+        tuple | None: (method, target, version, headers, body)；连接已关闭时返回 None。
+
+    异常:
+        BadRequest: 请求行、请求头或请求体格式不正确。
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+        raise BadRequest('Malformed request line')
+    method, target, version = parts
+
+    headers = {}
+    total = len(request_line)
+    while True:
+        line = await reader.readline()
+        total += len(line)
+        if total > MAX_HEADER_BYTES:
+            raise BadRequest('Headers too large')
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, sep, value = line.decode('latin-1').partition(':')
+        if not sep:
+            raise BadRequest('Malformed header')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length', 0) or 0)
+    except ValueError:
+        raise BadRequest('Invalid Content-Length')
+    if length < 0:
+        raise BadRequest('Invalid Content-Length')
+    body = await reader.readexactly(length) if length else b''
+    return method, target, version, headers, body
+
+
+def wants_keep_alive(version: str, headers: dict) -> bool:
+    """HTTP/1.1 默认保持连接，HTTP/1.0 需显式声明 keep-alive。"""
+    connection = headers.get('connection', '').lower()
+    if version == 'HTTP/1.1':
+        return connection != 'close'
+    return connection == 'keep-alive'
+
+
+def encode_response(status: int, data, keep_alive: bool) -> bytes:
+    """将状态码与 JSON 数据编码为完整的 HTTP/1.1 响应报文。"""
+    return encode_body_response(status, json.dumps(data).encode('utf-8'), keep_alive)
+
+
+def encode_body_response(status: int, body: bytes, keep_alive: bool, etag: str = None) -> bytes:
+    """将状态码与已编码的 JSON 响应体组装为完整的 HTTP/1.1 响应报文（304 不带响应体）。"""
+    head = f"HTTP/1.1 {status} {responses.get(status, '')}\r\n"
+    if etag:
+        head += f"ETag: {etag}\r\n"
+    if status != 304:
+        head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+    head += f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    return head.encode('latin-1') + (body if status != 304 else b'')
+
+
+class AsyncAPIServer:
+    """
+    asyncio 版 API 服务器。
+
+    每个连接只占用一个协程而不是一个线程；阻塞的存储调用通过线程池执行，
+    不会阻塞事件循环。
+    """
+
+    def __init__(self, host='0.0.0.0', port=8000, executor_workers=DEFAULT_EXECUTOR_WORKERS):
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="async-api-io")
+        self.server = None
+        self._connections = set()
+
+    async def handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), IDLE_TIMEOUT)
+                except BadRequest as exc:
+                    writer.write(encode_response(400, {'error': str(exc)}, False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                keep_alive = wants_keep_alive(version, headers)
+                route = route_label(urlsplit(target).path)
+                started = time.perf_counter()
+                if method == 'GET':
+                    status, payload, etag = await loop.run_in_executor(
+                        self.executor, conditional_get, target, headers.get('if-none-match'))
+                    if isinstance(payload, EventStream):
+                        try:
+                            await self._write_events(writer, payload)
+                        finally:
+                            record_request(route, method, status, time.perf_counter() - started)
+                        break
+                    if isinstance(payload, StreamingResponse):
+                        await self._write_stream(writer, status, payload, keep_alive)
+                    else:
+                        writer.write(encode_body_response(status, payload, keep_alive, etag))
+                        await writer.drain()
+                else:
+                    status, data = await loop.run_in_executor(self.executor, handle_request, method, target, body)
+                    body = encode_json(data, route)
+                    writer.write(encode_body_response(status, body, keep_alive))
+                    await writer.drain()
+                record_request(route, method, status, time.perf_counter() - started)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _write_stream(self, writer, status, response, keep_alive):
+        """以 chunked 编码发送流式响应，每一块都在线程池中生成。"""
+        loop = asyncio.get_running_loop()
+        writer.write((
+            f"HTTP/1.1 {status} {responses.get(status, '')}\r\n"
+            f"Content-Type: {response.content_type}\r\n"
+            "Transfer-Encoding: chunked\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        ).encode('latin-1'))
+        chunks = iter(response.chunks)
+        while True:
+            chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+            if chunk is None:
+                break
+            if chunk:
+                writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _write_events(self, writer, response):
+        """
+        发送 SSE 流：直接在事件循环中订阅 broker，等待事件不占用线程池。
+
+        分发线程通过 call_soon_threadsafe 把事件投递到本连接的 asyncio 队列，
+        慢客户端的队列满时丢弃新事件。
+        """
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue(dispatcher.SUBSCRIBER_QUEUE_SIZE)
+
+        def offer(event):
+            try:
+                events.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+
+        def deliver(event):
+            loop.call_soon_threadsafe(offer, event)
+
+        headers = "".join(f"{name}: {value}\r\n" for name, value in response.headers.items())
+        writer.write((
+            "HTTP/1.1 200 OK\r\n"
+            f"Content-Type: {response.content_type}\r\n"
+            f"{headers}"
+            "Transfer-Encoding: chunked\r\n"
+            "Connection: close\r\n"
+            "\r\n"
+        ).encode('latin-1'))
+        response.broker.subscribe(deliver)
+        try:
+            chunk = b": connected\n\n"
+            while chunk is not None:
+                writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                await writer.drain()
+                try:
+                    event = await asyncio.wait_for(events.get(), dispatcher.SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    chunk = b": keep-alive\n\n"
+                else:
+                    chunk = dispatcher.format_sse(event) if event is not None else None
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            response.broker.unsubscribe(deliver)
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port, backlog=4096)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        print(f"Async API server listening on {self.host}:{self.port}")
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def shutdown(self):
+        """停止监听并取消所有仍在处理中的连接。"""
+        if self.server is not None:
+            self.server.close()
+        tasks = list(self._connections)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.executor.shutdown(wait=False)
+
+
+def run(host='0.0.0.0', port=8000, executor_workers=DEFAULT_EXECUTOR_WORKERS, start_dispatcher=True):
+    server = AsyncAPIServer(host, port, executor_workers)
+    if start_dispatcher:
+        dispatcher.start_dispatcher()
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dispatcher.stop_dispatcher()
+        server.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Calendar reminder asyncio API server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--executor-workers", type=int, default=DEFAULT_EXECUTOR_WORKERS,
+                        help="执行存储操作的线程数")
+    parser.add_argument("--no-dispatcher", action="store_true",
+                        help="不启动后台提醒分发线程（/api/reminders/stream 将没有事件）")
+    args = parser.parse_args()
+    run(args.host, args.port, args.executor_workers, not args.no_dispatcher)
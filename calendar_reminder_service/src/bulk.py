@@ -0,0 +1,244 @@
+# 批量导入、导出：NDJSON / CSV 流式读写，内存占用只与批大小有关，与数据总量无关
+import csv
+import json
+import time
+import uuid
+
+from .appointments import current_store, iter_appointments, validate_appointment_fields
+from .calendar_utils import parse_datetime_minutes
+from .recurrence import RECURRENCE_FIELD, normalize_recurrence
+
+FORMATS = ("ndjson", "csv")
+# CSV 的列；recurrence 列保存 JSON 编码的重复规则，空字符串表示单次约会
+CSV_FIELDS = ("id", "title", "date", "time", "description", "location", "reminder_time", RECURRENCE_FIELD)
+# 每批写入存储的条数：每批只保存一次
+DEFAULT_BATCH_SIZE = 5000
+# 报告中最多保留的错误条数（其余只计数）
+MAX_REPORTED_ERRORS = 20
+
+_EXTENSIONS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}
+
+
+def detect_format(path: str, default: str = "ndjson") -> str:
+    """
+    根据文件扩展名判断格式（.ndjson / .jsonl / .csv），无法判断时返回 default。
+
+    参数:
+        path (str): 文件路径。
+        default (str): 默认格式。
+
+    返回值:
+        str: "ndjson" 或 "csv"。
+    """
+    for extension, fmt in _EXTENSIONS.items():
+        if path.lower().endswith(extension):
+            return fmt
+    return default
+
+
+def read_rows(fp, fmt: str):
+    """
+    逐行读取导入数据，不会一次性读入整个文件。
+
+    参数:
+        fp: 文本文件对象（CSV 需以 newline="" 打开）。
+        fmt (str): "ndjson" 或 "csv"。
+
+    返回值:
+        生成器，产出 (行号, 约会字典或 None, 错误描述)；解析失败时约会字典为 None。
+
+    异常:
+        ValueError: 格式不受支持。
+    """
+    if fmt == "ndjson":
+        for line_no, line in enumerate(fp, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line), ""
+            except json.JSONDecodeError as e:
+                yield line_no, None, f"Invalid JSON: {e.msg}"
+    elif fmt == "csv":
+        reader = csv.DictReader(fp, restval="")
+        for row in reader:
+            rule = row.get(RECURRENCE_FIELD) or ""
+            if rule:
+                try:
+                    row[RECURRENCE_FIELD] = json.loads(rule)
+                except json.JSONDecodeError:
+                    yield reader.line_num, None, "Invalid recurrence, expected a JSON object"
+                    continue
+            else:
+                row[RECURRENCE_FIELD] = None
+            row.pop(None, None)
+            yield reader.line_num, row, ""
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def build_record(row: dict):
+    """
+    校验一行导入数据并生成约会记录。
+
+    与 API 新增约会的校验一致，另外接受 id（保留原系统的 ID，缺省时生成新的）与 reminder_time
+    （非空时视为已设置提醒）。
+
+    参数:
+        row (dict): 一行导入数据。
+
+    返回值:
+        tuple: (约会字典或 None, 错误描述)。
+    """
+    error = validate_appointment_fields(row)
+    if error:
+        return None, error
+    appointment_id = row.get("id") or str(uuid.uuid4())
+    if not isinstance(appointment_id, str):
+        return None, "Field 'id' must be a string"
+    reminder_time = row.get("reminder_time") or ""
+    if reminder_time:
+        try:
+            parse_datetime_minutes(reminder_time)
+        except (TypeError, ValueError):
+            return None, "Invalid reminder_time format, expected YYYY-MM-DD HH:MM"
+    record = {
+        "id": appointment_id,
+        "title": row["title"],
+        "date": row["date"],
+        "time": row["time"],
+        "description": row.get("description") or "",
+        "reminder_set": bool(reminder_time),
+        "reminder_time": reminder_time,
+        "location": row.get("location") or "",
+    }
+    if row.get(RECURRENCE_FIELD):
+        record[RECURRENCE_FIELD] = normalize_recurrence(row[RECURRENCE_FIELD])
+    return record, ""
+
+
+def _rate(count: int, elapsed: float) -> float:
+    return round(count / elapsed, 1) if elapsed > 0 else float(count)
+
+
+def import_appointments(fp, fmt: str, batch_size: int = DEFAULT_BATCH_SIZE, progress=None) -> dict:
+    """
+    流式导入约会：逐行校验，每攒满 batch_size 条有效约会调用一次 add_many（只保存一次）。
+
+    无效的行与 ID 已存在（或在本次导入中重复）的行会被跳过并计入 failed。
+
+    参数:
+        fp: 文本文件对象。
+        fmt (str): "ndjson" 或 "csv"。
+        batch_size (int): 每批写入的条数。
+        progress (callable, optional): 每批写入后以当前报告调用。
+
+    返回值:
+        dict: {"read", "imported", "failed", "errors", "batches", "elapsed", "rows_per_second"}，
+              errors 为前 MAX_REPORTED_ERRORS 个 {"line", "error"}。
+    """
+    store = current_store()
+    report = {"read": 0, "imported": 0, "failed": 0, "errors": [], "batches": 0,
+              "elapsed": 0.0, "rows_per_second": 0.0}
+    started = time.perf_counter()
+
+    def fail(line_no, error):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"line": line_no, "error": error})
+
+    def flush(batch):
+        store.add_many(batch)
+        report["imported"] += len(batch)
+        report["batches"] += 1
+        report["elapsed"] = time.perf_counter() - started
+        report["rows_per_second"] = _rate(report["read"], report["elapsed"])
+        if progress is not None:
+            progress(report)
+
+    batch = []
+    batch_ids = set()
+    for line_no, row, error in read_rows(fp, fmt):
+        report["read"] += 1
+        if not error:
+            record, error = build_record(row)
+        if not error and (record["id"] in batch_ids or (row.get("id") and store.get(record["id"]) is not None)):
+            error = f"Duplicate id: {record['id']}"
+        if error:
+            fail(line_no, error)
+            continue
+        batch.append(record)
+        batch_ids.add(record["id"])
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+            batch_ids.clear()
+    if batch:
+        flush(batch)
+    report["elapsed"] = time.perf_counter() - started
+    report["rows_per_second"] = _rate(report["read"], report["elapsed"])
+    return report
+
+
+def export_appointments(fp, fmt: str, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """
+    按 (date, time, id) 顺序流式导出全部约会，每次只从存储读取 batch_size 条。
+
+    重复约会按系列导出一条（与存储中一致），CSV 的 recurrence 列为 JSON 编码的规则。
+
+    参数:
+        fp: 文本文件对象（CSV 需以 newline="" 打开）。
+        fmt (str): "ndjson" 或 "csv"。
+        batch_size (int): 每批从存储读取的条数。
+
+    返回值:
+        dict: {"exported", "elapsed", "rows_per_second"}。
+
+    异常:
+        ValueError: 格式不受支持。
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    started = time.perf_counter()
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(fp, CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+    for appt in iter_appointments(batch_size):
+        if fmt == "ndjson":
+            fp.write(json.dumps(appt, ensure_ascii=False) + "\n")
+        else:
+            rule = appt.get(RECURRENCE_FIELD)
+            writer.writerow(dict(appt, **{RECURRENCE_FIELD: json.dumps(rule) if rule else ""}))
+        count += 1
+    elapsed = time.perf_counter() - started
+    return {"exported": count, "elapsed": elapsed, "rows_per_second": _rate(count, elapsed)}
+
+
+def storage_stats(batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """
+    流式统计当前存储中的约会。
+
+    参数:
+        batch_size (int): 每批从存储读取的条数。
+
+    返回值:
+        dict: {"appointments", "recurring", "reminders", "first_date", "last_date", "store"}，
+              store 为存储实现自身的统计信息（见 stats()）。
+    """
+    result = {"appointments": 0, "recurring": 0, "reminders": 0, "first_date": None, "last_date": None}
+    for appt in iter_appointments(batch_size):
+        result["appointments"] += 1
+        if appt.get(RECURRENCE_FIELD):
+            result["recurring"] += 1
+        if appt.get("reminder_set"):
+            result["reminders"] += 1
+        date = appt.get("date")
+        if not isinstance(date, str):
+            # 早期数据中可能有日期为 null 的约会：计入总数，不参与日期范围
+            continue
+        if result["first_date"] is None or date < result["first_date"]:
+            result["first_date"] = date
+        if result["last_date"] is None or date > result["last_date"]:
+            result["last_date"] = date
+    result["store"] = current_store().stats()
+    return result
@@ -1 +1,147 @@
 # 这是 calendar_utils.py 文件
+import re
+from datetime import date, datetime, timedelta
+
+DATE_FORMAT = "%Y-%m-%d"
+TIME_FORMAT = "%H:%M"
+DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+# 规范格式 "YYYY-MM-DD" / "HH:MM" 的快速路径；其余 strptime 能接受的写法（如单位数月份）回退到 strptime
+_DATE_RE = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+_CLOCK_RE = re.compile(r"[0-9]{2}:[0-9]{2}")
+# 日期与时刻的解析结果缓存：日历中大量约会共享相同的日期与时刻
+_DAY_MINUTES = {}
+_CLOCK_MINUTES = {}
+_DAY_CACHE_LIMIT = 100000
+
+def datetime_to_seconds(dt: datetime) -> float:
+    """
+    将（无时区的）datetime 转换为相对 1970-01-01 的秒数，便于整数/浮点比较。
+
+    参数:
+        dt (datetime): 本地时间。
+
+    返回值:
+        float: 距离纪元的秒数（保留微秒精度）。
+    """
+    return (dt - _EPOCH).total_seconds()
+
+
+def seconds_to_datetime(seconds: float) -> datetime:
+    """
+    datetime_to_seconds 的逆运算：将纪元秒数转换回（无时区的）本地时间。
+
+    参数:
+        seconds (float): 距离纪元的秒数。
+
+    返回值:
+        datetime: 对应的本地时间。
+    """
+    return _EPOCH + timedelta(seconds=seconds)
+
+
+def _strptime_minutes(datetime_str: str) -> int:
+    dt = datetime.strptime(datetime_str, DATETIME_FORMAT)
+    return (dt.toordinal() - _EPOCH_ORDINAL) * 1440 + dt.hour * 60 + dt.minute
+
+
+def _day_minutes(date_str: str):
+    """规范格式日期对应的纪元分钟数（当天 00:00）；非规范格式返回 None，日期无效时抛出 ValueError。"""
+    minutes = _DAY_MINUTES.get(date_str)
+    if minutes is None and _DATE_RE.fullmatch(date_str):
+        # date() 负责校验年月日（如 2 月 30 日）
+        minutes = (date(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:])).toordinal() - _EPOCH_ORDINAL) * 1440
+        if len(_DAY_MINUTES) >= _DAY_CACHE_LIMIT:
+            _DAY_MINUTES.clear()
+        _DAY_MINUTES[date_str] = minutes
+    return minutes
+
+
+def _clock_minutes(time_str: str):
+    """规范格式时刻对应的分钟数；非规范格式返回 None，时刻无效时抛出 ValueError。"""
+    minutes = _CLOCK_MINUTES.get(time_str)
+    if minutes is None and _CLOCK_RE.fullmatch(time_str):
+        hour, minute = int(time_str[:2]), int(time_str[3:])
+        if hour > 23 or minute > 59:
+            raise ValueError(f"time data {time_str!r} does not match format {TIME_FORMAT!r}")
+        minutes = _CLOCK_MINUTES[time_str] = hour * 60 + minute
+    return minutes
+
+
+def parse_date_time_minutes(date_str: str, time_str: str) -> int:
+    """
+    将分开保存的日期（YYYY-MM-DD）与时刻（HH:MM）解析为纪元分钟数。
+
+    规范格式按位解析并缓存结果，比 datetime.strptime 快一个数量级；结果与 strptime 完全一致。
+
+    参数:
+        date_str (str): 日期字符串。
+        time_str (str): 时刻字符串。
+
+    返回值:
+        int: 距离纪元的分钟数。
+
+    异常:
+        ValueError: 格式不正确或日期时间超出范围时抛出。
+        TypeError: 参数不是字符串时抛出。
+    """
+    day = _day_minutes(date_str)
+    clock = _clock_minutes(time_str)
+    if day is None or clock is None:
+        return _strptime_minutes(f"{date_str} {time_str}")
+    return day + clock
+
+
+def parse_datetime_minutes(datetime_str: str) -> int:
+    """
+    解析 "YYYY-MM-DD HH:MM" 格式的时间字符串为纪元分钟数，见 parse_date_time_minutes。
+
+    异常:
+        ValueError: 格式不正确或日期时间超出范围时抛出。
+        TypeError: 参数不是字符串时抛出。
+    """
+    if len(datetime_str) == 16 and datetime_str[10] == " ":
+        return parse_date_time_minutes(datetime_str[:10], datetime_str[11:])
+    return _strptime_minutes(datetime_str)
+
+
+def parse_datetime_seconds(datetime_str: str) -> int:
+    """
+    解析 "YYYY-MM-DD HH:MM" 格式的时间字符串为纪元秒数。
+
+    参数:
+        datetime_str (str): 时间字符串。
+
+    返回值:
+        int: 距离纪元的秒数。
+
+    异常:
+        ValueError: 格式不正确时抛出。
+    """
+    return parse_datetime_minutes(datetime_str) * 60
+
+
+def epoch_day_to_date(day: int) -> date:
+    """将纪元日序号（距 1970-01-01 的天数，即纪元分钟数 // 1440）转换为 date。"""
+    return date.fromordinal(_EPOCH_ORDINAL + day)
+
+
+def date_to_epoch_day(value: date) -> int:
+    """epoch_day_to_date 的逆运算。"""
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def format_minutes(minutes: int) -> str:
+    """
+    将纪元分钟数格式化为 "YYYY-MM-DD HH:MM"（parse_datetime_minutes 的逆运算）。
+
+    参数:
+        minutes (int): 距离纪元的分钟数。
+
+    返回值:
+        str: 时间字符串。
+    """
+    day, clock = divmod(minutes, 1440)
+    return f"{epoch_day_to_date(day).isoformat()} {clock // 60:02d}:{clock % 60:02d}"
@@ -0,0 +1,204 @@
+# 增量变更日志：按单调递增的序号记录新增、修改、删除，同步客户端只拉取某个序号之后的变更
+import json
+import os
+import threading
+
+# 变更日志至少保留的条数；文件（或表）中的条目超过两倍时裁剪回这么多条
+CHANGE_LOG_CAPACITY = int(os.environ.get("CALENDAR_CHANGE_LOG_SIZE", "10000"))
+
+# 变更类型
+ADD = "add"
+UPDATE = "update"
+DELETE = "delete"
+# 日志文件的首行：{"op": "reset", "seq": floor}，floor 之前（含）的变更已不在日志中
+_RESET = "reset"
+
+
+class ResyncRequired(Exception):
+    """
+    请求的序号已不在变更日志保留的范围内（落后太多、数据被整体替换过，或序号来自另一份日志），
+    客户端需要重新全量下载。
+
+    参数:
+        seq (int): 当前最新的序号，全量下载后从这里继续拉取增量。
+    """
+
+    def __init__(self, seq: int):
+        super().__init__(f"Change log does not cover the requested sequence, resync from {seq}")
+        self.seq = seq
+
+
+def _file_signature(path: str):
+    # 与 store.file_signature 相同；store 导入本模块，这里不能反向导入
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def changes_path_for(path: str) -> str:
+    """数据文件对应的变更日志路径。"""
+    return path + ".changes"
+
+
+def change(op: str, appointment_id: str, appointment=None) -> dict:
+    """
+    构造一条（尚未分配序号的）变更。
+
+    参数:
+        op (str): ADD、UPDATE 或 DELETE。
+        appointment_id (str): 约会 ID。
+        appointment (dict, optional): 新增或修改后的完整约会，删除时为 None。
+
+    返回值:
+        dict: {"op", "id"[, "appointment"]}。
+    """
+    entry = {"op": op, "id": appointment_id}
+    if appointment is not None:
+        entry["appointment"] = appointment
+    return entry
+
+
+def delta(entries, floor: int, last: int, since: int, limit: int) -> dict:
+    """
+    从按序号连续排列的变更中取出 since 之后的至多 limit 条。
+
+    参数:
+        entries: 序号为 floor + 1 .. last 的变更，支持下标访问。
+        floor (int): 日志能够回答的最小序号。
+        last (int): 最新的序号。
+        since (int): 客户端已经同步到的序号。
+        limit (int): 返回条数上限。
+
+    返回值:
+        dict: {"seq": 本次同步到的序号, "changes": [...], "more": 是否还有更多变更}。
+
+    异常:
+        ResyncRequired: since 小于 floor 或大于 last。
+    """
+    if since < floor or since > last:
+        raise ResyncRequired(last)
+    start = since - floor
+    changes = list(entries[start:start + limit])
+    seq = changes[-1]["seq"] if changes else since
+    return {"seq": seq, "changes": changes, "more": seq < last}
+
+
+class ChangeLog:
+    """
+    文件形式的有界变更日志（NDJSON），供 JSON、追加日志与分片存储使用。
+
+    首行 ``{"op": "reset", "seq": floor}`` 之后每行一条变更
+    ``{"seq", "op", "id"[, "appointment"]}``，序号从 floor + 1 起连续递增；
+    条目超过 capacity 的两倍时原子地重写为最近 capacity 条，floor 随之前移。
+    日志文件不存在时视为在序号 1 处整体替换过：已有的数据没有变更记录，序号 0 需要全量同步。
+
+    写入（append / reset）由存储在写锁（及跨进程锁）内、数据写盘之后调用；
+    内存中的条目按文件签名缓存，其他进程追加后在下次访问时重新读取。
+
+    参数:
+        path (str): 日志文件路径，见 changes_path_for。
+        capacity (int, optional): 至少保留的条数。
+    """
+
+    def __init__(self, path: str, capacity: int = None):
+        self.path = path
+        self.capacity = capacity if capacity is not None else CHANGE_LOG_CAPACITY
+        self._lock = threading.Lock()
+        self._signature = False
+        self._floor = 1
+        self._entries = []
+
+    @property
+    def last(self) -> int:
+        return self._floor + len(self._entries)
+
+    def _refresh(self):
+        """日志文件被（其他进程）修改过时重新读取。"""
+        signature = _file_signature(self.path)
+        if signature == self._signature:
+            return
+        floor, entries = 1, []
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 写到一半的最后一行，忽略
+                        continue
+                    if entry.get("op") == _RESET:
+                        floor, entries = entry["seq"], []
+                    else:
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        self._floor, self._entries = floor, entries
+        self._signature = signature
+
+    def _rewrite(self):
+        lines = [json.dumps({"op": _RESET, "seq": self._floor})]
+        lines.extend(json.dumps(entry) for entry in self._entries)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+        self._signature = _file_signature(self.path)
+
+    def append(self, changes: list) -> int:
+        """
+        为变更分配序号并追加到日志。
+
+        参数:
+            changes (list): change() 构造的变更列表。
+
+        返回值:
+            int: 最新的序号。
+        """
+        with self._lock:
+            self._refresh()
+            if not changes:
+                return self.last
+            new = []
+            for entry in changes:
+                new.append({"seq": self.last + len(new) + 1, **entry})
+            self._entries.extend(new)
+            if len(self._entries) > 2 * self.capacity:
+                drop = len(self._entries) - self.capacity
+                self._floor += drop
+                del self._entries[:drop]
+                self._rewrite()
+            elif not os.path.exists(self.path):
+                self._rewrite()
+            else:
+                with open(self.path, 'a') as f:
+                    f.write("".join(json.dumps(entry) + "\n" for entry in new))
+                self._signature = _file_signature(self.path)
+            return self.last
+
+    def reset(self) -> int:
+        """
+        数据被整体替换（save_appointments）后调用：清空日志并消耗一个序号，
+        之前的所有序号都需要全量同步。
+
+        返回值:
+            int: 新的序号。
+        """
+        with self._lock:
+            self._refresh()
+            self._floor, self._entries = self.last + 1, []
+            self._rewrite()
+            return self._floor
+
+    def since(self, seq: int, limit: int) -> dict:
+        """
+        返回序号 seq 之后的至多 limit 条变更，见 delta。
+
+        异常:
+            ResyncRequired: 日志已不包含 seq 之后的全部变更。
+        """
+        with self._lock:
+            self._refresh()
+            return delta(self._entries, self._floor, self.last, seq, limit)
@@ -0,0 +1,354 @@
+# 后台提醒分发：到点触发提醒并推送给 Server-Sent Events 订阅者
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from .appointments import current_store
+from .calendar_utils import DATETIME_FORMAT, datetime_to_seconds, parse_datetime_seconds, seconds_to_datetime
+from .marks import ACKED, DELIVERED, is_marked
+from .reminders import current_marks
+
+logger = logging.getLogger(__name__)
+
+# 两次检查之间的最长休眠时间（秒）：兜底发现其他进程写入的提醒
+MAX_SLEEP = float(os.environ.get("CALENDAR_DISPATCHER_MAX_SLEEP", "60"))
+# SSE 连接的心跳间隔（秒），防止代理因空闲断开连接，同时及时发现已断开的客户端
+SSE_HEARTBEAT = 15
+# 每个订阅者最多积压的事件数，慢客户端超出后丢弃新事件
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+def is_delivered(appt: dict) -> bool:
+    """
+    判断约会当前的提醒是否已经推送过（见提醒标记文件中的 DELIVERED 标记）。
+
+    标记保存的是推送时的提醒时间，重新设置为其他提醒时间后自动视为未推送；
+    重复约会的标记作为水位线，见 marks.is_marked。
+    """
+    return current_marks().is_marked(DELIVERED, appt)
+
+
+class ReminderBroker:
+    """
+    进程内的提醒事件发布/订阅中心。
+
+    订阅者以回调形式注册，publish 在分发线程中依次调用各回调；
+    单个回调出错（如客户端已断开）不影响其他订阅者。
+    """
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, callback):
+        """注册订阅回调，回调以事件字典为参数；broker 关闭时以 None 调用。"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, event: dict) -> dict:
+        """
+        为事件分配递增的序号并推送给全部订阅者。
+
+        返回值:
+            dict: 带有 "id" 字段的事件。
+        """
+        with self._lock:
+            self._sequence += 1
+            event = dict(event, id=self._sequence)
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for callback in subscribers:
+            try:
+                if callback(event) is False:
+                    self.dropped += 1
+            except Exception:
+                logger.exception("Reminder subscriber failed")
+        return event
+
+    def close(self):
+        """通知所有订阅者结束（SSE 流随之关闭）。"""
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for callback in subscribers:
+            try:
+                callback(None)
+            except Exception:
+                pass
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+def format_sse(event: dict) -> bytes:
+    """将提醒事件编码为一条 SSE 消息。"""
+    return f"id: {event['id']}\nevent: reminder\ndata: {json.dumps(event)}\n\n".encode('utf-8')
+
+
+def event_stream(broker, heartbeat=None):
+    """
+    阻塞式的 SSE 输出：订阅 broker，逐条产出已编码的事件，空闲时产出心跳注释。
+
+    生成器被关闭（客户端断开）或 broker 关闭时取消订阅。
+    """
+    events = queue.Queue(SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(event):
+        try:
+            events.put_nowait(event)
+        except queue.Full:
+            return False
+
+    broker.subscribe(deliver)
+    try:
+        yield b": connected\n\n"
+        while True:
+            try:
+                event = events.get(timeout=heartbeat if heartbeat is not None else SSE_HEARTBEAT)
+            except queue.Empty:
+                yield b": keep-alive\n\n"
+                continue
+            if event is None:
+                return
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(deliver)
+
+
+class ReminderDispatcher:
+    """
+    后台提醒分发线程。
+
+    线程休眠到下一条提醒的时间点（由存储的 next_reminder_time 给出）才醒来，
+    期间存储有写入时通过监听回调提前唤醒并重新计算，而不是定期轮询。
+    到期的提醒先在提醒标记文件中标记为已推送（见 marks.DELIVERED，约会记录本身不变），
+    再发布给订阅者，因此服务重启或多次检查都不会重复推送同一条提醒。
+
+    pre-fork 多进程模式下每个工作进程只向连接到自己的订阅者推送，推送记录只保存在进程内存中
+    （persist_delivered=False）：否则第一个推送的工作进程写入的标记会使其他工作进程的订阅者收不到提醒。
+
+    参数:
+        broker (ReminderBroker, optional): 事件发布中心，默认使用模块级 BROKER。
+        repository_provider (callable, optional): 返回当前存储实例，默认 current_store。
+        now_func (callable, optional): 返回当前本地时间（datetime），测试时可替换。
+        max_sleep (float, optional): 单次最长休眠秒数。
+        persist_delivered (bool, optional): 是否把“已推送”标记写入提醒标记文件，默认 True。
+    """
+
+    def __init__(self, broker=None, repository_provider=None, now_func=None, max_sleep=None,
+                 persist_delivered=True):
+        self.broker = broker if broker is not None else BROKER
+        self.persist_delivered = persist_delivered
+        # persist_delivered 为 False 时的推送记录：约会 ID -> 推送时的提醒时间
+        self._delivered = {}
+        self._repository_provider = repository_provider or current_store
+        self._now = now_func or datetime.now
+        self.max_sleep = max_sleep if max_sleep is not None else MAX_SLEEP
+        self._repository = None
+        self._cond = threading.Condition()
+        self._woken = False
+        self._stopping = False
+        self._thread = None
+        self.next_reminder = None
+        self.wakeups = 0
+        self.fired = 0
+        self._latency_total = 0.0
+        self.latency_max = 0.0
+        self.latency_last = None
+        self.lag_max = 0.0
+        self.lag_last = None
+
+    def _watch(self, repository):
+        """在当前存储上注册写入监听（数据文件切换后改为监听新的存储）。"""
+        if repository is self._repository:
+            return
+        if self._repository is not None:
+            self._repository.remove_listener(self.wake)
+        repository.add_listener(self.wake)
+        self._repository = repository
+
+    def wake(self):
+        """提前唤醒分发线程，使其重新检查到期提醒并重新计算休眠时间。"""
+        with self._cond:
+            self._woken = True
+            self._cond.notify()
+
+    def run_once(self) -> list:
+        """
+        推送当前所有已到期且尚未推送的提醒，并更新下一次提醒时间。
+
+        返回值:
+            list: 本次发布的事件列表。
+        """
+        repository = self._repository_provider()
+        self._watch(repository)
+        now = self._now()
+        now_seconds = datetime_to_seconds(now)
+        due = repository.due(now_seconds)
+        if due:
+            # 已经通过 POST /api/reminders/ack 确认的提醒不再推送
+            delivered = self._delivered_markers()
+            acked = current_marks().markers(ACKED)
+            due = [appt for appt in due
+                   if not is_marked(appt, delivered.get(appt["id"])) and not is_marked(appt, acked.get(appt["id"]))]
+        events = []
+        if due:
+            # 先持久化“已推送”标记再发布：进程在两者之间崩溃只会漏推，不会重复推送
+            self._mark_delivered(due, now_seconds)
+            fired_at = now.strftime("%Y-%m-%d %H:%M:%S")
+            for appt in due:
+                # 重复约会推送的是该次发生（日期与提醒时间为该次的值），而不是系列本身
+                reminder_seconds = parse_datetime_seconds(appt["reminder_time"])
+                latency = max(0.0, now_seconds - reminder_seconds)
+                self._record_latency(latency)
+                events.append(self.broker.publish({
+                    "appointment": appt,
+                    "reminder_time": appt["reminder_time"],
+                    "fired_at": fired_at,
+                    "latency_ms": round(latency * 1000, 3),
+                }))
+        self.next_reminder = repository.next_reminder_time(now_seconds)
+        return events
+
+    def _delivered_markers(self) -> dict:
+        if self.persist_delivered:
+            return current_marks().markers(DELIVERED)
+        return self._delivered
+
+    def _mark_delivered(self, due: list, now_seconds: float):
+        """记录本次推送的提醒（标记为推送时的提醒时间）。"""
+        if self.persist_delivered:
+            current_marks().mark(DELIVERED, [(appt, appt["reminder_time"]) for appt in due], now_seconds)
+            return
+        for appt in due:
+            self._delivered[appt["id"]] = appt["reminder_time"]
+
+    def _record_latency(self, latency: float):
+        self.fired += 1
+        self._latency_total += latency
+        self.latency_last = latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def _sleep_seconds(self) -> float:
+        if self.next_reminder is None:
+            return self.max_sleep
+        remaining = self.next_reminder - datetime_to_seconds(self._now())
+        return min(max(remaining, 0.0), self.max_sleep)
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Reminder dispatch failed")
+                self.next_reminder = None
+            with self._cond:
+                if self._stopping:
+                    return
+                if not self._woken:
+                    timeout = self._sleep_seconds()
+                    deadline = time.monotonic() + timeout
+                    if not self._cond.wait(timeout) and timeout < self.max_sleep:
+                        # 按时醒来：实际醒来时间与计划时间之差即分发线程的延迟
+                        self.lag_last = max(0.0, time.monotonic() - deadline)
+                        self.lag_max = max(self.lag_max, self.lag_last)
+                self._woken = False
+                if self._stopping:
+                    return
+                self.wakeups += 1
+
+    def start(self):
+        """启动后台分发线程（已启动时忽略）。"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="reminder-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """停止分发线程并取消存储监听。"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._repository is not None:
+            self._repository.remove_listener(self.wake)
+            self._repository = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> dict:
+        """返回触发延迟（提醒时间到实际推送）与分发线程延迟（计划醒来到实际醒来）等统计。"""
+        def ms(seconds):
+            return round(seconds * 1000, 3) if seconds is not None else None
+
+        return {
+            "running": self.is_running(),
+            "next_reminder": (seconds_to_datetime(self.next_reminder).strftime(DATETIME_FORMAT)
+                              if self.next_reminder is not None else None),
+            "wakeups": self.wakeups,
+            "fired": self.fired,
+            "published": self.broker.published,
+            "dropped": self.broker.dropped,
+            "subscribers": self.broker.subscriber_count(),
+            "latency_ms": {
+                "last": ms(self.latency_last),
+                "avg": ms(self._latency_total / self.fired) if self.fired else None,
+                "max": ms(self.latency_max),
+            },
+            "lag_ms": {"last": ms(self.lag_last), "max": ms(self.lag_max)},
+        }
+
+
+# 进程内共享的发布中心与分发线程
+BROKER = ReminderBroker()
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def start_dispatcher(**options) -> ReminderDispatcher:
+    """
+    启动（或返回已启动的）进程内共享分发线程。
+
+    参数:
+        **options: 首次创建时传给 ReminderDispatcher 的参数（如 max_sleep、persist_delivered）。
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = ReminderDispatcher(BROKER, **options)
+        _dispatcher.start()
+        return _dispatcher
+
+
+def stop_dispatcher():
+    """停止共享分发线程，并结束所有 SSE 订阅。"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is not None:
+            _dispatcher.stop()
+            _dispatcher = None
+    BROKER.close()
+
+
+def dispatcher_stats() -> dict:
+    """返回共享分发线程的统计；未启动时只包含订阅信息。"""
+    with _dispatcher_lock:
+        dispatcher = _dispatcher
+    if dispatcher is None:
+        return {"running": False, "published": BROKER.published, "subscribers": BROKER.subscriber_count()}
+    return dispatcher.stats()
@@ -0,0 +1,90 @@
+import bisect
+
+
+class DateIndex:
+    """
+    日期索引：日期 -> 约会 ID 列表，并维护一个有序的日期列表以便二分查找。
+
+    同一日期下的 ID 保持插入顺序，与原先线性扫描返回的顺序一致。
+    日期不是字符串（如 null）的约会不参与日期查询，单独记录以便分页时仍能取到。
+    """
+
+    def __init__(self):
+        self._dates = []
+        self._ids = {}
+        # 日期不是字符串的约会 ID（按插入顺序，值恒为 None）
+        self._undated = {}
+
+    def rebuild(self, records: list):
+        """根据约会列表重建整个索引。"""
+        self._ids = {}
+        self._undated = {}
+        for appt in records:
+            date = appt.get("date")
+            if appt.get("id") is None:
+                continue
+            if isinstance(date, str):
+                self._ids.setdefault(date, []).append(appt["id"])
+            else:
+                self._undated[appt["id"]] = None
+        self._dates = sorted(self._ids)
+
+    def add(self, appt: dict):
+        """将一条约会加入索引。"""
+        date = appt.get("date")
+        if appt.get("id") is None:
+            return
+        if not isinstance(date, str):
+            self._undated[appt["id"]] = None
+            return
+        ids = self._ids.get(date)
+        if ids is None:
+            ids = self._ids[date] = []
+            bisect.insort(self._dates, date)
+        ids.append(appt["id"])
+
+    def remove(self, appt: dict):
+        """从索引中移除一条约会（不存在时忽略）。"""
+        date = appt.get("date")
+        if not isinstance(date, str):
+            self._undated.pop(appt.get("id"), None)
+            return
+        ids = self._ids.get(date)
+        if not ids or appt.get("id") not in ids:
+            return
+        ids.remove(appt["id"])
+        if not ids:
+            del self._ids[date]
+            pos = bisect.bisect_left(self._dates, date)
+            del self._dates[pos]
+
+    def ids_on(self, date: str) -> list:
+        """返回指定日期的约会 ID 列表。"""
+        return list(self._ids.get(date, ()))
+
+    def undated_ids(self) -> list:
+        """返回日期不是字符串的约会 ID 列表。"""
+        return list(self._undated)
+
+    def iter_dates(self, start=None):
+        """按升序逐个产出不早于 start 的日期（调用期间索引不应被修改）。"""
+        pos = 0 if start is None else bisect.bisect_left(self._dates, start)
+        dates = self._dates
+        while pos < len(dates):
+            yield dates[pos]
+            pos += 1
+
+    def ids_between(self, start=None, end=None) -> list:
+        """
+        返回日期落在 [start, end] 闭区间内的约会 ID，按日期排序。
+
+        参数:
+            start (str, optional): 起始日期（YYYY-MM-DD），为 None 表示不限。
+            end (str, optional): 结束日期（YYYY-MM-DD），为 None 表示不限。
+        """
+        lo = 0 if start is None else bisect.bisect_left(self._dates, start)
+        hi = len(self._dates) if end is None else bisect.bisect_right(self._dates, end)
+        result = []
+        for date in self._dates[lo:hi]:
+            result.extend(self._ids[date])
+        return result
@@ -0,0 +1,133 @@
+# 多进程（pre-fork）部署时的跨进程同步：fcntl 咨询锁与共享内存中的数据版本计数器
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows 等没有 fcntl 的平台只支持单进程模式
+    fcntl = None
+
+# 是否启用跨进程同步：为 True 时新建的存储实例会附带 ProcessSync。
+# pre-fork 模式在创建工作进程之前调用 enable()，也可以通过环境变量开启（如同时运行多个独立的服务进程）。
+ENABLED = os.environ.get("CALENDAR_PROCESS_SHARED", "") == "1"
+
+_COUNTER = struct.Struct("<Q")
+
+
+def enable():
+    """
+    开启跨进程同步，之后新建的存储实例都会使用文件锁与共享版本计数器。
+
+    异常:
+        RuntimeError: 当前平台没有 fcntl。
+    """
+    global ENABLED
+    if fcntl is None:
+        raise RuntimeError("Multi-process mode requires fcntl (POSIX only)")
+    ENABLED = True
+
+
+def is_enabled() -> bool:
+    """返回是否已开启跨进程同步。"""
+    return ENABLED and fcntl is not None
+
+
+def lock_path_for(path: str) -> str:
+    """数据文件（或分片目录）对应的锁文件路径。"""
+    return path + ".lock"
+
+
+class ProcessSync:
+    """
+    同一份数据在多个进程之间的同步。
+
+    锁文件上的 ``fcntl.flock`` 咨询锁用于串行化写入：写入者持有排他锁完成“重新加载-修改-写盘”，
+    读取者在重新解析数据文件时持有共享锁（追加日志模式下快照与日志需要一起读取）。
+    锁文件的前 8 个字节是数据版本计数器，以 mmap 映射到内存：写入者在排他锁内递增，
+    其他进程读取计数器只是一次内存访问（不需要 stat 等系统调用），计数器不变即可直接使用内存中的数据。
+
+    文件描述符与映射按进程打开：fork 出的子进程第一次使用时重新打开
+    （继承自父进程的描述符与父进程共享同一把 flock 锁）。
+
+    参数:
+        path (str): 锁文件路径，见 lock_path_for。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._guard = threading.RLock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+        self._depth = 0
+
+    def _open(self):
+        if self._pid == os.getpid():
+            return
+        if self._fd is not None:
+            # fork 之后：关闭继承的描述符，重新打开属于本进程的
+            self._map.close()
+            os.close(self._fd)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(fd).st_size < _COUNTER.size:
+            os.ftruncate(fd, _COUNTER.size)
+        self._fd = fd
+        self._map = mmap.mmap(fd, _COUNTER.size)
+        self._pid = os.getpid()
+        self._depth = 0
+
+    @contextmanager
+    def lock(self, shared: bool = False):
+        """
+        获取跨进程锁（同时也是线程锁）。
+
+        已经持有锁的线程再次调用时直接复用外层的锁；因此需要排他锁的调用方必须在最外层获取排他锁。
+
+        参数:
+            shared (bool): True 为共享锁（读取），False 为排他锁（写入）。
+        """
+        with self._guard:
+            self._open()
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            fcntl.flock(self._fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            self._depth = 1
+            try:
+                yield
+            finally:
+                self._depth = 0
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def version(self) -> int:
+        """读取共享的数据版本计数器（不加锁，只是一次内存读取）。"""
+        if self._pid != os.getpid():
+            with self._guard:
+                self._open()
+        return _COUNTER.unpack_from(self._map, 0)[0]
+
+    def bump(self) -> int:
+        """递增数据版本计数器并返回新值，调用方需持有排他锁。"""
+        with self._guard:
+            self._open()
+            value = _COUNTER.unpack_from(self._map, 0)[0] + 1
+            _COUNTER.pack_into(self._map, 0, value)
+            return value
+
+    def close(self):
+        """关闭本进程打开的描述符与映射。"""
+        with self._guard:
+            if self._fd is not None and self._pid == os.getpid():
+                self._map.close()
+                os.close(self._fd)
+            self._fd = None
+            self._map = None
+            self._pid = None
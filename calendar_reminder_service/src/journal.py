@@ -0,0 +1,115 @@
+import json
+import os
+from .models import json_default
+from .store import file_signature, read_json_list, write_json_atomic
+
+# 日志记录数达到该值时压缩为快照
+DEFAULT_COMPACT_EVERY = 1000
+
+
+class JournalEngine:
+    """
+    追加日志存储引擎。
+
+    快照文件与 JSON 模式的数据文件格式相同（约会列表），
+    写操作（新增约会、设置提醒等字段更新、删除约会）以 NDJSON 追加到 ``<快照>.journal``，
+    每次写入的开销与单条记录大小相关，而不是与约会总数相关。
+    加载时先读快照再回放日志；日志条数达到 ``compact_every`` 时压缩为新快照。
+    """
+
+    name = "journal"
+
+    def __init__(self, path: str, compact_every: int = DEFAULT_COMPACT_EVERY):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_every = compact_every
+        self._journal_entries = 0
+
+    def signature(self):
+        return (file_signature(self.path), file_signature(self.journal_path))
+
+    def read(self) -> list:
+        records = read_json_list(self.path)
+        by_id = {appt.get("id"): appt for appt in records}
+        # 回放中删除的记录：最后按身份过滤一遍，而不是每条删除都扫描记录列表
+        deleted = []
+        entries = 0
+        try:
+            with open(self.journal_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 进程中途退出时可能留下不完整的最后一行，忽略即可
+                        continue
+                    entries += 1
+                    self._apply(records, by_id, deleted, entry)
+        except FileNotFoundError:
+            pass
+        self._journal_entries = entries
+        if deleted:
+            gone = {id(appt) for appt in deleted}
+            records = [appt for appt in records if id(appt) not in gone]
+        return records
+
+    @staticmethod
+    def _apply(records: list, by_id: dict, deleted: list, entry: dict):
+        op = entry.get("op")
+        if op == "add":
+            record = entry.get("record") or {}
+            if record.get("id") in by_id:
+                # 压缩时先替换快照再删除日志，两步之间退出会留下已并入快照的日志：
+                # 快照中的记录更新，跳过重复的新增，之后的修改、删除照常回放即可收敛到最终状态
+                return
+            records.append(record)
+            by_id[record.get("id")] = record
+        elif op == "update":
+            appt = by_id.get(entry.get("id"))
+            if appt is not None:
+                appt.update(entry.get("changes") or {})
+        elif op == "delete":
+            appt = by_id.pop(entry.get("id"), None)
+            if appt is not None:
+                deleted.append(appt)
+
+    def write_all(self, records: list):
+        """写入完整快照（原子替换）并清空日志（即一次压缩）。"""
+        write_json_atomic(self.path, records)
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+        self._journal_entries = 0
+
+    def _append(self, records: list, entries: list):
+        if self._journal_entries + len(entries) >= self.compact_every:
+            self.write_all(records)
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = "".join(json.dumps(entry, default=json_default) + "\n" for entry in entries).encode()
+        with open(self.journal_path, 'ab+') as f:
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # 之前的进程中途退出留下了不完整的最后一行：另起一行，新记录不会与它拼成无法解析的一行
+                    data = b"\n" + data
+            f.write(data)
+        self._journal_entries += len(entries)
+
+    def record_add(self, records: list, record: dict):
+        self._append(records, [{"op": "add", "record": record}])
+
+    def record_update(self, records: list, appointment_id: str, changes: dict):
+        self._append(records, [{"op": "update", "id": appointment_id, "changes": changes}])
+
+    def record_delete(self, records: list, appointment_id: str):
+        self._append(records, [{"op": "delete", "id": appointment_id}])
+
+    def record_add_many(self, records: list, new_records: list):
+        self._append(records, [{"op": "add", "record": record} for record in new_records])
+
+    def record_update_many(self, records: list, updates: list):
+        self._append(records, [{"op": "update", "id": appt_id, "changes": changes} for appt_id, changes in updates])
+
+    def record_delete_many(self, records: list, appointment_ids: list):
+        self._append(records, [{"op": "delete", "id": appt_id} for appt_id in appointment_ids])
@@ -0,0 +1,143 @@
+# 提醒标记：已确认、已推送的提醒保存在数据文件旁的 .reminders 文件中，不写入约会记录
+import json
+import os
+import threading
+from contextlib import contextmanager
+from .calendar_utils import parse_datetime_seconds
+from .interprocess import fcntl, lock_path_for
+from .recurrence import is_recurring
+from .store import file_signature, write_json_atomic
+
+# 标记类型
+ACKED = "acked"
+DELIVERED = "delivered"
+
+
+def marks_path_for(path: str) -> str:
+    """数据文件对应的提醒标记文件路径。"""
+    return path + ".reminders"
+
+
+def is_marked(appt: dict, marker) -> bool:
+    """
+    判断约会当前的提醒是否被标记覆盖。
+
+    标记保存的是当时的提醒时间，重新设置为其他提醒时间后自动视为未标记。
+    重复约会的各次发生共用系列的标记，标记作为水位线：提醒时间不晚于它的发生都已标记。
+
+    参数:
+        appt (dict): 约会（重复约会为某次发生）。
+        marker (str): 该约会的标记，没有时为 None 或空串。
+    """
+    if not marker:
+        return False
+    if is_recurring(appt):
+        return appt.get("reminder_time", "") <= marker
+    return marker == appt.get("reminder_time")
+
+
+def _start_seconds(appt: dict):
+    try:
+        return parse_datetime_seconds(f"{appt.get('date')} {appt.get('time')}")
+    except (TypeError, ValueError):
+        return None
+
+
+class ReminderMarks:
+    """
+    提醒标记文件：{类型: {约会 ID: [标记, 失效时间]}}，类型为 ACKED 或 DELIVERED。
+
+    标记不写入约会记录：约会的 JSON、API 与变更日志格式不变，确认或推送提醒也不会重写数据文件、
+    推进数据版本（不会使响应缓存失效）。普通约会的标记在约会开始后失效（此后提醒不会再到期），
+    每次写入时清理；重复约会的标记没有失效时间。
+
+    文件以原子替换写入，读取按文件签名缓存；写入时持有 .lock 文件上的 flock，多个进程的写入不会互相覆盖。
+
+    参数:
+        path (str): 标记文件路径，见 marks_path_for。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._data = {}
+
+    def _load_locked(self) -> dict:
+        signature = file_signature(self.path)
+        if signature is None or signature != self._signature:
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            except (FileNotFoundError, ValueError):
+                # 文件不存在（从未标记过）或内容损坏：视为没有标记
+                data = {}
+            self._data = data if isinstance(data, dict) else {}
+            self._signature = signature
+        return self._data
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(lock_path_for(self.path), "a") as handle:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def markers(self, kind: str) -> dict:
+        """返回某类标记：约会 ID -> 标记（不要修改返回的字典）。"""
+        with self._lock:
+            return {appointment_id: entry[0] for appointment_id, entry in self._load_locked().get(kind, {}).items()}
+
+    def is_marked(self, kind: str, appt: dict) -> bool:
+        """判断约会当前的提醒是否带有 kind 类标记，见 is_marked。"""
+        with self._lock:
+            entry = self._load_locked().get(kind, {}).get(appt.get("id"))
+        return entry is not None and is_marked(appt, entry[0])
+
+    def mark(self, kind: str, items: list, now_seconds: float):
+        """
+        记录一批标记，并清理已失效的标记。
+
+        参数:
+            kind (str): ACKED 或 DELIVERED。
+            items (list): (约会, 标记) 列表，标记为提醒时间（重复约会为水位线）。
+            now_seconds (float): 当前时间的纪元秒数。
+        """
+        with self._lock, self._file_lock():
+            # 其他进程可能刚刚写入：持有文件锁后重新读取
+            self._signature = None
+            data = {
+                name: {appointment_id: entry for appointment_id, entry in entries.items()
+                       if entry[1] is None or entry[1] >= now_seconds}
+                for name, entries in self._load_locked().items()
+            }
+            entries = data.setdefault(kind, {})
+            for appt, marker in items:
+                entries[appt["id"]] = [marker, None if is_recurring(appt) else _start_seconds(appt)]
+            write_json_atomic(self.path, data)
+            self._data = data
+            self._signature = file_signature(self.path)
+
+    def version(self):
+        """返回标记文件的签名，标记变化后随之改变（用于响应缓存的键）。"""
+        return file_signature(self.path)
+
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_marks(path: str) -> ReminderMarks:
+    """返回数据文件对应的（进程内共享的）提醒标记。"""
+    marks_path = marks_path_for(path)
+    with _instances_lock:
+        marks = _instances.get(marks_path)
+        if marks is None:
+            marks = _instances[marks_path] = ReminderMarks(marks_path)
+        return marks
@@ -0,0 +1,146 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# 延迟直方图的桶上界（秒），与 Prometheus 客户端库的默认桶相近并补充了亚毫秒级的桶
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """固定桶的累积直方图（Prometheus histogram 语义）。"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """逐个产出 (桶上界字符串, 累积计数)，最后一个桶为 "+Inf"。"""
+        total = 0
+        for bound, count in zip(self.buckets + (None,), self.counts):
+            total += count
+            yield ("+Inf" if bound is None else repr(bound)), total
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class MetricsRegistry:
+    """
+    进程内的指标注册表：计数器与直方图按 (指标名, 标签) 存放，render 输出 Prometheus 文本格式。
+
+    计数器与直方图在使用时自动创建；其他模块的统计（缓存命中、存储重新加载等）
+    通过 register_collector 注册的回调在 render 时读取。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def describe(self, name: str, help_text: str):
+        """设置指标的 HELP 说明。"""
+        self._help[name] = help_text
+
+    def inc(self, name: str, labels: dict = None, amount: float = 1):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, labels: dict = None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timed(self, name: str, labels: dict = None):
+        """把 with 块的耗时（秒）记录到直方图 name。"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, labels)
+
+    def register_collector(self, collector):
+        """
+        注册在 render 时调用的回调。
+
+        回调返回 (指标名, 类型, 说明, [(标签字典, 数值), ...]) 的列表，类型为 "gauge" 或 "counter"。
+        """
+        self._collectors.append(collector)
+
+    def reset(self):
+        """清空计数器与直方图（用于测试）。"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def counter_value(self, name: str, labels: dict = None) -> float:
+        return self._counters.get((name, tuple(sorted((labels or {}).items()))), 0)
+
+    def histogram(self, name: str, labels: dict = None):
+        return self._histograms.get((name, tuple(sorted((labels or {}).items()))))
+
+    def render(self) -> str:
+        """按 Prometheus 文本格式（0.0.4）输出全部指标。"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                ((key, (h.buckets, list(h.counts), h.sum, h.count)) for key, h in self._histograms.items()),
+                key=lambda item: item[0])
+        lines = []
+        described = set()
+
+        def header(name, kind, help_text=None):
+            if name in described:
+                return
+            described.add(name)
+            help_text = help_text or self._help.get(name)
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), (buckets, counts, total_sum, count) in histograms:
+            header(name, "histogram")
+            snapshot = Histogram(buckets)
+            snapshot.counts = counts
+            for bound, cumulative in snapshot.cumulative():
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total_sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        for collector in list(self._collectors):
+            for name, kind, help_text, samples in collector():
+                header(name, kind, help_text)
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(sorted(labels.items()))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# 进程内共享的注册表
+METRICS = MetricsRegistry()
+METRICS.describe("calendar_http_requests_total", "HTTP requests by route, method and status code.")
+METRICS.describe("calendar_http_request_duration_seconds", "HTTP request handling time by route and method.")
+METRICS.describe("calendar_json_encode_duration_seconds", "Time spent encoding JSON response bodies.")
+METRICS.describe("calendar_storage_duration_seconds", "Time spent loading from and saving to storage.")
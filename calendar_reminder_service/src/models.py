@@ -0,0 +1,155 @@
+import copy
+import sys
+from .calendar_utils import parse_date_time_minutes, parse_datetime_minutes
+
+# 约会的标准字段，to_dict 按此顺序输出（与 appointments._new_appointment 一致）
+FIELDS = ("id", "title", "date", "time", "description", "reminder_set", "reminder_time", "location")
+_FIELD_SET = frozenset(FIELDS)
+# 影响预解析时间戳的字段
+_TIME_FIELDS = frozenset(("date", "time", "reminder_set", "reminder_time"))
+# 高度重复的短字符串，驻留后所有约会共享同一个对象
+_INTERNED = ("date", "time", "reminder_time")
+
+# 标记字典中不存在的字段，保证 from_dict / to_dict 往返后字段集合不变
+_MISSING = object()
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _copy(value):
+    """复制嵌套的字典、列表（如重复规则），使记录与调用方的字典互不共享可变对象。"""
+    return copy.deepcopy(value) if type(value) in (dict, list) else value
+
+
+def _minutes(value):
+    """解析 "YYYY-MM-DD HH:MM" 为纪元分钟数，无法解析时返回 None。"""
+    try:
+        return parse_datetime_minutes(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Appointment:
+    """
+    常驻内存的约会记录。
+
+    使用 ``__slots__`` 代替字典以降低每条约会的内存占用；日期、时间字符串会被驻留共享。
+    约会开始时间与（已启用的）提醒时间在创建或更新时解析一次，保存为整数纪元分钟
+    （``start_minute`` / ``remind_minute``，无法解析时为 None），
+    调度器与查询无需再反复调用 strptime。
+
+    对外（JSON 文件、API、appointments 模块的返回值）仍然是普通字典：
+    ``to_dict`` 与 ``from_dict`` 往返后内容不变，标准字段之外的键保存在 ``extra`` 中；
+    嵌套的字典、列表（如 ``recurrence``）进出记录时都会复制，调用方修改返回值不会改动存储中的记录。
+    同时提供只读的 ``get`` 与 ``[]`` 访问，便于按字典方式读取字段。
+    """
+
+    __slots__ = FIELDS + ("extra", "start_minute", "remind_minute")
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Appointment":
+        """
+        从约会字典创建记录（复制字段，之后修改原字典不影响记录）。
+
+        参数:
+            data (dict): 约会字典。
+
+        返回值:
+            Appointment: 新的约会记录。
+        """
+        self = cls.__new__(cls)
+        get = data.get
+        intern = sys.intern
+        self.id = get("id", _MISSING)
+        self.title = get("title", _MISSING)
+        date = get("date", _MISSING)
+        self.date = intern(date) if type(date) is str else date
+        time = get("time", _MISSING)
+        self.time = intern(time) if type(time) is str else time
+        self.description = get("description", _MISSING)
+        self.reminder_set = get("reminder_set", _MISSING)
+        reminder_time = get("reminder_time", _MISSING)
+        self.reminder_time = intern(reminder_time) if type(reminder_time) is str else reminder_time
+        self.location = get("location", _MISSING)
+        self.extra = (None if _FIELD_SET.issuperset(data)
+                      else {k: _copy(v) for k, v in data.items() if k not in _FIELD_SET})
+        self._parse_times()
+        return self
+
+    def _parse_times(self):
+        date, time = self.date, self.time
+        start = None
+        if type(date) is str and type(time) is str:
+            try:
+                start = parse_date_time_minutes(date, time)
+            except ValueError:
+                pass
+        self.start_minute = start
+        reminder_set, reminder_time = self.reminder_set, self.reminder_time
+        if reminder_set is not _MISSING and reminder_set and type(reminder_time) is str and reminder_time:
+            self.remind_minute = _minutes(reminder_time)
+        else:
+            self.remind_minute = None
+
+    def to_dict(self) -> dict:
+        """返回约会字典：标准字段按固定顺序在前，其余字段在后（嵌套的字典、列表为副本）。"""
+        result = {}
+        for name in FIELDS:
+            value = getattr(self, name)
+            if value is not _MISSING:
+                result[name] = value
+        if self.extra:
+            for key, value in self.extra.items():
+                result[key] = _copy(value)
+        return result
+
+    def update(self, changes: dict):
+        """更新字段；涉及日期、时间或提醒的修改会重新解析时间戳。"""
+        for key, value in changes.items():
+            if key in _FIELD_SET:
+                setattr(self, key, _intern(value) if key in _INTERNED else value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[key] = _copy(value)
+        if not _TIME_FIELDS.isdisjoint(changes):
+            self._parse_times()
+
+    def get(self, key, default=None):
+        """按字典方式读取字段，不存在时返回 default。"""
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __eq__(self, other):
+        if isinstance(other, Appointment):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Appointment({self.to_dict()!r})"
+
+
+def json_default(obj):
+    """json.dump 的 default 钩子：把 Appointment 编码为约会字典。"""
+    if isinstance(obj, Appointment):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
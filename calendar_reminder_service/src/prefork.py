@@ -0,0 +1,138 @@
+# pre-fork 多进程模式：主进程创建监听套接字后 fork 出多个工作进程，各工作进程在同一套接字上接受连接
+import logging
+import os
+import signal
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# 主进程负责转发给工作进程的信号
+_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+# 工作进程启动后这么多秒内就退出时，推迟重启，避免启动即崩溃时反复 fork
+RESPAWN_BACKOFF = 1.0
+
+
+class _Shutdown(Exception):
+    """主进程收到 SIGINT / SIGTERM。"""
+
+
+def _raise_shutdown(signum, frame):
+    raise _Shutdown()
+
+
+@contextmanager
+def _signals_blocked():
+    """暂时屏蔽 SIGINT / SIGTERM，保证 fork 与登记子进程之间不会被打断（否则子进程会成为孤儿）。"""
+    previous = signal.pthread_sigmask(signal.SIG_BLOCK, _SIGNALS)
+    try:
+        yield
+    finally:
+        signal.pthread_sigmask(signal.SIG_SETMASK, previous)
+
+
+def fork_worker(target, index: int) -> int:
+    """
+    fork 出一个工作进程执行 target(index)；target 返回（或抛出异常）后子进程即退出，不会回到调用方。
+
+    子进程恢复默认的 SIGTERM 处理并忽略 SIGINT（终端的 Ctrl-C 由主进程统一处理），
+    target 可以自行安装优雅退出的信号处理。
+
+    参数:
+        target (callable): 工作进程的主函数，参数为工作进程序号。
+        index (int): 工作进程序号。
+
+    返回值:
+        int: 子进程 pid。
+    """
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, _SIGNALS)
+            target(index)
+        except BaseException:
+            logger.exception("Worker %d failed", index)
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def stop_workers(pids, timeout: float = 5.0):
+    """
+    向工作进程发送 SIGTERM 并等待退出，超时仍未退出的发送 SIGKILL。
+
+    参数:
+        pids: 工作进程 pid 的可迭代对象。
+        timeout (float): 等待优雅退出的秒数。
+    """
+    remaining = set(pids)
+    for pid in remaining:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.monotonic() + timeout
+    while remaining:
+        for pid in list(remaining):
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done = pid
+            if done:
+                remaining.discard(pid)
+        if not remaining:
+            return
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(0.05)
+    for pid in remaining:
+        try:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+
+
+def supervise(target, processes: int, respawn: bool = True):
+    """
+    主进程循环：启动 processes 个工作进程，意外退出的工作进程按原序号重新启动；
+    收到 SIGINT / SIGTERM 后结束全部工作进程并返回。
+
+    监听套接字需要在调用前创建好（例如已绑定端口的 HTTPServer），子进程通过 fork 继承。
+    主进程本身不处理请求，也不应在调用前启动线程。
+
+    参数:
+        target (callable): 工作进程的主函数，见 fork_worker。
+        processes (int): 工作进程数。
+        respawn (bool): 是否重启意外退出的工作进程。
+    """
+    workers = {}
+    started = {}
+    previous = {sig: signal.signal(sig, _raise_shutdown) for sig in _SIGNALS}
+    try:
+        for index in range(processes):
+            with _signals_blocked():
+                workers[fork_worker(target, index)] = index
+            started[index] = time.monotonic()
+        while workers:
+            pid, status = os.wait()
+            index = workers.pop(pid, None)
+            if index is None:
+                continue
+            logger.warning("Worker %d (pid %d) exited with status %d", index, pid, os.waitstatus_to_exitcode(status))
+            if respawn:
+                if time.monotonic() - started[index] < RESPAWN_BACKOFF:
+                    time.sleep(RESPAWN_BACKOFF)
+                with _signals_blocked():
+                    workers[fork_worker(target, index)] = index
+                started[index] = time.monotonic()
+    except _Shutdown:
+        pass
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        stop_workers(list(workers))
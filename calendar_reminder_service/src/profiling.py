@@ -0,0 +1,94 @@
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+
+# 采样率（0–1），为 0 时不做任何剖析
+DEFAULT_SAMPLE_RATE = float(os.environ.get("CALENDAR_PROFILE_SAMPLE_RATE", "0") or 0)
+# 只保存耗时不少于该值（毫秒）的请求的剖析结果
+DEFAULT_SLOW_MS = float(os.environ.get("CALENDAR_PROFILE_SLOW_MS", "200") or 200)
+# 剖析结果（.prof，可用 pstats / snakeviz 查看）的保存目录
+DEFAULT_PROFILE_DIR = os.environ.get("CALENDAR_PROFILE_DIR", "")
+
+
+class SlowRequestProfiler:
+    """
+    按采样率对请求做 cProfile 剖析，只保存慢请求的结果。
+
+    默认关闭（采样率为 0 或未指定目录）。cProfile 只剖析调用 start 的线程，
+    同一时刻最多剖析一个请求（其余请求直接跳过），避免多个剖析器相互干扰、放大开销。
+
+    参数:
+        directory (str): 保存 .prof 文件的目录。
+        sample_rate (float): 被剖析请求的比例（0–1）。
+        slow_ms (float): 保存结果的耗时阈值（毫秒）。
+    """
+
+    def __init__(self, directory=DEFAULT_PROFILE_DIR, sample_rate=DEFAULT_SAMPLE_RATE, slow_ms=DEFAULT_SLOW_MS):
+        self.configure(directory, sample_rate, slow_ms)
+        self._busy = threading.Lock()
+        self.sampled = 0
+        self.saved = 0
+
+    def configure(self, directory=None, sample_rate=None, slow_ms=None):
+        """修改剖析参数（为 None 的参数保持不变）。"""
+        if directory is not None:
+            self.directory = directory
+        if sample_rate is not None:
+            self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        if slow_ms is not None:
+            self.slow_seconds = float(slow_ms) / 1000
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and self.sample_rate > 0
+
+    def start(self):
+        """
+        按采样率决定是否剖析当前请求。
+
+        返回值:
+            cProfile.Profile | None: 已开始的剖析器；未被采样时为 None。
+        """
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 已有其他剖析器在运行（如外部的 python -m cProfile）
+            self._busy.release()
+            return None
+        self.sampled += 1
+        return profile
+
+    def finish(self, profile, elapsed: float, label: str):
+        """
+        结束剖析；请求耗时达到阈值时把结果写入目录。
+
+        返回值:
+            str | None: 保存的文件路径；未保存时为 None。
+        """
+        if profile is None:
+            return None
+        try:
+            profile.disable()
+            if elapsed < self.slow_seconds:
+                return None
+            os.makedirs(self.directory, exist_ok=True)
+            safe_label = re.sub(r"[^A-Za-z0-9_.-]+", "_", label).strip("_") or "request"
+            filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_label}-{int(elapsed * 1000)}ms-{self.saved}.prof"
+            path = os.path.join(self.directory, filename)
+            profile.dump_stats(path)
+            self.saved += 1
+            return path
+        finally:
+            self._busy.release()
+
+
+# 进程内共享的剖析器
+PROFILER = SlowRequestProfiler()
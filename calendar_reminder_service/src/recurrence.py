@@ -0,0 +1,278 @@
+import calendar
+from datetime import datetime
+from .calendar_utils import (
+    DATE_FORMAT, date_to_epoch_day, epoch_day_to_date, format_minutes, parse_date_time_minutes,
+    parse_datetime_minutes,
+)
+
+# 约会中保存重复规则的字段，例如 {"freq": "weekly", "interval": 1, "count": 10, "until": "2025-12-31"}
+RECURRENCE_FIELD = "recurrence"
+FREQUENCIES = ("daily", "weekly", "monthly")
+# 日期范围查询不限上界时，重复约会最多展开到范围起点（或系列第一次发生）之后的天数
+EXPANSION_HORIZON_DAYS = 366
+
+_STEP_DAYS = {"daily": 1, "weekly": 7}
+
+
+def is_recurring(appt) -> bool:
+    """判断约会是否为重复约会（带有重复规则）。"""
+    return bool(appt.get(RECURRENCE_FIELD))
+
+
+def validate_recurrence(rule) -> str:
+    """
+    校验重复规则。
+
+    参数:
+        rule: 请求中的重复规则，应为包含 freq，可选 interval、count、until 的字典。
+
+    返回值:
+        str: 错误描述；校验通过时返回空字符串。
+    """
+    if not isinstance(rule, dict):
+        return "Recurrence must be an object"
+    if rule.get("freq") not in FREQUENCIES:
+        return f"Recurrence freq must be one of: {', '.join(FREQUENCIES)}"
+    for key in ("interval", "count"):
+        value = rule.get(key)
+        if value is not None and (type(value) is not int or value < 1):
+            return f"Recurrence {key} must be a positive integer"
+    until = rule.get("until")
+    if until is not None:
+        try:
+            datetime.strptime(until, DATE_FORMAT)
+        except (TypeError, ValueError):
+            return "Invalid recurrence until, expected YYYY-MM-DD"
+    unknown = set(rule) - {"freq", "interval", "count", "until"}
+    if unknown:
+        return f"Unknown recurrence fields: {', '.join(sorted(unknown))}"
+    return ""
+
+
+def normalize_recurrence(rule: dict) -> dict:
+    """返回补全默认值（interval 为 1）并去掉空字段后的重复规则，rule 需已通过 validate_recurrence。"""
+    normalized = {"freq": rule["freq"], "interval": rule.get("interval") or 1}
+    if rule.get("count") is not None:
+        normalized["count"] = rule["count"]
+    if rule.get("until") is not None:
+        normalized["until"] = rule["until"]
+    return normalized
+
+
+def _start_minute(appt):
+    """系列第一次发生的纪元分钟数（models.Appointment 已预解析），无法解析时返回 None。"""
+    start = getattr(appt, "start_minute", None)
+    if start is not None:
+        return start
+    try:
+        return parse_date_time_minutes(appt.get("date"), appt.get("time"))
+    except (TypeError, ValueError):
+        return None
+
+
+def reminder_lead(appt):
+    """
+    返回重复约会的提醒提前量（分钟）：系列第一次发生的开始时间减去所设置的提醒时间。
+
+    每次发生的提醒时间都按同一提前量从该次的开始时间推算，不逐次保存。
+
+    返回值:
+        int | None: 提前量；未设置提醒或时间无法解析时为 None。
+    """
+    if not appt.get("reminder_set") or not appt.get("reminder_time"):
+        return None
+    start = _start_minute(appt)
+    remind = getattr(appt, "remind_minute", None)
+    if remind is None:
+        try:
+            remind = parse_datetime_minutes(appt.get("reminder_time"))
+        except (TypeError, ValueError):
+            return None
+    if start is None:
+        return None
+    return start - remind
+
+
+def _day_of(date_str):
+    return parse_date_time_minutes(date_str, "00:00") // 1440
+
+
+def occurrence_days(appt, first_day=None, last_day=None):
+    """
+    按时间顺序逐个产出重复约会落在 [first_day, last_day] 内的发生日期（纪元日序号）。
+
+    只计算查询窗口内的日期：按天、按周的规则直接跳到窗口内的第一次发生；
+    count 从系列第一次发生开始计数，按月的规则跳过没有该日期的月份（如 31 日），且不计入 count。
+
+    参数:
+        appt: 重复约会（字典或 models.Appointment）。
+        first_day (int, optional): 窗口起点，None 表示从系列第一次发生开始。
+        last_day (int, optional): 窗口终点，None 表示不限（调用方需自行停止迭代）。
+    """
+    rule = appt.get(RECURRENCE_FIELD)
+    start = _start_minute(appt)
+    if not rule or start is None:
+        return
+    start_day = start // 1440
+    interval = rule.get("interval") or 1
+    count = rule.get("count")
+    until = rule.get("until")
+    if until is not None:
+        try:
+            until_day = _day_of(until)
+        except (TypeError, ValueError):
+            return
+        last_day = until_day if last_day is None else min(last_day, until_day)
+    if first_day is None or first_day < start_day:
+        first_day = start_day
+
+    freq = rule.get("freq")
+    if freq in _STEP_DAYS:
+        step = _STEP_DAYS[freq] * interval
+        index = -(-(first_day - start_day) // step)
+        while count is None or index < count:
+            day = start_day + index * step
+            if last_day is not None and day > last_day:
+                return
+            yield day
+            index += 1
+    elif freq == "monthly":
+        first = epoch_day_to_date(start_day)
+        month0 = first.year * 12 + first.month - 1
+        index = 0
+        if count is None:
+            # 没有 count 时无需逐月计数，直接跳到窗口起点所在的月份附近
+            window = epoch_day_to_date(first_day)
+            index = max(0, (window.year * 12 + window.month - 1 - month0) // interval)
+        seen = 0
+        while count is None or seen < count:
+            year, month = divmod(month0 + index * interval, 12)
+            month += 1
+            index += 1
+            if last_day is not None and date_to_epoch_day(first.replace(year=year, month=month, day=1)) > last_day:
+                return
+            if first.day > calendar.monthrange(year, month)[1]:
+                continue
+            seen += 1
+            day = date_to_epoch_day(first.replace(year=year, month=month))
+            if last_day is not None and day > last_day:
+                return
+            if day >= first_day:
+                yield day
+
+
+def _occurrence(base: dict, day: int, clock: int, lead):
+    occurrence = dict(base)
+    occurrence["date"] = epoch_day_to_date(day).isoformat()
+    if lead is not None:
+        occurrence["reminder_time"] = format_minutes(day * 1440 + clock - lead)
+    return occurrence
+
+
+def _as_dict(appt) -> dict:
+    return appt.to_dict() if hasattr(appt, "to_dict") else dict(appt)
+
+
+def occurrences(appt, start=None, end=None):
+    """
+    惰性展开重复约会在日期区间 [start, end] 内的各次发生。
+
+    每次发生是系列字典的副本：id 与重复规则不变，date 为该次的日期，
+    已设置提醒时 reminder_time 为该次开始时间减去提醒提前量（见 reminder_lead）。
+
+    参数:
+        appt: 重复约会。
+        start (str, optional): 起始日期（YYYY-MM-DD），None 表示从系列第一次发生开始。
+        end (str, optional): 结束日期（YYYY-MM-DD），None 表示展开到起点之后 EXPANSION_HORIZON_DAYS 天。
+
+    返回值:
+        generator: 逐个产出约会字典。
+    """
+    begin = _start_minute(appt)
+    if begin is None:
+        return
+    first_day = _day_of(start) if start is not None else None
+    if end is not None:
+        last_day = _day_of(end)
+    else:
+        last_day = max(first_day if first_day is not None else begin // 1440, begin // 1440) + EXPANSION_HORIZON_DAYS
+    base = _as_dict(appt)
+    lead = reminder_lead(appt)
+    clock = begin % 1440
+    for day in occurrence_days(appt, first_day, last_day):
+        yield _occurrence(base, day, clock, lead)
+
+
+def expand_between(series, start=None, end=None) -> list:
+    """
+    展开多个重复约会在 [start, end] 内的发生，按日期排序（同一日期内保持系列的顺序）。
+
+    参数:
+        series: 重复约会的可迭代对象。
+        start (str, optional): 起始日期，None 表示不限。
+        end (str, optional): 结束日期，None 表示不限（见 occurrences 的展开上限）。
+
+    返回值:
+        list: 约会字典列表。
+    """
+    expanded = []
+    for appt in series:
+        expanded.extend(occurrences(appt, start, end))
+    expanded.sort(key=lambda occurrence: occurrence["date"])
+    return expanded
+
+
+def due_occurrences(series, now_seconds: float, since=None) -> list:
+    """
+    返回提醒时间已到、且尚未开始的各次发生（即开始时间落在 [now, now + 提前量] 内的发生）。
+
+    参数:
+        series: 重复约会的可迭代对象。
+        now_seconds (float): 当前时间的纪元秒数。
+        since (float, optional): 只返回提醒时间晚于它的发生，None 表示不限。
+
+    返回值:
+        list: (提醒秒数, 约会字典) 的列表，未排序。
+    """
+    now_minutes = now_seconds / 60
+    due = []
+    for appt in series:
+        lead = reminder_lead(appt)
+        begin = _start_minute(appt)
+        if lead is None or lead < 0 or begin is None:
+            continue
+        clock = begin % 1440
+        first_day = int((now_minutes - clock) // 1440)
+        last_day = int((now_minutes + lead - clock) // 1440)
+        base = None
+        for day in occurrence_days(appt, first_day, last_day):
+            start_seconds = (day * 1440 + clock) * 60
+            reminder_seconds = start_seconds - lead * 60
+            if reminder_seconds <= now_seconds <= start_seconds and (since is None or reminder_seconds > since):
+                if base is None:
+                    base = _as_dict(appt)
+                due.append((reminder_seconds, _occurrence(base, day, clock, lead)))
+    return due
+
+
+def next_reminder_time(series, now_seconds: float):
+    """
+    返回各重复约会中晚于 now_seconds 的最早一次提醒时间（纪元秒），没有时返回 None。
+
+    每个系列只需展开到第一个提醒时间晚于 now_seconds 的发生。
+    """
+    now_minutes = now_seconds / 60
+    upcoming = None
+    for appt in series:
+        lead = reminder_lead(appt)
+        begin = _start_minute(appt)
+        if lead is None or lead < 0 or begin is None:
+            continue
+        clock = begin % 1440
+        for day in occurrence_days(appt, int((now_minutes + lead - clock) // 1440)):
+            reminder_seconds = (day * 1440 + clock - lead) * 60
+            if reminder_seconds > now_seconds:
+                if upcoming is None or reminder_seconds < upcoming:
+                    upcoming = reminder_seconds
+                break
+    return upcoming
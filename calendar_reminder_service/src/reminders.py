@@ -1,7 +1,135 @@
 from datetime import datetime
-from .appointments import load_appointments, save_appointments, DATA_FILE # 测试时需要 DATA_FILE
+from contextlib import contextmanager
+import json
+import sys
+import threading
+from . import appointments
+from .appointments import load_appointments, save_appointments, current_store, DATA_FILE # 测试时需要 DATA_FILE
+from .calendar_utils import DATETIME_FORMAT, datetime_to_seconds, parse_datetime_minutes, parse_datetime_seconds
+from .changes import ResyncRequired
+from .interprocess import fcntl
+from .marks import ACKED, get_marks, is_marked
+from .recurrence import is_recurring
+from .repository import due_among
 import os # 用于测试
 
+# 同一进程内的线程通过该锁串行推进水位线；跨进程由水位线文件上的 flock 保证
+_watermark_lock = threading.Lock()
+
+
+def watermark_path_for(path: str) -> str:
+    """数据文件对应的提醒水位线文件路径：记录 check_reminders 已处理到的时间。"""
+    return path + ".watermark"
+
+
+def current_marks():
+    """返回当前数据文件旁的提醒标记（已确认 / 已推送），见 marks.ReminderMarks。"""
+    return get_marks(appointments.DATA_FILE)
+
+
+def is_acknowledged(appt: dict) -> bool:
+    """判断约会当前的提醒是否已经确认（见 acknowledge_reminders）。"""
+    return current_marks().is_marked(ACKED, appt)
+
+
+def _unacknowledged(due: list) -> list:
+    acked = current_marks().markers(ACKED)
+    return [appt for appt in due if not is_marked(appt, acked.get(appt.get("id")))]
+
+
+@contextmanager
+def _watermark_file(path: str):
+    """以排他方式打开水位线文件，产出文件对象；其他进程的检查在此等待。"""
+    with _watermark_lock:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a+", encoding="utf-8") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield handle
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def _read_watermark(handle) -> dict:
+    """
+    读取水位线状态 {"time", "seq", "returned"}：
+    time 为已处理到的时间，seq 为当时变更日志的最新序号，
+    returned 为已经返回、约会尚未开始的提醒（_reminder_key -> 约会开始的纪元秒）。
+    """
+    handle.seek(0)
+    content = handle.read().strip()
+    state = {"time": None, "seq": None, "returned": {}}
+    try:
+        value = json.loads(content)
+    except ValueError:
+        # 文件为空（从未检查过）或内容损坏：视为没有水位线
+        return state
+    if isinstance(value, (int, float)):
+        # 旧格式：只有时间
+        state["time"] = float(value)
+    elif isinstance(value, dict):
+        state.update(value)
+    return state
+
+
+def _write_watermark(handle, state: dict):
+    handle.seek(0)
+    handle.truncate()
+    handle.write(json.dumps(state) + "\n")
+    handle.flush()
+    os.fsync(handle.fileno())
+
+
+def reminder_watermark():
+    """
+    返回 check_reminders 已处理到的时间（纪元秒），从未检查过时返回 None。
+    """
+    with _watermark_file(watermark_path_for(appointments.DATA_FILE)) as handle:
+        return _read_watermark(handle)["time"]
+
+
+def _reminder_key(appt: dict) -> str:
+    # 同一约会重新设置提醒时间（或重复约会的另一次发生）视为新的提醒
+    return f"{appt.get('id')}|{appt.get('reminder_time')}"
+
+
+def _start_seconds(appt: dict):
+    try:
+        return parse_datetime_seconds(f"{appt.get('date')} {appt.get('time')}")
+    except (TypeError, ValueError):
+        return None
+
+
+def _changed_since(store, seq):
+    """
+    读取变更日志中序号 seq 之后新增或修改过的约会（每个 ID 取最后的状态）。
+
+    返回值:
+        tuple: (约会列表, 最新序号)；日志不覆盖 seq（或存储不记录变更）时约会列表为 None，
+               最新序号未知时为 None。
+    """
+    if seq is None:
+        # 大于任何序号的请求总是要求全量同步，借此取得最新序号
+        seq = sys.maxsize
+    changed = {}
+    try:
+        while True:
+            batch = store.changes_since(seq)
+            for entry in batch["changes"]:
+                if entry.get("appointment") is None:
+                    changed.pop(entry["id"], None)
+                else:
+                    changed[entry["id"]] = entry["appointment"]
+            seq = batch["seq"]
+            if not batch["more"]:
+                return list(changed.values()), seq
+    except ResyncRequired as exc:
+        return None, exc.seq
+    except NotImplementedError:
+        return None, None
+
 def set_reminder(appointment_id: str, reminder_datetime_str: str) -> bool:
     """
     为指定的约会设置提醒。
@@ -13,57 +141,151 @@ def set_reminder(appointment_id: str, reminder_datetime_str: str) -> bool:
     返回值:
         bool: 设置成功返回 True，否则为 False。
     """
-    appointments = load_appointments()
-    appointment_found = False
-    for appt in appointments:
-        if appt.get("id") == appointment_id:
-            try:
-                # 校验提醒时间格式
-                datetime.strptime(reminder_datetime_str, "%Y-%m-%d %H:%M")
-                appt["reminder_time"] = reminder_datetime_str
-                appt["reminder_set"] = True
-                appointment_found = True
-                break
-            except ValueError:
-                # 时间格式不正确
-                return False
-    
-    if appointment_found:
-        save_appointments(appointments)
-        return True
-    return False
+    try:
+        # 校验提醒时间格式
+        parse_datetime_minutes(reminder_datetime_str)
+    except (TypeError, ValueError):
+        # 时间格式不正确
+        return False
+
+    updated = current_store().update(
+        appointment_id,
+        {"reminder_time": reminder_datetime_str, "reminder_set": True},
+    )
+    return updated is not None
+
+def set_reminders(items: list) -> list:
+    """
+    批量设置提醒：先校验全部条目，再一次性写入存储（只加载、保存一次）。
+
+    参数:
+        items (list): 每项为 {"appointment_id": ..., "reminder_time": "YYYY-MM-DD HH:MM"}。
+
+    返回值:
+        list: 与 items 一一对应的结果，成功为 {"index", "appointment_id", "status": "ok"}，
+              失败为 {"index", "appointment_id", "status": "error", "error"}。
+    """
+    results = []
+    updates = []
+    for index, item in enumerate(items):
+        appointment_id = item.get("appointment_id") if isinstance(item, dict) else None
+        result = {"index": index, "appointment_id": appointment_id, "status": "ok"}
+        results.append(result)
+        if not isinstance(item, dict) or not appointment_id or "reminder_time" not in item:
+            result.update(status="error", error="Missing fields")
+            continue
+        try:
+            parse_datetime_minutes(item["reminder_time"])
+        except (TypeError, ValueError):
+            result.update(status="error", error="Invalid reminder_time format, expected YYYY-MM-DD HH:MM")
+            continue
+        updates.append((result, {"reminder_time": item["reminder_time"], "reminder_set": True}))
+
+    if updates:
+        updated = current_store().update_many([(r["appointment_id"], changes) for r, changes in updates])
+        for (result, _), appt in zip(updates, updated):
+            if appt is None:
+                result.update(status="error", error="Appointment not found")
+    return results
 
 def check_reminders() -> list:
     """
-    检查提醒时间已到的约会。
+    检查上次检查之后新到期的提醒，并把水位线推进到当前时间。
+
+    主要查询提醒时间落在 (水位线, 当前时间] 内的约会：由存储的索引完成
+    （内存模式为最小堆调度器，SQLite 模式为提醒时间索引），开销只与新到期的提醒数量相关。
+    上次检查之后才设置（或改到）水位线之前的提醒不在这个范围内，通过变更日志中上次检查之后
+    新增或修改过的约会找回；变更日志不再覆盖上次检查时的序号时退回到查询全部到期的提醒。
+    已返回过的提醒按 (约会 ID, 提醒时间) 记录在水位线文件中直到约会开始，不会再次返回；
+    提醒已到但约会已开始的条目、已确认的提醒会被跳过。从未检查过时返回当前全部到期且未确认的提醒。
+
+    水位线保存在数据文件旁的 .watermark 文件中，多个轮询进程共用：
+    检查期间持有文件锁，同一批提醒只会交给其中一个调用者。
+    调用者处理失败时可以通过 pending_reminders 重新取得尚未确认的提醒。
 
     返回值:
-        list: 需要提醒的约会字典列表。
+        list: 需要提醒的约会字典列表，按提醒时间排序。
     """
-    appointments = load_appointments()
-    due_reminders = []
-    now = datetime.now()
+    now_seconds = datetime_to_seconds(datetime.now())
+    store = current_store()
+    with _watermark_file(watermark_path_for(appointments.DATA_FILE)) as handle:
+        state = _read_watermark(handle)
+        since = state["time"]
+        if since is not None and now_seconds <= since:
+            # 同一时刻重复检查，或系统时间回退：没有新到期的提醒，水位线保持不变
+            return []
+        # 先读变更日志再查询：两者之间设置的提醒留在下次检查的变更范围内
+        changed, seq = _changed_since(store, state["seq"])
+        due = store.due(now_seconds, since)
+        if since is not None:
+            if changed is None:
+                late = store.due(now_seconds)
+            else:
+                late = due_among(changed, now_seconds)
+            late = [appt for appt in late if parse_datetime_seconds(appt["reminder_time"]) <= since]
+            if late:
+                due = sorted(due + late, key=lambda appt: parse_datetime_seconds(appt["reminder_time"]))
 
-    for appt in appointments:
-        if appt.get("reminder_set") and appt.get("reminder_time"):
-            try:
-                reminder_time_obj = datetime.strptime(appt["reminder_time"], "%Y-%m-%d %H:%M")
-                appointment_datetime_str = f"{appt.get('date')} {appt.get('time')}"
-                appointment_time_obj = datetime.strptime(appointment_datetime_str, "%Y-%m-%d %H:%M")
-
-                # 如果提醒时间已过而约会时间未过，则加入待提醒列表
-                if reminder_time_obj <= now and appointment_time_obj >= now:
-                    due_reminders.append(appt)
-                # 如有需要可以增加更老的提醒条件或约会已过期的情况
-                # 目前只检查 reminder_time 是否已过
-                # 简单的检查例如：
-                # if reminder_time_obj <= now:
-                #     due_reminders.append(appt)
-
-            except ValueError:
-                # 存储数据格式不正确，跳过该约会
+        returned = {key: start for key, start in state["returned"].items() if start >= now_seconds}
+        fresh = []
+        for appt in due:
+            key = _reminder_key(appt)
+            if key in returned:
                 continue
-    return due_reminders
+            returned[key] = _start_seconds(appt)
+            fresh.append(appt)
+        _write_watermark(handle, {"time": now_seconds, "seq": seq, "returned": returned})
+    return _unacknowledged(fresh)
+
+def pending_reminders() -> list:
+    """
+    返回当前全部到期（提醒时间已到、约会尚未开始）且尚未确认的提醒，不推进水位线。
+
+    用于轮询者重启后找回已取得但还没来得及处理的提醒。
+
+    返回值:
+        list: 约会字典列表，按提醒时间排序。
+    """
+    now = datetime.now()
+    return _unacknowledged(current_store().due(datetime_to_seconds(now)))
+
+def acknowledge_reminders(ids: list) -> list:
+    """
+    批量确认提醒：为每条约会记录当前提醒的已确认标记，一次写入数据文件旁的提醒标记文件
+    （见 marks.ReminderMarks），约会记录本身不变。
+
+    普通约会记录其 reminder_time，之后重新设置提醒会自动解除确认；
+    重复约会记录当前时间，提醒时间不晚于它的各次发生都视为已确认。
+
+    参数:
+        ids (list): 约会 ID 列表。
+
+    返回值:
+        list: 与 ids 一一对应的结果，成功为 {"index", "appointment_id", "status": "ok"}，
+              失败为 {"index", "appointment_id", "status": "error", "error"}。
+    """
+    store = current_store()
+    now = datetime.now()
+    results = []
+    marked = []
+    for index, appointment_id in enumerate(ids):
+        result = {"index": index, "appointment_id": appointment_id, "status": "ok"}
+        results.append(result)
+        if not isinstance(appointment_id, str) or not appointment_id:
+            result.update(status="error", error="Invalid appointment id")
+            continue
+        appt = store.get(appointment_id)
+        if appt is None:
+            result.update(status="error", error="Appointment not found")
+            continue
+        if not appt.get("reminder_set") or not appt.get("reminder_time"):
+            result.update(status="error", error="No reminder set")
+            continue
+        marked.append((appt, now.strftime(DATETIME_FORMAT) if is_recurring(appt) else appt["reminder_time"]))
+
+    if marked:
+        current_marks().mark(ACKED, marked, datetime_to_seconds(now))
+    return results
 
 if __name__ == '__main__':
     # 初始化：确保测试时数据文件为空
@@ -0,0 +1,297 @@
+import os
+import threading
+from .calendar_utils import parse_datetime_seconds
+from . import interprocess, recurrence
+
+
+def order_key(appt: dict) -> tuple:
+    """
+    分页与流式输出使用的稳定排序键：(date, time, id)。
+
+    各项取字符串形式，缺失或为 null 时记为空串，日期不规范的约会也有确定的位置（ID 唯一即为全序）。
+    """
+    return (str(appt.get("date") or ""), str(appt.get("time") or ""), str(appt.get("id") or ""))
+
+
+def due_among(records: list, now_seconds: float, since=None) -> list:
+    """
+    在给定的约会中找出提醒时间已到、约会尚未开始的约会（重复约会展开为各次发生），按提醒时间排序。
+
+    参数:
+        records (list): 约会字典列表。
+        now_seconds (float): 当前时间的纪元秒数。
+        since (float, optional): 只返回提醒时间晚于它的约会，None 表示不限。
+    """
+    due = recurrence.due_occurrences(filter(recurrence.is_recurring, records), now_seconds, since)
+    for appt in records:
+        if recurrence.is_recurring(appt) or not appt.get("reminder_set") or not appt.get("reminder_time"):
+            continue
+        try:
+            reminder = parse_datetime_seconds(appt["reminder_time"])
+            start = parse_datetime_seconds(f"{appt.get('date')} {appt.get('time')}")
+        except (TypeError, ValueError):
+            continue
+        if reminder <= now_seconds <= start and (since is None or reminder > since):
+            due.append((reminder, appt))
+    due.sort(key=lambda entry: entry[0])
+    return [appt for _, appt in due]
+
+
+class AppointmentRepository:
+    """
+    约会存储接口。
+
+    appointments.py 与 reminders.py 只通过该接口访问数据，具体实现包括
+    ``store.AppointmentStore``（JSON / 追加日志文件 + 内存索引）与
+    ``sqlite_store.SQLiteRepository``。所有返回的约会字典均为副本，调用方可以自由修改。
+
+    查询方法提供基于 ``all()`` 全量扫描的默认实现，子类应使用各自的索引覆盖。
+    重复约会（见 recurrence 模块）只保存一条，按日期查询与到期检查返回其在查询窗口内的各次发生。
+    """
+
+    def all(self) -> list:
+        """返回全部约会。"""
+        raise NotImplementedError
+
+    def replace(self, appointments: list):
+        """用给定列表整体替换存储内容。"""
+        raise NotImplementedError
+
+    def add(self, appointment: dict) -> dict:
+        """新增一条约会，返回新增约会的副本。"""
+        raise NotImplementedError
+
+    def update(self, appointment_id: str, changes: dict):
+        """更新指定约会的字段，返回更新后的副本；未找到时返回 None。"""
+        raise NotImplementedError
+
+    def get(self, appointment_id: str):
+        """返回指定 ID 的约会副本；未找到时返回 None。"""
+        return next((appt for appt in self.all() if appt.get("id") == appointment_id), None)
+
+    def delete(self, appointment_id: str) -> bool:
+        """删除指定约会，返回是否找到并删除。"""
+        raise NotImplementedError
+
+    def add_many(self, appointments: list) -> list:
+        """批量新增约会，返回新增约会的副本列表。"""
+        return [self.add(appt) for appt in appointments]
+
+    def update_many(self, updates: list) -> list:
+        """批量更新 (约会 ID, 字段字典)，返回一一对应的更新后副本，未找到时为 None。"""
+        return [self.update(appt_id, changes) for appt_id, changes in updates]
+
+    def delete_many(self, appointment_ids: list, expected=None) -> list:
+        """
+        批量删除约会，返回与 appointment_ids 一一对应的是否找到并删除。
+
+        expected 为与 appointment_ids 一一对应的约会字典时只删除当前内容与之相同的约会，
+        之后被修改过的约会保留并返回 False（见 archive.archive_appointments）。
+        各存储后端在同一把写锁内比较并删除；这里的默认实现只用于没有写锁的简单后端。
+        """
+        if expected is None:
+            return [self.delete(appt_id) for appt_id in appointment_ids]
+        return [self.get(appt_id) == appt and self.delete(appt_id) for appt_id, appt in zip(appointment_ids, expected)]
+
+    def on_date(self, date: str) -> list:
+        """返回指定日期的约会。"""
+        records = self.all()
+        matched = [appt for appt in records if appt.get("date") == date and not recurrence.is_recurring(appt)]
+        matched.extend(recurrence.expand_between(filter(recurrence.is_recurring, records), date, date))
+        return matched
+
+    def between(self, start=None, end=None) -> list:
+        """返回日期在 [start, end] 闭区间内的约会，按日期排序。"""
+        records = self.all()
+        matched = [
+            appt for appt in records
+            if isinstance(appt.get("date"), str) and not recurrence.is_recurring(appt)
+            and (start is None or appt["date"] >= start)
+            and (end is None or appt["date"] <= end)
+        ]
+        matched.extend(recurrence.expand_between(filter(recurrence.is_recurring, records), start, end))
+        matched.sort(key=lambda appt: appt["date"])
+        return matched
+
+    def page(self, after=None, limit: int = 100) -> list:
+        """
+        按 (date, time, id) 顺序返回排在 after 之后的至多 limit 条约会，用于游标分页。
+
+        参数:
+            after (tuple, optional): 上一页最后一条约会的 order_key，None 表示从头开始。
+            limit (int): 返回条数上限。
+        """
+        ordered = sorted(self.all(), key=order_key)
+        if after is not None:
+            ordered = [appt for appt in ordered if order_key(appt) > tuple(after)]
+        return ordered[:limit]
+
+    def due(self, now_seconds: float, since=None) -> list:
+        """
+        返回提醒时间已到、约会尚未开始的约会，按提醒时间排序。
+
+        参数:
+            now_seconds (float): 当前时间的纪元秒数。
+            since (float, optional): 只返回提醒时间晚于它的约会（上次检查之后新到期的提醒），None 表示不限。
+        """
+        return due_among(self.all(), now_seconds, since)
+
+    def next_reminder_time(self, now_seconds: float):
+        """
+        返回晚于 now_seconds、且早于约会开始时间的最早提醒时间（纪元秒）；没有时返回 None。
+
+        后台提醒分发线程据此决定休眠多久，而不是定期轮询。
+        """
+        records = self.all()
+        upcoming = recurrence.next_reminder_time(filter(recurrence.is_recurring, records), now_seconds)
+        for appt in records:
+            if recurrence.is_recurring(appt) or not appt.get("reminder_set") or not appt.get("reminder_time"):
+                continue
+            try:
+                reminder = parse_datetime_seconds(appt["reminder_time"])
+                start = parse_datetime_seconds(f"{appt.get('date')} {appt.get('time')}")
+            except (TypeError, ValueError):
+                continue
+            if now_seconds < reminder <= start and (upcoming is None or reminder < upcoming):
+                upcoming = reminder
+        return upcoming
+
+    def search(self, query: str, start=None, end=None, limit: int = 50) -> list:
+        """
+        全文检索：返回 title、description、location 包含全部查询词（按前缀匹配）的约会，见 search 模块。
+
+        参数:
+            query (str): 查询字符串，按空白与标点切分为查询词。
+            start (str, optional): 起始日期（YYYY-MM-DD），None 表示不限。
+            end (str, optional): 结束日期（YYYY-MM-DD），None 表示不限。
+            limit (int): 返回条数上限。
+
+        返回值:
+            list: 按 (date, time, id) 排序的约会列表；查询中没有任何词时为空列表。
+        """
+        from .search import matches, query_terms, search_results
+        terms = query_terms(query)
+        if not terms:
+            return []
+        return search_results((appt for appt in self.all() if matches(appt, terms)), start, end, limit)
+
+    def add_listener(self, callback):
+        """
+        注册数据变化回调：每次写入（以及检测到外部修改）后以无参数形式调用。
+
+        回调可能在持有存储内部锁的线程中执行，应当只做轻量的通知（如唤醒等待中的线程）。
+        """
+        listeners = self.__dict__.setdefault("_listeners", [])
+        if callback not in listeners:
+            listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """注销 add_listener 注册的回调（未注册时忽略）。"""
+        listeners = self.__dict__.get("_listeners", [])
+        if callback in listeners:
+            listeners.remove(callback)
+
+    def _notify_listeners(self):
+        for callback in list(self.__dict__.get("_listeners", ())):
+            callback()
+
+    def changes_since(self, seq: int, limit: int = 1000) -> dict:
+        """
+        返回序号 seq 之后的至多 limit 条变更（新增、修改、删除），见 changes.delta。
+
+        异常:
+            changes.ResyncRequired: 变更日志已不包含 seq 之后的全部变更，需要全量同步。
+            NotImplementedError: 实现不记录变更。
+        """
+        raise NotImplementedError
+
+    def version(self):
+        """
+        返回单调递增的数据版本号，每次写入后递增；不支持版本号的实现返回 None。
+
+        API 层以版本号作为响应缓存的键，版本不变即可直接复用已编码的响应。
+        """
+        return None
+
+    def stats(self) -> dict:
+        """返回实现相关的统计信息。"""
+        return {}
+
+    def close(self):
+        """释放实现持有的资源（如数据库连接）。"""
+
+
+_sqlite_repositories = {}
+_sqlite_lock = threading.Lock()
+
+
+def sqlite_path_for(path: str) -> str:
+    """SQLite 模式下数据库文件与 JSON 数据文件同目录同名，扩展名为 .db。"""
+    return os.path.splitext(os.path.abspath(path))[0] + ".db"
+
+
+_sharded_repositories = {}
+_sharded_lock = threading.Lock()
+
+
+def shard_dir_for(path: str) -> str:
+    """按月分片模式下分片目录与 JSON 数据文件同级，目录名为去掉扩展名的文件名（如 data/appointments/）。"""
+    return os.path.splitext(os.path.abspath(path))[0]
+
+
+_snapshot_repositories = {}
+_snapshot_lock = threading.Lock()
+
+
+def snapshot_path_for(path: str) -> str:
+    """二进制快照模式下快照文件与 JSON 数据文件同目录同名，扩展名为 .snap。"""
+    return os.path.splitext(os.path.abspath(path))[0] + ".snap"
+
+
+def get_repository(path: str, mode: str = "json") -> AppointmentRepository:
+    """
+    获取指定数据文件与存储模式对应的共享存储实例。
+
+    开启跨进程同步（见 interprocess 模块）后，json / journal / sharded / snapshot 模式的写入由文件锁串行化；
+    SQLite 自身已支持多进程并发访问。
+
+    参数:
+        path (str): JSON 数据文件路径（SQLite / 分片 / 快照模式下用于推导数据库路径、分片目录或快照路径）。
+        mode (str, optional): "json"、"journal"、"sqlite"、"sharded" 或 "snapshot"。
+
+    返回值:
+        AppointmentRepository: 存储实例。
+
+    异常:
+        ValueError: 未知的存储模式。
+    """
+    if mode == "sqlite":
+        from .sqlite_store import SQLiteRepository
+        db_path = sqlite_path_for(path)
+        with _sqlite_lock:
+            repo = _sqlite_repositories.get(db_path)
+            if repo is None:
+                repo = _sqlite_repositories[db_path] = SQLiteRepository(db_path)
+            return repo
+    if mode == "sharded":
+        from .shards import ShardedRepository
+        directory = shard_dir_for(path)
+        shared = interprocess.is_enabled()
+        with _sharded_lock:
+            repo = _sharded_repositories.get((directory, shared))
+            if repo is None:
+                sync = interprocess.ProcessSync(interprocess.lock_path_for(directory)) if shared else None
+                repo = _sharded_repositories[(directory, shared)] = ShardedRepository(directory, sync)
+            return repo
+    if mode == "snapshot":
+        from .snapshot import SnapshotRepository
+        snapshot_path = snapshot_path_for(path)
+        shared = interprocess.is_enabled()
+        with _snapshot_lock:
+            repo = _snapshot_repositories.get((snapshot_path, shared))
+            if repo is None:
+                sync = interprocess.ProcessSync(interprocess.lock_path_for(snapshot_path)) if shared else None
+                repo = _snapshot_repositories[(snapshot_path, shared)] = SnapshotRepository(snapshot_path, sync)
+            return repo
+    from .store import get_store
+    return get_store(path, mode)
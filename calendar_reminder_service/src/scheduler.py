@@ -0,0 +1,144 @@
+import heapq
+
+
+class ReminderScheduler:
+    """
+    基于最小堆的到期提醒调度器。
+
+    待触发的提醒按提醒时间放在 ``_pending`` 堆中；提醒时间已到的条目移入
+    按约会开始时间排序的 ``_fired`` 堆，约会开始后再从中丢弃。
+    因此每次检查的开销只与到期提醒的数量相关，而不是约会总数。
+
+    更新提醒时不会从堆中删除旧条目，而是通过 ``_current`` 做惰性失效：
+    弹出的条目若与 ``_current`` 中记录的时间不一致则直接丢弃。
+    """
+
+    def __init__(self):
+        self._current = {}
+        self._pending = []
+        self._fired = []
+        self._watermark = float("-inf")
+
+    @staticmethod
+    def _key(appt):
+        """返回 (提醒秒数, 约会开始秒数)，约会未设置有效提醒时返回 None。"""
+        # 时间戳已在 models.Appointment 创建 / 更新时解析为纪元分钟
+        reminder, start = appt.remind_minute, appt.start_minute
+        if reminder is None or start is None:
+            return None
+        return reminder * 60, start * 60
+
+    def rebuild(self, records: list):
+        """根据约会记录（models.Appointment）列表重建调度器。"""
+        self._current = {}
+        for appt in records:
+            key = self._key(appt)
+            if key is not None and appt.get("id") is not None:
+                self._current[appt["id"]] = key
+        self._rebuild_heaps()
+
+    def _rebuild_heaps(self):
+        self._pending = []
+        self._fired = []
+        for appt_id, (reminder, start) in self._current.items():
+            if reminder <= self._watermark:
+                self._fired.append((start, reminder, appt_id))
+            else:
+                self._pending.append((reminder, start, appt_id))
+        heapq.heapify(self._pending)
+        heapq.heapify(self._fired)
+
+    def schedule(self, appt):
+        """新增或更新一条约会的提醒（无有效提醒时取消调度）。"""
+        appt_id = appt.get("id")
+        key = self._key(appt)
+        if key is None:
+            self._current.pop(appt_id, None)
+            return
+        if self._current.get(appt_id) == key:
+            return
+        self._current[appt_id] = key
+        reminder, start = key
+        if reminder <= self._watermark:
+            heapq.heappush(self._fired, (start, reminder, appt_id))
+        else:
+            heapq.heappush(self._pending, (reminder, start, appt_id))
+
+    def unschedule(self, appointment_id: str):
+        """取消指定约会的提醒。"""
+        self._current.pop(appointment_id, None)
+
+    def _advance(self, now_seconds: float) -> list:
+        """
+        把提醒时间不晚于 now_seconds 的待触发条目移入 ``_fired`` 堆。
+
+        返回值:
+            list: 本次移入的有效条目 (提醒秒数, 开始秒数, 约会 ID)。
+        """
+        if now_seconds < self._watermark:
+            # 时间倒退（如测试中模拟的当前时间），按当前有效条目重建
+            self._watermark = now_seconds
+            self._rebuild_heaps()
+        self._watermark = now_seconds
+
+        pending = self._pending
+        fired = []
+        while pending and pending[0][0] <= now_seconds:
+            reminder, start, appt_id = heapq.heappop(pending)
+            if self._current.get(appt_id) == (reminder, start):
+                heapq.heappush(self._fired, (start, reminder, appt_id))
+                fired.append((reminder, start, appt_id))
+        return fired
+
+    def next_reminder(self, now_seconds: float):
+        """
+        返回晚于 now_seconds 的最早提醒时间（纪元秒），没有待触发的提醒时返回 None。
+
+        堆顶已失效的条目会被顺带丢弃，开销为 O(log n)。
+        """
+        self._advance(now_seconds)
+        pending = self._pending
+        while pending:
+            reminder, start, appt_id = pending[0]
+            if self._current.get(appt_id) == (reminder, start):
+                return reminder
+            heapq.heappop(pending)
+        return None
+
+    def due(self, now_seconds: float, since=None) -> list:
+        """
+        返回提醒时间已到、且约会尚未开始的约会 ID。
+
+        指定 since 时只返回提醒时间晚于 since 的约会（即上次检查之后新到期的提醒）。
+        since 不早于上次检查的时间时，这些条目在本次检查前都还在 ``_pending`` 堆中，
+        结果就是本次弹出的条目，不必再遍历已触发的条目。
+
+        参数:
+            now_seconds (float): 当前时间的纪元秒数。
+            since (float, optional): 上次处理到的时间（纪元秒），None 表示不限。
+
+        返回值:
+            list: 约会 ID 列表，按提醒时间排序。
+        """
+        previous = self._watermark
+        popped = self._advance(now_seconds)
+        fired = self._fired
+        while fired and fired[0][0] < now_seconds:
+            heapq.heappop(fired)
+
+        if since is None:
+            entries = fired
+        elif since >= previous:
+            entries = [(start, reminder, appt_id) for reminder, start, appt_id in popped
+                       if reminder > since and start >= now_seconds]
+        else:
+            entries = [entry for entry in fired if entry[1] > since]
+
+        seen = set()
+        result = []
+        for start, reminder, appt_id in sorted(entries, key=lambda entry: (entry[1], entry[0])):
+            if appt_id in seen or self._current.get(appt_id) != (reminder, start):
+                continue
+            seen.add(appt_id)
+            result.append(appt_id)
+        return result
@@ -0,0 +1,263 @@
+import bisect
+import heapq
+import re
+import unicodedata
+from functools import lru_cache
+from itertools import chain
+from .recurrence import expand_between, is_recurring
+from .repository import order_key
+
+# 参与全文检索的字段
+SEARCH_FIELDS = ("title", "description", "location")
+# 搜索结果的默认条数
+DEFAULT_SEARCH_LIMIT = 50
+# 候选集不超过这么多条时，其余查询词直接在候选约会的文本上校验，不再合并前缀对应的全部倒排列表
+VERIFY_LIMIT = 256
+# 前缀展开的词超过这么多个（如 "2" 匹配所有以 2 开头的编号）时不合并倒排列表，同样改为逐条校验
+EXPANSION_LIMIT = 16384
+
+# 词由字母和数字组成（下划线等标点都是分隔符），与 SQLite FTS5 的 unicode61 分词器一致；
+# 纯 ASCII 文本（最常见的情况）使用更快的 ASCII 正则
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_ASCII_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """转为小写并去掉变音符号（"Café" -> "cafe"），分词与逐条校验都基于规范化后的文本。"""
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return text.lower()
+
+
+def tokenize(text) -> list:
+    """
+    把文本切分为小写、去掉变音符号的词（"Café-Meeting" -> ["cafe", "meeting"]）。
+
+    连续的中日韩文字视为一个词，可以用其开头的若干个字前缀匹配。非字符串返回空列表。
+    """
+    if not isinstance(text, str) or not text:
+        return []
+    text = normalize(text)
+    return (_ASCII_TOKEN_RE if text.isascii() else _TOKEN_RE).findall(text)
+
+
+def query_terms(query: str) -> list:
+    """把查询字符串切分为去重后的查询词，保持原有顺序。"""
+    return list(dict.fromkeys(tokenize(query)))
+
+
+def _search_text(appt) -> str:
+    return " ".join([value for value in map(appt.get, SEARCH_FIELDS) if isinstance(value, str)])
+
+
+def record_tokens(appt) -> set:
+    """约会在 SEARCH_FIELDS 中出现的全部词。"""
+    return set(tokenize(_search_text(appt)))
+
+
+@lru_cache(maxsize=256)
+def _prefix_pattern(term: str):
+    # 查询词出现在词首（前面不是字母或数字）即为某个词的前缀
+    return re.compile(r"(?<![^\W_])" + re.escape(term))
+
+
+def matches(appt, terms) -> bool:
+    """每个查询词都是约会中某个词的前缀（AND 语义）时返回 True。"""
+    text = normalize(_search_text(appt))
+    return all(_prefix_pattern(term).search(text) for term in terms)
+
+
+def filter_matches(records, terms) -> list:
+    """保留匹配全部查询词的约会；terms 为空时原样返回。"""
+    if not terms:
+        return list(records)
+    return [appt for appt in records if matches(appt, terms)]
+
+
+def _in_range(date, start, end) -> bool:
+    return isinstance(date, str) and (start is None or date >= start) and (end is None or date <= end)
+
+
+def search_results(matched, start=None, end=None, limit: int = DEFAULT_SEARCH_LIMIT) -> list:
+    """
+    把匹配的约会整理为搜索结果：按日期范围过滤，按 (date, time, id) 排序后取前 limit 条。
+
+    未指定日期范围时重复约会按系列本身返回；指定了范围时展开为范围内的各次发生（与 between 一致）。
+
+    参数:
+        matched: 匹配查询的约会（字典或 models.Appointment）的可迭代对象。
+        start (str, optional): 起始日期（YYYY-MM-DD），None 表示不限。
+        end (str, optional): 结束日期（YYYY-MM-DD），None 表示不限。
+        limit (int): 返回条数上限。
+
+    返回值:
+        list: 约会字典副本列表。
+    """
+    singles, series = [], []
+    for appt in matched:
+        (series if is_recurring(appt) else singles).append(appt)
+    if start is not None or end is not None:
+        singles = [appt for appt in singles if _in_range(appt.get("date"), start, end)]
+        series = expand_between(series, start, end)
+    top = heapq.nsmallest(limit, chain(singles, series), key=order_key)
+    return [appt.to_dict() if hasattr(appt, "to_dict") else dict(appt) for appt in top]
+
+
+def prefer_ordered_scan(matched: int, total: int, limit: int) -> bool:
+    """
+    匹配的约会很多时，按日期顺序扫描、取够 limit 条即停止，比对全部匹配项排序更快。
+
+    按顺序扫描预计检查 limit * total / matched 条约会，排序需要处理 matched 条；
+    matched 超过 sqrt(limit * total) 时前者更少。
+    """
+    return matched * matched > limit * total
+
+
+def iter_ordered(date_index, by_id, ids, pending, start=None, end=None):
+    """
+    借助日期索引按 (date, time, id) 顺序逐个产出匹配查询、日期在 [start, end] 内的约会。
+
+    参数:
+        date_index (indexes.DateIndex): 日期索引。
+        by_id (dict): 约会 ID -> 约会记录。
+        ids: 候选约会 ID 集合，None 表示全部约会，见 SearchIndex.candidates。
+        pending (list): 还需逐条校验的查询词。
+        start (str, optional): 起始日期，None 表示不限。
+        end (str, optional): 结束日期，None 表示不限。
+    """
+    for date in date_index.iter_dates(start):
+        if end is not None and date > end:
+            return
+        day = date_index.ids_on(date)
+        matched = filter_matches((by_id[i] for i in day if ids is None or i in ids), pending)
+        if matched:
+            yield from sorted(matched, key=order_key)
+
+
+def merge_results(ordered, series, start=None, end=None, limit: int = DEFAULT_SEARCH_LIMIT) -> list:
+    """
+    与 search_results 相同，但单次约会已经按 (date, time, id) 排好序并按日期范围过滤（见 iter_ordered），
+    只需与重复约会归并后取前 limit 条。
+    """
+    if start is not None or end is not None:
+        series = expand_between(series, start, end)
+    series = sorted(series, key=order_key)
+    top = [appt for appt, _ in zip(heapq.merge(series, ordered, key=order_key), range(limit))]
+    return [appt.to_dict() if hasattr(appt, "to_dict") else dict(appt) for appt in top]
+
+
+class SearchIndex:
+    """
+    全文检索的倒排索引：词 -> 约会 ID 集合，并维护一个有序的词表以便二分查找前缀。
+
+    只出现在一条约会中的词（如编号）直接保存该约会的 ID 字符串而不是集合，节省内存。
+    查询的每个词按前缀匹配，多个词之间为 AND：先合并、求交倒排列表最小的词，
+    候选集缩小到 VERIFY_LIMIT 以内后其余的词留给调用方在候选约会上校验；
+    像 "2" 这样展开成大量词的短前缀也留待校验，不会拖慢整个查询。
+    """
+
+    def __init__(self):
+        self._tokens = []
+        self._ids = {}
+
+    def rebuild(self, records: list):
+        """根据约会列表重建整个索引。"""
+        self._ids = {}
+        for appt in records:
+            self._add_postings(appt)
+        self._tokens = sorted(self._ids)
+
+    def _add_postings(self, appt) -> list:
+        """把约会 ID 加入其各个词的倒排列表，返回新出现的词。"""
+        appt_id = appt.get("id")
+        if appt_id is None:
+            return []
+        postings = self._ids
+        new_tokens = []
+        for token in record_tokens(appt):
+            ids = postings.get(token)
+            if ids is None:
+                postings[token] = appt_id
+                new_tokens.append(token)
+            elif isinstance(ids, set):
+                ids.add(appt_id)
+            elif ids != appt_id:
+                postings[token] = {ids, appt_id}
+        return new_tokens
+
+    def add(self, appt):
+        """将一条约会加入索引。"""
+        for token in self._add_postings(appt):
+            bisect.insort(self._tokens, token)
+
+    def remove(self, appt):
+        """从索引中移除一条约会（须在修改其文本字段之前调用；不存在时忽略）。"""
+        appt_id = appt.get("id")
+        for token in record_tokens(appt):
+            ids = self._ids.get(token)
+            if isinstance(ids, set):
+                ids.discard(appt_id)
+                if len(ids) == 1:
+                    self._ids[token] = next(iter(ids))
+            elif ids is not None and ids == appt_id:
+                del self._ids[token]
+                del self._tokens[bisect.bisect_left(self._tokens, token)]
+
+    def _expand(self, term: str) -> list:
+        """返回以 term 为前缀的全部词。"""
+        lo = bisect.bisect_left(self._tokens, term)
+        hi = bisect.bisect_left(self._tokens, term[:-1] + chr(ord(term[-1]) + 1))
+        return self._tokens[lo:hi]
+
+    def _union(self, tokens: list):
+        """合并多个词的倒排列表；只有一个词时直接返回其集合（调用方不得修改）。"""
+        if len(tokens) == 1 and isinstance(self._ids[tokens[0]], set):
+            return self._ids[tokens[0]]
+        ids = set()
+        for token in tokens:
+            posting = self._ids[token]
+            if isinstance(posting, set):
+                ids.update(posting)
+            else:
+                ids.add(posting)
+        return ids
+
+    def candidates(self, terms: list) -> tuple:
+        """
+        按倒排索引求出候选约会，返回 (候选 ID 集合, 待校验的查询词)。
+
+        候选集中的约会已匹配除待校验词以外的全部查询词，调用方再以 filter_matches 校验其余的词。
+
+        参数:
+            terms (list): 查询词，见 query_terms。
+
+        返回值:
+            tuple: (set 或 None, list)。候选集可能是索引内部的集合，调用方不得修改；
+                   为 None 表示每个查询词都展开成太多的词，全部约会都是候选。
+                   某个查询词不是任何词的前缀时返回 (空集合, [])。
+        """
+        plans, pending = [], []
+        for term in terms:
+            tokens = self._expand(term)
+            if not tokens:
+                return set(), []
+            if len(tokens) > EXPANSION_LIMIT:
+                pending.append(term)
+                continue
+            size = sum(len(posting) if isinstance(posting, set) else 1 for posting in map(self._ids.get, tokens))
+            plans.append((size, term, tokens))
+        plans.sort(key=lambda plan: plan[0])
+        candidates = None
+        for _, term, tokens in plans:
+            if candidates is not None and len(candidates) <= VERIFY_LIMIT:
+                pending.append(term)
+                continue
+            ids = self._union(tokens)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return set(), []
+        return candidates, pending
+
+    def stats(self) -> dict:
+        """返回索引中的词数。"""
+        return {"tokens": len(self._tokens)}
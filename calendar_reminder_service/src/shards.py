@@ -0,0 +1,636 @@
+import heapq
+import json
+import os
+import re
+import sys
+import threading
+from contextlib import nullcontext
+from .changes import ADD, DELETE, UPDATE, ChangeLog, change
+from .calendar_utils import format_minutes, parse_datetime_minutes
+from .indexes import DateIndex
+from .locks import ReadWriteLock
+from .metrics import METRICS
+from .models import Appointment
+from .recurrence import due_occurrences, expand_between, is_recurring, next_reminder_time
+from .repository import AppointmentRepository, order_key, shard_dir_for
+from .scheduler import ReminderScheduler
+from .search import (
+    DEFAULT_SEARCH_LIMIT, SEARCH_FIELDS, SearchIndex, filter_matches, iter_ordered, merge_results, prefer_ordered_scan,
+    query_terms, search_results,
+)
+from .store import STORAGE_METRIC, file_signature, read_json_list, remove_record, write_json_atomic
+
+MANIFEST_NAME = "manifest.json"
+# 变更日志文件，见 changes.ChangeLog
+CHANGES_NAME = "changes.ndjson"
+MANIFEST_FORMAT = 1
+# 周期性约会跨越多个月份，单独保存在一个分片中，所有按日期的查询都会读取它
+RECURRING_SHARD = "recurring"
+# 日期不是规范 YYYY-MM-DD 格式的约会
+UNDATED_SHARD = "undated"
+
+_DATE_RE = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+# 分片的全文索引在读锁下惰性建立，由该锁保证同一个分片只建立一次
+_search_build_lock = threading.Lock()
+
+
+def shard_for_date(date) -> str:
+    """日期（YYYY-MM-DD）所在的月份分片名，如 "2025-01"；非规范格式的日期归入 UNDATED_SHARD。"""
+    if isinstance(date, str) and _DATE_RE.fullmatch(date):
+        return date[:7]
+    return UNDATED_SHARD
+
+
+def shard_for(appt) -> str:
+    """约会所在的分片名。"""
+    if is_recurring(appt):
+        return RECURRING_SHARD
+    return shard_for_date(appt.get("date"))
+
+
+def _is_month(key: str) -> bool:
+    return key not in (RECURRING_SHARD, UNDATED_SHARD)
+
+
+def shard_stats(records: list) -> dict:
+    """
+    计算写入清单的分片统计：约会条数，以及已设置提醒的约会的提醒时间范围与最晚开始时间。
+
+    check_reminders 据此跳过不可能包含待触发提醒的分片。
+    """
+    stats = {"count": len(records), "reminders": 0}
+    remind_from = remind_to = start_to = None
+    for appt in records:
+        remind, start = appt.remind_minute, appt.start_minute
+        if remind is None or start is None:
+            continue
+        stats["reminders"] += 1
+        remind_from = remind if remind_from is None else min(remind_from, remind)
+        remind_to = remind if remind_to is None else max(remind_to, remind)
+        start_to = start if start_to is None else max(start_to, start)
+    if stats["reminders"]:
+        stats["remind_from"] = format_minutes(remind_from)
+        stats["remind_to"] = format_minutes(remind_to)
+        stats["start_to"] = format_minutes(start_to)
+    return stats
+
+
+def _stat_seconds(stats: dict, key: str):
+    value = stats.get(key)
+    return parse_datetime_minutes(value) * 60 if value else None
+
+
+class _Shard:
+    """一个分片在内存中的缓存：记录列表以及分片内的 ID、日期索引、提醒调度器与全文索引（与 store.AppointmentStore 相同）。"""
+
+    __slots__ = ("signature", "records", "by_id", "date_index", "scheduler", "search")
+
+    def __init__(self, signature, records):
+        self.signature = signature
+        self.records = records
+        self.by_id = {appt.get("id"): appt for appt in records}
+        self.date_index = DateIndex()
+        self.date_index.rebuild(records)
+        self.scheduler = ReminderScheduler()
+        self.scheduler.rebuild(records)
+        self.search = None
+
+    def add(self, record):
+        self.records.append(record)
+        self.by_id[record.get("id")] = record
+        self.date_index.add(record)
+        self.scheduler.schedule(record)
+        if self.search is not None:
+            self.search.add(record)
+
+    def search_index(self) -> SearchIndex:
+        """返回分片的全文索引，第一次检索时才建立（调用方至少持有读锁，见 AppointmentStore._search_index_locked）。"""
+        if self.search is None:
+            with _search_build_lock:
+                if self.search is None:
+                    index = SearchIndex()
+                    index.rebuild(self.records)
+                    self.search = index
+        return self.search
+
+    def remove(self, record):
+        remove_record(self.records, record)
+        self._unindex(record)
+
+    def remove_many(self, records: list):
+        """批量移除：记录列表只过滤一遍。"""
+        gone = {id(record) for record in records}
+        self.records[:] = [record for record in self.records if id(record) not in gone]
+        for record in records:
+            self._unindex(record)
+
+    def _unindex(self, record):
+        del self.by_id[record.get("id")]
+        self.date_index.remove(record)
+        self.scheduler.unschedule(record.get("id"))
+        if self.search is not None:
+            self.search.remove(record)
+
+
+class ShardedRepository(AppointmentRepository):
+    """
+    按月分片的约会存储：每个月一个 JSON 文件（``<目录>/2025-01.json``），另有一个小的清单文件。
+
+    清单（manifest.json）记录每个分片的约会条数与提醒时间范围，以及跨进程共享的数据版本号。
+    按日期查询只读取当月分片（以及周期性约会分片），新增约会只重写目标分片与清单，
+    到期提醒检查只读取提醒时间范围覆盖当前时间的分片。
+
+    读取过的分片按文件签名缓存在内存中，文件被其他进程修改后才重新读取。
+    读取或写入过的约会记录其所在分片（ID → 分片名），按 ID 查询、更新、删除时直接读取该分片，
+    从未见过的 ID 才需要读取全部分片。
+
+    多进程部署时传入 ``interprocess.ProcessSync``，写操作在跨进程排他锁内重新检查清单与分片后再修改；
+    分片与清单都以原子替换写入，清单中的版本号即跨进程共享的数据版本。
+
+    新增、修改、删除记入目录下的变更日志（changes.ndjson），在写分片之后、写清单之前追加，
+    其他进程看到新版本号时变更日志已经包含对应的变更。
+
+    参数:
+        directory (str): 分片目录。
+        sync (interprocess.ProcessSync, optional): 跨进程锁。
+    """
+
+    def __init__(self, directory: str, sync=None):
+        self.directory = directory
+        self._sync = sync
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self._changes = ChangeLog(os.path.join(directory, CHANGES_NAME))
+        self._lock = ReadWriteLock()
+        self._shards = {}
+        self._locations = {}
+        self._manifest = None
+        self._manifest_signature = None
+        self.shard_reads = 0
+        self.shard_writes = 0
+
+    def _timed(self, operation: str):
+        return METRICS.timed(STORAGE_METRIC, {"backend": "sharded", "operation": operation})
+
+    def _file_lock(self):
+        """写操作的跨进程排他锁；未启用多进程同步时为空操作。"""
+        return self._sync.lock() if self._sync is not None else nullcontext()
+
+    def shard_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    # ---- 清单与分片的读取（调用方持有锁） ----
+
+    def _manifest_fresh(self) -> bool:
+        return self._manifest is not None and file_signature(self.manifest_path) == self._manifest_signature
+
+    def _load_manifest_locked(self) -> dict:
+        """在持有写锁时调用：清单有变化（或尚未读取）则重新读取。"""
+        if self._manifest_fresh():
+            return self._manifest
+        signature = file_signature(self.manifest_path)
+        manifest = None
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        if not isinstance(manifest, dict):
+            manifest = {"format": MANIFEST_FORMAT, "version": 0, "shards": {}}
+        self._manifest = manifest
+        self._manifest_signature = signature
+        return manifest
+
+    def _shard_fresh(self, key: str) -> bool:
+        shard = self._shards.get(key)
+        return shard is not None and file_signature(self.shard_path(key)) == shard.signature
+
+    def _load_shard_locked(self, key: str) -> _Shard:
+        """在持有写锁时调用：分片文件有变化（或尚未读取）则重新读取。"""
+        if self._shard_fresh(key):
+            return self._shards[key]
+        path = self.shard_path(key)
+        signature = file_signature(path)
+        with self._timed("load"):
+            records = [Appointment.from_dict(appt) for appt in read_json_list(path)]
+        self.shard_reads += 1
+        shard = self._shards[key] = _Shard(signature, records)
+        for appt in records:
+            self._locations[appt.get("id")] = key
+        return shard
+
+    def _read(self, select, collect):
+        """
+        在读锁下执行查询：select(manifest) 返回需要的分片名，collect(manifest, {分片名: 分片}) 生成结果。
+
+        清单与分片都已缓存且未变化时只需要读锁，否则在写锁内重新读取后再执行。
+        """
+        with self._lock.read():
+            if self._manifest_fresh():
+                keys = select(self._manifest)
+                if all(self._shard_fresh(key) for key in keys):
+                    return collect(self._manifest, {key: self._shards[key] for key in keys})
+        with self._lock.write():
+            manifest = self._load_manifest_locked()
+            keys = select(manifest)
+            return collect(manifest, {key: self._load_shard_locked(key) for key in keys})
+
+    # ---- 写入（调用方持有写锁） ----
+
+    def _write_shards_locked(self, keys, changes=(), reset=False):
+        """
+        重写指定分片（空分片删除文件），记录变更，再更新清单中的统计并递增版本号。
+
+        参数:
+            keys: 要重写的分片名。
+            changes (list, optional): 要记入变更日志的变更，见 changes.change。
+            reset (bool, optional): 数据被整体替换，清空变更日志。
+        """
+        manifest = self._load_manifest_locked()
+        os.makedirs(self.directory, exist_ok=True)
+        with self._timed("save"):
+            for key in keys:
+                shard = self._shards[key]
+                path = self.shard_path(key)
+                if shard.records:
+                    write_json_atomic(path, shard.records)
+                    manifest["shards"][key] = shard_stats(shard.records)
+                else:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    manifest["shards"].pop(key, None)
+                shard.signature = file_signature(path)
+                self.shard_writes += 1
+            if reset:
+                self._changes.reset()
+            elif changes:
+                self._changes.append(changes)
+            manifest["format"] = MANIFEST_FORMAT
+            manifest["version"] = manifest.get("version", 0) + 1
+            write_json_atomic(self.manifest_path, manifest, indent=2, sort_keys=True)
+        self._manifest_signature = file_signature(self.manifest_path)
+        self._notify_listeners()
+
+    def _locate_locked(self, appointment_id: str):
+        """返回约会所在的分片；先查 ID 所在分片的记录，没有记录或已过期时读取全部分片。"""
+        manifest = self._load_manifest_locked()
+        known = self._locations.get(appointment_id)
+        if known in manifest["shards"]:
+            shard = self._load_shard_locked(known)
+            if appointment_id in shard.by_id:
+                return shard
+        for key in manifest["shards"]:
+            if key == known:
+                continue
+            shard = self._load_shard_locked(key)
+            if appointment_id in shard.by_id:
+                return shard
+        return None
+
+    def _insert_locked(self, record: Appointment) -> str:
+        key = shard_for(record)
+        self._load_shard_locked(key).add(record)
+        self._locations[record.get("id")] = key
+        return key
+
+    def _update_locked(self, appointment_id: str, changes: dict, touched: set):
+        shard = self._locate_locked(appointment_id)
+        if shard is None:
+            return None
+        appt = shard.by_id[appointment_id]
+        old_key = shard_for(appt)
+        touched.add(old_key)
+        date_changed = "date" in changes and changes["date"] != appt.get("date")
+        # 全文索引按旧文本移除，因此要在修改之前；约会可能移到其他分片时也先移除
+        retoken = shard.search is not None and (
+            date_changed or "recurrence" in changes or any(field in changes for field in SEARCH_FIELDS))
+        if date_changed:
+            shard.date_index.remove(appt)
+        if retoken:
+            shard.search.remove(appt)
+        appt.update(changes)
+        new_key = shard_for(appt)
+        if new_key == old_key:
+            if date_changed:
+                shard.date_index.add(appt)
+            if retoken:
+                shard.search.add(appt)
+            shard.scheduler.schedule(appt)
+        else:
+            # 日期改到其他月份（或改为 / 取消周期性）：移到新的分片
+            shard.remove(appt)
+            touched.add(self._insert_locked(appt))
+        return appt
+
+    # ---- AppointmentRepository 接口 ----
+
+    def all(self) -> list:
+        """返回全部约会：按分片（月份）顺序，同一分片内保持添加顺序。"""
+        def collect(manifest, shards):
+            return [appt.to_dict() for key in sorted(shards) for appt in shards[key].records]
+        return self._read(lambda manifest: list(manifest["shards"]), collect)
+
+    def replace(self, appointments: list):
+        grouped = {}
+        for appt in appointments:
+            record = Appointment.from_dict(appt)
+            grouped.setdefault(shard_for(record), []).append(record)
+        with self._lock.write(), self._file_lock():
+            manifest = self._load_manifest_locked()
+            keys = set(manifest["shards"]) | set(grouped)
+            self._locations = {}
+            for key in keys:
+                self._shards[key] = _Shard(None, grouped.get(key, []))
+                for record in grouped.get(key, ()):
+                    self._locations[record.get("id")] = key
+            self._write_shards_locked(sorted(keys), reset=True)
+
+    def get(self, appointment_id: str):
+        """ID 所在分片已缓存且未变化时只需要读锁，否则在写锁内定位。"""
+        with self._lock.read():
+            key = self._locations.get(appointment_id)
+            if key is not None and self._manifest_fresh() and self._shard_fresh(key):
+                appt = self._shards[key].by_id.get(appointment_id)
+                if appt is not None:
+                    return appt.to_dict()
+        with self._lock.write():
+            shard = self._locate_locked(appointment_id)
+            return shard.by_id[appointment_id].to_dict() if shard is not None else None
+
+    def add(self, appointment: dict) -> dict:
+        record = Appointment.from_dict(appointment)
+        with self._lock.write(), self._file_lock():
+            self._load_manifest_locked()
+            key = self._insert_locked(record)
+            appt = record.to_dict()
+            self._write_shards_locked([key], [change(ADD, appt["id"], appt)])
+            return appt
+
+    def add_many(self, appointments: list) -> list:
+        records = [Appointment.from_dict(appt) for appt in appointments]
+        if not records:
+            return []
+        with self._lock.write(), self._file_lock():
+            self._load_manifest_locked()
+            keys = {self._insert_locked(record) for record in records}
+            added = [record.to_dict() for record in records]
+            self._write_shards_locked(sorted(keys), [change(ADD, appt["id"], appt) for appt in added])
+            return added
+
+    def update(self, appointment_id: str, changes: dict):
+        return self.update_many([(appointment_id, changes)])[0]
+
+    def delete(self, appointment_id: str) -> bool:
+        """只重写约会所在的分片与清单。"""
+        with self._lock.write(), self._file_lock():
+            shard = self._locate_locked(appointment_id)
+            if shard is None:
+                return False
+            appt = shard.by_id[appointment_id]
+            shard.remove(appt)
+            self._locations.pop(appointment_id, None)
+            self._write_shards_locked([shard_for(appt)], [change(DELETE, appointment_id)])
+            return True
+
+    def delete_many(self, appointment_ids: list, expected=None) -> list:
+        """按分片批量删除，每个涉及的分片只重写一次；expected 见 AppointmentRepository.delete_many。"""
+        with self._lock.write(), self._file_lock():
+            removed = {}
+            seen = set()
+            results = []
+            for i, appointment_id in enumerate(appointment_ids):
+                shard = None if appointment_id in seen else self._locate_locked(appointment_id)
+                if shard is not None and expected is not None and shard.by_id[appointment_id].to_dict() != expected[i]:
+                    shard = None
+                results.append(shard is not None)
+                if shard is None:
+                    continue
+                seen.add(appointment_id)
+                appt = shard.by_id[appointment_id]
+                removed.setdefault(shard_for(appt), (shard, []))[1].append(appt)
+                self._locations.pop(appointment_id, None)
+            for shard, records in removed.values():
+                shard.remove_many(records)
+            if removed:
+                deleted = [appt_id for appt_id, found in zip(appointment_ids, results) if found]
+                self._write_shards_locked(sorted(removed), [change(DELETE, appt_id) for appt_id in deleted])
+            return results
+
+    def update_many(self, updates: list) -> list:
+        with self._lock.write(), self._file_lock():
+            touched = set()
+            results = []
+            for appointment_id, changes in updates:
+                appt = self._update_locked(appointment_id, changes, touched)
+                results.append(appt.to_dict() if appt is not None else None)
+            if touched:
+                self._write_shards_locked(sorted(touched),
+                                          [change(UPDATE, appt["id"], appt) for appt in results if appt is not None])
+            return results
+
+    def on_date(self, date: str) -> list:
+        """只读取当月分片与周期性约会分片。"""
+        key = shard_for_date(date)
+
+        def select(manifest):
+            return [k for k in (key, RECURRING_SHARD) if k in manifest["shards"]]
+
+        def collect(manifest, shards):
+            result = []
+            if key in shards:
+                shard = shards[key]
+                result = [shard.by_id[i].to_dict() for i in shard.date_index.ids_on(date)]
+            if RECURRING_SHARD in shards:
+                result.extend(expand_between(shards[RECURRING_SHARD].records, date, date))
+            return result
+        return self._read(select, collect)
+
+    def between(self, start=None, end=None) -> list:
+        """只读取 [start, end] 覆盖的月份分片（以及周期性约会、非规范日期的分片）。"""
+        low = start[:7] if start else None
+        high = end[:7] if end else None
+
+        def select(manifest):
+            return [
+                key for key in manifest["shards"]
+                if not _is_month(key) or ((low is None or key >= low) and (high is None or key <= high))
+            ]
+
+        def collect(manifest, shards):
+            result = [
+                shards[key].by_id[i].to_dict() for key in sorted(shards) if key != RECURRING_SHARD
+                for i in shards[key].date_index.ids_between(start, end)
+            ]
+            if RECURRING_SHARD in shards:
+                result.extend(expand_between(shards[RECURRING_SHARD].records, start, end))
+            result.sort(key=lambda appt: appt["date"])
+            return result
+        return self._read(select, collect)
+
+    def page(self, after=None, limit: int = 100) -> list:
+        """
+        按 (date, time, id) 顺序分页：从游标所在的月份开始逐个读取月份分片，取够 limit 条即停止。
+
+        周期性约会与非规范日期的约会不在月份分片中，排序后与月份分片的结果归并。
+        """
+        after = tuple(after) if after is not None else None
+        first = after[0][:7] if after is not None else None
+        with self._lock.write():
+            manifest = self._load_manifest_locked()
+            months = sorted(key for key in manifest["shards"] if _is_month(key) and (first is None or key >= first))
+            unplaced = sorted(
+                (appt for key in (RECURRING_SHARD, UNDATED_SHARD) if key in manifest["shards"]
+                 for appt in self._load_shard_locked(key).records),
+                key=order_key)
+
+            def by_month():
+                for key in months:
+                    yield from sorted(self._load_shard_locked(key).records, key=order_key)
+
+            result = []
+            for appt in heapq.merge(unplaced, by_month(), key=order_key):
+                if after is not None and order_key(appt) <= after:
+                    continue
+                result.append(appt.to_dict())
+                if len(result) >= limit:
+                    break
+            return result
+
+    def search(self, query: str, start=None, end=None, limit: int = DEFAULT_SEARCH_LIMIT) -> list:
+        """通过各分片的倒排索引全文检索；指定日期范围时只读取范围覆盖的月份分片（与 between 相同）。"""
+        terms = query_terms(query)
+        if not terms:
+            return []
+        low = start[:7] if start else None
+        high = end[:7] if end else None
+
+        def select(manifest):
+            return [
+                key for key in manifest["shards"]
+                if not _is_month(key) or ((low is None or key >= low) and (high is None or key <= high))
+            ]
+
+        def collect(manifest, shards):
+            found = {key: shard.search_index().candidates(terms) for key, shard in shards.items()}
+
+            def matched(key):
+                ids, pending = found[key]
+                shard = shards[key]
+                return filter_matches(shard.records if ids is None else [shard.by_id[i] for i in ids], pending)
+
+            candidates = sum(len(shards[key].records) if ids is None else len(ids) for key, (ids, _) in found.items())
+            if not prefer_ordered_scan(candidates, sum(len(shard.records) for shard in shards.values()), limit):
+                return search_results([appt for key in found for appt in matched(key)], start, end, limit)
+            series = matched(RECURRING_SHARD) if RECURRING_SHARD in found else []
+            ordered = heapq.merge(*(
+                iter_ordered(shards[key].date_index, shards[key].by_id, ids, pending, start, end)
+                for key, (ids, pending) in found.items() if key != RECURRING_SHARD and (ids is None or ids)
+            ), key=order_key)
+            return merge_results(ordered, series, start, end, limit)
+        return self._read(select, collect)
+
+    def _reminder_shards(self, manifest, now_seconds: float, upcoming: bool, since=None) -> list:
+        """
+        选出可能包含到期（upcoming 为 False）或未来（upcoming 为 True）提醒的分片。
+
+        指定 since 时，到期提醒只在提醒时间范围晚于 since 的分片中查找。
+        """
+        keys = []
+        for key, stats in manifest["shards"].items():
+            if key == RECURRING_SHARD:
+                keys.append(key)
+                continue
+            if not stats.get("reminders"):
+                continue
+            if upcoming:
+                if _stat_seconds(stats, "remind_to") > now_seconds:
+                    keys.append(key)
+            elif (_stat_seconds(stats, "remind_from") <= now_seconds <= _stat_seconds(stats, "start_to")
+                  and (since is None or _stat_seconds(stats, "remind_to") > since)):
+                keys.append(key)
+        return keys
+
+    def _reminder_shards_locked(self, now_seconds: float, upcoming: bool, since=None) -> dict:
+        manifest = self._load_manifest_locked()
+        keys = self._reminder_shards(manifest, now_seconds, upcoming, since)
+        return {key: self._load_shard_locked(key) for key in keys}
+
+    def due(self, now_seconds: float, since=None) -> list:
+        """
+        只检查提醒时间范围覆盖当前时间的分片，分片内由提醒调度器完成。
+
+        调度器在检查时会推进内部状态，因此需要写锁。
+        """
+        with self._lock.write():
+            due = []
+            for key, shard in self._reminder_shards_locked(now_seconds, False, since).items():
+                if key == RECURRING_SHARD:
+                    due.extend(due_occurrences(shard.records, now_seconds, since))
+                    continue
+                for i in shard.scheduler.due(now_seconds, since):
+                    appt = shard.by_id[i]
+                    due.append((appt.remind_minute * 60, appt.to_dict()))
+            due.sort(key=lambda entry: entry[0])
+            return [appt for _, appt in due]
+
+    def next_reminder_time(self, now_seconds: float):
+        with self._lock.write():
+            upcoming = None
+            for key, shard in self._reminder_shards_locked(now_seconds, True).items():
+                if key == RECURRING_SHARD:
+                    candidate = next_reminder_time(shard.records, now_seconds)
+                else:
+                    candidate = shard.scheduler.next_reminder(now_seconds)
+                if candidate is not None and (upcoming is None or candidate < upcoming):
+                    upcoming = candidate
+            return upcoming
+
+    def changes_since(self, seq: int, limit: int = 1000) -> dict:
+        """返回序号 seq 之后的至多 limit 条变更，见 changes.ChangeLog.since。"""
+        return self._changes.since(seq, limit)
+
+    def version(self) -> int:
+        """返回清单中的数据版本号（跨进程共享，每次写入递增）。"""
+        return self._read(lambda manifest: [], lambda manifest, shards: manifest.get("version", 0))
+
+    def stats(self) -> dict:
+        return {"shard_reads": self.shard_reads, "shard_writes": self.shard_writes, "cached_shards": len(self._shards)}
+
+    def close(self):
+        with self._lock.write():
+            self._shards = {}
+            self._locations = {}
+            self._manifest = None
+            self._manifest_signature = None
+
+
+def migrate_to_shards(json_path: str, directory: str = None) -> int:
+    """
+    将单个 JSON 数据文件（含追加日志模式的 .journal）拆分为按月分片的目录。
+
+    参数:
+        json_path (str): 现有的 appointments.json 路径。
+        directory (str, optional): 分片目录，默认与数据文件同名（去掉扩展名）的目录。
+
+    返回值:
+        int: 迁移的约会条数。
+    """
+    if os.path.exists(json_path + ".journal"):
+        from .journal import JournalEngine
+        records = JournalEngine(json_path).read()
+    else:
+        records = read_json_list(json_path)
+    repo = ShardedRepository(directory or shard_dir_for(json_path))
+    repo.replace(records)
+    repo.close()
+    return len(records)
+
+
+if __name__ == '__main__':
+    # 用法：python -m calendar_reminder_service.src.shards [json_path] [directory]
+    from .appointments import DATA_FILE
+    source = sys.argv[1] if len(sys.argv) > 1 else DATA_FILE
+    target = sys.argv[2] if len(sys.argv) > 2 else shard_dir_for(source)
+    count = migrate_to_shards(source, target)
+    print(f"Migrated {count} appointment(s) from {source} into monthly shards under {target}")
@@ -0,0 +1,569 @@
+# 二进制快照存储：定长记录表 + 字符串堆，以 mmap 只读映射打开，只解码实际访问到的约会
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from contextlib import nullcontext
+from .changes import ADD, DELETE, UPDATE, ChangeLog, change, changes_path_for
+from .locks import ReadWriteLock
+from .metrics import METRICS
+from .models import Appointment, json_default
+from .recurrence import due_occurrences, expand_between, is_recurring, next_reminder_time
+from .repository import AppointmentRepository, order_key, snapshot_path_for
+from .store import STORAGE_METRIC, file_signature, read_json_list
+
+MAGIC = b"CALSNAP\x00"
+SNAPSHOT_FORMAT = 1
+
+# 文件头：魔数、格式版本、数据版本、约会总数、有规范日期的单次约会数、日期不规范的单次约会数、
+# 设置了提醒的单次约会数、重复约会数、字符串堆的偏移
+_HEADER = struct.Struct("<8sIQIIIIIQ")
+# 定长记录：开始时间与提醒时间（纪元分钟）、日期（YYYYMMDD 整数）、标志位、
+# ID 与约会 JSON 在字符串堆中的偏移和长度
+_RECORD = struct.Struct("<qqiIQIQI")
+# 各有序行号表中的一项（记录表中的行号）
+_ROW = struct.Struct("<I")
+
+# 记录标志位
+FLAG_RECURRING = 1
+FLAG_DATED = 2
+FLAG_STARTS = 4
+FLAG_REMINDS = 8
+
+_DATE_RE = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+
+
+def _day_key(date):
+    """把规范的 YYYY-MM-DD 日期转换为可比较的整数 YYYYMMDD，其他值返回 None。"""
+    if type(date) is str and _DATE_RE.fullmatch(date):
+        return int(date[:4] + date[5:7] + date[8:])
+    return None
+
+
+def _entry(record: Appointment) -> tuple:
+    """把一条约会编码为写入快照的 (开始分钟, 提醒分钟, 日期, 标志位, ID 字节, JSON 字节)。"""
+    flags = 0
+    if is_recurring(record):
+        flags |= FLAG_RECURRING
+    day = _day_key(record.get("date"))
+    if day is not None:
+        flags |= FLAG_DATED
+    start = record.start_minute
+    if start is not None:
+        flags |= FLAG_STARTS
+    remind = record.remind_minute
+    if remind is not None:
+        flags |= FLAG_REMINDS
+    appointment_id = record.get("id")
+    return (
+        start or 0, remind or 0, day or 0, flags,
+        appointment_id.encode("utf-8") if isinstance(appointment_id, str) else b"",
+        json.dumps(record.to_dict(), separators=(",", ":"), default=json_default).encode("utf-8"),
+    )
+
+
+def _rows_bytes(rows: list) -> bytes:
+    values = array("I", rows)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_entries(path: str, entries: list, version: int = 0):
+    """
+    把编码好的记录（见 _entry）原子地写成快照文件（临时文件 + os.replace）。
+
+    文件依次为：文件头、定长记录表（保持添加顺序）、按 ID 排序的行号表、按日期排序的单次约会行号表
+    （日期不规范的排在最后）、按提醒时间排序的行号表、重复约会的行号表、字符串堆。
+    字符串堆中先是按行顺序以逗号分隔的约会 JSON，加上方括号即为完整的约会列表，之后是各条约会的 ID。
+    """
+    single = [i for i, entry in enumerate(entries) if not entry[3] & FLAG_RECURRING]
+    dated = sorted((i for i in single if entries[i][3] & FLAG_DATED), key=lambda i: entries[i][2])
+    undated = [i for i in single if not entries[i][3] & FLAG_DATED]
+    reminds = sorted((i for i in single if entries[i][3] & FLAG_REMINDS), key=lambda i: entries[i][1])
+    series = [i for i, entry in enumerate(entries) if entry[3] & FLAG_RECURRING]
+    by_id = sorted(range(len(entries)), key=lambda i: entries[i][4])
+
+    data_size = sum(len(entry[5]) for entry in entries) + max(len(entries) - 1, 0)
+    table = bytearray()
+    data_offset, id_offset = 0, data_size
+    for start, remind, day, flags, id_bytes, data in entries:
+        table += _RECORD.pack(start, remind, day, flags, id_offset, len(id_bytes), data_offset, len(data))
+        data_offset += len(data) + 1
+        id_offset += len(id_bytes)
+    rows = b"".join(_rows_bytes(part) for part in (by_id, dated + undated, reminds, series))
+    heap_offset = _HEADER.size + len(table) + len(rows)
+    header = _HEADER.pack(MAGIC, SNAPSHOT_FORMAT, version, len(entries), len(dated), len(undated),
+                          len(reminds), len(series), heap_offset)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(table)
+        f.write(rows)
+        f.write(b",".join(entry[5] for entry in entries))
+        f.write(b"".join(entry[4] for entry in entries))
+    os.replace(tmp_path, path)
+
+
+def write_snapshot(path: str, appointments: list, version: int = 0):
+    """
+    把约会字典列表写成快照文件。
+
+    参数:
+        path (str): 快照文件路径。
+        appointments (list): 约会字典列表。
+        version (int, optional): 写入文件头的数据版本号。
+    """
+    write_entries(path, [_entry(Appointment.from_dict(appt)) for appt in appointments], version)
+
+
+class SnapshotReader:
+    """
+    以 mmap 只读映射打开的快照文件。
+
+    打开时只解析文件头，按 ID、日期、提醒时间的查询在对应的有序行号表上二分查找，
+    只有命中的记录才从字符串堆中取出 JSON 解码为字典（``decoded`` 统计解码的条数）。
+    文件不存在或为空时视为空快照。文件被原子替换后，已打开的映射仍然指向旧文件。
+
+    异常:
+        ValueError: 文件不是快照文件、格式版本不受支持或已被截断。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.signature = file_signature(path)
+        self.version = 0
+        self.count = 0
+        self.decoded = 0
+        self._map = None
+        self._dated = self._undated = self._reminds = self._series_count = 0
+        self._series = None
+        if self.signature is None or self.signature[1] == 0:
+            return
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ValueError(f"Truncated appointment snapshot: {path}")
+        (magic, fmt, self.version, self.count, self._dated, self._undated,
+         self._reminds, self._series_count, self._heap) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or fmt != SNAPSHOT_FORMAT:
+            self.close()
+            raise ValueError(f"Not an appointment snapshot (format {SNAPSHOT_FORMAT}): {path}")
+        self._table = _HEADER.size
+        self._by_id = self._table + self.count * _RECORD.size
+        self._by_date = self._by_id + self.count * _ROW.size
+        self._by_remind = self._by_date + (self._dated + self._undated) * _ROW.size
+        self._series_rows = self._by_remind + self._reminds * _ROW.size
+        if self._series_rows + self._series_count * _ROW.size != self._heap or self._heap > len(self._map):
+            self.close()
+            raise ValueError(f"Truncated appointment snapshot: {path}")
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    # ---- 定长部分 ----
+
+    def record(self, row: int) -> tuple:
+        """返回第 row 行的定长记录 (开始分钟, 提醒分钟, 日期, 标志位, ID 偏移, ID 长度, JSON 偏移, JSON 长度)。"""
+        return _RECORD.unpack_from(self._map, self._table + row * _RECORD.size)
+
+    def _row(self, section: int, index: int) -> int:
+        return _ROW.unpack_from(self._map, section + index * _ROW.size)[0]
+
+    def _bisect(self, section: int, lo: int, hi: int, field: int, value, scale: int = 1) -> int:
+        """在有序行号表 [lo, hi) 中找到第一个 记录[field] * scale > value 的位置。"""
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.record(self._row(section, mid))[field] * scale > value:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def _id_bytes(self, row: int) -> bytes:
+        record = self.record(row)
+        start = self._heap + record[4]
+        return self._map[start:start + record[5]]
+
+    # ---- 解码 ----
+
+    def decode(self, row: int) -> dict:
+        """把第 row 行解码为约会字典（每次调用返回新的字典）。"""
+        record = self.record(row)
+        start = self._heap + record[6]
+        self.decoded += 1
+        return json.loads(self._map[start:start + record[7]])
+
+    def all(self) -> list:
+        """按添加顺序解码全部约会：字符串堆开头就是逗号分隔的约会 JSON，一次 json.loads 完成。"""
+        if not self.count:
+            return []
+        last = self.record(self.count - 1)
+        self.decoded += self.count
+        return json.loads(b"[" + self._map[self._heap:self._heap + last[6] + last[7]] + b"]")
+
+    def series(self) -> list:
+        """返回全部重复约会（解码一次后缓存，调用方不得修改）。"""
+        if self._series is None:
+            self._series = [self.decode(self._row(self._series_rows, i)) for i in range(self._series_count)]
+        return self._series
+
+    def entries(self) -> list:
+        """按添加顺序返回全部记录的编码形式（见 _entry），重写快照时未修改的记录直接复制字节，不解码。"""
+        if not self.count:
+            return []
+        mm, heap = self._map, self._heap
+        table = mm[self._table:self._by_id]
+        return [
+            (start, remind, day, flags, mm[heap + id_at:heap + id_at + id_len], mm[heap + at:heap + at + size])
+            for start, remind, day, flags, id_at, id_len, at, size in _RECORD.iter_unpack(table)
+        ]
+
+    # ---- 查询（返回行号） ----
+
+    def find(self, appointment_id) -> int:
+        """在按 ID 排序的行号表上二分查找，返回行号；未找到时返回 None。"""
+        if not isinstance(appointment_id, str) or not self.count:
+            return None
+        key = appointment_id.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._id_bytes(self._row(self._by_id, mid)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            row = self._row(self._by_id, lo)
+            if self._id_bytes(row) == key:
+                return row
+        return None
+
+    def rows_between(self, first_day=None, last_day=None) -> list:
+        """返回日期（YYYYMMDD 整数）在 [first_day, last_day] 内的单次约会行号，按日期排序，同一日期内保持添加顺序。"""
+        lo = 0 if first_day is None else self._bisect(self._by_date, 0, self._dated, 2, first_day - 1)
+        hi = self._dated if last_day is None else self._bisect(self._by_date, lo, self._dated, 2, last_day)
+        return [self._row(self._by_date, i) for i in range(lo, hi)]
+
+    def undated_rows(self) -> list:
+        """返回日期不是规范 YYYY-MM-DD 格式的单次约会行号。"""
+        return [self._row(self._by_date, i) for i in range(self._dated, self._dated + self._undated)]
+
+    def reminder_rows(self, after_seconds=None, until_seconds=None):
+        """按提醒时间顺序逐个返回提醒时间在 (after_seconds, until_seconds] 内的单次约会行号与定长记录。"""
+        lo = 0 if after_seconds is None else self._bisect(self._by_remind, 0, self._reminds, 1, after_seconds, 60)
+        hi = self._reminds if until_seconds is None else self._bisect(
+            self._by_remind, lo, self._reminds, 1, until_seconds, 60)
+        for i in range(lo, hi):
+            row = self._row(self._by_remind, i)
+            yield row, self.record(row)
+
+
+class SnapshotRepository(AppointmentRepository):
+    """
+    以二进制快照文件（见 SnapshotReader）保存约会的存储。
+
+    启动时只映射文件、读取文件头，不解析整个日历：按 ID、日期、日期范围查询与到期提醒检查
+    在快照的有序行号表上二分查找，只解码命中的约会；``all()``（即 load_appointments）一次解码全部约会。
+    文件签名变化（被其他进程替换）时重新映射。
+
+    写操作在写锁（及跨进程锁）内重写整个快照：未修改的约会直接复制定长记录与字符串堆中的字节，
+    只有新增、修改的约会需要编码，每次写入的开销与文件大小成正比，适合读多写少的部署。
+    全文检索使用基类基于 ``all()`` 的全量扫描。
+
+    新增、修改、删除记入快照旁的 .changes 变更日志；文件头中的数据版本号即跨进程共享的版本。
+
+    参数:
+        path (str): 快照文件路径，见 repository.snapshot_path_for。
+        sync (interprocess.ProcessSync, optional): 跨进程锁。
+    """
+
+    def __init__(self, path: str, sync=None):
+        self.path = path
+        self._sync = sync
+        self._changes = ChangeLog(changes_path_for(path))
+        self._lock = ReadWriteLock()
+        self._reader = None
+        self.opens = 0
+        self.rewrites = 0
+
+    def _timed(self, operation: str):
+        return METRICS.timed(STORAGE_METRIC, {"backend": "snapshot", "operation": operation})
+
+    def _file_lock(self):
+        """写操作的跨进程排他锁；未启用多进程同步时为空操作。"""
+        return self._sync.lock() if self._sync is not None else nullcontext()
+
+    def _fresh(self) -> bool:
+        return self._reader is not None and file_signature(self.path) == self._reader.signature
+
+    def _open_locked(self) -> SnapshotReader:
+        """在持有写锁时调用：快照文件有变化（或尚未打开）则重新映射。"""
+        if self._fresh():
+            return self._reader
+        external_change = self._reader is not None
+        with self._timed("load"):
+            reader = SnapshotReader(self.path)
+        if self._reader is not None:
+            self._reader.close()
+        self._reader = reader
+        self.opens += 1
+        if external_change:
+            self._notify_listeners()
+        return reader
+
+    def _read(self, query):
+        """映射已打开且文件未变化时只需要读锁，否则在写锁内重新映射后再执行 query(reader)。"""
+        with self._lock.read():
+            if self._fresh():
+                return query(self._reader)
+        with self._lock.write():
+            return query(self._open_locked())
+
+    def _rewrite_locked(self, entries: list, changes=(), reset: bool = False):
+        """在持有写锁（及跨进程锁）时调用：写入新快照、记录变更并重新映射。"""
+        version = self._open_locked().version + 1
+        with self._timed("save"):
+            write_entries(self.path, entries, version)
+        self.rewrites += 1
+        if reset:
+            self._changes.reset()
+        elif changes:
+            self._changes.append(changes)
+        self._reader.close()
+        self._reader = SnapshotReader(self.path)
+        self._notify_listeners()
+
+    # ---- AppointmentRepository 接口 ----
+
+    def all(self) -> list:
+        return self._read(lambda reader: reader.all())
+
+    def replace(self, appointments: list):
+        entries = [_entry(Appointment.from_dict(appt)) for appt in appointments]
+        with self._lock.write(), self._file_lock():
+            self._rewrite_locked(entries, reset=True)
+
+    def get(self, appointment_id: str):
+        def query(reader):
+            row = reader.find(appointment_id)
+            return reader.decode(row) if row is not None else None
+        return self._read(query)
+
+    def add(self, appointment: dict) -> dict:
+        return self.add_many([appointment])[0]
+
+    def add_many(self, appointments: list) -> list:
+        records = [Appointment.from_dict(appt) for appt in appointments]
+        if not records:
+            return []
+        with self._lock.write(), self._file_lock():
+            entries = self._open_locked().entries()
+            entries.extend(_entry(record) for record in records)
+            added = [record.to_dict() for record in records]
+            self._rewrite_locked(entries, [change(ADD, appt["id"], appt) for appt in added])
+            return added
+
+    def update(self, appointment_id: str, changes: dict):
+        return self.update_many([(appointment_id, changes)])[0]
+
+    def update_many(self, updates: list) -> list:
+        """只解码、重新编码被修改的约会。"""
+        with self._lock.write(), self._file_lock():
+            reader = self._open_locked()
+            updated = {}
+            results = []
+            for appointment_id, changes in updates:
+                row = reader.find(appointment_id)
+                if row is None:
+                    results.append(None)
+                    continue
+                record = updated.get(row)
+                if record is None:
+                    record = updated[row] = Appointment.from_dict(reader.decode(row))
+                record.update(changes)
+                results.append(record.to_dict())
+            if updated:
+                entries = reader.entries()
+                for row, record in updated.items():
+                    entries[row] = _entry(record)
+                self._rewrite_locked(entries,
+                                     [change(UPDATE, appt["id"], appt) for appt in results if appt is not None])
+            return results
+
+    def delete(self, appointment_id: str) -> bool:
+        return self.delete_many([appointment_id])[0]
+
+    def delete_many(self, appointment_ids: list, expected=None) -> list:
+        with self._lock.write(), self._file_lock():
+            reader = self._open_locked()
+            rows = set()
+            results = []
+            for i, appointment_id in enumerate(appointment_ids):
+                row = reader.find(appointment_id)
+                if row is not None and expected is not None and reader.decode(row) != expected[i]:
+                    row = None
+                results.append(row is not None and row not in rows)
+                if row is not None:
+                    rows.add(row)
+            if rows:
+                entries = [entry for row, entry in enumerate(reader.entries()) if row not in rows]
+                deleted = [appt_id for appt_id, found in zip(appointment_ids, results) if found]
+                self._rewrite_locked(entries, [change(DELETE, appt_id) for appt_id in deleted])
+            return results
+
+    def on_date(self, date: str) -> list:
+        day = _day_key(date)
+        if day is None:
+            return super().on_date(date)
+
+        def query(reader):
+            result = [reader.decode(row) for row in reader.rows_between(day, day)]
+            if reader.series():
+                result.extend(expand_between(reader.series(), date, date))
+            return result
+        return self._read(query)
+
+    def between(self, start=None, end=None) -> list:
+        first_day, last_day = _day_key(start), _day_key(end)
+        if (start is not None and first_day is None) or (end is not None and last_day is None):
+            return super().between(start, end)
+
+        def query(reader):
+            result = [reader.decode(row) for row in reader.rows_between(first_day, last_day)]
+            # 日期不规范的约会与 DateIndex 一样按字符串比较（正常数据中不存在）
+            unplaced = [
+                appt for appt in (reader.decode(row) for row in reader.undated_rows())
+                if isinstance(appt.get("date"), str)
+                and (start is None or appt["date"] >= start) and (end is None or appt["date"] <= end)
+            ]
+            if reader.series():
+                unplaced.extend(expand_between(reader.series(), start, end))
+            if unplaced:
+                result.extend(unplaced)
+                result.sort(key=lambda appt: appt["date"])
+            return result
+        return self._read(query)
+
+    def page(self, after=None, limit: int = 100) -> list:
+        """
+        沿按日期排序的行号表逐日解码、按 (date, time, id) 排序，取够 limit 条即停止。
+
+        重复约会与日期不规范的约会不在日期行号表中，排序后与之归并。
+        """
+        after = tuple(after) if after is not None else None
+        first_day = _day_key(after[0]) if after is not None else None
+
+        def query(reader):
+            unplaced = sorted([dict(appt) for appt in reader.series()]
+                              + [reader.decode(row) for row in reader.undated_rows()], key=order_key)
+
+            def by_date():
+                rows = reader.rows_between(first_day)
+                start = 0
+                while start < len(rows):
+                    day = reader.record(rows[start])[2]
+                    stop = start + 1
+                    while stop < len(rows) and reader.record(rows[stop])[2] == day:
+                        stop += 1
+                    yield from sorted((reader.decode(row) for row in rows[start:stop]), key=order_key)
+                    start = stop
+
+            result = []
+            for appt in heapq.merge(unplaced, by_date(), key=order_key):
+                if after is not None and order_key(appt) <= after:
+                    continue
+                result.append(appt)
+                if len(result) >= limit:
+                    break
+            return result
+        return self._read(query)
+
+    def due(self, now_seconds: float, since=None) -> list:
+        """沿按提醒时间排序的行号表二分查找 (since, now] 区间，只解码约会尚未开始的记录。"""
+        def query(reader):
+            due = [
+                (record[1] * 60, reader.decode(row))
+                for row, record in reader.reminder_rows(since, now_seconds)
+                if record[3] & FLAG_STARTS and record[0] * 60 >= now_seconds
+            ]
+            if reader.series():
+                due.extend(due_occurrences(reader.series(), now_seconds, since))
+                due.sort(key=lambda entry: entry[0])
+            return [appt for _, appt in due]
+        return self._read(query)
+
+    def next_reminder_time(self, now_seconds: float):
+        def query(reader):
+            upcoming = None
+            for _, record in reader.reminder_rows(now_seconds):
+                if record[3] & FLAG_STARTS and record[0] >= record[1]:
+                    upcoming = record[1] * 60
+                    break
+            series_next = next_reminder_time(reader.series(), now_seconds)
+            if upcoming is None or (series_next is not None and series_next < upcoming):
+                return series_next
+            return upcoming
+        return self._read(query)
+
+    def changes_since(self, seq: int, limit: int = 1000) -> dict:
+        """返回序号 seq 之后的至多 limit 条变更，见 changes.ChangeLog.since。"""
+        return self._changes.since(seq, limit)
+
+    def version(self) -> int:
+        """返回快照文件头中的数据版本号（跨进程共享，每次写入递增）。"""
+        return self._read(lambda reader: reader.version)
+
+    def stats(self) -> dict:
+        """返回映射次数、重写次数、快照中的约会数与当前映射已解码的约会数。"""
+        return self._read(lambda reader: {
+            "opens": self.opens, "rewrites": self.rewrites, "records": reader.count, "decoded": reader.decoded,
+        })
+
+    def close(self):
+        with self._lock.write():
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+
+def migrate_to_snapshot(json_path: str, snapshot_path: str = None) -> int:
+    """
+    将 JSON 数据文件（含追加日志模式的 .journal）转换为二进制快照文件。
+
+    参数:
+        json_path (str): 现有的 appointments.json 路径。
+        snapshot_path (str, optional): 目标快照路径，默认与数据文件同名的 .snap。
+
+    返回值:
+        int: 转换的约会条数。
+    """
+    if os.path.exists(json_path + ".journal"):
+        from .journal import JournalEngine
+        records = JournalEngine(json_path).read()
+    else:
+        records = read_json_list(json_path)
+    repo = SnapshotRepository(snapshot_path or snapshot_path_for(json_path))
+    try:
+        repo.replace(records)
+    finally:
+        repo.close()
+    return len(records)
+
+
+if __name__ == '__main__':
+    # 用法：python -m calendar_reminder_service.src.snapshot [json_path] [snapshot_path]
+    from .appointments import DATA_FILE
+    source = sys.argv[1] if len(sys.argv) > 1 else DATA_FILE
+    target = sys.argv[2] if len(sys.argv) > 2 else snapshot_path_for(source)
+    count = migrate_to_snapshot(source, target)
+    print(f"Migrated {count} appointment(s) from {source} to {target}")
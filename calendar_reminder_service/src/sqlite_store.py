@@ -0,0 +1,537 @@
+import heapq
+import json
+import os
+import sqlite3
+import sys
+import threading
+from itertools import islice
+from .calendar_utils import parse_datetime_seconds
+from .changes import ADD, CHANGE_LOG_CAPACITY, DELETE, UPDATE, change, delta, ResyncRequired
+from .metrics import METRICS
+from .models import FIELDS
+from . import recurrence
+from .repository import AppointmentRepository, order_key, sqlite_path_for
+from .search import DEFAULT_SEARCH_LIMIT, prefer_ordered_scan, query_terms, search_results
+from .store import read_json_list
+
+# 约会的标准字段（models.FIELDS）之外的字段以 JSON 形式保存在 extra 列中；
+# 重复规则单独保存在 recurrence 列，重复约会的 start_at / remind_at 为空，不参与索引上的到期查询
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS appointments (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    date TEXT,
+    time TEXT,
+    description TEXT,
+    reminder_set INTEGER NOT NULL DEFAULT 0,
+    reminder_time TEXT,
+    location TEXT,
+    start_at INTEGER,
+    remind_at INTEGER,
+    extra TEXT,
+    recurrence TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments(date);
+CREATE INDEX IF NOT EXISTS idx_appointments_order ON appointments(date, time, id);
+CREATE INDEX IF NOT EXISTS idx_appointments_remind_at ON appointments(remind_at);
+CREATE INDEX IF NOT EXISTS idx_appointments_pending ON appointments(start_at) WHERE remind_at IS NOT NULL;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY,
+    op TEXT NOT NULL,
+    id TEXT NOT NULL,
+    appointment TEXT
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('change_seq', 1);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('change_floor', 1);
+"""
+# 早期版本创建的数据库没有 recurrence 列，连接时补上
+_ADD_RECURRENCE = "ALTER TABLE appointments ADD COLUMN recurrence TEXT"
+_CREATE_SERIES_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_appointments_series ON appointments(id) WHERE recurrence IS NOT NULL"
+)
+
+# 全文检索：以 appointments 为外部内容的 FTS5 表（按 rowid 关联，不重复保存文本），由触发器同步。
+# INSERT OR REPLACE 删除旧行时只有开启 recursive_triggers 才会触发删除触发器
+_SELECT_FTS_TABLE = "SELECT 1 FROM sqlite_master WHERE name = 'appointments_fts'"
+_CREATE_FTS = (
+    "CREATE VIRTUAL TABLE appointments_fts USING fts5("
+    "title, description, location, content='appointments', content_rowid='rowid')"
+)
+_FTS_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS appointments_fts_insert AFTER INSERT ON appointments BEGIN "
+    "INSERT INTO appointments_fts (rowid, title, description, location) "
+    "VALUES (new.rowid, new.title, new.description, new.location); END",
+    "CREATE TRIGGER IF NOT EXISTS appointments_fts_delete AFTER DELETE ON appointments BEGIN "
+    "INSERT INTO appointments_fts (appointments_fts, rowid, title, description, location) "
+    "VALUES ('delete', old.rowid, old.title, old.description, old.location); END",
+    "CREATE TRIGGER IF NOT EXISTS appointments_fts_update AFTER UPDATE OF title, description, location "
+    "ON appointments BEGIN "
+    "INSERT INTO appointments_fts (appointments_fts, rowid, title, description, location) "
+    "VALUES ('delete', old.rowid, old.title, old.description, old.location); "
+    "INSERT INTO appointments_fts (rowid, title, description, location) "
+    "VALUES (new.rowid, new.title, new.description, new.location); END",
+)
+# 为已有数据建立全文索引（升级早期版本创建的数据库）
+_REBUILD_FTS = "INSERT INTO appointments_fts (appointments_fts) VALUES ('rebuild')"
+
+# 固定的 SQL 文本配合参数绑定，由 sqlite3 模块的语句缓存复用预编译语句
+_COLUMNS = "id, title, date, time, description, reminder_set, reminder_time, location, extra, recurrence"
+_SELECT_ALL = f"SELECT {_COLUMNS} FROM appointments ORDER BY rowid"
+_SELECT_BY_ID = f"SELECT {_COLUMNS} FROM appointments WHERE id = ?"
+_SELECT_ON_DATE = f"SELECT {_COLUMNS} FROM appointments WHERE date = ? AND recurrence IS NULL ORDER BY rowid"
+_SELECT_BETWEEN = (
+    f"SELECT {_COLUMNS} FROM appointments "
+    "WHERE date >= ? AND date <= ? AND recurrence IS NULL ORDER BY date, rowid"
+)
+# 沿部分索引 idx_appointments_series 只读取重复约会，否则 ORDER BY rowid 会让查询规划器扫描整张表
+_SELECT_SERIES = (
+    f"SELECT {_COLUMNS} FROM appointments INDEXED BY idx_appointments_series "
+    "WHERE recurrence IS NOT NULL ORDER BY rowid"
+)
+_SELECT_PAGE_FIRST = f"SELECT {_COLUMNS} FROM appointments WHERE date IS NOT NULL ORDER BY date, time, id LIMIT ?"
+# 日期为 NULL 的约会在 SQL 的元组比较中无法与游标比较，单独取出后按 order_key 归并
+_SELECT_PAGE_UNDATED = f"SELECT {_COLUMNS} FROM appointments WHERE date IS NULL"
+_SELECT_PAGE_AFTER = (
+    f"SELECT {_COLUMNS} FROM appointments WHERE (date, time, id) > (?, ?, ?) ORDER BY date, time, id LIMIT ?"
+)
+_SELECT_DUE = (
+    f"SELECT {_COLUMNS} FROM appointments "
+    "WHERE remind_at IS NOT NULL AND remind_at <= ? AND start_at >= ? ORDER BY remind_at"
+)
+# 只取上次检查之后新到期的提醒：沿提醒时间索引扫描 (since, now] 区间
+_SELECT_DUE_SINCE = (
+    f"SELECT {_COLUMNS} FROM appointments INDEXED BY idx_appointments_remind_at "
+    "WHERE remind_at > ? AND remind_at <= ? AND start_at >= ? ORDER BY remind_at"
+)
+_SELECT_NEXT_REMINDER = (
+    "SELECT MIN(remind_at) FROM appointments WHERE remind_at > ? AND start_at >= remind_at"
+)
+_FTS_MATCH = "rowid IN (SELECT rowid FROM appointments_fts WHERE appointments_fts MATCH ?)"
+# 匹配较少时按 rowid 取出全部匹配再排序；很多时沿 (date, time, id) 索引顺序扫描，取够 LIMIT 条即停止
+_SEARCH = (
+    f"SELECT {_COLUMNS} FROM appointments WHERE {_FTS_MATCH} AND recurrence IS NULL "
+    "AND date >= ? AND date <= ? ORDER BY date, time, id LIMIT ?"
+)
+_SEARCH_ORDERED = (
+    f"SELECT {_COLUMNS} FROM appointments INDEXED BY idx_appointments_order WHERE {_FTS_MATCH} "
+    "AND recurrence IS NULL AND date >= ? AND date <= ? ORDER BY date, time, id LIMIT ?"
+)
+_COUNT_MATCHES = "SELECT count(*) FROM appointments_fts WHERE appointments_fts MATCH ?"
+# rowid 只增不减，最大 rowid 即约会条数的上界，比 count(*) 便宜得多
+_MAX_ROWID = "SELECT max(rowid) FROM appointments"
+# 重复约会很少：扫描部分索引 idx_appointments_series 逐条判断，而不是按 rowid 查找每一条匹配
+_SEARCH_SERIES = (
+    f"SELECT {_COLUMNS} FROM appointments INDEXED BY idx_appointments_series "
+    f"WHERE recurrence IS NOT NULL AND {_FTS_MATCH}"
+)
+_INSERT = (
+    "INSERT OR REPLACE INTO appointments "
+    "(id, title, date, time, description, reminder_set, reminder_time, location, start_at, remind_at, extra, "
+    "recurrence) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_UPDATE = (
+    "UPDATE appointments SET title = ?, date = ?, time = ?, description = ?, reminder_set = ?, "
+    "reminder_time = ?, location = ?, start_at = ?, remind_at = ?, extra = ?, recurrence = ? WHERE id = ?"
+)
+_DELETE = "DELETE FROM appointments WHERE id = ?"
+
+# 数据版本号：每个写事务内递增，所有进程与连接共享
+_BUMP_VERSION = "UPDATE meta SET value = value + 1 WHERE key = 'version'"
+_SELECT_VERSION = "SELECT value FROM meta WHERE key = 'version'"
+
+# 变更日志：与数据在同一个事务中写入。change_seq 为最新序号，change_floor 之前（含）的变更已裁剪；
+# 先 UPDATE 递增序号（取得写锁）再读取，多个进程同时写入也不会分配到相同的序号
+_ADVANCE_CHANGE_SEQ = "UPDATE meta SET value = value + ? WHERE key = 'change_seq'"
+_SELECT_CHANGE_BOUNDS = (
+    "SELECT (SELECT value FROM meta WHERE key = 'change_floor'), (SELECT value FROM meta WHERE key = 'change_seq')"
+)
+_SET_CHANGE_FLOOR = "UPDATE meta SET value = ? WHERE key = 'change_floor'"
+_INSERT_CHANGE = "INSERT INTO changes (seq, op, id, appointment) VALUES (?, ?, ?, ?)"
+_TRIM_CHANGES = "DELETE FROM changes WHERE seq <= ?"
+_SELECT_CHANGES = "SELECT seq, op, id, appointment FROM changes WHERE seq > ? ORDER BY seq LIMIT ?"
+
+# 日期范围查询缺省边界（YYYY-MM-DD 字符串按字典序比较）
+_MIN_DATE = ""
+_MAX_DATE = "\uffff"
+
+
+def _timestamps(appt: dict):
+    """计算 (约会开始秒数, 提醒秒数)，无法解析或未设置提醒时对应项为 None。"""
+    try:
+        start_at = parse_datetime_seconds(f"{appt.get('date')} {appt.get('time')}")
+    except ValueError:
+        return None, None
+    remind_at = None
+    reminder_time = appt.get("reminder_time")
+    if appt.get("reminder_set") and reminder_time and isinstance(reminder_time, str):
+        try:
+            remind_at = parse_datetime_seconds(reminder_time)
+        except ValueError:
+            remind_at = None
+    return start_at, remind_at
+
+
+def _extra(appt: dict):
+    extra = {key: value for key, value in appt.items() if key not in FIELDS and key != recurrence.RECURRENCE_FIELD}
+    return json.dumps(extra) if extra else None
+
+
+def _row_values(appt: dict) -> tuple:
+    rule = appt.get(recurrence.RECURRENCE_FIELD)
+    start_at, remind_at = (None, None) if rule else _timestamps(appt)
+    return (
+        appt.get("id"), appt.get("title"), appt.get("date"), appt.get("time"),
+        appt.get("description", ""), 1 if appt.get("reminder_set") else 0,
+        appt.get("reminder_time", ""), appt.get("location", ""),
+        start_at, remind_at, _extra(appt), json.dumps(rule) if rule else None,
+    )
+
+
+def _match_expression(terms: list) -> str:
+    """把查询词转换为 FTS5 查询：每个词加引号并按前缀匹配，空格分隔即为 AND。"""
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _create_fts(conn) -> bool:
+    """创建全文索引表与同步触发器（已存在时跳过）；SQLite 未编译 FTS5 时返回 False。"""
+    if conn.execute(_SELECT_FTS_TABLE).fetchone() is not None:
+        return True
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        # 其他进程可能在等待写锁期间已经建好
+        if conn.execute(_SELECT_FTS_TABLE).fetchone() is None:
+            conn.execute(_CREATE_FTS)
+            for trigger in _FTS_TRIGGERS:
+                conn.execute(trigger)
+            conn.execute(_REBUILD_FTS)
+        conn.commit()
+    except sqlite3.OperationalError:
+        conn.rollback()
+        return False
+    return True
+
+
+def _row_to_dict(row) -> dict:
+    appt = {
+        "id": row[0],
+        "title": row[1],
+        "date": row[2],
+        "time": row[3],
+        "description": row[4],
+        "reminder_set": bool(row[5]),
+        "reminder_time": row[6],
+        "location": row[7],
+    }
+    if row[8]:
+        appt.update(json.loads(row[8]))
+    if row[9]:
+        appt[recurrence.RECURRENCE_FIELD] = json.loads(row[9])
+    return appt
+
+
+class SQLiteRepository(AppointmentRepository):
+    """
+    基于标准库 sqlite3 的约会存储。
+
+    数据库使用 WAL 模式，date、id、提醒时间均建有索引，
+    按日期查询与到期提醒查询都是索引查找而非全表扫描；重复约会另行取出后在查询窗口内展开。
+    新增、修改、删除与数据在同一个事务中记入 changes 表（有界，见 changes 模块）。
+    title、description、location 由 FTS5 全文索引（触发器同步）；SQLite 未编译 FTS5 时退回全量扫描。
+    每个线程使用独立连接。
+
+    参数:
+        db_path (str): 数据库文件路径。
+        change_log_capacity (int, optional): 变更日志至少保留的条数，默认 changes.CHANGE_LOG_CAPACITY。
+    """
+
+    def __init__(self, db_path: str, change_log_capacity: int = None):
+        self.db_path = db_path
+        self.change_log_capacity = change_log_capacity if change_log_capacity is not None else CHANGE_LOG_CAPACITY
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._fts = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA recursive_triggers=ON")
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(appointments)")}
+            if "recurrence" not in columns:
+                try:
+                    conn.execute(_ADD_RECURRENCE)
+                except sqlite3.OperationalError:
+                    # 其他连接已经补上了该列
+                    pass
+            conn.execute(_CREATE_SERIES_INDEX)
+            self._fts = _create_fts(conn)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _timed(self, operation: str):
+        """记录一次存储读（load）或写（save）的耗时，指标与 store.AppointmentStore 相同。"""
+        return METRICS.timed("calendar_storage_duration_seconds", {"backend": "sqlite", "operation": operation})
+
+    def _log_changes(self, conn, entries: list):
+        """在写事务内记录变更；条目超过容量的两倍时裁剪回容量。"""
+        if not entries:
+            return
+        conn.execute(_ADVANCE_CHANGE_SEQ, (len(entries),))
+        floor, last = conn.execute(_SELECT_CHANGE_BOUNDS).fetchone()
+        first = last - len(entries) + 1
+        conn.executemany(_INSERT_CHANGE, (
+            (first + i, entry["op"], entry["id"],
+             json.dumps(entry["appointment"]) if "appointment" in entry else None)
+            for i, entry in enumerate(entries)
+        ))
+        if last - floor > 2 * self.change_log_capacity:
+            floor = last - self.change_log_capacity
+            conn.execute(_TRIM_CHANGES, (floor,))
+            conn.execute(_SET_CHANGE_FLOOR, (floor,))
+
+    def all(self) -> list:
+        with self._timed("load"):
+            return [_row_to_dict(row) for row in self._conn().execute(_SELECT_ALL)]
+
+    def replace(self, appointments: list):
+        conn = self._conn()
+        with self._timed("save"), conn:
+            conn.execute("DELETE FROM appointments")
+            conn.executemany(_INSERT, (_row_values(appt) for appt in appointments))
+            conn.execute(_BUMP_VERSION)
+            # 整体替换：清空变更日志并消耗一个序号，之前的序号都需要全量同步
+            conn.execute("DELETE FROM changes")
+            conn.execute(_ADVANCE_CHANGE_SEQ, (1,))
+            conn.execute(_SET_CHANGE_FLOOR, (conn.execute(_SELECT_CHANGE_BOUNDS).fetchone()[1],))
+        self._notify_listeners()
+
+    def get(self, appointment_id: str):
+        row = self._conn().execute(_SELECT_BY_ID, (appointment_id,)).fetchone()
+        return _row_to_dict(row) if row is not None else None
+
+    def add(self, appointment: dict) -> dict:
+        conn = self._conn()
+        with self._timed("save"), conn:
+            conn.execute(_INSERT, _row_values(appointment))
+            conn.execute(_BUMP_VERSION)
+            self._log_changes(conn, [change(ADD, appointment.get("id"), appointment)])
+        self._notify_listeners()
+        return dict(appointment)
+
+    def add_many(self, appointments: list) -> list:
+        conn = self._conn()
+        with self._timed("save"), conn:
+            conn.executemany(_INSERT, (_row_values(appt) for appt in appointments))
+            conn.execute(_BUMP_VERSION)
+            self._log_changes(conn, [change(ADD, appt.get("id"), appt) for appt in appointments])
+        self._notify_listeners()
+        return [dict(appt) for appt in appointments]
+
+    def _update_in(self, conn, appointment_id: str, changes: dict):
+        row = conn.execute(_SELECT_BY_ID, (appointment_id,)).fetchone()
+        if row is None:
+            return None
+        appt = _row_to_dict(row)
+        appt.update(changes)
+        values = _row_values(appt)
+        conn.execute(_UPDATE, values[1:] + (appointment_id,))
+        conn.execute(_BUMP_VERSION)
+        return appt
+
+    def _delete_in(self, conn, appointment_id: str, expected=None) -> bool:
+        if expected is not None:
+            row = conn.execute(_SELECT_BY_ID, (appointment_id,)).fetchone()
+            if row is None or _row_to_dict(row) != expected:
+                return False
+        return conn.execute(_DELETE, (appointment_id,)).rowcount > 0
+
+    def update(self, appointment_id: str, changes: dict):
+        conn = self._conn()
+        with self._timed("save"), conn:
+            appt = self._update_in(conn, appointment_id, changes)
+            if appt is not None:
+                self._log_changes(conn, [change(UPDATE, appointment_id, appt)])
+        if appt is not None:
+            self._notify_listeners()
+        return appt
+
+    def delete(self, appointment_id: str) -> bool:
+        conn = self._conn()
+        with self._timed("save"), conn:
+            deleted = conn.execute(_DELETE, (appointment_id,)).rowcount > 0
+            if deleted:
+                conn.execute(_BUMP_VERSION)
+                self._log_changes(conn, [change(DELETE, appointment_id)])
+        if deleted:
+            self._notify_listeners()
+        return deleted
+
+    def delete_many(self, appointment_ids: list, expected=None) -> list:
+        conn = self._conn()
+        with self._timed("save"), conn:
+            if expected is not None:
+                # 先取得写锁，比较与删除在同一个事务内
+                conn.execute("BEGIN IMMEDIATE")
+            results = [self._delete_in(conn, appt_id, expected[i] if expected is not None else None)
+                       for i, appt_id in enumerate(appointment_ids)]
+            deleted = [appt_id for appt_id, found in zip(appointment_ids, results) if found]
+            if deleted:
+                conn.execute(_BUMP_VERSION)
+                self._log_changes(conn, [change(DELETE, appt_id) for appt_id in deleted])
+        if deleted:
+            self._notify_listeners()
+        return results
+
+    def update_many(self, updates: list) -> list:
+        conn = self._conn()
+        with self._timed("save"), conn:
+            results = [self._update_in(conn, appt_id, changes) for appt_id, changes in updates]
+            self._log_changes(conn, [change(UPDATE, appt["id"], appt) for appt in results if appt is not None])
+        if any(appt is not None for appt in results):
+            self._notify_listeners()
+        return results
+
+    def _series(self) -> list:
+        return [_row_to_dict(row) for row in self._conn().execute(_SELECT_SERIES)]
+
+    def on_date(self, date: str) -> list:
+        result = [_row_to_dict(row) for row in self._conn().execute(_SELECT_ON_DATE, (date,))]
+        result.extend(recurrence.expand_between(self._series(), date, date))
+        return result
+
+    def between(self, start=None, end=None) -> list:
+        bounds = (start if start is not None else _MIN_DATE, end if end is not None else _MAX_DATE)
+        result = [_row_to_dict(row) for row in self._conn().execute(_SELECT_BETWEEN, bounds)]
+        series = self._series()
+        if series:
+            result.extend(recurrence.expand_between(series, start, end))
+            result.sort(key=lambda appt: appt["date"])
+        return result
+
+    def page(self, after=None, limit: int = 100) -> list:
+        """沿 (date, time, id) 索引分页；日期为 NULL 的约会（通常很少）单独取出排序后归并。"""
+        conn = self._conn()
+        undated = sorted((_row_to_dict(row) for row in conn.execute(_SELECT_PAGE_UNDATED)), key=order_key)
+        if after is None:
+            rows = conn.execute(_SELECT_PAGE_FIRST, (limit,))
+        else:
+            after = tuple(after)
+            undated = [appt for appt in undated if order_key(appt) > after]
+            rows = conn.execute(_SELECT_PAGE_AFTER, after + (limit,))
+        dated = [_row_to_dict(row) for row in rows]
+        return list(islice(heapq.merge(undated, dated, key=order_key), limit))
+
+    def search(self, query: str, start=None, end=None, limit: int = DEFAULT_SEARCH_LIMIT) -> list:
+        """
+        通过 FTS5 全文索引检索；日期过滤、排序与 limit 在同一条 SQL 中完成，重复约会另行展开。
+
+        先统计匹配条数，据此（与 store.AppointmentStore.search 相同的规则）选择按 rowid 取出或按顺序扫描。
+        """
+        terms = query_terms(query)
+        conn = self._conn()
+        if not terms or not self._fts:
+            return super().search(query, start, end, limit)
+        match = _match_expression(terms)
+        ordered = prefer_ordered_scan(conn.execute(_COUNT_MATCHES, (match,)).fetchone()[0],
+                                      conn.execute(_MAX_ROWID).fetchone()[0] or 0, limit)
+        bounds = (start if start is not None else _MIN_DATE, end if end is not None else _MAX_DATE)
+        rows = conn.execute(_SEARCH_ORDERED if ordered else _SEARCH, (match,) + bounds + (limit,))
+        matched = [_row_to_dict(row) for row in rows]
+        matched.extend(_row_to_dict(row) for row in conn.execute(_SEARCH_SERIES, (match,)))
+        return search_results(matched, start, end, limit)
+
+    def due(self, now_seconds: float, since=None) -> list:
+        if since is None:
+            rows = self._conn().execute(_SELECT_DUE, (now_seconds, now_seconds))
+        else:
+            rows = self._conn().execute(_SELECT_DUE_SINCE, (since, now_seconds, now_seconds))
+        due = [_row_to_dict(row) for row in rows]
+        series = self._series()
+        if not series:
+            return due
+        due = [(parse_datetime_seconds(appt["reminder_time"]), appt) for appt in due]
+        due.extend(recurrence.due_occurrences(series, now_seconds, since))
+        due.sort(key=lambda entry: entry[0])
+        return [appt for _, appt in due]
+
+    def next_reminder_time(self, now_seconds: float):
+        upcoming = self._conn().execute(_SELECT_NEXT_REMINDER, (now_seconds,)).fetchone()[0]
+        series_next = recurrence.next_reminder_time(self._series(), now_seconds)
+        if upcoming is None or (series_next is not None and series_next < upcoming):
+            return series_next
+        return upcoming
+
+    def changes_since(self, seq: int, limit: int = 1000) -> dict:
+        conn = self._conn()
+        # 在同一个读事务（WAL 快照）内读取序号范围与变更，避免与并发的裁剪交错
+        conn.execute("BEGIN")
+        try:
+            floor, last = conn.execute(_SELECT_CHANGE_BOUNDS).fetchone()
+            if seq < floor or seq > last:
+                raise ResyncRequired(last)
+            entries = []
+            for row in conn.execute(_SELECT_CHANGES, (seq, limit)):
+                entry = {"seq": row[0], "op": row[1], "id": row[2]}
+                if row[3] is not None:
+                    entry["appointment"] = json.loads(row[3])
+                entries.append(entry)
+        finally:
+            conn.commit()
+        # entries 从 seq + 1 开始
+        return delta(entries, seq, last, seq, limit)
+
+    def version(self) -> int:
+        return self._conn().execute(_SELECT_VERSION).fetchone()[0]
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+def migrate_json_to_sqlite(json_path: str, db_path: str = None) -> int:
+    """
+    一次性将 JSON 数据文件（含追加日志模式的 .journal）导入 SQLite 数据库。
+
+    参数:
+        json_path (str): 现有的 appointments.json 路径。
+        db_path (str, optional): 目标数据库路径，默认与 JSON 文件同名的 .db。
+
+    返回值:
+        int: 导入的约会条数。
+    """
+    if os.path.exists(json_path + ".journal"):
+        from .journal import JournalEngine
+        records = JournalEngine(json_path).read()
+    else:
+        records = read_json_list(json_path)
+    repo = SQLiteRepository(db_path or sqlite_path_for(json_path))
+    try:
+        repo.replace(records)
+    finally:
+        repo.close()
+    return len(records)
+
+
+if __name__ == '__main__':
+    # 用法：python -m calendar_reminder_service.src.sqlite_store [json_path] [db_path]
+    from .appointments import DATA_FILE
+    source = sys.argv[1] if len(sys.argv) > 1 else DATA_FILE
+    target = sys.argv[2] if len(sys.argv) > 2 else sqlite_path_for(source)
+    count = migrate_json_to_sqlite(source, target)
+    print(f"Migrated {count} appointment(s) from {source} to {target}")
@@ -0,0 +1,708 @@
+import heapq
+import json
+import os
+import threading
+from contextlib import nullcontext
+from . import interprocess
+from .changes import ADD, DELETE, UPDATE, ChangeLog, change, changes_path_for
+from .indexes import DateIndex
+from .scheduler import ReminderScheduler
+from .search import (
+    DEFAULT_SEARCH_LIMIT, SEARCH_FIELDS, SearchIndex, filter_matches, iter_ordered, merge_results, prefer_ordered_scan,
+    query_terms, search_results,
+)
+from .repository import AppointmentRepository, order_key
+from .locks import ReadWriteLock
+from .metrics import METRICS
+from .models import Appointment, json_default
+from .recurrence import due_occurrences, expand_between, is_recurring, next_reminder_time
+
+# 存储读写耗时的直方图名称
+STORAGE_METRIC = "calendar_storage_duration_seconds"
+# write_json_atomic 分段编码时每段的条数
+_WRITE_CHUNK = 1000
+
+
+def file_signature(path: str):
+    """返回文件的 (mtime_ns, size, inode)，文件不存在时返回 None。"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def read_json_list(path: str) -> list:
+    """读取并解析 JSON 列表文件，文件不存在、为空或格式错误时返回空列表。"""
+    try:
+        if os.path.getsize(path) > 0:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, list) else []
+        return []
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+
+def remove_record(records: list, record):
+    """
+    从列表中移除 record 这个对象本身。
+
+    list.remove 按相等比较，会对沿途每条记录调用 Appointment.__eq__（两侧各 to_dict 一次）；
+    这里只比较身份，从末尾开始查找（新增的约会在末尾）。
+
+    查找仍是 O(N)：10 万条记录、删除最早的一条约 4 ms。没有维护 ID -> 位置索引，因为删除后其后
+    所有位置都要平移，维护成本同样是 O(N)。JSON 模式下删除后随即整体重写数据文件，本身就是 O(N)；
+    分片模式只扫描约会所在的分片；追加日志模式下这次扫描是删除的主要开销。批量删除应使用
+    delete_many，它只过滤一遍记录列表。
+    """
+    for index in range(len(records) - 1, -1, -1):
+        if records[index] is record:
+            del records[index]
+            return
+
+
+def write_json_atomic(path: str, data, indent=None, sort_keys: bool = False):
+    """
+    原子地写入 JSON 文件：先写同目录下的临时文件，再以 os.replace 替换。
+
+    其他进程（或崩溃后重启的本进程）只会读到旧文件或新文件，不会读到写了一半的内容。
+
+    不缩进的列表按 _WRITE_CHUNK 条分段以 json.dumps 编码：json.dump 写入文件对象时总是使用纯 Python
+    编码器，json.dumps 则使用 C 编码器；分段编码使内存占用与列表长度无关，输出与 json.dump 完全相同。
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        if indent is None and isinstance(data, list):
+            f.write("[")
+            for start in range(0, len(data), _WRITE_CHUNK):
+                if start:
+                    f.write(", ")
+                f.write(json.dumps(data[start:start + _WRITE_CHUNK], sort_keys=sort_keys, default=json_default)[1:-1])
+            f.write("]")
+        else:
+            json.dump(data, f, indent=indent, sort_keys=sort_keys, default=json_default)
+    os.replace(tmp_path, path)
+
+
+class JsonFileEngine:
+    """
+    默认存储引擎：每次写操作都把完整列表重写为带缩进的 JSON 文件（临时文件 + 原子替换）。
+    """
+
+    name = "json"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def signature(self):
+        return file_signature(self.path)
+
+    def read(self) -> list:
+        return read_json_list(self.path)
+
+    def write_all(self, records: list):
+        write_json_atomic(self.path, records, indent=4)
+
+    def record_add(self, records: list, record: dict):
+        self.write_all(records)
+
+    def record_update(self, records: list, appointment_id: str, changes: dict):
+        self.write_all(records)
+
+    def record_delete(self, records: list, appointment_id: str):
+        self.write_all(records)
+
+    def record_add_many(self, records: list, new_records: list):
+        self.write_all(records)
+
+    def record_update_many(self, records: list, updates: list):
+        self.write_all(records)
+
+    def record_delete_many(self, records: list, appointment_ids: list):
+        self.write_all(records)
+
+
+class AppointmentStore(AppointmentRepository):
+    """
+    常驻内存的约会存储，写操作同步写回磁盘（write-through）。
+
+    内存中的约会保存为 ``models.Appointment`` 记录（时间戳已预解析），
+    对外的查询方法仍返回普通字典副本。
+
+    重复约会（见 recurrence 模块）只保存一条记录，不进入日期索引与提醒调度器；
+    按日期查询、到期提醒检查时在查询窗口内惰性展开，开销与系列数量而非发生次数相关。
+
+    解析后的约会列表保存在内存中，只有当存储引擎报告的文件签名（mtime / 大小 / inode）
+    发生变化（即被其他进程修改）时才重新读取，避免每次调用都重新解析整个 JSON。
+    落盘方式由存储引擎决定，见 ``JsonFileEngine`` 与 ``journal.JournalEngine``。
+
+    并发访问由读写锁保护：查询可并行执行；写操作（以及重新加载、提醒调度器的状态推进）
+    独占执行，整个“加载-修改-保存”过程在同一把写锁内完成，多线程并发写入不会丢失数据。
+
+    多进程部署时传入 ``interprocess.ProcessSync``：写操作额外持有跨进程排他锁，
+    并在写盘后递增共享版本计数器；判断内存数据是否过期时只比较计数器，不再 stat 数据文件。
+    此时绕过本类直接修改数据文件不会被察觉。
+
+    传入 ``changes.ChangeLog`` 时，每次写盘之后在同一把锁内把新增、修改、删除记入变更日志，
+    供 ``changes_since`` 增量同步。
+    """
+
+    def __init__(self, path: str, engine=None, sync=None, changes=None):
+        self.path = path
+        self._engine = engine if engine is not None else JsonFileEngine(path)
+        self._sync = sync
+        self._changes = changes
+        self._synced_version = None
+        self._records = None
+        self._signature = None
+        self._by_id = {}
+        self._date_index = DateIndex()
+        self._scheduler = ReminderScheduler()
+        # 全文索引在第一次检索时才建立（见 _search_index_locked），之后随写入增量维护
+        self._search = None
+        self._search_build_lock = threading.Lock()
+        self._series = {}
+        self._lock = ReadWriteLock()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _timed(self, operation: str):
+        """记录一次存储读（load）或写（save）的耗时。"""
+        return METRICS.timed(STORAGE_METRIC, {"backend": self._engine.name, "operation": operation})
+
+    def _rebuild_indexes(self):
+        self._by_id = {appt.get("id"): appt for appt in self._records}
+        single = [appt for appt in self._records if not is_recurring(appt)]
+        self._series = {appt.get("id"): appt for appt in self._records if is_recurring(appt)}
+        self._date_index.rebuild(single)
+        self._scheduler.rebuild(single)
+        self._search = None
+
+    def _index_locked(self, record: Appointment):
+        if self._search is not None:
+            self._search.add(record)
+        if is_recurring(record):
+            self._series[record.get("id")] = record
+        else:
+            self._date_index.add(record)
+            self._scheduler.schedule(record)
+
+    def _unindex_locked(self, record: Appointment):
+        if self._search is not None:
+            self._search.remove(record)
+        if self._series.pop(record.get("id"), None) is None:
+            self._date_index.remove(record)
+            self._scheduler.unschedule(record.get("id"))
+
+    def _search_index_locked(self) -> SearchIndex:
+        """
+        返回全文索引，不存在时先建立（调用方至少持有读锁）。
+
+        持有读锁时没有写操作会修改记录，并发的检索由 _search_build_lock 保证只建立一次。
+        """
+        if self._search is None:
+            with self._search_build_lock:
+                if self._search is None:
+                    index = SearchIndex()
+                    index.rebuild(self._records)
+                    self._search = index
+        return self._search
+
+    def _file_lock(self, shared: bool = False):
+        """跨进程锁；未启用多进程同步时为空操作。"""
+        return self._sync.lock(shared) if self._sync is not None else nullcontext()
+
+    def _is_current(self) -> bool:
+        """内存数据是否仍是最新的：多进程模式下比较共享版本计数器，否则比较数据文件签名。"""
+        if self._records is None:
+            return False
+        if self._sync is not None:
+            return self._sync.version() == self._synced_version
+        return self._engine.signature() == self._signature
+
+    def _reload_locked(self):
+        """在持有写锁时调用：数据文件有变化（或尚未加载）则重新加载并重建索引。"""
+        if self._is_current():
+            self.hits += 1
+            return
+        external_change = self._records is not None
+        if external_change:
+            self.reloads += 1
+        else:
+            self.misses += 1
+        with self._file_lock(shared=True), self._timed("load"):
+            if self._sync is not None:
+                self._synced_version = self._sync.version()
+            signature = self._engine.signature()
+            self._records = [Appointment.from_dict(appt) for appt in self._engine.read()]
+        self._signature = signature
+        self._version += 1
+        self._rebuild_indexes()
+        if external_change:
+            self._notify_listeners()
+
+    def _persisted(self):
+        """在持有写锁、且刚写盘之后调用：记录新的文件签名、递增数据版本（及共享计数器）并通知监听者。"""
+        self._signature = self._engine.signature()
+        if self._sync is not None:
+            self._synced_version = self._sync.bump()
+        self._version += 1
+        self._notify_listeners()
+
+    def _log_changes(self, entries: list):
+        """在持有写锁、且刚写盘之后调用：把变更记入变更日志（未配置日志时忽略）。"""
+        if self._changes is not None:
+            self._changes.append(entries)
+
+    def _ensure_loaded(self):
+        """确保内存数据是最新的；常见的命中路径只需要读锁。"""
+        with self._lock.read():
+            if self._is_current():
+                self.hits += 1
+                return
+        with self._lock.write():
+            self._reload_locked()
+
+    def records(self) -> list:
+        """
+        返回内存中的约会记录列表（内部对象，调用方不应直接修改）。
+
+        返回值:
+            list: models.Appointment 的列表，可按字典方式读取字段；若文件已被外部修改则先重新加载。
+        """
+        self._ensure_loaded()
+        return self._records
+
+    def all(self) -> list:
+        """返回全部约会的副本。"""
+        self._ensure_loaded()
+        with self._lock.read():
+            return [appt.to_dict() for appt in self._records]
+
+    def replace(self, appointments: list):
+        """
+        用给定列表整体替换内存数据并写回磁盘。
+
+        参数:
+            appointments (list): 新的约会字典列表（会被复制，调用方之后的修改不影响缓存）。
+        """
+        records = [Appointment.from_dict(appt) for appt in appointments]
+        with self._lock.write(), self._file_lock():
+            self._records = records
+            self._rebuild_indexes()
+            with self._timed("save"):
+                self._engine.write_all(self._records)
+            if self._changes is not None:
+                self._changes.reset()
+            self._persisted()
+
+    def _add_locked(self, record: Appointment):
+        self._records.append(record)
+        self._by_id[record.get("id")] = record
+        self._index_locked(record)
+
+    def _update_locked(self, appointment_id: str, changes: dict):
+        appt = self._by_id.get(appointment_id)
+        if appt is None:
+            return None
+        reindex = ("date" in changes and changes["date"] != appt.get("date")) or "recurrence" in changes
+        retoken = not reindex and self._search is not None and any(field in changes for field in SEARCH_FIELDS)
+        if reindex:
+            self._unindex_locked(appt)
+        elif retoken:
+            self._search.remove(appt)
+        appt.update(changes)
+        if reindex:
+            self._index_locked(appt)
+            return appt
+        if retoken:
+            self._search.add(appt)
+        if not is_recurring(appt):
+            self._scheduler.schedule(appt)
+        return appt
+
+    def get(self, appointment_id: str):
+        """
+        通过 ID 索引获取单条约会，不扫描全部记录。
+
+        参数:
+            appointment_id (str): 约会 ID。
+
+        返回值:
+            dict | None: 约会副本（重复约会为系列本身，不展开）；未找到时返回 None。
+        """
+        self._ensure_loaded()
+        with self._lock.read():
+            appt = self._by_id.get(appointment_id)
+            return appt.to_dict() if appt is not None else None
+
+    def add(self, appointment: dict) -> dict:
+        """
+        追加一条约会并写回磁盘。
+
+        参数:
+            appointment (dict): 新约会字典。
+
+        返回值:
+            dict: 追加的约会字典的副本。
+        """
+        record = Appointment.from_dict(appointment)
+        with self._lock.write(), self._file_lock():
+            self._reload_locked()
+            self._add_locked(record)
+            with self._timed("save"):
+                self._engine.record_add(self._records, record)
+            appt = record.to_dict()
+            self._log_changes([change(ADD, appt["id"], appt)])
+            self._persisted()
+            return appt
+
+    def add_many(self, appointments: list) -> list:
+        """
+        批量追加约会，只加载一次、写盘一次。
+
+        参数:
+            appointments (list): 新约会字典列表。
+
+        返回值:
+            list: 追加的约会副本列表。
+        """
+        records = [Appointment.from_dict(appt) for appt in appointments]
+        with self._lock.write(), self._file_lock():
+            self._reload_locked()
+            for record in records:
+                self._add_locked(record)
+            if records:
+                with self._timed("save"):
+                    self._engine.record_add_many(self._records, records)
+            added = [record.to_dict() for record in records]
+            if records:
+                self._log_changes([change(ADD, appt["id"], appt) for appt in added])
+                self._persisted()
+            return added
+
+    def update(self, appointment_id: str, changes: dict):
+        """
+        更新指定 ID 的约会字段并写回磁盘。
+
+        参数:
+            appointment_id (str): 约会 ID。
+            changes (dict): 需要更新的字段。
+
+        返回值:
+            dict | None: 更新后的约会副本；未找到时返回 None。
+        """
+        with self._lock.write(), self._file_lock():
+            self._reload_locked()
+            appt = self._update_locked(appointment_id, changes)
+            if appt is None:
+                return None
+            with self._timed("save"):
+                self._engine.record_update(self._records, appointment_id, changes)
+            updated = appt.to_dict()
+            self._log_changes([change(UPDATE, appointment_id, updated)])
+            self._persisted()
+            return updated
+
+    def delete(self, appointment_id: str) -> bool:
+        """
+        删除指定 ID 的约会并写回磁盘（追加日志模式下只追加一条删除记录）。
+
+        参数:
+            appointment_id (str): 约会 ID。
+
+        返回值:
+            bool: 删除成功返回 True；未找到时返回 False。
+        """
+        with self._lock.write(), self._file_lock():
+            self._reload_locked()
+            appt = self._by_id.pop(appointment_id, None)
+            if appt is None:
+                return False
+            self._unindex_locked(appt)
+            remove_record(self._records, appt)
+            with self._timed("save"):
+                self._engine.record_delete(self._records, appointment_id)
+            self._log_changes([change(DELETE, appointment_id)])
+            self._persisted()
+            return True
+
+    def delete_many(self, appointment_ids: list, expected=None) -> list:
+        """
+        批量删除约会，只加载一次、写盘一次（追加日志模式下一次追加全部删除记录）。
+
+        参数:
+            appointment_ids (list): 约会 ID 列表。
+            expected (list, optional): 与 appointment_ids 一一对应的约会字典；给出时在写锁内比较，
+                                       只删除当前内容与之相同的约会。
+
+        返回值:
+            list: 与 appointment_ids 一一对应的是否找到并删除（重复的 ID 只有第一次为 True）。
+        """
+        with self._lock.write(), self._file_lock():
+            self._reload_locked()
+            results = []
+            removed = []
+            for i, appointment_id in enumerate(appointment_ids):
+                appt = self._by_id.get(appointment_id)
+                if appt is not None and expected is not None and appt.to_dict() != expected[i]:
+                    appt = None
+                results.append(appt is not None)
+                if appt is not None:
+                    del self._by_id[appointment_id]
+                    self._unindex_locked(appt)
+                    removed.append(appt)
+            if removed:
+                # 记录列表只过滤一遍，而不是逐条 list.remove
+                gone = {id(appt) for appt in removed}
+                self._records[:] = [appt for appt in self._records if id(appt) not in gone]
+                deleted = [appt["id"] for appt in removed]
+                with self._timed("save"):
+                    self._engine.record_delete_many(self._records, deleted)
+                self._log_changes([change(DELETE, appt_id) for appt_id in deleted])
+                self._persisted()
+            return results
+
+    def update_many(self, updates: list) -> list:
+        """
+        批量更新约会字段，只加载一次、写盘一次。
+
+        参数:
+            updates (list): (约会 ID, 字段字典) 的列表。
+
+        返回值:
+            list: 与 updates 一一对应的更新后副本；未找到的约会对应 None。
+        """
+        with self._lock.write(), self._file_lock():
+            self._reload_locked()
+            results = []
+            applied = []
+            for appointment_id, changes in updates:
+                appt = self._update_locked(appointment_id, changes)
+                results.append(appt.to_dict() if appt is not None else None)
+                if appt is not None:
+                    applied.append((appointment_id, changes))
+            if applied:
+                with self._timed("save"):
+                    self._engine.record_update_many(self._records, applied)
+                self._log_changes([change(UPDATE, appt["id"], appt) for appt in results if appt is not None])
+                self._persisted()
+            return results
+
+    def on_date(self, date: str) -> list:
+        """
+        通过日期索引获取指定日期的约会，并加入当天发生的重复约会。
+
+        参数:
+            date (str): 日期（YYYY-MM-DD）。
+
+        返回值:
+            list: 该日期的约会列表，保持插入顺序（重复约会的发生排在单次约会之后）。
+        """
+        self._ensure_loaded()
+        with self._lock.read():
+            result = [self._by_id[i].to_dict() for i in self._date_index.ids_on(date)]
+            if self._series:
+                result.extend(expand_between(self._series.values(), date, date))
+            return result
+
+    def between(self, start=None, end=None) -> list:
+        """
+        通过日期索引获取 [start, end] 闭区间内的约会，重复约会展开为区间内的各次发生。
+
+        参数:
+            start (str, optional): 起始日期（YYYY-MM-DD），None 表示不限。
+            end (str, optional): 结束日期（YYYY-MM-DD），None 表示不限。
+
+        返回值:
+            list: 按日期排序的约会列表。
+        """
+        self._ensure_loaded()
+        with self._lock.read():
+            result = [self._by_id[i].to_dict() for i in self._date_index.ids_between(start, end)]
+            if self._series:
+                result.extend(expand_between(self._series.values(), start, end))
+                result.sort(key=lambda appt: appt["date"])
+            return result
+
+    def page(self, after=None, limit: int = 100) -> list:
+        """
+        借助日期索引按 (date, time, id) 顺序分页，只排序涉及到的日期内的约会。
+
+        重复约会不在日期索引中，按系列本身（第一次发生的日期）排序后与之归并；
+        日期不是字符串的约会（order_key 中日期记为空串）同样单独排序后归并。
+
+        参数:
+            after (tuple, optional): 上一页最后一条约会的 order_key，None 表示从头开始。
+            limit (int): 返回条数上限。
+
+        返回值:
+            list: 约会副本列表。
+        """
+        after = tuple(after) if after is not None else None
+        result = []
+        self._ensure_loaded()
+        with self._lock.read():
+            def by_date():
+                for date in self._date_index.iter_dates(after[0] if after else None):
+                    yield from sorted((self._by_id[i] for i in self._date_index.ids_on(date)), key=order_key)
+
+            unplaced = sorted([*self._series.values(), *(self._by_id[i] for i in self._date_index.undated_ids())],
+                              key=order_key)
+            for appt in heapq.merge(unplaced, by_date(), key=order_key):
+                if after is not None and order_key(appt) <= after:
+                    continue
+                result.append(appt.to_dict())
+                if len(result) >= limit:
+                    return result
+        return result
+
+    def due(self, now_seconds: float, since=None) -> list:
+        """
+        通过提醒调度器获取提醒已到期、约会尚未开始的约会；重复约会按各次发生分别计算。
+
+        调度器在检查时会推进内部状态，因此需要写锁。
+
+        参数:
+            now_seconds (float): 当前时间的纪元秒数。
+            since (float, optional): 只返回提醒时间晚于它的约会，None 表示不限；
+                                     见 ReminderScheduler.due。
+
+        返回值:
+            list: 约会列表，按提醒时间排序。
+        """
+        with self._lock.write():
+            self._reload_locked()
+            ids = self._scheduler.due(now_seconds, since)
+            if not self._series:
+                return [self._by_id[i].to_dict() for i in ids]
+            due = [(self._by_id[i].remind_minute * 60, self._by_id[i].to_dict()) for i in ids]
+            due.extend(due_occurrences(self._series.values(), now_seconds, since))
+            due.sort(key=lambda entry: entry[0])
+            return [appt for _, appt in due]
+
+    def next_reminder_time(self, now_seconds: float):
+        """
+        通过提醒调度器的最小堆取得晚于 now_seconds 的最早提醒时间。
+
+        参数:
+            now_seconds (float): 当前时间的纪元秒数。
+
+        返回值:
+            int | None: 提醒时间的纪元秒数；没有待触发的提醒时为 None。
+        """
+        with self._lock.write():
+            self._reload_locked()
+            upcoming = self._scheduler.next_reminder(now_seconds)
+            if self._series:
+                series_next = next_reminder_time(self._series.values(), now_seconds)
+                if upcoming is None or (series_next is not None and series_next < upcoming):
+                    upcoming = series_next
+            return upcoming
+
+    def changes_since(self, seq: int, limit: int = 1000) -> dict:
+        """
+        返回序号 seq 之后的至多 limit 条变更，见 changes.ChangeLog.since。
+
+        异常:
+            changes.ResyncRequired: 需要全量同步。
+            NotImplementedError: 未配置变更日志。
+        """
+        if self._changes is None:
+            return super().changes_since(seq, limit)
+        return self._changes.since(seq, limit)
+
+    def search(self, query: str, start=None, end=None, limit: int = DEFAULT_SEARCH_LIMIT) -> list:
+        """
+        通过倒排索引全文检索，见 search.SearchIndex。
+
+        候选约会较少时只对它们校验、排序；很多时（如常见的词）沿日期索引按顺序扫描，取够 limit 条即停止。
+
+        参数:
+            query (str): 查询字符串，每个词按前缀匹配，多个词之间为 AND。
+            start (str, optional): 起始日期（YYYY-MM-DD），None 表示不限。
+            end (str, optional): 结束日期（YYYY-MM-DD），None 表示不限。
+            limit (int): 返回条数上限。
+
+        返回值:
+            list: 按 (date, time, id) 排序的约会列表。
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        self._ensure_loaded()
+        with self._lock.read():
+            ids, pending = self._search_index_locked().candidates(terms)
+            total = len(self._by_id)
+            if not prefer_ordered_scan(total if ids is None else len(ids), total, limit):
+                pool = self._records if ids is None else [self._by_id[i] for i in ids]
+                return search_results(filter_matches(pool, pending), start, end, limit)
+            series = filter_matches((appt for key, appt in self._series.items() if ids is None or key in ids), pending)
+            ordered = iter_ordered(self._date_index, self._by_id, ids, pending, start, end)
+            return merge_results(ordered, series, start, end, limit)
+
+    def version(self) -> int:
+        """
+        返回数据版本号：每次写入或检测到外部修改后重新加载时递增（进程内单调递增）。
+        """
+        self._ensure_loaded()
+        return self._version
+
+    def stats(self) -> dict:
+        """返回缓存命中/未命中/重新加载次数。"""
+        return {"hits": self.hits, "misses": self.misses, "reloads": self.reloads}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def create_engine(path: str, mode: str = "json"):
+    """
+    根据存储模式创建存储引擎。
+
+    参数:
+        path (str): 数据文件路径。
+        mode (str): "json"（整体重写）或 "journal"（追加日志 + 定期压缩）。
+
+    返回值:
+        存储引擎实例。
+
+    异常:
+        ValueError: 未知的存储模式。
+    """
+    if mode == "json":
+        return JsonFileEngine(path)
+    if mode == "journal":
+        from .journal import JournalEngine
+        return JournalEngine(path)
+    raise ValueError(f"Unknown storage mode: {mode}")
+
+
+def get_store(path: str, mode: str = "json") -> AppointmentStore:
+    """
+    获取指定数据文件对应的共享存储实例（同一路径与模式在进程内只创建一次）。
+
+    开启了跨进程同步（见 ``interprocess.enable``）时，实例使用与数据文件同名的 .lock 文件加锁并共享版本计数器。
+    变更日志保存在数据文件旁的 .changes 文件中，见 ``changes.ChangeLog``。
+
+    参数:
+        path (str): 数据文件路径。
+        mode (str, optional): 存储模式，见 ``create_engine``。
+
+    返回值:
+        AppointmentStore: 该路径对应的存储实例。
+    """
+    shared = interprocess.is_enabled()
+    key = (os.path.abspath(path), mode, shared)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            sync = interprocess.ProcessSync(interprocess.lock_path_for(key[0])) if shared else None
+            store = _stores[key] = AppointmentStore(key[0], create_engine(key[0], mode), sync,
+                                                    ChangeLog(changes_path_for(key[0])))
+        return store
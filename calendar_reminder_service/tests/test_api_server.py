@@ -0,0 +1,404 @@
+import unittest
+import os
+import json
+import threading
+import http.client
+import shutil
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from calendar_reminder_service.src import appointments
+from calendar_reminder_service.src import api_server
+from calendar_reminder_service.src import archive
+from calendar_reminder_service.src import dispatcher
+from calendar_reminder_service.src import reminders
+from calendar_reminder_service.src.api_server import create_server
+from calendar_reminder_service.src.changes import changes_path_for
+from calendar_reminder_service.src.interprocess import lock_path_for
+from calendar_reminder_service.src.marks import marks_path_for
+
+class TestAPIServer(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.test_data_file = os.path.join(self.test_data_dir, "test_api_appointments.json")
+
+        self.data_file_patcher = patch('calendar_reminder_service.src.appointments.DATA_FILE', self.test_data_file)
+        self.data_file_patcher.start()
+        appointments.save_appointments([])
+
+        self.server = create_server('127.0.0.1', 0, workers=8)
+        self.port = self.server.server_address[1]
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+
+    def tearDown(self):
+        # 结束仍在进行的 SSE 订阅
+        dispatcher.BROKER.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.data_file_patcher.stop()
+        for path in (self.test_data_file, changes_path_for(self.test_data_file),
+                     reminders.watermark_path_for(self.test_data_file), marks_path_for(self.test_data_file),
+                     lock_path_for(marks_path_for(self.test_data_file))):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(archive.archive_dir_for(self.test_data_file), ignore_errors=True)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def _request(self, conn, method, path, body=None):
+        payload = json.dumps(body) if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        conn.request(method, path, body=payload, headers=headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_keep_alive_reuses_connection(self):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            status, created = self._request(conn, "POST", "/api/appointments",
+                                             {"title": "Keep", "date": "2025-01-02", "time": "15:00"})
+            self.assertEqual(status, 201)
+            sock = conn.sock
+            status, data = self._request(conn, "GET", "/api/appointments?date=2025-01-02")
+            self.assertEqual(status, 200)
+            self.assertEqual([a["id"] for a in data], [created["id"]])
+            # HTTP/1.1 持久连接：第二个请求复用同一个套接字
+            self.assertIs(conn.sock, sock)
+
+            status, data = self._request(conn, "GET", "/api/appointments?from=2025-01-01&to=2025-01-07")
+            self.assertEqual(len(data), 1)
+            status, _ = self._request(conn, "GET", "/api/appointments?from=2025-13-01")
+            self.assertEqual(status, 400)
+        finally:
+            conn.close()
+
+    def test_batch_endpoints(self):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            status, data = self._request(conn, "POST", "/api/appointments/batch", [
+                {"title": "Import 1", "date": "2025-04-01", "time": "09:00"},
+                {"title": "Import 2", "date": "2025-04-01", "time": "25:00"},
+            ])
+            self.assertEqual(status, 200)
+            self.assertEqual((data["succeeded"], data["failed"]), (1, 1))
+            created_id = data["results"][0]["appointment"]["id"]
+
+            status, data = self._request(conn, "POST", "/api/reminders/batch", [
+                {"appointment_id": created_id, "reminder_time": "2025-04-01 08:00"},
+            ])
+            self.assertEqual((status, data["succeeded"]), (200, 1))
+
+            status, _ = self._request(conn, "POST", "/api/appointments/batch", {"title": "not a list"})
+            self.assertEqual(status, 400)
+        finally:
+            conn.close()
+
+    def test_single_appointment_routes(self):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            status, created = self._request(conn, "POST", "/api/appointments",
+                                             {"title": "Single", "date": "2025-03-01", "time": "09:00"})
+            path = f"/api/appointments/{created['id']}"
+            status, data = self._request(conn, "GET", path)
+            self.assertEqual((status, data), (200, created))
+
+            status, data = self._request(conn, "PATCH", path, {"title": "Renamed", "reminder_time": "2025-03-01 08:00"})
+            self.assertEqual(status, 200)
+            self.assertEqual((data["title"], data["reminder_set"]), ("Renamed", True))
+            status, data = self._request(conn, "PATCH", path, {"date": "2025-02-30"})
+            self.assertEqual(status, 400)
+            status, _ = self._request(conn, "PATCH", "/api/appointments/missing", {"title": "x"})
+            self.assertEqual(status, 404)
+
+            # 单条新增与批量新增使用相同的校验与错误信息
+            for body, error in (
+                ({"title": "Null", "date": None, "time": "09:00"}, "Missing fields: date"),
+                ({"title": "Word", "date": "tomorrow", "time": "09:00"}, "Invalid date format, expected YYYY-MM-DD"),
+                ({"title": "Bad", "date": "2025-03-01", "time": "x"}, "Invalid time format, expected HH:MM"),
+                ({"title": 1, "date": "2025-03-01", "time": "09:00"}, "Field 'title' must be a string"),
+                (["not", "an", "object"], "Item must be an object"),
+            ):
+                status, data = self._request(conn, "POST", "/api/appointments", body)
+                self.assertEqual((status, data), (400, {"error": error}))
+
+            status, data = self._request(conn, "DELETE", path)
+            self.assertEqual((status, data), (200, {"status": "ok"}))
+            for method in ("GET", "DELETE"):
+                status, _ = self._request(conn, method, path)
+                self.assertEqual(status, 404)
+            self.assertEqual(appointments.load_appointments(), [])
+        finally:
+            conn.close()
+
+    def test_change_feed(self):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            # 首次同步：410 给出全量下载后继续拉取的序号
+            status, data = self._request(conn, "GET", "/api/appointments?since=0")
+            self.assertEqual((status, data["resync"]), (410, True))
+            seq = data["seq"]
+            status, data = self._request(conn, "GET", f"/api/appointments?since={seq}")
+            self.assertEqual((status, data), (200, {"seq": seq, "changes": [], "more": False}))
+
+            status, created = self._request(conn, "POST", "/api/appointments",
+                                             {"title": "Synced", "date": "2025-03-01", "time": "09:00"})
+            self._request(conn, "PATCH", f"/api/appointments/{created['id']}", {"title": "Renamed"})
+            status, data = self._request(conn, "GET", f"/api/appointments?since={seq}&limit=1")
+            self.assertEqual((status, data["more"]), (200, True))
+            self.assertEqual([(c["op"], c["appointment"]["title"]) for c in data["changes"]], [("add", "Synced")])
+            status, data = self._request(conn, "GET", f"/api/appointments?since={data['seq']}")
+            self.assertEqual([(c["op"], c["appointment"]["title"]) for c in data["changes"]], [("update", "Renamed")])
+            self.assertEqual((data["seq"], data["more"]), (seq + 2, False))
+
+            for query in ("since=-1", "since=abc", f"since={seq}&limit=0"):
+                status, _ = self._request(conn, "GET", f"/api/appointments?{query}")
+                self.assertEqual(status, 400)
+        finally:
+            conn.close()
+
+    def test_search_route(self):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            self._request(conn, "POST", "/api/appointments/batch", [
+                {"title": "Team meeting", "date": "2025-03-01", "time": "09:00", "location": "Room A"},
+                {"title": "Team lunch", "date": "2025-04-01", "time": "12:00"},
+            ])
+            status, data = self._request(conn, "GET", "/api/appointments/search?q=team")
+            self.assertEqual((status, [appt["title"] for appt in data]), (200, ["Team meeting", "Team lunch"]))
+            status, data = self._request(conn, "GET", "/api/appointments/search?q=TEAM+roo")
+            self.assertEqual([appt["title"] for appt in data], ["Team meeting"])
+            status, data = self._request(conn, "GET", "/api/appointments/search?q=team&from=2025-04-01&to=2025-04-30")
+            self.assertEqual([appt["title"] for appt in data], ["Team lunch"])
+            status, data = self._request(conn, "GET", "/api/appointments/search?q=team&limit=1")
+            self.assertEqual(len(data), 1)
+
+            for query in ("", "q=", "q=team&from=2025-13-01", "q=team&limit=0"):
+                status, _ = self._request(conn, "GET", f"/api/appointments/search?{query}")
+                self.assertEqual(status, 400)
+            # search 不会被当作约会 ID
+            status, _ = self._request(conn, "DELETE", "/api/appointments/search")
+            self.assertEqual(status, 404)
+        finally:
+            conn.close()
+
+    def test_due_and_ack_routes(self):
+        now = datetime.now()
+        appt = appointments.add_appointment("Due soon", (now + timedelta(days=1)).strftime("%Y-%m-%d"), "09:00")
+        reminders.set_reminder(appt["id"], (now - timedelta(hours=1)).strftime("%Y-%m-%d %H:%M"))
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            # 每次检查只返回上次检查之后新到期的提醒
+            status, data = self._request(conn, "GET", "/api/reminders/due")
+            self.assertEqual((status, [a["id"] for a in data]), (200, [appt["id"]]))
+            status, data = self._request(conn, "GET", "/api/reminders/due")
+            self.assertEqual((status, data), (200, []))
+            status, data = self._request(conn, "GET", "/api/reminders/due?pending=1")
+            self.assertEqual([a["id"] for a in data], [appt["id"]])
+
+            status, data = self._request(conn, "POST", "/api/reminders/ack", {"ids": [appt["id"], "missing"]})
+            self.assertEqual((status, data["succeeded"], data["failed"]), (200, 1, 1))
+            status, data = self._request(conn, "GET", "/api/reminders/due?pending=1")
+            self.assertEqual(data, [])
+            status, data = self._request(conn, "POST", "/api/reminders/ack", [appt["id"]])
+            self.assertEqual((status, data["succeeded"]), (200, 1))
+            status, _ = self._request(conn, "POST", "/api/reminders/ack", {"ids": "oops"})
+            self.assertEqual(status, 400)
+        finally:
+            conn.close()
+
+    def test_include_archived(self):
+        old = appointments.add_appointment("Archived", "2020-03-02", "09:00")
+        appointments.archive_appointments("2021-01-01")
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            status, data = self._request(conn, "GET", "/api/appointments?date=2020-03-02")
+            self.assertEqual((status, data), (200, []))
+            status, data = self._request(conn, "GET", "/api/appointments?date=2020-03-02&include_archived=1")
+            self.assertEqual([a["id"] for a in data], [old["id"]])
+            status, data = self._request(conn, "GET", "/api/appointments?from=2020-01-01&to=2020-12-31&include_archived=true")
+            self.assertEqual([a["id"] for a in data], [old["id"]])
+        finally:
+            conn.close()
+
+    def test_paginated_and_streamed_listing(self):
+        appointments.add_appointments([
+            {"title": f"Page {i}", "date": f"2025-05-{1 + i % 5:02d}", "time": "09:00"} for i in range(7)
+        ])
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            seen, cursor = [], None
+            while True:
+                path = "/api/appointments?limit=3" + (f"&cursor={cursor}" if cursor else "")
+                status, data = self._request(conn, "GET", path)
+                self.assertEqual(status, 200)
+                seen.extend(a["id"] for a in data["items"])
+                cursor = data["next_cursor"]
+                if cursor is None:
+                    break
+            self.assertEqual(len(seen), 7)
+            self.assertEqual(len(set(seen)), 7)
+
+            status, _ = self._request(conn, "GET", "/api/appointments?limit=0")
+            self.assertEqual(status, 400)
+            status, _ = self._request(conn, "GET", "/api/appointments?cursor=not-a-cursor")
+            self.assertEqual(status, 400)
+
+            # 分块传输的 NDJSON，随后同一连接仍可继续使用
+            conn.request("GET", "/api/appointments?stream=1")
+            response = conn.getresponse()
+            self.assertEqual(response.getheader("Transfer-Encoding"), "chunked")
+            lines = response.read().decode("utf-8").splitlines()
+            self.assertEqual([json.loads(line)["id"] for line in lines], seen)
+            status, data = self._request(conn, "GET", "/api/appointments")
+            self.assertEqual(len(data), 7)
+        finally:
+            conn.close()
+
+    def test_etag_and_cached_polling(self):
+        appointments.add_appointment("Poll", "2025-06-01", "09:00")
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            conn.request("GET", "/api/appointments?date=2025-06-01")
+            response = conn.getresponse()
+            body = response.read()
+            etag = response.getheader("ETag")
+            self.assertEqual(response.status, 200)
+            self.assertTrue(etag)
+
+            # 数据未变化：重复轮询既不查询存储也不重新编码，条件请求返回 304
+            with patch.object(api_server, 'handle_get', wraps=api_server.handle_get) as handle_get:
+                conn.request("GET", "/api/appointments?date=2025-06-01")
+                response = conn.getresponse()
+                self.assertEqual(response.read(), body)
+                conn.request("GET", "/api/appointments?date=2025-06-01", headers={"If-None-Match": etag})
+                response = conn.getresponse()
+                self.assertEqual(response.status, 304)
+                self.assertEqual(response.read(), b"")
+                self.assertEqual(handle_get.call_count, 0)
+
+            # 写入后数据版本变化，响应与 ETag 随之更新
+            self._request(conn, "POST", "/api/appointments", {"title": "New", "date": "2025-06-01", "time": "10:00"})
+            conn.request("GET", "/api/appointments?date=2025-06-01", headers={"If-None-Match": etag})
+            response = conn.getresponse()
+            self.assertEqual(response.status, 200)
+            self.assertEqual(len(json.loads(response.read())), 2)
+            self.assertNotEqual(response.getheader("ETag"), etag)
+        finally:
+            conn.close()
+
+    def test_reminder_event_stream(self):
+        appt = appointments.add_appointment("Push", "2025-07-01", "10:00")
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            conn.request("GET", "/api/reminders/stream")
+            response = conn.getresponse()
+            self.assertEqual(response.getheader("Content-Type"), "text/event-stream")
+            self.assertEqual(response.readline(), b": connected\n")
+            self.assertEqual(response.readline(), b"\n")
+
+            appointments.current_store().update(appt["id"], {"reminder_set": True, "reminder_time": "2025-07-01 09:00"})
+            clock = lambda: datetime(2025, 7, 1, 9, 0)
+            dispatcher.ReminderDispatcher(dispatcher.BROKER, now_func=clock).run_once()
+            self.assertEqual(response.readline(), b"id: %d\n" % dispatcher.BROKER.published)
+            self.assertEqual(response.readline(), b"event: reminder\n")
+            data = json.loads(response.readline().decode("utf-8")[len("data: "):])
+            self.assertEqual(data["appointment"]["id"], appt["id"])
+        finally:
+            conn.close()
+
+    def test_reminder_streams_do_not_hold_request_slots(self):
+        self.server.request_slots = threading.BoundedSemaphore(1)
+        self.server.stream_slots = threading.BoundedSemaphore(2)
+        streams = [http.client.HTTPConnection('127.0.0.1', self.port, timeout=10) for _ in range(3)]
+        try:
+            for conn in streams[:2]:
+                conn.request("GET", "/api/reminders/stream")
+                response = conn.getresponse()
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.readline(), b": connected\n")
+            # 订阅名额已满
+            self.assertEqual(self._request(streams[2], "GET", "/api/reminders/stream"),
+                             (503, {"error": "Too many stream subscribers"}))
+
+            # 订阅连接不占用请求名额，普通请求照常处理
+            conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+            try:
+                self.assertEqual(self._request(conn, "GET", "/api/appointments")[0], 200)
+            finally:
+                conn.close()
+        finally:
+            for conn in streams:
+                conn.close()
+
+    def test_metrics_endpoint(self):
+        from calendar_reminder_service.src.metrics import METRICS
+        METRICS.reset()
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            self._request(conn, "POST", "/api/appointments", {"title": "M", "date": "2025-01-02", "time": "09:00"})
+            self._request(conn, "GET", "/api/appointments?date=2025-01-02")
+            self._request(conn, "GET", "/api/nowhere")
+            conn.request("GET", "/api/metrics")
+            response = conn.getresponse()
+            self.assertEqual(response.status, 200)
+            self.assertTrue(response.getheader("Content-Type").startswith("text/plain"))
+            text = response.read().decode("utf-8")
+        finally:
+            conn.close()
+        self.assertIn('calendar_http_requests_total{method="POST",route="/api/appointments",status="201"} 1', text)
+        self.assertIn('calendar_http_requests_total{method="GET",route="other",status="404"} 1', text)
+        self.assertIn('calendar_http_request_duration_seconds_count{method="GET",route="/api/appointments"} 1', text)
+        self.assertIn('calendar_json_encode_duration_seconds_count{route="/api/appointments"} 2', text)
+        self.assertIn('calendar_storage_duration_seconds_count{backend="json",operation="save"} 1', text)
+        self.assertIn("calendar_response_cache_misses_total", text)
+
+    def test_idle_keep_alive_connections_do_not_block_new_clients(self):
+        # 比请求名额更多的空闲 keep-alive 连接
+        idle = [http.client.HTTPConnection('127.0.0.1', self.port, timeout=10) for _ in range(self.server.workers + 2)]
+        try:
+            for conn in idle:
+                self.assertEqual(self._request(conn, "GET", "/api/appointments")[0], 200)
+            conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+            try:
+                self.assertEqual(self._request(conn, "GET", "/api/appointments")[0], 200)
+            finally:
+                conn.close()
+        finally:
+            for conn in idle:
+                conn.close()
+
+    def test_parallel_posts_lose_no_writes(self):
+        clients, per_client = 8, 25
+        errors = []
+
+        def worker(client_no):
+            conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+            try:
+                for i in range(per_client):
+                    status, _ = self._request(conn, "POST", "/api/appointments", {
+                        "title": f"Client {client_no} #{i}", "date": "2025-03-01", "time": "09:00",
+                    })
+                    if status != 201:
+                        errors.append(status)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                conn.close()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        with open(self.test_data_file, 'r') as f:
+            saved = json.load(f)
+        self.assertEqual(len(saved), clients * per_client)
+        self.assertEqual(len({a["id"] for a in saved}), clients * per_client)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,16 @@
 import unittest
 import os
 import json
+import shutil
 from unittest.mock import patch
 
 # 假设在项目根目录运行：`python -m unittest discover calendar_reminder_service/tests`
 # 即 'calendar_reminder_service' 为顶层包
 from calendar_reminder_service.src import appointments
+from calendar_reminder_service.src.models import Appointment
+from calendar_reminder_service.src.store import JsonFileEngine
+from calendar_reminder_service.src.changes import changes_path_for
+from calendar_reminder_service.src.repository import order_key, shard_dir_for, snapshot_path_for, sqlite_path_for
 
 class TestAppointments(unittest.TestCase):
 
@@ -30,8 +35,9 @@ class TestAppointments(unittest.TestCase):
         # 停止补丁
         self.data_file_patcher.stop()
         # 测试后清理测试数据文件
-        if os.path.exists(self.test_data_file):
-            os.remove(self.test_data_file)
+        for path in (self.test_data_file, changes_path_for(self.test_data_file)):
+            if os.path.exists(path):
+                os.remove(path)
         if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
             os.rmdir(self.test_data_dir)
 
@@ -58,6 +64,14 @@ class TestAppointments(unittest.TestCase):
         self.assertEqual(data[0]["title"], "Test Event")
         self.assertEqual(data[0]["id"], added_appt["id"])
 
+        # 字段无效时不写入，错误信息与批量新增相同
+        for date, time, error in ((None, "10:00", "Missing fields: date"),
+                                  ("tomorrow", "10:00", "Invalid date format, expected YYYY-MM-DD"),
+                                  ("2024-01-01", "x", "Invalid time format, expected HH:MM")):
+            with self.assertRaisesRegex(ValueError, error):
+                appointments.add_appointment("Bad", date, time)
+        self.assertEqual(len(appointments.load_appointments()), 1)
+
     def test_get_appointments_on_date(self):
         # 添加几条约会
         appt1 = appointments.add_appointment("Event 1", "2024-01-01", "10:00")
@@ -79,6 +93,136 @@ class TestAppointments(unittest.TestCase):
         on_date_03 = appointments.get_appointments_on_date("2024-01-03")
         self.assertEqual(len(on_date_03), 0)
 
+    def test_get_appointments_between(self):
+        appt1 = appointments.add_appointment("Event 1", "2024-01-03", "10:00")
+        appt2 = appointments.add_appointment("Event 2", "2024-01-01", "11:00")
+        appt3 = appointments.add_appointment("Event 3", "2024-01-07", "12:00")
+        appointments.add_appointment("Event 4", "2024-01-08", "09:00")
+
+        # 闭区间，结果按日期排序
+        week = appointments.get_appointments_between("2024-01-01", "2024-01-07")
+        self.assertEqual([a["id"] for a in week], [appt2["id"], appt1["id"], appt3["id"]])
+
+        # 区间内无约会
+        self.assertEqual(appointments.get_appointments_between("2024-02-01", "2024-02-29"), [])
+
+        # 只给出下界
+        self.assertEqual(len(appointments.get_appointments_between("2024-01-07", None)), 2)
+
+    def test_date_index_follows_updates(self):
+        appt = appointments.add_appointment("Movable", "2024-01-01", "10:00")
+        appointments.current_store().update(appt["id"], {"date": "2024-01-05"})
+
+        self.assertEqual(appointments.get_appointments_on_date("2024-01-01"), [])
+        moved = appointments.get_appointments_on_date("2024-01-05")
+        self.assertEqual([a["id"] for a in moved], [appt["id"]])
+
+    def test_get_update_delete_by_id(self):
+        appt = appointments.add_appointment("Single", "2024-02-01", "10:00")
+        other = appointments.add_appointment("Other", "2024-02-01", "11:00")
+        # 按 ID 读取走索引，不会重新加载或全量扫描
+        with patch.object(appointments.current_store(), 'all', side_effect=AssertionError("full scan")):
+            self.assertEqual(appointments.get_appointment(appt["id"]), appt)
+            self.assertIsNone(appointments.get_appointment("missing"))
+
+        updated = appointments.update_appointment(appt["id"], {"date": "2024-02-03", "reminder_time": "2024-02-03 09:00"})
+        self.assertEqual((updated["date"], updated["reminder_set"]), ("2024-02-03", True))
+        self.assertEqual([a["id"] for a in appointments.get_appointments_on_date("2024-02-03")], [appt["id"]])
+        cleared = appointments.update_appointment(appt["id"], {"reminder_time": ""})
+        self.assertFalse(cleared["reminder_set"])
+        self.assertIsNone(appointments.update_appointment("missing", {"title": "x"}))
+        for changes in ({}, {"id": "x"}, {"time": "25:00"}, {"title": ""}, {"reminder_time": "tomorrow"}):
+            with self.assertRaises(ValueError):
+                appointments.update_appointment(appt["id"], changes)
+
+        # 按身份移除记录，不与排在前面的记录逐条调用 Appointment.__eq__
+        last = appointments.add_appointment("Last", "2024-02-05", "10:00")
+        appointments.add_appointment("After", "2024-02-05", "11:00")
+        with patch.object(Appointment, '__eq__', side_effect=AssertionError("compared by value")):
+            self.assertTrue(appointments.delete_appointment(last["id"]))
+        self.assertEqual([a["title"] for a in appointments.get_appointments_on_date("2024-02-05")], ["After"])
+        appointments.delete_appointment(appointments.get_appointments_on_date("2024-02-05")[0]["id"])
+
+        self.assertTrue(appointments.delete_appointment(appt["id"]))
+        self.assertFalse(appointments.delete_appointment(appt["id"]))
+        self.assertIsNone(appointments.get_appointment(appt["id"]))
+        self.assertEqual(appointments.get_appointments_on_date("2024-02-03"), [])
+        with open(self.test_data_file, 'r') as f:
+            self.assertEqual([a["id"] for a in json.load(f)], [other["id"]])
+
+    def test_add_appointments_batch(self):
+        items = [
+            {"title": "Batch 1", "date": "2024-04-01", "time": "09:00", "location": "Room"},
+            {"title": "Missing time", "date": "2024-04-01"},
+            {"title": "Bad date", "date": "2024/04/02", "time": "10:00"},
+            "not an object",
+            {"title": "Batch 2", "date": "2024-04-02", "time": "11:30"},
+        ]
+        original_write_all = JsonFileEngine.write_all
+        with patch.object(JsonFileEngine, 'write_all', autospec=True, side_effect=original_write_all) as write_all:
+            results = appointments.add_appointments(items)
+        # 整批只写盘一次
+        self.assertEqual(write_all.call_count, 1)
+
+        self.assertEqual([r["status"] for r in results], ["created", "error", "error", "error", "created"])
+        self.assertEqual(results[1]["error"], "Missing fields: time")
+        self.assertEqual(results[0]["appointment"]["location"], "Room")
+
+        with open(self.test_data_file, 'r') as f:
+            saved = json.load(f)
+        self.assertEqual([a["title"] for a in saved], ["Batch 1", "Batch 2"])
+        self.assertEqual([a["id"] for a in saved], [results[0]["appointment"]["id"], results[4]["appointment"]["id"]])
+
+    def test_pagination_is_stable_and_complete(self):
+        appointments.add_appointments([
+            {"title": f"Event {i}", "date": f"2024-01-0{1 + i % 3}", "time": f"{10 + i % 4}:00"}
+            for i in range(11)
+        ])
+        expected = sorted(appointments.load_appointments(), key=lambda a: (a["date"], a["time"], a["id"]))
+
+        pages, cursor = [], None
+        while True:
+            items, cursor = appointments.get_appointments_page(4, cursor)
+            pages.append(items)
+            if cursor is None:
+                break
+        self.assertEqual([len(p) for p in pages], [4, 4, 3])
+        self.assertEqual([a["id"] for p in pages for a in p], [a["id"] for a in expected])
+
+        streamed = list(appointments.iter_appointments(batch_size=3))
+        self.assertEqual([a["id"] for a in streamed], [a["id"] for a in expected])
+
+    def test_paging_includes_records_without_string_dates(self):
+        records = [
+            {"id": f"r{i}", "title": f"Event {i}", "date": date, "time": "09:00", "description": "",
+             "reminder_set": False, "reminder_time": "", "location": ""}
+            for i, date in enumerate(["2024-03-02", None, "2024-03-01", None, "2024-03-02", None])
+        ]
+        records.append({"id": "weekly", "title": "Weekly", "date": "2024-03-01", "time": "08:00",
+                        "recurrence": {"freq": "weekly"}})
+        expected = [appt["id"] for appt in sorted(records, key=order_key)]
+        db_file, snapshot_file = sqlite_path_for(self.test_data_file), snapshot_path_for(self.test_data_file)
+        for mode in ("json", "journal", "sqlite", "sharded", "snapshot"):
+            with self.subTest(mode=mode), patch('calendar_reminder_service.src.appointments.STORAGE_MODE', mode):
+                try:
+                    appointments.save_appointments(records)
+                    for batch_size in (1, 2, 4):
+                        self.assertEqual([a["id"] for a in appointments.iter_appointments(batch_size=batch_size)],
+                                         expected)
+                    items, cursor = appointments.get_appointments_page(2)
+                    while cursor is not None:
+                        page, cursor = appointments.get_appointments_page(2, cursor)
+                        items.extend(page)
+                    self.assertEqual([a["id"] for a in items], expected)
+                    self.assertEqual(sorted(a["id"] for a in appointments.load_appointments()), sorted(expected))
+                finally:
+                    appointments.current_store().close()
+                    for path in (self.test_data_file + ".journal", db_file, db_file + "-wal", db_file + "-shm",
+                                 snapshot_file, changes_path_for(snapshot_file)):
+                        if os.path.exists(path):
+                            os.remove(path)
+                    shutil.rmtree(shard_dir_for(self.test_data_file), ignore_errors=True)
+
     def test_load_appointments(self):
         # 1. 测试从不存在的文件加载
         #    setUp 会创建空文件，因此此处先删除再加载
@@ -0,0 +1,181 @@
+import unittest
+import os
+import io
+import gzip
+import json
+import shutil
+from contextlib import redirect_stdout
+from datetime import date
+from unittest.mock import patch
+
+from calendar_reminder_service.src import appointments
+from calendar_reminder_service.src import archive
+from calendar_reminder_service.src.app import main
+from calendar_reminder_service.src.changes import changes_path_for
+from calendar_reminder_service.src.repository import shard_dir_for, sqlite_path_for
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.test_data_file = os.path.join(self.test_data_dir, "test_archive_appointments.json")
+        self.archive_dir = archive.archive_dir_for(self.test_data_file)
+        self.data_file_patcher = patch('calendar_reminder_service.src.appointments.DATA_FILE', self.test_data_file)
+        self.data_file_patcher.start()
+
+    def tearDown(self):
+        self.data_file_patcher.stop()
+        db_file = sqlite_path_for(self.test_data_file)
+        for path in (self.test_data_file, self.test_data_file + ".journal", changes_path_for(self.test_data_file),
+                     db_file, db_file + "-wal", db_file + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(shard_dir_for(self.test_data_file), ignore_errors=True)
+        shutil.rmtree(self.archive_dir, ignore_errors=True)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def test_archive_cutoff(self):
+        self.assertEqual(archive.archive_cutoff(30, today=date(2025, 3, 1)), "2025-01-30")
+        with self.assertRaises(ValueError):
+            archive.archive_cutoff(-1)
+
+    def _check_mode(self):
+        old = [result["appointment"] for result in appointments.add_appointments([
+            {"title": "Old 2023", "date": "2023-12-31", "time": "09:00"},
+            {"title": "Old 2024", "date": "2024-06-03", "time": "10:00"},
+            {"title": "Same day", "date": "2024-06-03", "time": "08:00"},
+        ])]
+        current = appointments.add_appointment("Current", "2025-01-10", "09:00")
+        series = appointments.add_appointment("Weekly", "2024-05-27", "12:00", recurrence={"freq": "weekly"})
+
+        report = appointments.archive_appointments("2025-01-01")
+        self.assertEqual((report["archived"], report["years"]), (3, {"2023": 1, "2024": 2}))
+        self.assertEqual(archive.archived_years(self.archive_dir), ["2023", "2024"])
+        with gzip.open(archive.archive_path(self.archive_dir, "2024"), "rt", encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["title"] for line in f], ["Old 2024", "Same day"])
+
+        # 热存储只保留当前与未来的约会（以及不归档的重复约会）
+        self.assertEqual(sorted(a["id"] for a in appointments.load_appointments()),
+                         sorted([current["id"], series["id"]]))
+        self.assertIsNone(appointments.get_appointment(old[0]["id"]))
+        self.assertEqual([a["title"] for a in appointments.get_appointments_on_date("2024-06-03")], ["Weekly"])
+
+        # include_archived 时按需读取归档文件
+        on_date = appointments.get_appointments_on_date("2024-06-03", include_archived=True)
+        self.assertEqual([a["title"] for a in on_date], ["Old 2024", "Same day", "Weekly"])
+        self.assertEqual(on_date[1], old[2])
+        between = appointments.get_appointments_between("2023-12-25", "2024-01-05", include_archived=True)
+        self.assertEqual([(a["title"], a["date"]) for a in between],
+                         [("Old 2023", "2023-12-31")])
+        between = appointments.get_appointments_between("2024-12-30", "2025-01-10", include_archived=True)
+        self.assertEqual([a["title"] for a in between], ["Weekly", "Weekly", "Current"])
+        self.assertEqual(appointments.get_appointments_between("2023-12-25", "2024-01-05"), [])
+
+        # 再次归档只追加新过期的约会，已归档的按 ID 去重
+        late = appointments.add_appointment("Late 2024", "2024-12-31", "18:00")
+        report = appointments.archive_appointments("2025-01-01")
+        self.assertEqual((report["archived"], report["years"]), (1, {"2024": 1}))
+        titles = [a["title"] for a in appointments.get_appointments_between("2024-01-01", "2024-12-31", True)
+                  if a["id"] != series["id"]]
+        self.assertEqual(titles, ["Old 2024", "Same day", "Late 2024"])
+        self.assertEqual(appointments.archive_appointments("2025-01-01")["archived"], 0)
+        self.assertIsNone(appointments.get_appointment(late["id"]))
+
+        with self.assertRaises(ValueError):
+            appointments.archive_appointments("2025/01/01")
+
+    def test_json_store(self):
+        self._check_mode()
+
+    def test_journal_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'journal'):
+            self._check_mode()
+
+    def test_sqlite_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'sqlite'):
+            try:
+                self._check_mode()
+            finally:
+                appointments.current_store().close()
+
+    def test_sharded_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'sharded'):
+            try:
+                self._check_mode()
+            finally:
+                appointments.current_store().close()
+
+    def test_delete_many(self):
+        for mode in ("json", "journal", "sqlite", "sharded"):
+            with self.subTest(mode=mode), patch('calendar_reminder_service.src.appointments.STORAGE_MODE', mode):
+                store = appointments.current_store()
+                try:
+                    added = [result["appointment"] for result in appointments.add_appointments([
+                        {"title": f"Event {i}", "date": f"2024-0{1 + i % 3}-01", "time": "09:00"} for i in range(6)
+                    ])]
+                    ids = [added[0]["id"], "missing", added[3]["id"], added[0]["id"], added[4]["id"]]
+                    self.assertEqual(store.delete_many(ids), [True, False, True, False, True])
+                    self.assertEqual(sorted(a["id"] for a in store.all()),
+                                     sorted(added[i]["id"] for i in (1, 2, 5)))
+                    self.assertEqual([a["title"] for a in store.on_date("2024-01-01")], [])
+                    appointments.save_appointments([])
+                finally:
+                    store.close()
+
+    def test_archive_keeps_records_changed_during_archiving(self):
+        for mode in ("json", "journal", "sqlite", "sharded"):
+            with self.subTest(mode=mode), patch('calendar_reminder_service.src.appointments.STORAGE_MODE', mode):
+                store = appointments.current_store()
+                try:
+                    kept, moved, renamed, removed = [result["appointment"] for result in appointments.add_appointments([
+                        {"title": title, "date": "2024-06-03", "time": "09:00"}
+                        for title in ("Kept", "Moved", "Renamed", "Removed")
+                    ])]
+                    write = archive.write_archive_file
+                    edits = [
+                        lambda: appointments.update_appointment(moved["id"], {"date": "2025-03-01"}),
+                        lambda: appointments.update_appointment(renamed["id"], {"title": "Renamed later"}),
+                        lambda: appointments.delete_appointment(removed["id"]),
+                    ]
+
+                    def write_then_edit(path, records):
+                        # 归档文件写入之后、删除之前有其他请求修改了约会
+                        write(path, records)
+                        while edits:
+                            edits.pop(0)()
+
+                    with patch.object(archive, "write_archive_file", write_then_edit):
+                        report = appointments.archive_appointments("2025-01-01")
+                    self.assertEqual((report["archived"], report["years"]), (1, {"2024": 1}))
+                    self.assertIsNone(appointments.get_appointment(kept["id"]))
+                    self.assertEqual(appointments.get_appointment(moved["id"])["date"], "2025-03-01")
+                    self.assertEqual(appointments.get_appointment(renamed["id"])["title"], "Renamed later")
+                    self.assertIsNone(appointments.get_appointment(removed["id"]))
+                    # 被修改或删除的约会不留在归档文件中
+                    self.assertEqual([a["id"] for a in archive.archived_between(self.archive_dir)], [kept["id"]])
+
+                    # 下次归档按最新内容处理仍然过期的约会
+                    self.assertEqual(appointments.archive_appointments("2025-01-01")["archived"], 1)
+                    self.assertEqual([a["title"] for a in archive.archived_between(self.archive_dir)],
+                                     ["Kept", "Renamed later"])
+                    appointments.save_appointments([])
+                    shutil.rmtree(self.archive_dir, ignore_errors=True)
+                finally:
+                    store.close()
+
+    def test_cli_archive(self):
+        appointments.add_appointment("Ancient", "2020-01-01", "09:00")
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(main(["archive", "--before", "2021-01-01"]), 0)
+        report = json.loads(out.getvalue())
+        self.assertEqual((report["archived"], list(report["files"])), (1, ["2020"]))
+        self.assertEqual(main(["archive", "--days", "-5"]), 2)
+        self.assertEqual(appointments.load_appointments(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import unittest
+import os
+import json
+import asyncio
+import threading
+import http.client
+from datetime import datetime
+from unittest.mock import patch
+
+from calendar_reminder_service.src import appointments
+from calendar_reminder_service.src import dispatcher
+from calendar_reminder_service.src import reminders
+from calendar_reminder_service.src.async_server import AsyncAPIServer
+from calendar_reminder_service.src.changes import changes_path_for
+from calendar_reminder_service.src.interprocess import lock_path_for
+from calendar_reminder_service.src.marks import marks_path_for
+
+class TestAsyncAPIServer(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.test_data_file = os.path.join(self.test_data_dir, "test_async_appointments.json")
+
+        self.data_file_patcher = patch('calendar_reminder_service.src.appointments.DATA_FILE', self.test_data_file)
+        self.data_file_patcher.start()
+        appointments.save_appointments([])
+
+        # 在独立线程的事件循环中运行服务器
+        self.loop = asyncio.new_event_loop()
+        self.server = AsyncAPIServer('127.0.0.1', 0)
+        started = threading.Event()
+
+        def serve():
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self.server.start())
+            started.set()
+            self.loop.run_forever()
+
+        self.loop_thread = threading.Thread(target=serve, daemon=True)
+        self.loop_thread.start()
+        started.wait(5)
+        self.port = self.server.port
+
+    def tearDown(self):
+        # 结束仍在进行的 SSE 订阅
+        dispatcher.BROKER.close()
+        asyncio.run_coroutine_threadsafe(self.server.shutdown(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join(5)
+        self.loop.close()
+        self.data_file_patcher.stop()
+        for path in (self.test_data_file, changes_path_for(self.test_data_file),
+                     reminders.watermark_path_for(self.test_data_file), marks_path_for(self.test_data_file),
+                     lock_path_for(marks_path_for(self.test_data_file))):
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def _request(self, conn, method, path, body=None):
+        payload = json.dumps(body) if body is not None else None
+        conn.request(method, path, body=payload)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_routes_match_threaded_server(self):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            status, appt = self._request(conn, "POST", "/api/appointments",
+                                         {"title": "Async", "date": "2025-01-02", "time": "15:00"})
+            self.assertEqual(status, 201)
+            status, data = self._request(conn, "POST", "/api/reminders",
+                                         {"appointment_id": appt["id"], "reminder_time": "2025-01-02 14:00"})
+            self.assertEqual((status, data), (200, {"status": "ok"}))
+            status, data = self._request(conn, "GET", "/api/appointments?date=2025-01-02")
+            self.assertEqual([a["id"] for a in data], [appt["id"]])
+            self.assertTrue(data[0]["reminder_set"])
+            status, data = self._request(conn, "GET", "/api/reminders/due")
+            self.assertEqual(status, 200)
+            status, data = self._request(conn, "PATCH", f"/api/appointments/{appt['id']}", {"title": "Renamed"})
+            self.assertEqual((status, data["title"]), (200, "Renamed"))
+            status, data = self._request(conn, "GET", f"/api/appointments/{appt['id']}")
+            self.assertEqual((status, data["title"]), (200, "Renamed"))
+            conn.request("GET", "/api/appointments?stream=1")
+            response = conn.getresponse()
+            self.assertEqual(response.getheader("Transfer-Encoding"), "chunked")
+            self.assertEqual([json.loads(line)["id"] for line in response.read().splitlines()], [appt["id"]])
+            status, _ = self._request(conn, "GET", "/api/unknown")
+            self.assertEqual(status, 404)
+            status, data = self._request(conn, "POST", "/api/appointments", {"title": "No date"})
+            self.assertEqual((status, data), (400, {"error": "Missing fields: date, time"}))
+            status, data = self._request(conn, "POST", "/api/appointments",
+                                         {"title": "Word", "date": "tomorrow", "time": "15:00"})
+            self.assertEqual((status, data), (400, {"error": "Invalid date format, expected YYYY-MM-DD"}))
+        finally:
+            conn.close()
+
+    def test_many_concurrent_keep_alive_clients(self):
+        appointments.add_appointment("Shared", "2025-02-01", "10:00")
+
+        async def client():
+            reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+            statuses = []
+            for _ in range(2):
+                writer.write(b"GET /api/appointments?date=2025-02-01 HTTP/1.1\r\nHost: test\r\n\r\n")
+                await writer.drain()
+                status_line = await reader.readline()
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line == b"\r\n":
+                        break
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                body = json.loads(await reader.readexactly(length))
+                statuses.append((int(status_line.split()[1]), len(body)))
+                # 在连接上保持空闲，模拟长时间打开的面板
+                await asyncio.sleep(0.05)
+            writer.close()
+            return statuses
+
+        async def main():
+            return await asyncio.gather(*(client() for _ in range(300)))
+
+        results = asyncio.run(main())
+        self.assertEqual(len(results), 300)
+        self.assertTrue(all(r == [(200, 1), (200, 1)] for r in results))
+
+    def test_reminder_event_stream_does_not_hold_executor_threads(self):
+        appt = appointments.add_appointment("Push", "2025-07-01", "10:00")
+        # 订阅连接多于线程池线程数，普通请求仍能得到响应
+        streams = []
+        try:
+            for _ in range(6):
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+                conn.request("GET", "/api/reminders/stream")
+                response = conn.getresponse()
+                self.assertEqual(response.readline(), b": connected\n")
+                response.readline()
+                streams.append((conn, response))
+            conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+            status, _ = self._request(conn, "GET", "/api/appointments")
+            conn.close()
+            self.assertEqual(status, 200)
+
+            appointments.current_store().update(appt["id"], {"reminder_set": True, "reminder_time": "2025-07-01 09:00"})
+            dispatcher.ReminderDispatcher(dispatcher.BROKER, now_func=lambda: datetime(2025, 7, 1, 9, 0)).run_once()
+            for _, response in streams:
+                self.assertEqual(response.readline(), b"id: %d\n" % dispatcher.BROKER.published)
+                self.assertEqual(response.readline(), b"event: reminder\n")
+                data = json.loads(response.readline().decode("utf-8")[len("data: "):])
+                self.assertEqual(data["appointment"]["id"], appt["id"])
+        finally:
+            for conn, _ in streams:
+                conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import os
+import io
+import json
+from contextlib import redirect_stderr, redirect_stdout
+from unittest.mock import patch
+
+from calendar_reminder_service.src import appointments
+from calendar_reminder_service.src import bulk
+from calendar_reminder_service.src.app import main
+from calendar_reminder_service.src.changes import changes_path_for
+
+
+def ndjson(*rows):
+    return io.StringIO("".join(json.dumps(row) + "\n" for row in rows))
+
+
+class TestBulkImportExport(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.test_data_file = os.path.join(self.test_data_dir, "test_bulk_appointments.json")
+        self.test_export_file = os.path.join(self.test_data_dir, "test_bulk_export.csv")
+        self.data_file_patcher = patch('calendar_reminder_service.src.appointments.DATA_FILE', self.test_data_file)
+        self.data_file_patcher.start()
+        appointments.save_appointments([])
+
+    def tearDown(self):
+        self.data_file_patcher.stop()
+        for path in (self.test_data_file, changes_path_for(self.test_data_file), self.test_export_file):
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def test_import_validates_rows_and_saves_once_per_batch(self):
+        source = io.StringIO(
+            json.dumps({"id": "a", "title": "A", "date": "2025-03-01", "time": "09:00",
+                        "reminder_time": "2025-03-01 08:30"}) + "\n"
+            "\n"
+            "not json\n"
+            + json.dumps({"title": "Bad date", "date": "2025-02-30", "time": "09:00"}) + "\n"
+            + json.dumps({"title": "Bad time", "date": "2025-03-01", "time": "9am"}) + "\n"
+            + json.dumps({"id": "a", "title": "Again", "date": "2025-03-02", "time": "09:00"}) + "\n"
+            + "".join(json.dumps({"title": f"T{i}", "date": "2025-03-02", "time": "10:00"}) + "\n"
+                      for i in range(4))
+        )
+        store = appointments.current_store()
+        with patch.object(store, "add_many", wraps=store.add_many) as add_many:
+            report = bulk.import_appointments(source, "ndjson", batch_size=2)
+        self.assertEqual((report["read"], report["imported"], report["failed"], report["batches"]), (9, 5, 4, 3))
+        self.assertEqual(add_many.call_count, 3)
+        self.assertEqual([error["line"] for error in report["errors"]], [3, 4, 5, 6])
+        self.assertIn("Duplicate id", report["errors"][-1]["error"])
+        self.assertGreater(report["rows_per_second"], 0)
+
+        imported = appointments.get_appointment("a")
+        self.assertTrue(imported["reminder_set"])
+        self.assertEqual(imported["reminder_time"], "2025-03-01 08:30")
+        self.assertEqual(len(appointments.get_appointments_on_date("2025-03-02")), 4)
+
+    def test_csv_round_trip_keeps_recurrence(self):
+        appointments.add_appointment("Standup", "2025-01-06", "09:00", location="Room, 1",
+                                     recurrence={"freq": "weekly", "count": 3})
+        appointments.add_appointment("Dentist", "2025-01-07", "08:00", description="多行\n描述")
+        before = appointments.load_appointments()
+
+        with open(self.test_export_file, "w", encoding="utf-8", newline="") as f:
+            self.assertEqual(bulk.export_appointments(f, "csv", batch_size=1)["exported"], 2)
+        appointments.save_appointments([])
+        with open(self.test_export_file, encoding="utf-8", newline="") as f:
+            report = bulk.import_appointments(f, "csv")
+        self.assertEqual((report["imported"], report["failed"]), (2, 0))
+        self.assertEqual(sorted(appointments.load_appointments(), key=lambda a: a["id"]),
+                         sorted(before, key=lambda a: a["id"]))
+        self.assertEqual(len(appointments.get_appointments_between("2025-01-06", "2025-01-31")), 4)
+
+    def test_export_and_stats_include_records_without_dates(self):
+        records = [
+            {"id": "dated", "title": "Dated", "date": "2025-02-01", "time": "09:00", "description": "",
+             "reminder_set": False, "reminder_time": "", "location": ""},
+            {"id": "undated", "title": "Undated", "date": None, "time": "09:00", "description": "",
+             "reminder_set": False, "reminder_time": "", "location": ""},
+        ]
+        with open(self.test_data_file, "w") as f:
+            json.dump(records, f)
+
+        out = io.StringIO()
+        self.assertEqual(bulk.export_appointments(out, "ndjson", batch_size=1)["exported"], 2)
+        self.assertEqual(sorted(json.loads(line)["id"] for line in out.getvalue().splitlines()), ["dated", "undated"])
+        stats = bulk.storage_stats(batch_size=1)
+        self.assertEqual((stats["appointments"], stats["first_date"], stats["last_date"]), (2, "2025-02-01", "2025-02-01"))
+
+    def test_cli_export_import_and_stats(self):
+        appointments.add_appointment("Review", "2025-05-01", "15:00")
+        out, err = io.StringIO(), io.StringIO()
+        with redirect_stdout(out), redirect_stderr(err):
+            self.assertEqual(main(["export", "-", "--format", "ndjson"]), 0)
+        exported = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([appt["title"] for appt in exported], ["Review"])
+        self.assertIn("rows/s", err.getvalue())
+
+        appointments.save_appointments([])
+        with patch("sys.stdin", ndjson(*exported, {"title": "", "date": "2025-05-01", "time": "15:00"})), \
+                redirect_stderr(err):
+            self.assertEqual(main(["import", "-", "--batch-size", "10"]), 1)
+        self.assertIn("line 2: Missing fields: title", err.getvalue())
+
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(main(["stats"]), 0)
+        stats = json.loads(out.getvalue())
+        self.assertEqual((stats["appointments"], stats["first_date"], stats["last_date"]), (1, "2025-05-01", "2025-05-01"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import unittest
+import os
+import shutil
+from unittest.mock import patch
+
+from calendar_reminder_service.src import appointments
+from calendar_reminder_service.src import reminders
+from calendar_reminder_service.src.changes import ADD, DELETE, UPDATE, ChangeLog, ResyncRequired, change, changes_path_for
+from calendar_reminder_service.src.repository import shard_dir_for, sqlite_path_for
+
+
+class TestChangeLog(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.log_file = os.path.join(self.test_data_dir, "test_changes.json.changes")
+
+    def tearDown(self):
+        if os.path.exists(self.log_file):
+            os.remove(self.log_file)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def test_sequence_trimming_and_resync(self):
+        log = ChangeLog(self.log_file, capacity=3)
+        # 没有日志文件时已有数据没有变更记录，序号 0 需要全量同步
+        with self.assertRaises(ResyncRequired) as ctx:
+            log.since(0, 10)
+        self.assertEqual(ctx.exception.seq, 1)
+        self.assertEqual(log.since(1, 10), {"seq": 1, "changes": [], "more": False})
+
+        self.assertEqual(log.append([change(ADD, "a", {"id": "a"}), change(ADD, "b", {"id": "b"})]), 3)
+        self.assertEqual(log.append([change(DELETE, "a")]), 4)
+        delta = log.since(1, 2)
+        self.assertEqual([(c["seq"], c["op"], c["id"]) for c in delta["changes"]], [(2, ADD, "a"), (3, ADD, "b")])
+        self.assertEqual((delta["seq"], delta["more"]), (3, True))
+        self.assertEqual(log.since(3, 2)["changes"], [{"seq": 4, "op": DELETE, "id": "a"}])
+
+        # 超过容量的两倍（6 条）后裁剪回最近 3 条
+        log.append([change(UPDATE, "b", {"id": "b", "title": str(i)}) for i in range(4)])
+        self.assertEqual(log.last, 8)
+        with self.assertRaises(ResyncRequired):
+            log.since(4, 10)
+        self.assertEqual([c["seq"] for c in log.since(5, 10)["changes"]], [6, 7, 8])
+        # 客户端的序号比最新序号还大（来自另一份日志）
+        with self.assertRaises(ResyncRequired):
+            log.since(9, 10)
+
+        # 其他实例（进程）读取同一个文件，序号延续
+        other = ChangeLog(self.log_file, capacity=3)
+        self.assertEqual(other.since(7, 10)["changes"][0]["appointment"], {"id": "b", "title": "3"})
+        self.assertEqual(other.reset(), 9)
+        with self.assertRaises(ResyncRequired) as ctx:
+            log.since(8, 10)
+        self.assertEqual(ctx.exception.seq, 9)
+        self.assertEqual(log.append([change(ADD, "c", {"id": "c"})]), 10)
+
+
+class TestAppointmentChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.test_data_file = os.path.join(self.test_data_dir, "test_changes_appointments.json")
+        self.data_file_patcher = patch('calendar_reminder_service.src.appointments.DATA_FILE', self.test_data_file)
+        self.data_file_patcher.start()
+
+    def tearDown(self):
+        self.data_file_patcher.stop()
+        db_file = sqlite_path_for(self.test_data_file)
+        for path in (self.test_data_file, self.test_data_file + ".journal", changes_path_for(self.test_data_file),
+                     db_file, db_file + "-wal", db_file + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(shard_dir_for(self.test_data_file), ignore_errors=True)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def _check_mode(self):
+        appointments.save_appointments([])
+        # 整体替换后的序号即全量同步的起点
+        with self.assertRaises(ResyncRequired) as ctx:
+            appointments.get_changes_since(0)
+        start = ctx.exception.seq
+        self.assertEqual(appointments.get_changes_since(start), {"seq": start, "changes": [], "more": False})
+
+        first = appointments.add_appointment("First", "2025-03-01", "09:00")
+        appointments.add_appointments([{"title": "Second", "date": "2025-04-01", "time": "10:00"}])
+        self.assertTrue(reminders.set_reminder(first["id"], "2025-03-01 08:30"))
+        self.assertTrue(appointments.delete_appointment(first["id"]))
+        # 未找到的约会不产生变更
+        self.assertIsNone(appointments.update_appointment("missing", {"title": "x"}))
+
+        delta = appointments.get_changes_since(start)
+        self.assertEqual([(c["seq"] - start, c["op"]) for c in delta["changes"]],
+                         [(1, ADD), (2, ADD), (3, UPDATE), (4, DELETE)])
+        self.assertEqual(delta["changes"][2]["appointment"]["reminder_time"], "2025-03-01 08:30")
+        self.assertNotIn("appointment", delta["changes"][3])
+        self.assertEqual((delta["seq"], delta["more"]), (start + 4, False))
+        self.assertEqual([c["op"] for c in appointments.get_changes_since(start + 2, limit=1)["changes"]], [UPDATE])
+
+        appointments.save_appointments([])
+        with self.assertRaises(ResyncRequired) as ctx:
+            appointments.get_changes_since(start + 4)
+        self.assertEqual(ctx.exception.seq, start + 5)
+
+    def test_json_store(self):
+        self._check_mode()
+
+    def test_journal_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'journal'):
+            self._check_mode()
+
+    def test_sqlite_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'sqlite'):
+            try:
+                self._check_mode()
+            finally:
+                appointments.current_store().close()
+
+    def test_sharded_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'sharded'):
+            try:
+                self._check_mode()
+            finally:
+                appointments.current_store().close()
+
+    def test_sqlite_trims_to_capacity(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'sqlite'):
+            store = appointments.current_store()
+            try:
+                appointments.save_appointments([])
+                with patch.object(store, "change_log_capacity", 2):
+                    for i in range(5):
+                        appointments.add_appointment(f"A{i}", "2025-03-01", "09:00")
+                with self.assertRaises(ResyncRequired) as ctx:
+                    appointments.get_changes_since(0)
+                last = ctx.exception.seq
+                self.assertEqual(len(appointments.get_changes_since(last - 2)["changes"]), 2)
+                with self.assertRaises(ResyncRequired):
+                    appointments.get_changes_since(last - 3)
+            finally:
+                store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
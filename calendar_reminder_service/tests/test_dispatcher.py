@@ -0,0 +1,141 @@
+import unittest
+import os
+import json
+import queue
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from calendar_reminder_service.src import appointments
+from calendar_reminder_service.src import reminders
+from calendar_reminder_service.src.calendar_utils import parse_datetime_seconds
+from calendar_reminder_service.src.changes import changes_path_for
+from calendar_reminder_service.src.dispatcher import (
+    ReminderBroker, ReminderDispatcher, event_stream, format_sse,
+)
+from calendar_reminder_service.src.interprocess import lock_path_for
+from calendar_reminder_service.src.marks import DELIVERED, marks_path_for
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestReminderDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.test_data_file = os.path.join(self.test_data_dir, "test_dispatcher_appointments.json")
+
+        self.data_file_patcher = patch('calendar_reminder_service.src.appointments.DATA_FILE', self.test_data_file)
+        self.data_file_patcher.start()
+        appointments.save_appointments([])
+
+        self.broker = ReminderBroker()
+        self.events = queue.Queue()
+        self.broker.subscribe(self.events.put)
+
+    def tearDown(self):
+        self.data_file_patcher.stop()
+        marks_file = marks_path_for(self.test_data_file)
+        for path in (self.test_data_file, changes_path_for(self.test_data_file), marks_file, lock_path_for(marks_file)):
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def test_run_once_delivers_each_reminder_once(self):
+        appt = appointments.add_appointment("Standup", "2025-07-01", "10:00")
+        reminders.set_reminder(appt["id"], "2025-07-01 09:00")
+        clock = FakeClock(datetime(2025, 7, 1, 8, 30))
+        dispatcher = ReminderDispatcher(self.broker, now_func=clock)
+
+        self.assertEqual(dispatcher.run_once(), [])
+        self.assertEqual(dispatcher.next_reminder, parse_datetime_seconds("2025-07-01 09:00"))
+
+        clock.now = datetime(2025, 7, 1, 9, 0, 2)
+        events = dispatcher.run_once()
+        self.assertEqual([e["appointment"]["id"] for e in events], [appt["id"]])
+        self.assertEqual(events[0]["latency_ms"], 2000.0)
+        self.assertEqual(self.events.get_nowait()["id"], events[0]["id"])
+        # 推送标记保存在提醒标记文件中，约会记录不变
+        self.assertEqual(reminders.current_marks().markers(DELIVERED), {appt["id"]: "2025-07-01 09:00"})
+        self.assertNotIn("delivered_reminder_time", appointments.load_appointments()[0])
+        self.assertIsNone(dispatcher.next_reminder)
+
+        # 已推送的提醒不会再次推送（包括新的分发线程实例，即服务重启后）
+        self.assertEqual(dispatcher.run_once(), [])
+        self.assertEqual(ReminderDispatcher(self.broker, now_func=clock).run_once(), [])
+
+        # 重新设置提醒时间后再次推送
+        reminders.set_reminder(appt["id"], "2025-07-01 09:30")
+        clock.now = datetime(2025, 7, 1, 9, 30)
+        self.assertEqual(len(dispatcher.run_once()), 1)
+        stats = dispatcher.stats()
+        self.assertEqual(stats["fired"], 2)
+        self.assertEqual(stats["latency_ms"]["max"], 2000.0)
+
+    def test_recurring_reminder_delivered_per_occurrence(self):
+        appt = appointments.add_appointment("Weekly", "2025-07-07", "10:00", recurrence={"freq": "weekly"})
+        reminders.set_reminder(appt["id"], "2025-07-07 09:00")
+        clock = FakeClock(datetime(2025, 7, 14, 9, 1))
+        dispatcher = ReminderDispatcher(self.broker, now_func=clock)
+
+        events = dispatcher.run_once()
+        self.assertEqual([(e["appointment"]["date"], e["reminder_time"]) for e in events],
+                         [("2025-07-14", "2025-07-14 09:00")])
+        self.assertEqual(dispatcher.next_reminder, parse_datetime_seconds("2025-07-21 09:00"))
+        self.assertEqual(dispatcher.run_once(), [])
+
+        clock.now = datetime(2025, 7, 21, 9, 0)
+        self.assertEqual([e["appointment"]["date"] for e in dispatcher.run_once()], ["2025-07-21"])
+        # 系列只保存一条，标记为最近推送的提醒时间
+        self.assertEqual(len(appointments.load_appointments()), 1)
+        self.assertEqual(reminders.current_marks().markers(DELIVERED), {appt["id"]: "2025-07-21 09:00"})
+
+    def test_per_process_delivery_does_not_write_markers(self):
+        appt = appointments.add_appointment("Standup", "2025-07-01", "10:00")
+        reminders.set_reminder(appt["id"], "2025-07-01 09:00")
+        clock = FakeClock(datetime(2025, 7, 1, 9, 1))
+        # pre-fork 工作进程各自推送给自己的订阅者
+        workers = [ReminderDispatcher(ReminderBroker(), now_func=clock, persist_delivered=False) for _ in range(2)]
+        for worker in workers:
+            self.assertEqual([e["appointment"]["id"] for e in worker.run_once()], [appt["id"]])
+            self.assertEqual(worker.run_once(), [])
+        self.assertEqual(reminders.current_marks().markers(DELIVERED), {})
+
+        reminders.set_reminder(appt["id"], "2025-07-01 09:30")
+        clock.now = datetime(2025, 7, 1, 9, 30)
+        self.assertEqual(len(workers[0].run_once()), 1)
+
+    def test_thread_wakes_on_new_reminder(self):
+        appt = appointments.add_appointment("Soon", (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d"), "10:00")
+        dispatcher = ReminderDispatcher(self.broker, max_sleep=30)
+        dispatcher.start()
+        try:
+            # 没有待触发的提醒时线程休眠 max_sleep；写入会立即唤醒它
+            past = (datetime.now() - timedelta(minutes=1)).strftime("%Y-%m-%d %H:%M")
+            reminders.set_reminder(appt["id"], past)
+            event = self.events.get(timeout=5)
+            self.assertEqual(event["appointment"]["id"], appt["id"])
+            self.assertTrue(dispatcher.stats()["running"])
+        finally:
+            dispatcher.stop()
+        self.assertFalse(dispatcher.is_running())
+
+    def test_event_stream_formats_events_and_heartbeats(self):
+        stream = event_stream(self.broker, heartbeat=0.01)
+        self.assertEqual(next(stream), b": connected\n\n")
+        self.assertEqual(next(stream), b": keep-alive\n\n")
+        event = self.broker.publish({"reminder_time": "2025-07-01 09:00"})
+        chunk = next(stream)
+        self.assertEqual(chunk, format_sse(event))
+        self.assertEqual(json.loads(chunk.decode("utf-8").split("data: ", 1)[1]), event)
+        self.assertEqual(self.broker.subscriber_count(), 2)
+        stream.close()
+        self.assertEqual(self.broker.subscriber_count(), 1)
+
+if __name__ == '__main__':
+    unittest.main()
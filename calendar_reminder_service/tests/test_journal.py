@@ -0,0 +1,134 @@
+import unittest
+import os
+import json
+
+from calendar_reminder_service.src.store import AppointmentStore
+from calendar_reminder_service.src.journal import JournalEngine
+
+class TestJournalEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.snapshot_file = os.path.join(self.test_data_dir, "test_journal_appointments.json")
+        self.journal_file = self.snapshot_file + ".journal"
+        self._cleanup()
+
+    def tearDown(self):
+        self._cleanup()
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def _cleanup(self):
+        for path in (self.snapshot_file, self.journal_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _new_store(self, compact_every=1000):
+        return AppointmentStore(self.snapshot_file, JournalEngine(self.snapshot_file, compact_every))
+
+    def _appt(self, appt_id, date="2024-05-01"):
+        return {"id": appt_id, "title": f"Event {appt_id}", "date": date, "time": "10:00",
+                "description": "", "reminder_set": False, "reminder_time": "", "location": ""}
+
+    def test_mutations_are_appended_and_replayed(self):
+        store = self._new_store()
+        store.replace([self._appt("a")])
+        store.add(self._appt("b"))
+        store.update("a", {"reminder_set": True, "reminder_time": "2024-05-01 09:00"})
+
+        # 快照未被重写，变更只出现在日志中
+        with open(self.snapshot_file, 'r') as f:
+            self.assertEqual([a["id"] for a in json.load(f)], ["a"])
+        with open(self.journal_file, 'r') as f:
+            self.assertEqual([json.loads(line)["op"] for line in f], ["add", "update"])
+
+        # 新实例通过回放日志得到相同的数据
+        reloaded = self._new_store().records()
+        self.assertEqual([a["id"] for a in reloaded], ["a", "b"])
+        self.assertTrue(reloaded[0]["reminder_set"])
+        self.assertEqual(reloaded[0]["reminder_time"], "2024-05-01 09:00")
+
+    def test_delete_is_appended_and_replayed(self):
+        store = self._new_store()
+        store.replace([self._appt("a"), self._appt("b")])
+        self.assertTrue(store.delete("a"))
+        self.assertFalse(store.delete("a"))
+        with open(self.journal_file, 'r') as f:
+            self.assertEqual([json.loads(line) for line in f], [{"op": "delete", "id": "a"}])
+        reloaded = self._new_store()
+        self.assertEqual([a["id"] for a in reloaded.records()], ["b"])
+        self.assertIsNone(reloaded.get("a"))
+        self.assertEqual(reloaded.on_date("2024-05-01"), [self._appt("b")])
+
+    def test_replayed_deletes_keep_order_and_readded_records(self):
+        store = self._new_store()
+        store.replace([self._appt(appt_id) for appt_id in "abcde"])
+        for appt_id in "dbd":
+            store.delete(appt_id)
+        # 删除后以相同 ID 重新新增的约会保留
+        store.add(self._appt("d", date="2024-05-02"))
+        store.delete("e")
+        reloaded = self._new_store()
+        self.assertEqual([a["id"] for a in reloaded.records()], ["a", "c", "d"])
+        self.assertEqual(reloaded.get("d")["date"], "2024-05-02")
+
+    def test_compaction_folds_journal_into_snapshot(self):
+        store = self._new_store(compact_every=3)
+        store.add(self._appt("a"))
+        store.add(self._appt("b"))
+        self.assertTrue(os.path.exists(self.journal_file))
+        store.add(self._appt("c"))
+
+        self.assertFalse(os.path.exists(self.journal_file))
+        with open(self.snapshot_file, 'r') as f:
+            self.assertEqual([a["id"] for a in json.load(f)], ["a", "b", "c"])
+
+    def test_torn_last_line_is_ignored(self):
+        store = self._new_store()
+        store.add(self._appt("a"))
+        with open(self.journal_file, 'a') as f:
+            f.write('{"op": "add", "record": {"id": "partial"')
+
+        reloaded = self._new_store().records()
+        self.assertEqual([a["id"] for a in reloaded], ["a"])
+
+    def test_append_after_torn_line_is_replayed(self):
+        store = self._new_store()
+        store.add(self._appt("a"))
+        with open(self.journal_file, 'a') as f:
+            f.write('{"op": "add", "record": {"id": "partial"')
+
+        store = self._new_store()
+        store.add(self._appt("b"))
+        self.assertEqual([a["id"] for a in store.records()], ["a", "b"])
+        self.assertEqual([a["id"] for a in self._new_store().records()], ["a", "b"])
+
+    def test_journal_left_after_compaction_is_not_duplicated(self):
+        store = self._new_store()
+        store.add(self._appt("a"))
+        store.add(self._appt("b"))
+        store.update("a", {"title": "Renamed"})
+        store.delete("b")
+        # 模拟压缩时替换快照之后、删除日志之前退出
+        with open(self.journal_file, 'r') as f:
+            journal = f.read()
+        JournalEngine(self.snapshot_file).write_all(store.records())
+        with open(self.journal_file, 'w') as f:
+            f.write(journal)
+
+        reloaded = self._new_store().records()
+        self.assertEqual([(a["id"], a["title"]) for a in reloaded], [("a", "Renamed")])
+
+    def test_external_append_is_picked_up(self):
+        store = self._new_store()
+        store.add(self._appt("a"))
+        self.assertEqual(len(store.records()), 1)
+
+        other = self._new_store()
+        other.add(self._appt("b", date="2024-05-02"))
+
+        self.assertEqual([a["id"] for a in store.on_date("2024-05-02")], ["b"])
+
+if __name__ == '__main__':
+    unittest.main()
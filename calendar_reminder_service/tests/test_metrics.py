@@ -0,0 +1,70 @@
+import unittest
+import os
+import shutil
+
+from calendar_reminder_service.src.metrics import MetricsRegistry
+from calendar_reminder_service.src.profiling import SlowRequestProfiler
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_render_counters_and_histograms(self):
+        registry = MetricsRegistry()
+        registry.describe("requests_total", "Requests.")
+        registry.inc("requests_total", {"route": "/a", "status": "200"})
+        registry.inc("requests_total", {"status": "200", "route": "/a"})
+        registry.observe("latency_seconds", 0.003, {"route": "/a"})
+        registry.observe("latency_seconds", 2.0, {"route": "/a"})
+        registry.register_collector(lambda: [("cache_entries", "gauge", "Entries.", [({}, 7)])])
+
+        text = registry.render()
+        self.assertIn("# HELP requests_total Requests.", text)
+        self.assertIn("# TYPE requests_total counter", text)
+        self.assertIn('requests_total{route="/a",status="200"} 2', text)
+        self.assertIn("# TYPE latency_seconds histogram", text)
+        # 直方图的桶是累积的
+        self.assertIn('latency_seconds_bucket{route="/a",le="0.0025"} 0', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="0.005"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="2.5"} 2', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="+Inf"} 2', text)
+        self.assertIn('latency_seconds_count{route="/a"} 2', text)
+        self.assertIn("# TYPE cache_entries gauge", text)
+        self.assertIn("cache_entries 7", text)
+
+    def test_timed_records_duration(self):
+        registry = MetricsRegistry()
+        with registry.timed("work_seconds", {"op": "x"}):
+            pass
+        self.assertEqual(registry.histogram("work_seconds", {"op": "x"}).count, 1)
+
+
+class TestSlowRequestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        self.profile_dir = os.path.join(self.test_data_dir, "profiles")
+
+    def tearDown(self):
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def test_disabled_by_default(self):
+        profiler = SlowRequestProfiler(directory="", sample_rate=0)
+        self.assertIsNone(profiler.start())
+
+    def test_saves_only_slow_requests(self):
+        profiler = SlowRequestProfiler(self.profile_dir, sample_rate=1, slow_ms=50)
+        profile = profiler.start()
+        self.assertIsNotNone(profile)
+        self.assertIsNone(profiler.finish(profile, 0.01, "GET /api/appointments"))
+
+        profile = profiler.start()
+        path = profiler.finish(profile, 0.2, "GET /api/appointments")
+        self.assertTrue(os.path.isfile(path))
+        self.assertTrue(path.endswith(".prof"))
+        self.assertEqual((profiler.sampled, profiler.saved), (2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
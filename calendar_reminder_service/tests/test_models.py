@@ -0,0 +1,72 @@
+import unittest
+import json
+from datetime import datetime
+
+from calendar_reminder_service.src.calendar_utils import (
+    DATETIME_FORMAT, datetime_to_seconds, parse_datetime_minutes,
+)
+from calendar_reminder_service.src.models import Appointment, json_default
+
+class TestAppointment(unittest.TestCase):
+
+    def _appt(self, **overrides):
+        appt = {
+            "id": "a1",
+            "title": "Dentist",
+            "date": "2024-08-15",
+            "time": "09:30",
+            "description": "",
+            "reminder_set": True,
+            "reminder_time": "2024-08-15 08:00",
+            "location": "",
+        }
+        appt.update(overrides)
+        return appt
+
+    def test_round_trip_preserves_dict_and_key_order(self):
+        data = self._appt()
+        record = Appointment.from_dict(data)
+        self.assertEqual(record.to_dict(), data)
+        self.assertEqual(list(record.to_dict()), list(data))
+        self.assertEqual(json.dumps(record, default=json_default), json.dumps(data))
+
+        # 缺少的标准字段不会被补上，额外字段原样保留
+        partial = {"id": "x", "title": "External", "date": "2024-01-01", "time": "09:00", "custom": [1, 2]}
+        self.assertEqual(Appointment.from_dict(partial).to_dict(), partial)
+
+        # 记录复制了字段，修改原字典不影响记录
+        data["title"] = "Changed"
+        self.assertEqual(record["title"], "Dentist")
+
+    def test_timestamps_parsed_once_as_epoch_minutes(self):
+        record = Appointment.from_dict(self._appt())
+        self.assertEqual(record.start_minute * 60, datetime_to_seconds(datetime(2024, 8, 15, 9, 30)))
+        self.assertEqual(record.remind_minute * 60, datetime_to_seconds(datetime(2024, 8, 15, 8, 0)))
+
+        self.assertIsNone(Appointment.from_dict(self._appt(reminder_set=False)).remind_minute)
+        self.assertIsNone(Appointment.from_dict(self._appt(time="late")).start_minute)
+
+        record.update({"reminder_time": "2024-08-15 09:00", "note": "bring card"})
+        self.assertEqual(record.remind_minute, parse_datetime_minutes("2024-08-15 09:00"))
+        self.assertEqual(record.get("note"), "bring card")
+        self.assertEqual(record.to_dict()["note"], "bring card")
+
+    def test_dict_style_access(self):
+        record = Appointment.from_dict({"id": "x", "date": "2024-01-01"})
+        self.assertEqual(record["id"], "x")
+        self.assertIsNone(record.get("time"))
+        self.assertNotIn("time", record)
+        with self.assertRaises(KeyError):
+            record["title"]
+        self.assertEqual(record, {"id": "x", "date": "2024-01-01"})
+
+    def test_parse_matches_strptime(self):
+        for value in ("2024-02-29 23:59", "1970-01-01 00:00", "2025-1-5 9:05"):
+            expected = datetime_to_seconds(datetime.strptime(value, DATETIME_FORMAT)) / 60
+            self.assertEqual(parse_datetime_minutes(value), expected)
+        for value in ("2025-02-30 10:00", "2025-01-01 24:00", "2025-01-01 10:60", "2025/01/01 10:00"):
+            with self.assertRaises(ValueError):
+                parse_datetime_minutes(value)
+
+if __name__ == '__main__':
+    unittest.main()
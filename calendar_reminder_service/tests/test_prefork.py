@@ -0,0 +1,160 @@
+import unittest
+import os
+import json
+import http.client
+import multiprocessing
+import shutil
+import threading
+from unittest.mock import patch
+
+from calendar_reminder_service.src import appointments
+from calendar_reminder_service.src import interprocess
+from calendar_reminder_service.src import prefork
+from calendar_reminder_service.src.api_server import create_server, serve_worker
+from calendar_reminder_service.src.journal import JournalEngine
+from calendar_reminder_service.src.repository import shard_dir_for
+from calendar_reminder_service.src.shards import ShardedRepository
+from calendar_reminder_service.src.store import AppointmentStore, JsonFileEngine
+from calendar_reminder_service.src.changes import changes_path_for
+
+FORK_AVAILABLE = hasattr(os, "fork") and interprocess.fcntl is not None
+
+
+def _appt(appt_id):
+    return {"id": appt_id, "title": f"Event {appt_id}", "date": "2025-01-02", "time": "10:00",
+            "description": "", "reminder_set": False, "reminder_time": "", "location": ""}
+
+
+def _shared_store(path, mode):
+    if mode == "sharded":
+        directory = shard_dir_for(path)
+        return ShardedRepository(directory, interprocess.ProcessSync(interprocess.lock_path_for(directory)))
+    engine = JournalEngine(path, compact_every=20) if mode == "journal" else JsonFileEngine(path)
+    return AppointmentStore(path, engine, interprocess.ProcessSync(interprocess.lock_path_for(path)))
+
+
+def _add_from_process(path, mode, worker, count):
+    store = _shared_store(path, mode)
+    for i in range(count):
+        store.add(_appt(f"{worker}-{i}"))
+
+
+@unittest.skipUnless(FORK_AVAILABLE, "requires fork and fcntl")
+class TestProcessSync(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.test_data_file = os.path.join(self.test_data_dir, "test_prefork_store.json")
+
+    def tearDown(self):
+        shard_dir = shard_dir_for(self.test_data_file)
+        shutil.rmtree(shard_dir, ignore_errors=True)
+        for path in (self.test_data_file, self.test_data_file + ".journal", changes_path_for(self.test_data_file),
+                     interprocess.lock_path_for(self.test_data_file), interprocess.lock_path_for(shard_dir)):
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def test_concurrent_processes_lose_no_writes(self):
+        context = multiprocessing.get_context("fork")
+        for mode in ("json", "journal", "sharded"):
+            with self.subTest(mode=mode):
+                _shared_store(self.test_data_file, mode).replace([])
+                processes = [context.Process(target=_add_from_process, args=(self.test_data_file, mode, w, 25))
+                             for w in range(4)]
+                for process in processes:
+                    process.start()
+                for process in processes:
+                    process.join(30)
+                    self.assertEqual(process.exitcode, 0)
+                records = _shared_store(self.test_data_file, mode).all()
+                self.assertEqual(len(records), 100)
+                self.assertEqual(len({appt["id"] for appt in records}), 100)
+
+    def test_peer_writes_are_noticed_through_shared_counter(self):
+        writer = _shared_store(self.test_data_file, "json")
+        reader = _shared_store(self.test_data_file, "json")
+        writer.replace([_appt("a")])
+        self.assertEqual(len(reader.all()), 1)
+        # 计数器未变化时不 stat 数据文件，也不重新解析
+        with patch.object(reader._engine, "signature", side_effect=AssertionError("stat")):
+            self.assertEqual(len(reader.all()), 1)
+        misses, reloads = reader.misses, reader.reloads
+        writer.add(_appt("b"))
+        self.assertEqual([appt["id"] for appt in reader.all()], ["a", "b"])
+        self.assertEqual((reader.misses, reader.reloads), (misses, reloads + 1))
+        # 数据文件是完整的 JSON（原子替换，不会留下临时文件）
+        with open(self.test_data_file) as f:
+            self.assertEqual(len(json.load(f)), 2)
+        self.assertEqual([name for name in os.listdir(self.test_data_dir) if name.endswith(".tmp")], [])
+
+
+@unittest.skipUnless(FORK_AVAILABLE, "requires fork and fcntl")
+class TestPreforkServer(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.test_data_file = os.path.join(self.test_data_dir, "test_prefork_api.json")
+
+        self.data_file_patcher = patch('calendar_reminder_service.src.appointments.DATA_FILE', self.test_data_file)
+        self.shared_patcher = patch.object(interprocess, 'ENABLED', True)
+        self.data_file_patcher.start()
+        self.shared_patcher.start()
+        appointments.save_appointments([])
+
+        self.server = create_server('127.0.0.1', 0, workers=4)
+        self.port = self.server.server_address[1]
+        self.pids = [prefork.fork_worker(lambda index: serve_worker(self.server, dispatcher=False), i)
+                     for i in range(3)]
+
+    def tearDown(self):
+        prefork.stop_workers(self.pids)
+        self.server.server_close()
+        self.shared_patcher.stop()
+        self.data_file_patcher.stop()
+        for path in (self.test_data_file, changes_path_for(self.test_data_file),
+                     interprocess.lock_path_for(self.test_data_file)):
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def _request(self, method, path, body=None):
+        # 每个请求新建连接，让不同的工作进程接受连接
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            conn.request(method, path, body=json.dumps(body) if body is not None else None)
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            conn.close()
+
+    def test_workers_share_socket_and_serialize_writes(self):
+        errors = []
+
+        def post_many(client):
+            for i in range(5):
+                status, _ = self._request("POST", "/api/appointments",
+                                          {"title": f"P{client}-{i}", "date": "2025-02-01", "time": "09:00"})
+                if status != 201:
+                    errors.append(status)
+
+        threads = [threading.Thread(target=post_many, args=(c,)) for c in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+        # 任何一个工作进程都能看到其他进程的写入
+        for _ in range(6):
+            status, data = self._request("GET", "/api/appointments?date=2025-02-01")
+            self.assertEqual((status, len(data)), (200, 40))
+        self.assertEqual(len(appointments.load_appointments()), 40)
+
+
+if __name__ == '__main__':
+    unittest.main()
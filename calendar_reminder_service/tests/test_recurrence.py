@@ -0,0 +1,163 @@
+import unittest
+import copy
+import os
+import shutil
+from unittest.mock import patch
+
+from calendar_reminder_service.src import appointments
+from calendar_reminder_service.src import reminders
+from calendar_reminder_service.src import recurrence
+from calendar_reminder_service.src.calendar_utils import parse_datetime_seconds
+from calendar_reminder_service.src.repository import AppointmentRepository
+from calendar_reminder_service.src.changes import changes_path_for
+
+
+def series(date, time, rule, **fields):
+    appt = {"id": fields.pop("id", "s1"), "title": "Series", "date": date, "time": time, "description": "",
+            "reminder_set": False, "reminder_time": "", "location": "", "recurrence": rule}
+    appt.update(fields)
+    return appt
+
+
+def dates(appt, start=None, end=None):
+    return [occurrence["date"] for occurrence in recurrence.occurrences(appt, start, end)]
+
+
+class TestOccurrenceExpansion(unittest.TestCase):
+
+    def test_daily_and_weekly_with_interval_count_until(self):
+        self.assertEqual(dates(series("2025-01-30", "09:00", {"freq": "daily", "interval": 2, "count": 3})),
+                         ["2025-01-30", "2025-02-01", "2025-02-03"])
+        weekly = series("2025-01-06", "09:00", {"freq": "weekly", "until": "2025-02-03"})
+        self.assertEqual(dates(weekly), ["2025-01-06", "2025-01-13", "2025-01-20", "2025-01-27", "2025-02-03"])
+        # 只展开查询窗口内的发生
+        self.assertEqual(dates(weekly, "2025-01-14", "2025-01-27"), ["2025-01-20", "2025-01-27"])
+        self.assertEqual(dates(weekly, "2025-01-14", "2025-01-19"), [])
+
+    def test_count_is_measured_from_series_start(self):
+        weekly = series("2025-01-06", "09:00", {"freq": "weekly", "count": 4})
+        self.assertEqual(dates(weekly, "2025-01-20", "2025-12-31"), ["2025-01-20", "2025-01-27"])
+
+    def test_monthly_skips_missing_days(self):
+        monthly = series("2025-01-31", "18:00", {"freq": "monthly", "count": 4})
+        self.assertEqual(dates(monthly), ["2025-01-31", "2025-03-31", "2025-05-31", "2025-07-31"])
+        unbounded = series("2024-11-15", "18:00", {"freq": "monthly", "interval": 3})
+        self.assertEqual(dates(unbounded, "2030-01-01", "2030-12-31"),
+                         ["2030-02-15", "2030-05-15", "2030-08-15", "2030-11-15"])
+
+    def test_unbounded_range_uses_expansion_horizon(self):
+        daily = series("2025-01-01", "09:00", {"freq": "daily"})
+        expanded = dates(daily, "2025-06-01")
+        self.assertEqual(expanded[0], "2025-06-01")
+        self.assertEqual(len(expanded), recurrence.EXPANSION_HORIZON_DAYS + 1)
+
+    def test_reminder_follows_each_occurrence(self):
+        weekly = series("2025-01-06", "09:00", {"freq": "weekly"},
+                        reminder_set=True, reminder_time="2025-01-05 21:00")
+        occurrence = next(recurrence.occurrences(weekly, "2025-03-03", "2025-03-03"))
+        self.assertEqual(occurrence["reminder_time"], "2025-03-02 21:00")
+        self.assertEqual(occurrence["id"], "s1")
+
+        now = parse_datetime_seconds("2025-03-02 22:00")
+        self.assertEqual([appt["date"] for _, appt in recurrence.due_occurrences([weekly], now)], ["2025-03-03"])
+        self.assertEqual(recurrence.due_occurrences([weekly], parse_datetime_seconds("2025-03-02 20:59")), [])
+        self.assertEqual(recurrence.next_reminder_time([weekly], now), parse_datetime_seconds("2025-03-09 21:00"))
+
+    def test_validate_recurrence(self):
+        self.assertEqual(recurrence.validate_recurrence({"freq": "weekly", "interval": 2, "until": "2025-12-31"}), "")
+        self.assertIn("freq", recurrence.validate_recurrence({"freq": "hourly"}))
+        self.assertIn("interval", recurrence.validate_recurrence({"freq": "daily", "interval": 0}))
+        self.assertIn("until", recurrence.validate_recurrence({"freq": "daily", "until": "31/12/2025"}))
+        self.assertIn("Unknown", recurrence.validate_recurrence({"freq": "daily", "byday": "MO"}))
+
+
+class TestRecurringAppointments(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.test_data_file = os.path.join(self.test_data_dir, "test_recurrence_appointments.json")
+        self.test_db_file = os.path.join(self.test_data_dir, "test_recurrence_appointments.db")
+        self.data_file_patcher = patch('calendar_reminder_service.src.appointments.DATA_FILE', self.test_data_file)
+        self.data_file_patcher.start()
+
+    def tearDown(self):
+        appointments.current_store().close()
+        self.data_file_patcher.stop()
+        for path in (self.test_data_file, changes_path_for(self.test_data_file),
+                     self.test_db_file, self.test_db_file + "-wal", self.test_db_file + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def _check_mode(self):
+        appointments.save_appointments([])
+        weekly = appointments.add_appointment("Standup", "2025-01-06", "09:00",
+                                              recurrence={"freq": "weekly", "count": 52})
+        single = appointments.add_appointment("Dentist", "2025-01-13", "08:00")
+        # 系列只保存一条
+        self.assertEqual(len(appointments.load_appointments()), 2)
+        self.assertEqual(weekly["recurrence"], {"freq": "weekly", "interval": 1, "count": 52})
+
+        on_date = appointments.get_appointments_on_date("2025-01-13")
+        self.assertEqual([(a["id"], a["date"]) for a in on_date],
+                         [(single["id"], "2025-01-13"), (weekly["id"], "2025-01-13")])
+        self.assertEqual(appointments.get_appointments_on_date("2025-01-14"), [])
+        between = appointments.get_appointments_between("2025-01-07", "2025-01-20")
+        between_copy = copy.deepcopy(between)
+        self.assertEqual([a["date"] for a in between], ["2025-01-13", "2025-01-13", "2025-01-20"])
+        # 默认的全量扫描实现与索引实现结果一致
+        store = appointments.current_store()
+        # 分页遍历按系列本身的日期排序，包含重复约会
+        self.assertEqual([a["id"] for a in appointments.iter_appointments(batch_size=1)], [weekly["id"], single["id"]])
+        self.assertEqual(AppointmentRepository.between(store, "2025-01-07", "2025-01-20"), between)
+        # 返回的字典可以随意修改，不影响存储中的重复规则
+        appointments.get_appointment(weekly["id"])["recurrence"]["count"] = 1
+        between[-1]["recurrence"]["freq"] = "daily"
+        self.assertEqual(appointments.get_appointments_between("2025-01-07", "2025-01-20"), between_copy)
+
+        # 提醒只设置一次，相对系列第一次发生；每次发生按相同提前量计算
+        self.assertTrue(reminders.set_reminder(weekly["id"], "2025-01-06 08:45"))
+        due = store.due(parse_datetime_seconds("2025-06-02 08:50"))
+        self.assertEqual([(a["id"], a["date"], a["reminder_time"]) for a in due],
+                         [(weekly["id"], "2025-06-02", "2025-06-02 08:45")])
+        self.assertEqual(store.next_reminder_time(parse_datetime_seconds("2025-06-02 08:50")),
+                         parse_datetime_seconds("2025-06-09 08:45"))
+        # count 用完后不再有提醒
+        self.assertEqual(store.due(parse_datetime_seconds("2026-01-05 08:50")), [])
+        self.assertIsNone(store.next_reminder_time(parse_datetime_seconds("2025-12-29 09:00")))
+        self.assertEqual(AppointmentRepository.due(store, parse_datetime_seconds("2025-06-02 08:50")), due)
+
+    def test_json_store(self):
+        self._check_mode()
+
+    def test_sqlite_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'sqlite'):
+            try:
+                self._check_mode()
+            finally:
+                appointments.current_store().close()
+
+    def test_sharded_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'sharded'):
+            try:
+                self._check_mode()
+            finally:
+                appointments.current_store().close()
+                shutil.rmtree(os.path.splitext(self.test_data_file)[0], ignore_errors=True)
+
+    def test_invalid_recurrence_is_rejected(self):
+        appointments.save_appointments([])
+        with self.assertRaises(ValueError):
+            appointments.add_appointment("Bad", "2025-01-06", "09:00", recurrence={"freq": "yearly"})
+        results = appointments.add_appointments([
+            {"title": "Ok", "date": "2025-01-06", "time": "09:00", "recurrence": {"freq": "daily", "count": 2}},
+            {"title": "Bad", "date": "2025-01-06", "time": "09:00", "recurrence": {"freq": "daily", "count": -1}},
+        ])
+        self.assertEqual([r["status"] for r in results], ["created", "error"])
+        self.assertEqual(len(appointments.get_appointments_between("2025-01-01", "2025-01-31")), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,32 @@
 import unittest
 import os
 import json
+import random
 from datetime import datetime, timedelta
 from unittest.mock import patch
 
 # 假设在项目根目录运行：`python -m unittest discover calendar_reminder_service/tests`
 from calendar_reminder_service.src import reminders
 from calendar_reminder_service.src import appointments # 用于测试数据的创建
+from calendar_reminder_service.src.changes import changes_path_for
+from calendar_reminder_service.src.interprocess import lock_path_for
+from calendar_reminder_service.src.marks import ACKED, marks_path_for
+from calendar_reminder_service.src.repository import shard_dir_for, snapshot_path_for, sqlite_path_for
+import shutil
+
+def scan_due_reminders(appts, now):
+    """原先 check_reminders 的全量扫描实现，作为调度器结果的参照。"""
+    due = []
+    for appt in appts:
+        if appt.get("reminder_set") and appt.get("reminder_time"):
+            try:
+                reminder_time_obj = datetime.strptime(appt["reminder_time"], "%Y-%m-%d %H:%M")
+                appointment_time_obj = datetime.strptime(f"{appt.get('date')} {appt.get('time')}", "%Y-%m-%d %H:%M")
+                if reminder_time_obj <= now and appointment_time_obj >= now:
+                    due.append(appt)
+            except ValueError:
+                continue
+    return due
 
 class TestReminders(unittest.TestCase):
 
@@ -27,8 +47,17 @@ class TestReminders(unittest.TestCase):
 
     def tearDown(self):
         self.data_file_patcher.stop()
-        if os.path.exists(self.test_reminders_data_file):
-            os.remove(self.test_reminders_data_file)
+        db_file = sqlite_path_for(self.test_reminders_data_file)
+        snapshot_file = snapshot_path_for(self.test_reminders_data_file)
+        for path in (self.test_reminders_data_file, self.test_reminders_data_file + ".journal",
+                     changes_path_for(self.test_reminders_data_file),
+                     reminders.watermark_path_for(self.test_reminders_data_file),
+                     marks_path_for(self.test_reminders_data_file),
+                     lock_path_for(marks_path_for(self.test_reminders_data_file)),
+                     db_file, db_file + "-wal", db_file + "-shm", snapshot_file, changes_path_for(snapshot_file)):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(shard_dir_for(self.test_reminders_data_file), ignore_errors=True)
         if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
             os.rmdir(self.test_data_dir)
 
@@ -61,6 +90,23 @@ class TestReminders(unittest.TestCase):
         result = reminders.set_reminder("non-existent-id", "2024-09-01 08:00")
         self.assertFalse(result)
 
+    def test_set_reminders_batch(self):
+        appt1 = appointments.add_appointment("Batch A", "2024-09-01", "10:00")
+        appt2 = appointments.add_appointment("Batch B", "2024-09-02", "10:00")
+        results = reminders.set_reminders([
+            {"appointment_id": appt1["id"], "reminder_time": "2024-09-01 08:00"},
+            {"appointment_id": "non-existent-id", "reminder_time": "2024-09-01 08:00"},
+            {"appointment_id": appt2["id"], "reminder_time": "tomorrow"},
+            {"appointment_id": appt2["id"]},
+        ])
+        self.assertEqual([r["status"] for r in results], ["ok", "error", "error", "error"])
+        self.assertEqual(results[1]["error"], "Appointment not found")
+
+        saved = {a["id"]: a for a in appointments.load_appointments()}
+        self.assertTrue(saved[appt1["id"]]["reminder_set"])
+        self.assertEqual(saved[appt1["id"]]["reminder_time"], "2024-09-01 08:00")
+        self.assertFalse(saved[appt2["id"]]["reminder_set"])
+
     def test_check_reminders(self):
         # 定义多个模拟当前时间以测试不同场景
         mock_now_past_all = datetime(2024, 1, 1, 10, 0, 0) # 很早以前的时间
@@ -131,6 +177,163 @@ class TestReminders(unittest.TestCase):
             due = reminders.check_reminders()
             self.assertEqual(len(due), 0)
 
+    def test_check_reminders_matches_full_scan(self):
+        rng = random.Random(42)
+        base = datetime(2024, 8, 1, 0, 0)
+        records = []
+        for i in range(300):
+            start = base + timedelta(minutes=rng.randrange(0, 60 * 24 * 30))
+            appt = {
+                "id": f"appt-{i}", "title": f"Event {i}",
+                "date": start.strftime("%Y-%m-%d"), "time": start.strftime("%H:%M"),
+                "description": "", "reminder_set": False, "reminder_time": "", "location": "",
+            }
+            if rng.random() < 0.7:
+                reminder = start - timedelta(minutes=rng.randrange(0, 60 * 24 * 3))
+                appt["reminder_set"] = True
+                appt["reminder_time"] = reminder.strftime("%Y-%m-%d %H:%M")
+            records.append(appt)
+        # 混入格式错误的数据
+        records[0]["reminder_set"] = True
+        records[0]["reminder_time"] = "bad"
+        appointments.save_appointments(records)
+
+        # 时间先前进后回退，并在中途修改部分提醒
+        checkpoints = [base + timedelta(hours=h, seconds=30 * (h % 2)) for h in range(0, 24 * 31, 7)]
+        checkpoints += [base + timedelta(days=3), base + timedelta(days=10, minutes=1)]
+        watermark = None
+        returned = {}
+        for step, now in enumerate(checkpoints):
+            if step % 10 == 5:
+                target = records[rng.randrange(1, len(records))]
+                target_start = datetime.strptime(f"{target['date']} {target['time']}", "%Y-%m-%d %H:%M")
+                new_time = (target_start - timedelta(minutes=rng.randrange(0, 600))).strftime("%Y-%m-%d %H:%M")
+                reminders.set_reminder(target["id"], new_time)
+                target["reminder_set"] = True
+                target["reminder_time"] = new_time
+            if watermark is not None and step % 4 == 1:
+                # 把一条尚未开始的约会的提醒改到水位线之前
+                upcoming = [a for a in records[1:]
+                            if datetime.strptime(f"{a['date']} {a['time']}", "%Y-%m-%d %H:%M") > now]
+                if upcoming:
+                    target = rng.choice(upcoming)
+                    new_time = (watermark - timedelta(minutes=rng.randrange(0, 120))).strftime("%Y-%m-%d %H:%M")
+                    reminders.set_reminder(target["id"], new_time)
+                    target["reminder_set"] = True
+                    target["reminder_time"] = new_time
+
+            with patch('calendar_reminder_service.src.reminders.datetime') as mock_datetime:
+                mock_datetime.now.return_value = now
+                mock_datetime.strptime.side_effect = lambda *args, **kwargs: datetime.strptime(*args, **kwargs)
+                due = reminders.check_reminders()
+                pending = reminders.pending_reminders()
+
+            # pending_reminders 返回全部到期的提醒；check_reminders 只返回之前没有返回过的，
+            # 包括在上次检查之后才设置到水位线之前的提醒
+            expected = scan_due_reminders(records, now)
+            self.assertEqual(sorted(a["id"] for a in pending), sorted(a["id"] for a in expected), now)
+            if watermark is not None and now <= watermark:
+                expected = []
+            else:
+                returned = {key: start for key, start in returned.items() if start >= now}
+                expected = [a for a in expected if (a["id"], a["reminder_time"]) not in returned]
+                for a in expected:
+                    returned[(a["id"], a["reminder_time"])] = datetime.strptime(
+                        f"{a['date']} {a['time']}", "%Y-%m-%d %H:%M")
+            self.assertEqual(sorted(a["id"] for a in due), sorted(a["id"] for a in expected), now)
+            watermark = now if watermark is None else max(watermark, now)
+
+
+    def _check_at(self, now, func=None):
+        with patch('calendar_reminder_service.src.reminders.datetime') as mock_datetime:
+            mock_datetime.now.return_value = now
+            return [a["id"] for a in (func or reminders.check_reminders)()]
+
+    def _check_watermark_and_ack(self):
+        appt1 = appointments.add_appointment("First", "2024-08-15", "17:00")
+        appt2 = appointments.add_appointment("Second", "2024-08-15", "16:00")
+        series = appointments.add_appointment("Daily", "2024-08-14", "09:00", recurrence={"freq": "daily"})
+        reminders.set_reminders([
+            {"appointment_id": appt1["id"], "reminder_time": "2024-08-15 12:00"},
+            {"appointment_id": appt2["id"], "reminder_time": "2024-08-15 15:00"},
+            {"appointment_id": series["id"], "reminder_time": "2024-08-14 08:30"},
+        ])
+
+        # 第一次检查返回全部到期的提醒，之后只返回新到期的
+        self.assertEqual(self._check_at(datetime(2024, 8, 15, 13, 0)), [appt1["id"]])
+        self.assertEqual(reminders.reminder_watermark(), datetime(2024, 8, 15, 13, 0).timestamp())
+        self.assertEqual(self._check_at(datetime(2024, 8, 15, 13, 30)), [])
+        self.assertEqual(self._check_at(datetime(2024, 8, 15, 15, 0)), [appt2["id"]])
+        self.assertEqual(self._check_at(datetime(2024, 8, 15, 15, 0)), [])
+        # 时间回退不会重新返回已处理的提醒
+        self.assertEqual(self._check_at(datetime(2024, 8, 15, 12, 30)), [])
+
+        # 未确认的提醒仍可通过 pending_reminders 取回；确认后不再出现
+        self.assertEqual(self._check_at(datetime(2024, 8, 15, 15, 5), reminders.pending_reminders),
+                         [appt1["id"], appt2["id"]])
+        results = reminders.acknowledge_reminders([appt1["id"], "missing", appt2["id"], None])
+        self.assertEqual([r["status"] for r in results], ["ok", "error", "ok", "error"])
+        self.assertEqual(results[1]["error"], "Appointment not found")
+        self.assertEqual(self._check_at(datetime(2024, 8, 15, 15, 5), reminders.pending_reminders), [])
+        # 确认标记保存在提醒标记文件中，约会记录不变
+        self.assertEqual(reminders.current_marks().markers(ACKED)[appt1["id"]], "2024-08-15 12:00")
+        self.assertNotIn("acked_reminder_time", appointments.get_appointment(appt1["id"]))
+
+        # 重新设置提醒后解除确认，新的提醒时间晚于水位线时再次返回
+        reminders.set_reminder(appt2["id"], "2024-08-15 15:30")
+        self.assertEqual(self._check_at(datetime(2024, 8, 15, 15, 40)), [appt2["id"]])
+
+        # 检查之后才设置（或改到）水位线之前的提醒在下次检查时返回，且只返回一次
+        late = appointments.add_appointment("Late", "2024-08-15", "18:00")
+        moved = appointments.add_appointment("Moved", "2024-08-15", "19:00")
+        reminders.set_reminder(moved["id"], "2024-08-15 18:30")
+        self.assertEqual(self._check_at(datetime(2024, 8, 15, 15, 41)), [])
+        reminders.set_reminder(late["id"], "2024-08-15 15:41")
+        reminders.set_reminder(moved["id"], "2024-08-15 15:35")
+        self.assertEqual(self._check_at(datetime(2024, 8, 15, 15, 42)), [moved["id"], late["id"]])
+        self.assertEqual(self._check_at(datetime(2024, 8, 15, 15, 43)), [])
+        appointments.update_appointment(late["id"], {"title": "Late (renamed)"})
+        self.assertEqual(self._check_at(datetime(2024, 8, 15, 15, 44)), [])
+        reminders.acknowledge_reminders([late["id"], moved["id"]])
+
+        # 重复约会按各次发生计算，确认只覆盖已到期的发生
+        with patch('calendar_reminder_service.src.reminders.datetime') as mock_datetime:
+            mock_datetime.now.return_value = datetime(2024, 8, 16, 8, 40)
+            due = reminders.check_reminders()
+            self.assertEqual([(a["id"], a["date"]) for a in due], [(series["id"], "2024-08-16")])
+            self.assertEqual([r["status"] for r in reminders.acknowledge_reminders([series["id"]])], ["ok"])
+            self.assertEqual(reminders.pending_reminders(), [])
+        due = self._check_at(datetime(2024, 8, 17, 8, 45), reminders.pending_reminders)
+        self.assertEqual(due, [series["id"]])
+
+    def test_watermark_and_ack(self):
+        self._check_watermark_and_ack()
+
+    def test_watermark_and_ack_journal_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'journal'):
+            self._check_watermark_and_ack()
+
+    def test_watermark_and_ack_sqlite_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'sqlite'):
+            try:
+                self._check_watermark_and_ack()
+            finally:
+                appointments.current_store().close()
+
+    def test_watermark_and_ack_sharded_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'sharded'):
+            try:
+                self._check_watermark_and_ack()
+            finally:
+                appointments.current_store().close()
+
+    def test_watermark_and_ack_snapshot_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'snapshot'):
+            try:
+                self._check_watermark_and_ack()
+            finally:
+                appointments.current_store().close()
+
 
 if __name__ == '__main__':
     unittest.main()
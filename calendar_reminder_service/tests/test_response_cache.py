@@ -0,0 +1,39 @@
+import unittest
+
+from calendar_reminder_service.src.response_cache import ResponseCache, etag_matches, make_etag
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_lru_eviction_by_entries(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", 200, b"A", make_etag(b"A"))
+        cache.put("b", 200, b"B", make_etag(b"B"))
+        self.assertIsNotNone(cache.get("a"))   # a 变为最近使用
+        cache.put("c", 200, b"C", make_etag(b"C"))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a")[1], b"A")
+        self.assertEqual(cache.get("c")[1], b"C")
+
+    def test_lru_eviction_by_bytes(self):
+        cache = ResponseCache(max_entries=10, max_bytes=10)
+        cache.put("a", 200, b"123456", '"a"')
+        cache.put("b", 200, b"123456", '"b"')
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["bytes"], 6)
+        # 超过上限的单条响应不缓存
+        cache.put("huge", 200, b"x" * 11, '"h"')
+        self.assertIsNone(cache.get("huge"))
+
+    def test_etag_matching(self):
+        etag = make_etag(b"body")
+        self.assertEqual(etag, make_etag(b"body"))
+        self.assertNotEqual(etag, make_etag(b"other"))
+        self.assertTrue(etag_matches(etag, etag))
+        self.assertTrue(etag_matches(f'"x", W/{etag}', etag))
+        self.assertTrue(etag_matches("*", etag))
+        self.assertFalse(etag_matches('"x"', etag))
+        self.assertFalse(etag_matches(None, etag))
+
+if __name__ == '__main__':
+    unittest.main()
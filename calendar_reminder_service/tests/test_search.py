@@ -0,0 +1,162 @@
+import unittest
+import os
+import shutil
+from unittest.mock import patch
+
+from calendar_reminder_service.src import appointments
+from calendar_reminder_service.src.changes import changes_path_for
+from calendar_reminder_service.src.models import Appointment
+from calendar_reminder_service.src.repository import AppointmentRepository, shard_dir_for, sqlite_path_for
+from calendar_reminder_service.src.search import SearchIndex, filter_matches, query_terms, tokenize
+
+
+class TestSearchIndex(unittest.TestCase):
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Café-Meeting, room_2"), ["cafe", "meeting", "room", "2"])
+        self.assertEqual(tokenize("周会 会议室"), ["周会", "会议室"])
+        self.assertEqual(tokenize(None), [])
+        self.assertEqual(query_terms("team Team meet"), ["team", "meet"])
+
+    def _search(self, index, records, terms):
+        ids, pending = index.candidates(terms)
+        pool = records.values() if ids is None else [records[i] for i in ids]
+        return {appt.id for appt in filter_matches(pool, pending)}
+
+    def test_prefix_and_queries(self):
+        records = {
+            "a": Appointment.from_dict({"id": "a", "title": "Team meeting", "location": "Room A"}),
+            "b": Appointment.from_dict({"id": "b", "title": "Team lunch", "description": "Meet at noon"}),
+            "c": Appointment.from_dict({"id": "c", "title": "Dentist"}),
+        }
+        index = SearchIndex()
+        index.rebuild(list(records.values()))
+        self.assertEqual(self._search(index, records, ["meet"]), {"a", "b"})
+        self.assertEqual(self._search(index, records, ["team", "room"]), {"a"})
+        self.assertEqual(self._search(index, records, ["te", "d"]), set())
+        self.assertEqual(index.candidates(["x"]), (set(), []))
+
+        # 修改文本前移除、修改后重新加入
+        index.remove(records["a"])
+        records["a"].update({"title": "Review"})
+        index.add(records["a"])
+        self.assertEqual(self._search(index, records, ["team"]), {"b"})
+        self.assertEqual(self._search(index, records, ["rev"]), {"a"})
+        index.remove(records["c"])
+        self.assertEqual(index.stats()["tokens"], len({"review", "room", "a", "team", "lunch", "meet", "at", "noon"}))
+
+    def test_small_candidate_sets_and_wide_prefixes_are_left_to_verify(self):
+        records = {str(i): Appointment.from_dict({"id": str(i), "title": f"alpha a{i}"}) for i in range(50)}
+        records["x"] = Appointment.from_dict({"id": "x", "title": "zeta"})
+        index = SearchIndex()
+        index.rebuild(list(records.values()))
+        # "a1" 的候选集已足够小，"alp" 留待逐条校验
+        ids, pending = index.candidates(["a1", "alp"])
+        self.assertEqual((ids, pending), ({"1"} | {str(i) for i in range(10, 20)}, ["alp"]))
+        self.assertEqual(self._search(index, records, ["zeta", "a"]), set())
+
+        with patch('calendar_reminder_service.src.search.EXPANSION_LIMIT', 10):
+            ids, pending = index.candidates(["a"])
+            self.assertEqual((ids, pending), (None, ["a"]))
+            self.assertEqual(self._search(index, records, ["a", "zet"]), set())
+            self.assertEqual(len(self._search(index, records, ["a", "alpha"])), 50)
+
+
+class TestAppointmentSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.test_data_file = os.path.join(self.test_data_dir, "test_search_appointments.json")
+        self.data_file_patcher = patch('calendar_reminder_service.src.appointments.DATA_FILE', self.test_data_file)
+        self.data_file_patcher.start()
+
+    def tearDown(self):
+        self.data_file_patcher.stop()
+        db_file = sqlite_path_for(self.test_data_file)
+        for path in (self.test_data_file, self.test_data_file + ".journal", changes_path_for(self.test_data_file),
+                     db_file, db_file + "-wal", db_file + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(shard_dir_for(self.test_data_file), ignore_errors=True)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def _titles(self, *args, **kwargs):
+        return [appt["title"] for appt in appointments.search_appointments(*args, **kwargs)]
+
+    def _check_mode(self):
+        appointments.save_appointments([
+            {"id": "old", "title": "Budget review", "date": "2024-12-20", "time": "09:00",
+             "description": "", "reminder_set": False, "reminder_time": "", "location": "HQ"},
+        ])
+        standup = appointments.add_appointment("Daily standup", "2025-01-06", "09:00", location="Room 1",
+                                               recurrence={"freq": "weekly", "count": 3})
+        meeting = appointments.add_appointment("Team meeting", "2025-01-07", "10:00", description="Quarterly budget")
+        appointments.add_appointments([
+            {"title": "Dentist", "date": "2025-02-03", "time": "08:00", "location": "Clinic"},
+            {"title": "Café with team", "date": "2025-02-04", "time": "15:00"},
+        ])
+
+        # 第一次检索时为已有数据建立索引
+        self.assertEqual(self._titles("budget"), ["Budget review", "Team meeting"])
+        self.assertEqual(self._titles("TEAM"), ["Team meeting", "Café with team"])
+        self.assertEqual(self._titles("cafe te"), ["Café with team"])
+        self.assertEqual(self._titles("team budg"), ["Team meeting"])
+        self.assertEqual(self._titles("room stand"), ["Daily standup"])
+        self.assertEqual(self._titles("team nothing"), [])
+        self.assertEqual(self._titles("!!"), [])
+        self.assertEqual(self._titles("team", limit=1), ["Team meeting"])
+
+        # 日期范围：重复约会展开为范围内的发生
+        self.assertEqual(self._titles("team", start="2025-02-01"), ["Café with team"])
+        dates = [appt["date"] for appt in appointments.search_appointments("standup", "2025-01-10", "2025-01-31")]
+        self.assertEqual(dates, ["2025-01-13", "2025-01-20"])
+
+        # 修改与删除后索引随之更新
+        appointments.update_appointment(meeting["id"], {"title": "Planning", "date": "2025-03-01"})
+        self.assertEqual(self._titles("team"), ["Café with team"])
+        self.assertEqual(self._titles("plan quarterly", start="2025-03-01"), ["Planning"])
+        appointments.update_appointment(standup["id"], {"location": "Lobby"})
+        self.assertEqual(self._titles("room"), [])
+        self.assertEqual(self._titles("lobby"), ["Daily standup"])
+        appointments.delete_appointment(standup["id"])
+        self.assertEqual(self._titles("standup"), [])
+
+        # 匹配很多时沿日期索引按顺序扫描，结果与全量扫描的默认实现一致
+        appointments.add_appointments([
+            {"title": f"Sync {i}", "date": f"2025-{1 + i % 6:02d}-{1 + i % 27:02d}", "time": f"{8 + i % 9:02d}:00"}
+            for i in range(60)
+        ])
+        appointments.add_appointment("Sync series", "2025-02-03", "07:00", recurrence={"freq": "weekly"})
+        store = appointments.current_store()
+        queries = (("sync", None, None, 5), ("sync", "2025-02-01", "2025-03-15", 7), ("sync 1", None, None, 3),
+                   ("1 s", None, None, 4), ("5", "2025-03-01", None, 50))
+        with patch('calendar_reminder_service.src.search.EXPANSION_LIMIT', 3):
+            for args in queries:
+                self.assertEqual(store.search(*args), AppointmentRepository.search(store, *args), args)
+
+    def test_json_store(self):
+        self._check_mode()
+
+    def test_journal_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'journal'):
+            self._check_mode()
+
+    def test_sqlite_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'sqlite'):
+            try:
+                self._check_mode()
+            finally:
+                appointments.current_store().close()
+
+    def test_sharded_store(self):
+        with patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'sharded'):
+            try:
+                self._check_mode()
+            finally:
+                appointments.current_store().close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+import os
+import json
+import shutil
+from unittest.mock import patch
+
+from calendar_reminder_service.src import appointments
+from calendar_reminder_service.src import reminders
+from calendar_reminder_service.src.calendar_utils import parse_datetime_seconds
+from calendar_reminder_service.src.repository import AppointmentRepository, order_key
+from calendar_reminder_service.src.shards import CHANGES_NAME, MANIFEST_NAME, ShardedRepository, migrate_to_shards
+
+
+class TestShardedRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.test_data_file = os.path.join(self.test_data_dir, "test_sharded_appointments.json")
+        self.shard_dir = os.path.join(self.test_data_dir, "test_sharded_appointments")
+
+        self.data_file_patcher = patch('calendar_reminder_service.src.appointments.DATA_FILE', self.test_data_file)
+        self.mode_patcher = patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'sharded')
+        self.data_file_patcher.start()
+        self.mode_patcher.start()
+        appointments.save_appointments([])
+
+    def tearDown(self):
+        appointments.current_store().close()
+        self.mode_patcher.stop()
+        self.data_file_patcher.stop()
+        shutil.rmtree(self.shard_dir, ignore_errors=True)
+        if os.path.exists(self.test_data_file):
+            os.remove(self.test_data_file)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def _fresh(self):
+        """同一目录上的新实例（没有缓存），用来统计读取了哪些分片。"""
+        return ShardedRepository(self.shard_dir)
+
+    def test_layout_and_single_shard_writes(self):
+        jan = appointments.add_appointment("Jan", "2025-01-15", "09:00")
+        appointments.add_appointment("Feb", "2025-02-03", "10:00")
+        self.assertEqual(sorted(os.listdir(self.shard_dir)),
+                         ["2025-01.json", "2025-02.json", CHANGES_NAME, MANIFEST_NAME])
+        with open(os.path.join(self.shard_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        self.assertEqual({key: stats["count"] for key, stats in manifest["shards"].items()},
+                         {"2025-01": 1, "2025-02": 1})
+
+        # 新增约会只重写目标分片
+        feb_mtime = os.stat(os.path.join(self.shard_dir, "2025-02.json")).st_mtime_ns
+        store = appointments.current_store()
+        writes = store.shard_writes
+        appointments.add_appointment("Jan again", "2025-01-20", "11:00")
+        self.assertEqual(store.shard_writes, writes + 1)
+        self.assertEqual(os.stat(os.path.join(self.shard_dir, "2025-02.json")).st_mtime_ns, feb_mtime)
+
+        # 按日期查询只读取一个分片
+        repo = self._fresh()
+        self.assertEqual([a["id"] for a in repo.on_date("2025-01-15")], [jan["id"]])
+        self.assertEqual(repo.shard_reads, 1)
+        self.assertEqual(len(appointments.load_appointments()), 3)
+
+    def test_due_reads_only_shards_with_pending_reminders(self):
+        old = appointments.add_appointment("Old", "2024-06-10", "09:00")
+        reminders.set_reminder(old["id"], "2024-06-10 08:00")
+        current = appointments.add_appointment("Current", "2025-03-10", "09:00")
+        reminders.set_reminder(current["id"], "2025-03-10 08:30")
+        appointments.add_appointment("No reminder", "2025-03-20", "09:00")
+        later = appointments.add_appointment("Later", "2025-05-01", "09:00")
+        reminders.set_reminder(later["id"], "2025-04-30 09:00")
+
+        now = parse_datetime_seconds("2025-03-10 08:45")
+        repo = self._fresh()
+        self.assertEqual([a["id"] for a in repo.due(now)], [current["id"]])
+        self.assertEqual(repo.shard_reads, 1)
+        self.assertEqual(repo.next_reminder_time(now), parse_datetime_seconds("2025-04-30 09:00"))
+        self.assertEqual(repo.due(now), AppointmentRepository.due(repo, now))
+
+    def test_update_moves_between_shards_and_pages_in_order(self):
+        moved = appointments.add_appointment("Moves", "2025-01-05", "09:00")
+        appointments.add_appointment("Stays", "2025-02-05", "09:00")
+        weekly = appointments.add_appointment("Weekly", "2025-01-01", "08:00", recurrence={"freq": "weekly"})
+        store = appointments.current_store()
+        self.assertIsNotNone(store.update(moved["id"], {"date": "2025-03-01"}))
+        self.assertFalse(os.path.exists(os.path.join(self.shard_dir, "2025-01.json")))
+        self.assertEqual([a["id"] for a in self._fresh().on_date("2025-03-01")], [moved["id"]])
+        self.assertEqual([a["date"] for a in store.between("2025-02-01", "2025-02-28")],
+                         ["2025-02-05", "2025-02-05", "2025-02-12", "2025-02-19", "2025-02-26"])
+        self.assertIsNone(store.update("missing", {"title": "x"}))
+
+        expected = sorted(appointments.load_appointments(), key=order_key)
+        self.assertEqual([a["id"] for a in expected][0], weekly["id"])
+        self.assertEqual(list(appointments.iter_appointments(batch_size=1)), expected)
+
+    def test_get_and_delete_read_only_the_owning_shard(self):
+        jan = appointments.add_appointment("Jan", "2025-01-15", "09:00")
+        feb = appointments.add_appointment("Feb", "2025-02-03", "10:00")
+        self.assertEqual(appointments.get_appointment(feb["id"]), feb)
+
+        # 新实例第一次查询某个 ID 需要查找分片，之后按 ID → 分片的记录直接定位
+        repo = self._fresh()
+        self.assertEqual(repo.get(jan["id"]), jan)
+        reads = repo.shard_reads
+        self.assertEqual(repo.get(jan["id"]), jan)
+        self.assertEqual(repo.shard_reads, reads)
+
+        jan_mtime = os.stat(os.path.join(self.shard_dir, "2025-01.json")).st_mtime_ns
+        self.assertTrue(appointments.delete_appointment(feb["id"]))
+        self.assertFalse(os.path.exists(os.path.join(self.shard_dir, "2025-02.json")))
+        self.assertEqual(os.stat(os.path.join(self.shard_dir, "2025-01.json")).st_mtime_ns, jan_mtime)
+        self.assertFalse(appointments.delete_appointment(feb["id"]))
+        self.assertIsNone(appointments.get_appointment(feb["id"]))
+        self.assertIsNone(repo.get(feb["id"]))
+
+    def test_sees_writes_from_other_instances(self):
+        appointments.add_appointment("Mine", "2025-01-05", "09:00")
+        store = appointments.current_store()
+        self.assertEqual(len(store.on_date("2025-01-05")), 1)
+        version = store.version()
+        self._fresh().add({"id": "other", "title": "Other", "date": "2025-01-05", "time": "10:00"})
+        self.assertEqual([a["title"] for a in store.on_date("2025-01-05")], ["Mine", "Other"])
+        self.assertGreater(store.version(), version)
+
+    def test_migrate_single_file(self):
+        records = [
+            {"id": "a", "title": "A", "date": "2025-01-02", "time": "09:00", "description": "",
+             "reminder_set": False, "reminder_time": "", "location": ""},
+            {"id": "b", "title": "B", "date": "2025-04-02", "time": "09:00", "description": "",
+             "reminder_set": True, "reminder_time": "2025-04-02 08:00", "location": ""},
+        ]
+        with open(self.test_data_file, 'w') as f:
+            json.dump(records, f)
+        appointments.current_store().close()
+        self.assertEqual(migrate_to_shards(self.test_data_file), 2)
+        self.assertEqual(sorted(appointments.load_appointments(), key=lambda a: a["id"]), records)
+        self.assertEqual(appointments.get_appointments_on_date("2025-04-02")[0]["id"], "b")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+import os
+import json
+import random
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from calendar_reminder_service.src import appointments
+from calendar_reminder_service.src import reminders
+from calendar_reminder_service.src.calendar_utils import parse_datetime_seconds
+from calendar_reminder_service.src.changes import ResyncRequired, changes_path_for
+from calendar_reminder_service.src.repository import AppointmentRepository, order_key, snapshot_path_for
+from calendar_reminder_service.src.snapshot import SnapshotReader, SnapshotRepository, migrate_to_snapshot
+
+
+class TestSnapshotRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.test_data_file = os.path.join(self.test_data_dir, "test_snapshot_appointments.json")
+        self.snapshot_file = snapshot_path_for(self.test_data_file)
+
+        self.data_file_patcher = patch('calendar_reminder_service.src.appointments.DATA_FILE', self.test_data_file)
+        self.mode_patcher = patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'snapshot')
+        self.data_file_patcher.start()
+        self.mode_patcher.start()
+        appointments.save_appointments([])
+
+    def tearDown(self):
+        appointments.current_store().close()
+        self.mode_patcher.stop()
+        self.data_file_patcher.stop()
+        for path in (self.test_data_file, self.snapshot_file, changes_path_for(self.snapshot_file)):
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def _fresh(self):
+        """同一快照上的新实例（尚未映射），用来统计解码了多少条约会。"""
+        return SnapshotRepository(self.snapshot_file)
+
+    def test_lookups_decode_only_touched_records(self):
+        added = [result["appointment"] for result in appointments.add_appointments([
+            {"title": f"Event {i}", "date": f"2025-01-{1 + i % 10:02d}", "time": f"{8 + i % 9:02d}:00"}
+            for i in range(50)
+        ])]
+        self.assertFalse(os.path.exists(self.test_data_file))
+
+        repo = self._fresh()
+        try:
+            self.assertEqual(repo.get(added[17]["id"]), added[17])
+            self.assertEqual(repo.stats()["decoded"], 1)
+            self.assertIsNone(repo.get("missing"))
+            on_date = repo.on_date("2025-01-03")
+            self.assertEqual(on_date, [appt for appt in added if appt["date"] == "2025-01-03"])
+            self.assertEqual(repo.stats()["decoded"], 1 + len(on_date))
+            self.assertEqual(repo.stats()["records"], 50)
+        finally:
+            repo.close()
+
+        # load_appointments 按添加顺序返回全部约会
+        self.assertEqual(appointments.load_appointments(), added)
+
+    def test_queries_match_full_scan(self):
+        rng = random.Random(7)
+        base = datetime(2025, 3, 1)
+        records = []
+        for i in range(300):
+            start = base + timedelta(minutes=15 * rng.randrange(0, 4 * 24 * 40))
+            appt = {
+                "id": f"appt-{i:03d}", "title": f"Event {i}",
+                "date": start.strftime("%Y-%m-%d"), "time": start.strftime("%H:%M"),
+                "description": "", "reminder_set": False, "reminder_time": "", "location": "",
+            }
+            if rng.random() < 0.6:
+                appt["reminder_set"] = True
+                appt["reminder_time"] = (start - timedelta(minutes=rng.randrange(0, 60 * 48))).strftime("%Y-%m-%d %H:%M")
+            if i % 50 == 0:
+                appt["recurrence"] = {"freq": "weekly"}
+            records.append(appt)
+        # 混入格式错误的数据
+        records[1]["date"] = "someday"
+        records[2]["reminder_set"] = True
+        records[2]["reminder_time"] = "bad"
+        appointments.save_appointments(records)
+        store = appointments.current_store()
+
+        self.assertEqual(store.all(), records)
+        for day in ("2025-03-01", "2025-03-15", "2025-04-07"):
+            self.assertEqual(store.on_date(day), AppointmentRepository.on_date(store, day), day)
+        for start, end in (("2025-03-10", "2025-03-20"), (None, "2025-03-05"), ("2025-04-01", None)):
+            self.assertEqual(store.between(start, end), AppointmentRepository.between(store, start, end))
+        for hours in range(0, 24 * 40, 17):
+            now = (base + timedelta(hours=hours, seconds=30 * (hours % 2))).timestamp()
+            self.assertEqual(store.due(now), AppointmentRepository.due(store, now))
+            self.assertEqual(store.due(now, now - 3600 * 5), AppointmentRepository.due(store, now, now - 3600 * 5))
+            self.assertEqual(store.next_reminder_time(now), AppointmentRepository.next_reminder_time(store, now))
+
+        expected = sorted(records, key=order_key)
+        self.assertEqual(list(appointments.iter_appointments(batch_size=7)), expected)
+        self.assertEqual(store.page(order_key(expected[100]), 5), expected[101:106])
+
+    def test_writes_and_versions(self):
+        moved = appointments.add_appointment("Moves", "2025-01-05", "09:00")
+        stays = appointments.add_appointment("Stays", "2025-01-05", "10:00")
+        store = appointments.current_store()
+        version = store.version()
+        with self.assertRaises(ResyncRequired) as ctx:
+            store.changes_since(0)
+        seq = ctx.exception.seq
+
+        self.assertEqual(store.update(moved["id"], {"date": "2025-02-01", "location": "Room A"})["location"], "Room A")
+        self.assertEqual([a["id"] for a in store.on_date("2025-02-01")], [moved["id"]])
+        self.assertEqual([a["id"] for a in store.on_date("2025-01-05")], [stays["id"]])
+        self.assertIsNone(store.update("missing", {"title": "x"}))
+        self.assertGreater(store.version(), version)
+
+        reminders.set_reminder(stays["id"], "2025-01-05 09:30")
+        self.assertEqual(store.next_reminder_time(parse_datetime_seconds("2025-01-05 09:00")),
+                         parse_datetime_seconds("2025-01-05 09:30"))
+        self.assertEqual(store.delete_many([moved["id"], "missing", moved["id"]]), [True, False, False])
+        self.assertEqual([entry["op"] for entry in store.changes_since(seq)["changes"]],
+                         ["update", "update", "delete"])
+
+        # 其他实例（或进程）替换快照后重新映射
+        other = self._fresh()
+        try:
+            other.add({"id": "other", "title": "Other", "date": "2025-01-05", "time": "11:00"})
+        finally:
+            other.close()
+        self.assertEqual([a["title"] for a in store.on_date("2025-01-05")], ["Stays", "Other"])
+        self.assertEqual(len(appointments.load_appointments()), 2)
+
+    def test_migrate_and_reject_foreign_file(self):
+        records = [
+            {"id": "a", "title": "A", "date": "2025-01-02", "time": "09:00", "description": "",
+             "reminder_set": False, "reminder_time": "", "location": "", "color": "blue"},
+            {"id": "b", "title": "B", "date": "2025-04-02", "time": "09:00", "description": "",
+             "reminder_set": True, "reminder_time": "2025-04-02 08:00", "location": ""},
+        ]
+        with open(self.test_data_file, 'w') as f:
+            json.dump(records, f)
+        appointments.current_store().close()
+        self.assertEqual(migrate_to_snapshot(self.test_data_file), 2)
+        self.assertEqual(appointments.load_appointments(), records)
+        self.assertEqual(appointments.get_appointments_on_date("2025-04-02")[0]["id"], "b")
+
+        with open(self.snapshot_file, 'w') as f:
+            json.dump(records, f)
+        with self.assertRaises(ValueError):
+            SnapshotReader(self.snapshot_file)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import os
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+from calendar_reminder_service.src import appointments
+from calendar_reminder_service.src import reminders
+from calendar_reminder_service.src.calendar_utils import parse_datetime_seconds
+from calendar_reminder_service.src.sqlite_store import SQLiteRepository, migrate_json_to_sqlite
+
+class TestSQLiteRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.test_data_file = os.path.join(self.test_data_dir, "test_sqlite_appointments.json")
+        self.test_db_file = os.path.join(self.test_data_dir, "test_sqlite_appointments.db")
+
+        # DATA_FILE 决定数据库路径（同名 .db），STORAGE_MODE 切换到 SQLite
+        self.data_file_patcher = patch('calendar_reminder_service.src.appointments.DATA_FILE', self.test_data_file)
+        self.mode_patcher = patch('calendar_reminder_service.src.appointments.STORAGE_MODE', 'sqlite')
+        self.data_file_patcher.start()
+        self.mode_patcher.start()
+        self._cleanup()
+
+    def tearDown(self):
+        appointments.current_store().close()
+        self.mode_patcher.stop()
+        self.data_file_patcher.stop()
+        self._cleanup()
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def _cleanup(self):
+        for path in (self.test_data_file, self.test_db_file, self.test_db_file + "-wal", self.test_db_file + "-shm",
+                     reminders.watermark_path_for(self.test_data_file)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_add_and_query(self):
+        appt1 = appointments.add_appointment("Event 1", "2024-01-03", "10:00", "Desc", "Room")
+        appt2 = appointments.add_appointment("Event 2", "2024-01-01", "11:00")
+        appointments.add_appointment("Event 3", "2024-01-09", "12:00")
+
+        self.assertIsInstance(appointments.current_store(), SQLiteRepository)
+        self.assertTrue(os.path.exists(self.test_db_file))
+        self.assertFalse(os.path.exists(self.test_data_file))
+
+        on_date = appointments.get_appointments_on_date("2024-01-03")
+        self.assertEqual(on_date, [appt1])
+        week = appointments.get_appointments_between("2024-01-01", "2024-01-07")
+        self.assertEqual([a["id"] for a in week], [appt2["id"], appt1["id"]])
+        self.assertEqual(len(appointments.load_appointments()), 3)
+
+    def test_get_update_delete_by_id(self):
+        appt = appointments.add_appointment("Single", "2024-02-01", "10:00")
+        self.assertEqual(appointments.get_appointment(appt["id"]), appt)
+        version = appointments.data_version()
+        self.assertEqual(appointments.update_appointment(appt["id"], {"title": "Renamed"})["title"], "Renamed")
+        self.assertTrue(appointments.delete_appointment(appt["id"]))
+        self.assertFalse(appointments.delete_appointment(appt["id"]))
+        self.assertIsNone(appointments.get_appointment(appt["id"]))
+        self.assertEqual(appointments.data_version(), version + 2)
+
+    def test_set_and_check_reminders(self):
+        appt1 = appointments.add_appointment("Due", "2024-08-15", "14:00")
+        appt2 = appointments.add_appointment("Later", "2024-08-20", "10:00")
+        self.assertTrue(reminders.set_reminder(appt1["id"], "2024-08-15 12:00"))
+        self.assertTrue(reminders.set_reminder(appt2["id"], "2024-08-20 08:00"))
+        self.assertFalse(reminders.set_reminder("missing", "2024-08-20 08:00"))
+
+        with patch('calendar_reminder_service.src.reminders.datetime') as mock_datetime:
+            mock_datetime.now.return_value = datetime(2024, 8, 15, 13, 0)
+            due = reminders.check_reminders()
+        self.assertEqual([a["id"] for a in due], [appt1["id"]])
+        self.assertTrue(due[0]["reminder_set"])
+        self.assertEqual(due[0]["reminder_time"], "2024-08-15 12:00")
+
+        # 后台分发线程据此休眠到下一条提醒
+        repo = appointments.current_store()
+        now = parse_datetime_seconds("2024-08-15 13:00")
+        self.assertEqual(repo.next_reminder_time(now), parse_datetime_seconds("2024-08-20 08:00"))
+        self.assertIsNone(repo.next_reminder_time(parse_datetime_seconds("2024-08-20 08:00")))
+
+    def test_page_orders_by_date_time_id(self):
+        appointments.add_appointments([
+            {"title": f"Event {i}", "date": f"2024-03-0{1 + i % 2}", "time": f"1{i % 3}:00"} for i in range(6)
+        ])
+        expected = sorted(appointments.load_appointments(), key=lambda a: (a["date"], a["time"], a["id"]))
+        first, cursor = appointments.get_appointments_page(4)
+        second, cursor = appointments.get_appointments_page(4, cursor)
+        self.assertIsNone(cursor)
+        self.assertEqual([a["id"] for a in first + second], [a["id"] for a in expected])
+
+    def test_due_query_uses_index(self):
+        repo = appointments.current_store()
+        plan = repo._conn().execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM appointments "
+            "WHERE remind_at IS NOT NULL AND remind_at <= 0 AND start_at >= 0"
+        ).fetchall()
+        self.assertTrue(any("USING INDEX" in row[-1] for row in plan), plan)
+
+    def test_migrate_from_json(self):
+        sample_data = [
+            {"id": "1", "title": "Event A", "date": "2024-02-01", "time": "13:00", "description": "", "reminder_set": False, "reminder_time": "", "location": ""},
+            {"id": "2", "title": "Event B", "date": "2024-02-02", "time": "14:00", "description": "Desc", "reminder_set": True, "reminder_time": "2024-02-02 10:00", "location": "Room", "color": "red"}
+        ]
+        with open(self.test_data_file, 'w') as f:
+            json.dump(sample_data, f)
+
+        self.assertEqual(migrate_json_to_sqlite(self.test_data_file), 2)
+        self.assertEqual(appointments.load_appointments(), sample_data)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import os
+import json
+from unittest.mock import patch
+
+from calendar_reminder_service.src import appointments
+from calendar_reminder_service.src.store import AppointmentStore
+from calendar_reminder_service.src.changes import changes_path_for
+
+class TestAppointmentStore(unittest.TestCase):
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.test_data_file = os.path.join(self.test_data_dir, "test_store_appointments.json")
+
+        self.data_file_patcher = patch('calendar_reminder_service.src.appointments.DATA_FILE', self.test_data_file)
+        self.data_file_patcher.start()
+
+        if os.path.exists(self.test_data_file):
+            os.remove(self.test_data_file)
+        with open(self.test_data_file, 'w') as f:
+            json.dump([], f)
+
+    def tearDown(self):
+        self.data_file_patcher.stop()
+        for path in (self.test_data_file, changes_path_for(self.test_data_file)):
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists(self.test_data_dir) and not os.listdir(self.test_data_dir):
+            os.rmdir(self.test_data_dir)
+
+    def test_repeated_reads_hit_cache(self):
+        store = AppointmentStore(self.test_data_file)
+        store.records()
+        store.records()
+        store.records()
+        self.assertEqual(store.stats(), {"hits": 2, "misses": 1, "reloads": 0})
+
+    def test_external_write_triggers_reload(self):
+        store = AppointmentStore(self.test_data_file)
+        self.assertEqual(store.records(), [])
+
+        # 模拟其他进程直接改写数据文件
+        with open(self.test_data_file, 'w') as f:
+            json.dump([{"id": "x", "title": "External", "date": "2024-01-01", "time": "09:00"}], f)
+
+        records = store.records()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["id"], "x")
+        self.assertEqual(store.stats()["reloads"], 1)
+
+    def test_write_through_does_not_force_reload(self):
+        store = appointments.current_store()
+        appointments.add_appointment("Cached", "2024-01-01", "10:00")
+        before = store.stats()["reloads"]
+        self.assertEqual(len(appointments.load_appointments()), 1)
+        self.assertEqual(store.stats()["reloads"], before)
+
+        with open(self.test_data_file, 'r') as f:
+            self.assertEqual(len(json.load(f)), 1)
+
+    def test_returned_records_are_copies(self):
+        appointments.add_appointment("Original", "2024-01-01", "10:00")
+        loaded = appointments.load_appointments()
+        loaded[0]["title"] = "Mutated"
+        loaded.append({"id": "ghost"})
+
+        reloaded = appointments.load_appointments()
+        self.assertEqual(len(reloaded), 1)
+        self.assertEqual(reloaded[0]["title"], "Original")
+
+if __name__ == '__main__':
+    unittest.main()